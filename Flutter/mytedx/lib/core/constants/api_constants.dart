@@ -9,6 +9,9 @@ class ApiConstants {
       'https://fjpcr39w76.execute-api.us-east-1.amazonaws.com/default/search-by-title'; // Assumi un path come /search-talks
   static const String getAvailableTags =
       'https://0c7phf59uh.execute-api.us-east-1.amazonaws.com/default/get-tags';
+  // Router unico (Lambda graph-api): accetta anche più operazioni in un'unica richiesta
+  static const String graphApiEndpoint =
+      'https://[inserire-id-api].execute-api.us-east-1.amazonaws.com/default/graph-api'; // Da aggiornare dopo il deploy
   // Parametri API
   static const int talksPerPage = 6;
 }
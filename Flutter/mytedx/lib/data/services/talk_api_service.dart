@@ -181,4 +181,36 @@ class TalkApiService {
       throw Exception('Network error or server issue: $e');
     }
   }
+
+  /// Esegue più operazioni (es. tags, talks-by-tags, nexts) con una sola chiamata
+  /// al router graph-api. I risultati arrivano nello stesso ordine delle operazioni,
+  /// ognuno con il proprio 'status' e 'data' (o 'error').
+  Future<List<Map<String, dynamic>>> runBatch(
+    List<Map<String, dynamic>> operations,
+  ) async {
+    final url = Uri.parse(ApiConstants.graphApiEndpoint);
+    try {
+      final response = await _client.post(
+        url,
+        headers: {
+          'Content-Type': 'application/json',
+          'Accept': 'application/json',
+        },
+        body: jsonEncode({'operations': operations}),
+      );
+
+      if (response.statusCode == 200) {
+        final Map<String, dynamic> jsonMap = json.decode(
+          utf8.decode(response.bodyBytes),
+        );
+        return List<Map<String, dynamic>>.from(jsonMap['results']);
+      } else {
+        print('Failed to run batch: ${response.statusCode} ${response.body}');
+        throw Exception('Failed to run batch. Status: ${response.statusCode}');
+      }
+    } catch (e) {
+      print('Error in runBatch: $e');
+      throw Exception('Network error or server issue: $e');
+    }
+  }
 }
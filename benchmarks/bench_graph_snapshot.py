@@ -0,0 +1,88 @@
+"""
+Benchmark dello snapshot CSR del grafo (tedxgraph.graph_snapshot).
+
+Genera un grafo sintetico con le dimensioni del dataset TEDx (talk con 5 next_watch
+e qualche tag), scrive lo snapshot e misura:
+
+- il tempo di caricamento a freddo (mmap + indice id -> posizione), obiettivo < 1 s;
+- la latenza di vicini, k-hop, filtro per tag e speaker (talk, speaker correlati,
+  altri talk degli stessi speaker), obiettivo nell'ordine dei microsecondi.
+
+    python benchmarks/bench_graph_snapshot.py --talks 6000 --lookups 20000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambda", "layer", "python"))
+
+from tedxgraph import graph_snapshot, speakers  # noqa: E402
+
+
+def synthetic_graph(talks_count, degree=5, tags_count=300, seed=42, id_offset=100000):
+    rng = random.Random(seed)
+    tags = [f"tag{i}" for i in range(tags_count)]
+    talks = [
+        {
+            "id": str(id_offset + i),
+            "node_id": id_offset + i,
+            "title": f"Talk {i} about {rng.choice(tags)}",
+            "url": f"https://www.ted.com/talks/talk_{i}",
+            "speakers": f"Speaker {rng.randrange(talks_count // 2)}",
+            "description": "Lorem ipsum " * rng.randrange(5, 20),
+            "tags": rng.sample(tags, rng.randrange(1, 6)),
+        }
+        for i in range(talks_count)
+    ]
+    edges = []
+    for i in range(talks_count):
+        for rank, j in enumerate(rng.sample(range(talks_count), degree)):
+            edges.append((talks[i]["id"], talks[j]["id"], rank))
+    return talks, edges
+
+
+def per_call_us(fn, args_list):
+    started_at = time.perf_counter()
+    for args in args_list:
+        fn(*args)
+    return (time.perf_counter() - started_at) / len(args_list) * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--talks", type=int, default=6000)
+    parser.add_argument("--lookups", type=int, default=20000)
+    args = parser.parse_args()
+
+    talks, edges = synthetic_graph(args.talks)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "graph.snap")
+        started_at = time.perf_counter()
+        header, arrays = graph_snapshot.build_snapshot(talks, edges, "bench")
+        graph_snapshot.write_snapshot(path, header, arrays)
+        build_ms = (time.perf_counter() - started_at) * 1000
+
+        started_at = time.perf_counter()
+        snapshot = graph_snapshot.GraphSnapshot(path)
+        load_ms = (time.perf_counter() - started_at) * 1000
+
+        rng = random.Random(7)
+        ids = [(talks[rng.randrange(args.talks)]["id"],) for _ in range(args.lookups)]
+        indices = [(snapshot.index[talk_id],) for (talk_id,) in ids]
+        tag_queries = [([f"tag{rng.randrange(300)}", f"tag{rng.randrange(300)}"],) for _ in range(args.lookups // 10)]
+
+        print(f"Talks: {args.talks}, edges: {header['edges']}, file: {os.path.getsize(path) / 1024:.0f} KiB")
+        print(f"Build + write:            {build_ms:8.1f} ms")
+        print(f"Cold load (mmap + index): {load_ms:8.1f} ms")
+        print(f"Neighbour indices:        {per_call_us(lambda i: list(snapshot.neighbour_indices(i)), indices):8.2f} us/lookup")
+        print(f"Neighbours with cards:    {per_call_us(snapshot.neighbours, ids):8.2f} us/lookup")
+        print(f"2-hop (limit 50):         {per_call_us(lambda t: snapshot.k_hop(t, 2, 50), ids[:args.lookups // 10]):8.2f} us/lookup")
+        print(f"Talks by 2 tags:          {per_call_us(snapshot.talks_by_tags, tag_queries):8.2f} us/lookup")
+        speaker_keys = [(speakers.speaker_key(talks[snapshot.index[talk_id]]["speakers"]),) for (talk_id,) in ids]
+        print(f"Speaker talks:            {per_call_us(snapshot.speaker, speaker_keys):8.2f} us/lookup")
+        print(f"Co-tagged speakers:       {per_call_us(snapshot.co_tagged_speakers, speaker_keys[:args.lookups // 10]):8.2f} us/lookup")
+        print(f"Same-speaker neighbours:  {per_call_us(snapshot.speaker_neighbours, ids):8.2f} us/lookup")
@@ -0,0 +1,82 @@
+"""
+Benchmark dei cammini minimi tra due talk (GraphSnapshot.shortest_paths).
+
+Il grafo sintetico ha due componenti non collegate: le coppie tra componenti
+diverse sono il caso peggiore, perché la BFS deve esaurire una componente (o
+il limite di hop) prima di concludere che il cammino non esiste. Confronta la
+BFS bidirezionale con una BFS in un solo verso sullo stesso snapshot.
+
+    python benchmarks/bench_path.py --talks 6000 --pairs 500 --max-hops 8
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambda", "layer", "python"))
+
+from bench_graph_snapshot import synthetic_graph  # noqa: E402
+from tedxgraph import graph_snapshot  # noqa: E402
+
+
+def one_way_bfs(snapshot, source, target, max_hops):
+    depth = {source: 0}
+    queue = deque([source])
+    while queue:
+        u = queue.popleft()
+        if u == target:
+            return depth[u]
+        if depth[u] == max_hops:
+            continue
+        for v in snapshot.neighbour_indices(u):
+            if v not in depth:
+                depth[v] = depth[u] + 1
+                queue.append(v)
+    return None
+
+
+def timed_ms(fn, pairs):
+    started_at = time.perf_counter()
+    for source, target in pairs:
+        fn(source, target)
+    return (time.perf_counter() - started_at) / len(pairs) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--talks", type=int, default=6000)
+    parser.add_argument("--pairs", type=int, default=500)
+    parser.add_argument("--max-hops", type=int, default=8)
+    args = parser.parse_args()
+
+    half = args.talks // 2
+    talks_a, edges_a = synthetic_graph(half, seed=1, id_offset=100000)
+    talks_b, edges_b = synthetic_graph(args.talks - half, seed=2, id_offset=500000)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "graph.snap")
+        graph_snapshot.write_snapshot(path, *graph_snapshot.build_snapshot(talks_a + talks_b, edges_a + edges_b, "bench"))
+        snapshot = graph_snapshot.GraphSnapshot(path)
+
+        rng = random.Random(3)
+        connected = [(rng.randrange(half), rng.randrange(half)) for _ in range(args.pairs)]
+        disconnected = [(rng.randrange(half), half + rng.randrange(args.talks - half)) for _ in range(args.pairs)]
+
+        def bidirectional(source, target, k=1):
+            return snapshot.shortest_path_indices(source, target, max_hops=args.max_hops, k=k)
+
+        def one_way(source, target):
+            return one_way_bfs(snapshot, source, target, args.max_hops)
+
+        lengths = [len(p[0]) - 1 for p in (bidirectional(s, t) for s, t in connected) if p]
+        print(f"Talks: {args.talks} (2 components), edges: {len(snapshot.out_targets)}, max hops: {args.max_hops}")
+        print(f"Connected pairs: {len(lengths)}/{args.pairs} reachable, mean length {sum(lengths) / max(len(lengths), 1):.2f}")
+        print(f"Connected, bidirectional (k=1):   {timed_ms(bidirectional, connected):8.3f} ms/pair")
+        print(f"Connected, bidirectional (k=5):   {timed_ms(lambda s, t: bidirectional(s, t, k=5), connected):8.3f} ms/pair")
+        print(f"Connected, one-way BFS:           {timed_ms(one_way, connected):8.3f} ms/pair")
+        print(f"Disconnected, bidirectional:      {timed_ms(bidirectional, disconnected):8.3f} ms/pair")
+        print(f"Disconnected, one-way BFS:        {timed_ms(one_way, disconnected):8.3f} ms/pair")
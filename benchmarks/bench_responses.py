@@ -0,0 +1,132 @@
+"""
+Benchmark delle risposte delle Lambda di lettura (tedxgraph.responses) sullo
+snapshot del grafo costruito dal catalogo sintetico di tedxbench.
+
+Per i payload tipici di ogni endpoint (nexts, k-hop, talks-by-tags, tags e il
+batch della schermata mind-map) misura byte e microsecondi di:
+
+- serializzazione: json.dumps come nelle Lambda prima di responses.dumps
+  (spazi dopo i separatori), json compatto e orjson se installato;
+- compressione del JSON compatto: gzip e brotli (se installato) a vari livelli,
+  per scegliere RESPONSE_GZIP_LEVEL e RESPONSE_BROTLI_QUALITY;
+- selezione dei campi: payload completo e con fields=id,title.
+
+    python benchmarks/bench_responses.py --scale 1 --repeat 200
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import tempfile
+import time
+from statistics import median
+
+from tedxbench import datagen
+from tedxgraph import graph_snapshot, responses
+from tedxgraph.talk_filters import TalkFilter
+
+GZIP_LEVELS = (1, 5, 6, 9)
+BROTLI_QUALITIES = (1, 4, 5, 11)
+
+
+def build(scale, seed, path):
+    """Snapshot come in tedxbench.lambda_handlers (next_watch come archi RELATED_TO)."""
+    docs = datagen.talk_documents(scale, seed)
+    talks = [{**doc, "id": doc["_id"], "node_id": i, "published": doc.get("publishedAt")} for i, doc in enumerate(docs)]
+    edges = [(doc["_id"], related, rank) for doc in docs for rank, related in enumerate(doc.get("next_watch") or [])]
+    header, arrays = graph_snapshot.build_snapshot(talks, edges, "bench")
+    graph_snapshot.write_snapshot(path, header, arrays)
+    return docs
+
+
+def payloads(snapshot, docs, rng, fields):
+    """{endpoint: payload} con id e tag scelti a caso, limitati a ``fields`` dove supportato."""
+    talk_id = rng.choice(docs)["_id"]
+    tags = sorted({tag for doc in docs for tag in doc["tags"]})
+    talk_filter = TalkFilter(rng.sample(tags, 2))
+    neighbour_fields = fields or graph_snapshot.NEIGHBOUR_FIELDS
+    listing_fields = fields or graph_snapshot.LISTING_FIELDS
+    return {
+        "nexts": snapshot.neighbours(talk_id, neighbour_fields),
+        "k-hop (k=2)": snapshot.k_hop(talk_id, 2, 50, fields or graph_snapshot.CARD_FIELDS),
+        "talks-by-tags": snapshot.find_talks(talk_filter, fields=listing_fields),
+        "tags": list(snapshot.tags),
+        "batch (mind-map)": {"results": [
+            {"op": "tags", "status": 200, "data": list(snapshot.tags)},
+            {"op": "talks-by-tags", "status": 200, "data": snapshot.find_talks(talk_filter, fields=listing_fields)},
+            {"op": "nexts", "status": 200, "data": snapshot.neighbours(talk_id, neighbour_fields)},
+        ]},
+    }
+
+
+def timed(function, repeat):
+    """(risultato, microsecondi mediani per chiamata)."""
+    samples = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        result = function()
+        samples.append(time.perf_counter() - started_at)
+    return result, median(samples) * 1e6
+
+
+def serializers():
+    result = {
+        "json.dumps (before)": lambda payload: json.dumps(payload, default=str).encode("utf-8"),
+        "json compact": lambda payload: json.dumps(payload, separators=(",", ":"), default=str).encode("utf-8"),
+    }
+    if responses.orjson is not None:
+        result["orjson"] = lambda payload: responses.orjson.dumps(payload, default=str)
+    return result
+
+
+def compressors():
+    result = {f"gzip -{level}": (lambda body, level=level: gzip.compress(body, compresslevel=level, mtime=0))
+              for level in GZIP_LEVELS}
+    if responses.brotli is not None:
+        result.update({f"br q{quality}": (lambda body, quality=quality: responses.brotli.compress(body, quality=quality))
+                       for quality in BROTLI_QUALITIES})
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=1, help="catalogue size (1 = 6000 talks)")
+    parser.add_argument("--seed", type=int, default=datagen.DEFAULT_SEED)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "graph.snap")
+        docs = build(args.scale, args.seed, path)
+        snapshot = graph_snapshot.GraphSnapshot(path)
+        print(f"Talks: {snapshot.size}, orjson: {responses.orjson is not None}, brotli: {responses.brotli is not None}")
+
+        full = payloads(snapshot, docs, random.Random(args.seed), None)
+        projected = payloads(snapshot, docs, random.Random(args.seed), ("id", "title"))
+
+        print(f"\n{'serialization (bytes / us)':<28}" + "".join(f"{name:>24}" for name in serializers()))
+        for endpoint, payload in full.items():
+            row = ""
+            for serialize in serializers().values():
+                body, us = timed(lambda: serialize(payload), args.repeat)
+                row += f"{len(body):>14} {us:7.1f}us"
+            print(f"{endpoint:<28}{row}")
+
+        print(f"\n{'compression (bytes / us)':<28}" + "".join(f"{name:>16}" for name in compressors()))
+        for endpoint, payload in full.items():
+            body = responses.dumps(payload)
+            row = ""
+            for compress in compressors().values():
+                compressed, us = timed(lambda: compress(body), args.repeat)
+                row += f"{len(compressed):>7} {us:6.0f}us"
+            print(f"{endpoint:<28}{row}")
+
+        print(f"\n{'fields (bytes)':<28}{'all':>10}{'id,title':>10}{'all+' + responses.available_encodings()[0]:>12}"
+              f"{'id,title+' + responses.available_encodings()[0]:>16}")
+        encoding = responses.available_encodings()[0]
+        for endpoint in ("nexts", "k-hop (k=2)", "talks-by-tags", "batch (mind-map)"):
+            body, small = responses.dumps(full[endpoint]), responses.dumps(projected[endpoint])
+            print(f"{endpoint:<28}{len(body):>10}{len(small):>10}{len(responses.compress(body, encoding)):>12}"
+                  f"{len(responses.compress(small, encoding)):>16}")
@@ -0,0 +1,108 @@
+"""
+Benchmark dei filtri degli elenchi di talk (tedxgraph.talk_filters) sullo
+snapshot del grafo, con il catalogo sintetico di tedxbench (stesso seme e scala).
+
+Per ogni combinazione di filtri misura la latenza di find_talks partendo da
+ogni predicato (tag, data, durata, scansione completa) e con la scelta del
+planner, che deve essere vicina alla migliore; i risultati di tutte le
+strategie sono confrontati con quelli della scansione.
+
+    python benchmarks/bench_talk_filters.py --scale 1 --queries 300
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from tedxbench import datagen
+from tedxgraph import graph_snapshot
+from tedxgraph.talk_filters import TalkFilter
+
+STRATEGIES = ("planner", "tags", "published", "duration", "scan")
+
+
+def build(scale, seed, path):
+    talks = [
+        {**talk, "node_id": i, "published": talk["publishedAt"]}
+        for i, talk in enumerate(datagen.CatalogGenerator(scale, seed).talks())
+    ]
+    header, arrays = graph_snapshot.build_snapshot(talks, [], "bench")
+    graph_snapshot.write_snapshot(path, header, arrays)
+    return talks
+
+
+def query_mixes(talks, rng):
+    """{nome: funzione che genera un TalkFilter}: combinazioni con selettività diverse."""
+    counts = Counter(tag for talk in talks for tag in talk["tags"])
+    ranked = [tag for tag, _ in counts.most_common()]
+    popular = ranked[:5]
+    rare = [tag for tag in ranked if 5 <= counts[tag] <= 30] or ranked[-20:]
+    latest = max(talk["publishedAt"] for talk in talks)
+    end = datetime.fromisoformat(latest[:-1] + "+00:00")
+
+    def month():
+        start = end - timedelta(days=rng.randrange(30, 6000))
+        return start, start + timedelta(days=30)
+
+    return {
+        # "talk brevi e recenti su X": tag diffuso, ultimi due anni, al più 10 minuti
+        "popular tag + recent + short": lambda: TalkFilter(
+            [rng.choice(popular)], end - timedelta(days=730), None, None, 600, "newest"),
+        "rare tag + wide dates": lambda: TalkFilter(
+            [rng.choice(rare)], datetime(2008, 1, 1, tzinfo=timezone.utc), None, None, None, None),
+        "2 popular tags + one month": lambda: TalkFilter(
+            rng.sample(popular, 2), *month(), None, None, None),
+        "long talks (> 25 min)": lambda: TalkFilter(None, None, None, 1500, None, "longest"),
+        "last year, newest first": lambda: TalkFilter(None, end - timedelta(days=365), None, None, None, "newest"),
+    }
+
+
+def applicable(strategy, talk_filter):
+    if strategy in ("planner", "scan"):
+        return True
+    if strategy == "tags":
+        return bool(talk_filter.tags)
+    return strategy in talk_filter.ranges()
+
+
+def run_strategy(snapshot, filters, strategy, limit):
+    driver = None if strategy == "planner" else strategy
+    started_at = time.perf_counter()
+    results = [snapshot.find_talks(talk_filter, limit, driver=driver) for talk_filter in filters]
+    return (time.perf_counter() - started_at) / len(filters) * 1e6, results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=1, help="catalogue size (1 = 6000 talks)")
+    parser.add_argument("--seed", type=int, default=datagen.DEFAULT_SEED)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "graph.snap")
+        talks = build(args.scale, args.seed, path)
+        snapshot = graph_snapshot.GraphSnapshot(path)
+        print(f"Talks: {snapshot.size}, tags: {len(snapshot.tags)}")
+
+        rng = random.Random(args.seed)
+        print(f"\n{'us per query':<32}" + "".join(f"{strategy:>11}" for strategy in STRATEGIES) + "  planner picks")
+        for name, make in query_mixes(talks, rng).items():
+            filters = [make() for _ in range(args.queries)]
+            timings, expected = {}, None
+            for strategy in reversed(STRATEGIES):
+                if not all(applicable(strategy, talk_filter) for talk_filter in filters):
+                    continue
+                timings[strategy], results = run_strategy(snapshot, filters, strategy, args.limit)
+                if expected is None:
+                    expected = results
+                elif results != expected:
+                    raise SystemExit(f"{name}: strategy {strategy} returned different results from the scan")
+            picks = Counter(snapshot.plan(talk_filter)[0] or "scan" for talk_filter in filters)
+            row = "".join(f"{timings[strategy]:11.1f}" if strategy in timings else f"{'-':>11}" for strategy in STRATEGIES)
+            print(f"{name:<32}{row}  {', '.join(f'{driver} {count}' for driver, count in picks.most_common())}")
@@ -0,0 +1,176 @@
+"""
+Benchmark degli id dei talk come stringhe o come int64 (modalità typed-id, vedi
+tedxgraph/ids.py) sul dataset di tedxbench (stesso seme e stessa scala).
+
+- shuffle: byte degli id spostati dai join di tedXjob (details, tags, self-join
+  di next_watch), calcolati dalle righe di ogni fase con il layout UnsafeRow di
+  Spark (8 byte per campo + dati variabili arrotondati a 8 byte per le stringhe);
+- MongoDB: byte BSON di _id e next_watch nei documenti e chiavi dell'indice _id
+  (formato KeyString di WiredTiger);
+- lookup: ricerca binaria su chiavi ordinate (come in un indice B-tree) e hash
+  join in memoria, con id stringa e interi;
+- con pyspark installato, shuffle misurato: le fasi di build_tedx_dataset con e
+  senza typed_ids, leggendo shuffleWriteBytes dall'API REST di Spark.
+
+    python benchmarks/bench_talk_ids.py --scale 1 --lookups 200000
+"""
+
+import argparse
+import bisect
+import os
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+
+from tedxbench import GLUE_PATH, LAYER_PATH, datagen
+
+
+def unsafe_row_bytes(value):
+    """Byte di un campo in una UnsafeRow: slot fisso + dati variabili allineati a 8 byte."""
+    if isinstance(value, int):
+        return 8
+    return 8 + -(-len(value.encode("utf-8")) // 8) * 8
+
+
+def bson_element_bytes(value, name_length):
+    """Elemento BSON: tipo (1) + nome (C string) + valore (int64 o stringa con lunghezza e terminatore)."""
+    if isinstance(value, int):
+        return 1 + name_length + 1 + 8
+    return 1 + name_length + 1 + 4 + len(value.encode("utf-8")) + 1
+
+
+def keystring_bytes(value):
+    """Chiave dell'indice _id in KeyString: tipo + byte significativi (int) o stringa terminata."""
+    if isinstance(value, int):
+        return 1 + max(1, (value.bit_length() + 7) // 8)
+    return 1 + len(value.encode("utf-8")) + 1
+
+
+def typed(docs):
+    return [dict(doc, _id=int(doc["_id"]), next_watch=[int(related) for related in doc["next_watch"]]) for doc in docs]
+
+
+def shuffle_id_bytes(docs, tag_threshold=500):
+    """Byte degli id per fase di shuffle, con le righe che ogni fase sposta."""
+    ids = [doc["_id"] for doc in docs]
+    tag_counts = Counter(tag for doc in docs for tag in doc["tags"])
+    exploded = [(doc["_id"], tag) for doc in docs for tag in doc["tags"] if tag_counts[tag] <= tag_threshold]
+    by_tag = Counter(tag for _, tag in exploded)
+    pairs = sum(count * (count - 1) for count in by_tag.values())
+    id_size = statistics.mean(unsafe_row_bytes(talk_id) for talk_id in ids)
+    return {
+        # join con details e con i tag aggregati: entrambi i lati per id
+        "details join": 2 * len(ids) * id_size,
+        "tags groupBy + join": (len(exploded) + 2 * len(ids)) * id_size,
+        # self-join per tag (id come payload), groupBy (source, related), finestra e join finale
+        "next_watch self-join": 2 * len(exploded) * id_size + pairs * 2 * id_size,
+        "next_watch top-k + join": len(ids) * (1 + 5 + 1) * id_size,
+        "keywords join": 2 * len(ids) * id_size,
+    }
+
+
+def mongo_bytes(docs):
+    # _id e l'array next_watch (tipo, nome, lunghezza, terminatore) con i suoi elementi "0", "1", ...
+    documents = sum(bson_element_bytes(doc["_id"], 3) + 1 + len("next_watch") + 1 + 4 + 1 +
+                    sum(bson_element_bytes(related, len(str(i))) for i, related in enumerate(doc["next_watch"]))
+                    for doc in docs)
+    index = sum(keystring_bytes(doc["_id"]) for doc in docs)
+    return documents, index
+
+
+def lookup_latency(keys, probes):
+    ordered = sorted(keys)
+    started_at = time.perf_counter()
+    for probe in probes:
+        bisect.bisect_left(ordered, probe)
+    sorted_ns = (time.perf_counter() - started_at) / len(probes) * 1e9
+    table = {key: i for i, key in enumerate(keys)}
+    started_at = time.perf_counter()
+    for probe in probes:
+        table.get(probe)
+    hash_ns = (time.perf_counter() - started_at) / len(probes) * 1e9
+    return sorted_ns, hash_ns
+
+
+def spark_shuffle_bytes(scale, seed, workdir):
+    """Shuffle write misurato da Spark per build_tedx_dataset senza e con typed_ids."""
+    import requests
+    from pyspark.sql import SparkSession
+
+    os.environ["PYTHONPATH"] = os.pathsep.join(filter(None, [GLUE_PATH, LAYER_PATH, os.environ.get("PYTHONPATH")]))
+    sys.path.insert(0, GLUE_PATH)
+    import tedx_pipeline
+
+    data_dir = os.path.join(workdir, "dataset")
+    if not os.path.exists(os.path.join(data_dir, "transcripts.jsonl")):
+        datagen.write_dataset(data_dir, scale, seed)
+    spark = SparkSession.builder.master("local[*]").appName("bench-talk-ids").config("spark.ui.port", "4050").getOrCreate()
+    stages_url = f"{spark.sparkContext.uiWebUrl}/api/v1/applications/{spark.sparkContext.applicationId}/stages"
+    results = {}
+    try:
+        for typed_ids in (False, True):
+            before = sum(stage["shuffleWriteBytes"] for stage in requests.get(stages_url).json())
+            talks, details, tags = tedx_pipeline.read_inputs(spark, tedx_pipeline.input_paths(data_dir))
+            final = tedx_pipeline.build_tedx_dataset(talks, details, tags, typed_ids=typed_ids)
+            started_at = time.perf_counter()
+            final.select("_id", "next_watch").write.mode("overwrite").format("noop").save()
+            elapsed = time.perf_counter() - started_at
+            after = sum(stage["shuffleWriteBytes"] for stage in requests.get(stages_url).json())
+            results[typed_ids] = (after - before, elapsed)
+    finally:
+        spark.stop()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=1, help="catalogue size (1 = 6000 talks)")
+    parser.add_argument("--seed", type=int, default=datagen.DEFAULT_SEED)
+    parser.add_argument("--lookups", type=int, default=200000)
+    parser.add_argument("--workdir", default=None, help="dataset directory for the Spark measurement")
+    args = parser.parse_args()
+
+    string_docs = [{"_id": doc["_id"], "tags": doc["tags"], "next_watch": doc["next_watch"]}
+                   for doc in datagen.talk_documents(args.scale, args.seed)]
+    int_docs = typed(string_docs)
+    print(f"Talks: {len(string_docs)}, next_watch edges: {sum(len(doc['next_watch']) for doc in string_docs)}")
+
+    print(f"\n{'shuffle (id bytes, estimate)':<30} {'string':>10} {'int64':>10} {'saved':>7}")
+    string_shuffle, int_shuffle = shuffle_id_bytes(string_docs), shuffle_id_bytes(int_docs)
+    for stage in string_shuffle:
+        print(f"{stage:<30} {string_shuffle[stage] / 1024:9.0f}K {int_shuffle[stage] / 1024:9.0f}K "
+              f"{1 - int_shuffle[stage] / string_shuffle[stage]:6.0%}")
+    total_string, total_int = sum(string_shuffle.values()), sum(int_shuffle.values())
+    print(f"{'total':<30} {total_string / 1024:9.0f}K {total_int / 1024:9.0f}K {1 - total_int / total_string:6.0%}")
+
+    (string_docs_bytes, string_index), (int_docs_bytes, int_index) = mongo_bytes(string_docs), mongo_bytes(int_docs)
+    print(f"\n{'MongoDB':<30} {'string':>10} {'int64':>10} {'saved':>7}")
+    print(f"{'_id + next_watch (BSON)':<30} {string_docs_bytes / 1024:9.0f}K {int_docs_bytes / 1024:9.0f}K "
+          f"{1 - int_docs_bytes / string_docs_bytes:6.0%}")
+    print(f"{'_id index keys (KeyString)':<30} {string_index / 1024:9.0f}K {int_index / 1024:9.0f}K "
+          f"{1 - int_index / string_index:6.0%}")
+
+    rng = random.Random(args.seed)
+    string_ids = [doc["_id"] for doc in string_docs]
+    picks = [rng.randrange(len(string_ids)) for _ in range(args.lookups)]
+    string_sorted, string_hash = lookup_latency(string_ids, [string_ids[i] for i in picks])
+    int_ids = [int(talk_id) for talk_id in string_ids]
+    int_sorted, int_hash = lookup_latency(int_ids, [int_ids[i] for i in picks])
+    print(f"\n{'lookup (ns per probe)':<30} {'string':>10} {'int64':>10} {'speedup':>7}")
+    print(f"{'sorted keys (B-tree proxy)':<30} {string_sorted:10.0f} {int_sorted:10.0f} {string_sorted / int_sorted:6.2f}x")
+    print(f"{'hash (join/dict)':<30} {string_hash:10.0f} {int_hash:10.0f} {string_hash / int_hash:6.2f}x")
+
+    try:
+        import pyspark  # noqa: F401
+    except ImportError:
+        print("\npyspark not installed: measured Spark shuffle skipped.")
+    else:
+        import tempfile
+
+        measured = spark_shuffle_bytes(args.scale, args.seed, args.workdir or tempfile.mkdtemp(prefix="bench-talk-ids-"))
+        print(f"\n{'Spark shuffle write (measured)':<30} {'string':>10} {'int64':>10} {'saved':>7}")
+        (string_bytes, string_s), (int_bytes, int_s) = measured[False], measured[True]
+        print(f"{'bytes':<30} {string_bytes / 1024:9.0f}K {int_bytes / 1024:9.0f}K {1 - int_bytes / max(string_bytes, 1):6.0%}")
+        print(f"{'seconds':<30} {string_s:10.2f} {int_s:10.2f}")
@@ -0,0 +1,89 @@
+"""
+Benchmark delle trascrizioni compresse (tedxgraph.transcript_codec) sul dataset
+di tedxbench (stesso seme e stessa scala dei file generati).
+
+Per ogni codec (zstd se il pacchetto zstandard è installato, zlib sempre), con e
+senza dizionario condiviso, misura:
+
+- rapporto di compressione sul testo delle trascrizioni e sui documenti interi;
+- costo in scrittura: addestramento del dizionario e compressione (MB/s);
+- latenza di lettura di una trascrizione (decompressione, dizionario già in memoria)
+  e controllo che il testo letto sia identico.
+
+    python benchmarks/bench_transcript_compression.py --scale 1 --samples 2000
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+
+from tedxbench import datagen
+from tedxgraph import transcript_codec
+
+
+def document_bytes(doc):
+    return len(json.dumps({key: value for key, value in doc.items() if key != "transcript_cue_times"},
+                          ensure_ascii=False, default=lambda value: "x" * len(value)).encode("utf-8"))
+
+
+def run_codec(codec, dictionary, transcripts, docs, reads):
+    compressor = transcript_codec.Compressor(codec, dictionary)
+    started_at = time.perf_counter()
+    compressed = [compressor.compress(text) for text in transcripts]
+    compress_s = time.perf_counter() - started_at
+
+    cache = transcript_codec.DictionaryCache(lambda dict_id: dictionary)
+    latencies = []
+    for i in reads:
+        started_at = time.perf_counter()
+        text = transcript_codec.read_transcript({"transcript_z": compressed[i]}, cache)
+        latencies.append((time.perf_counter() - started_at) * 1000)
+        assert text == transcripts[i]
+
+    raw = sum(z["size"] for z in compressed)
+    packed = sum(len(z["data"]) for z in compressed)
+    plain_docs = sum(document_bytes(doc) for doc in docs)
+    packed_docs = plain_docs - raw + packed
+    return {
+        "ratio": raw / packed,
+        "document_ratio": plain_docs / packed_docs,
+        "compress_mb_s": raw / 1024 / 1024 / compress_s,
+        "compress_s": compress_s,
+        "read_p50_ms": statistics.median(latencies),
+        "read_p95_ms": sorted(latencies)[int(len(latencies) * 0.95)],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=0.2, help="catalogue size (1 = 6000 talks)")
+    parser.add_argument("--seed", type=int, default=datagen.DEFAULT_SEED)
+    parser.add_argument("--samples", type=int, default=2000, help="transcripts used to train the dictionary")
+    parser.add_argument("--reads", type=int, default=500)
+    args = parser.parse_args()
+
+    docs = datagen.talk_documents(args.scale, args.seed)
+    with_transcript = [doc for doc in docs if doc.get("transcript")]
+    transcripts = [doc["transcript"] for doc in with_transcript]
+    raw_bytes = sum(len(text.encode("utf-8")) for text in transcripts)
+    rng = random.Random(args.seed)
+    reads = [rng.randrange(len(transcripts)) for _ in range(args.reads)]
+    sample = rng.sample(transcripts, min(args.samples, len(transcripts)))
+    print(f"Talks: {len(docs)}, transcripts: {len(transcripts)} ({raw_bytes / 1024 / 1024:.1f} MiB), "
+          f"dictionary samples: {len(sample)}")
+
+    codecs = ["zlib"] if transcript_codec.available_codec() == "zlib" else ["zstd", "zlib"]
+    if codecs == ["zlib"]:
+        print("zstandard not installed: zstd skipped.")
+    print(f"{'codec':<18} {'ratio':>6} {'docs':>6} {'train s':>8} {'MB/s':>7} {'read p50':>9} {'read p95':>9}")
+    for codec in codecs:
+        for with_dictionary in (False, True):
+            started_at = time.perf_counter()
+            dictionary = transcript_codec.train_dictionary(sample, codec) if with_dictionary else b""
+            train_s = time.perf_counter() - started_at
+            stats = run_codec(codec, dictionary, transcripts, with_transcript, reads)
+            name = f"{codec} + dict {len(dictionary) // 1024} KiB" if with_dictionary else codec
+            print(f"{name:<18} {stats['ratio']:5.2f}x {stats['document_ratio']:5.2f}x {train_s:8.2f} "
+                  f"{stats['compress_mb_s']:7.1f} {stats['read_p50_ms']:7.3f}ms {stats['read_p95_ms']:7.3f}ms")
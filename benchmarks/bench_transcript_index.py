@@ -0,0 +1,143 @@
+"""
+Benchmark dell'indice posizionale delle trascrizioni (tedxgraph.transcript_index).
+
+Genera trascrizioni sintetiche (vocabolario con distribuzione di Zipf, cue da
+5-15 parole) con le dimensioni del dataset TEDx e misura:
+
+- dimensione dell'indice rispetto al testo grezzo;
+- latenza di query a un termine, a più termini e di frasi esatte;
+- la latenza della stessa ricerca di frase fatta rileggendo tutte le trascrizioni
+  (l'approccio che l'indice evita), controllando che i risultati coincidano;
+- lo spazio di testo e istanti delle cue rispetto al testo grezzo e la latenza
+  delle ricerche parola -> istante e istante -> cue di un talk.
+
+    python benchmarks/bench_transcript_index.py --talks 6000 --words 2000
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from itertools import accumulate
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambda", "layer", "python"))
+
+from tedxgraph import cue_times, graph_snapshot, transcript_index  # noqa: E402
+from tedxgraph.text import tokenize  # noqa: E402
+
+
+def word(number):
+    letters = ""
+    for _ in range(4):
+        number, digit = divmod(number, 26)
+        letters += chr(ord("a") + digit)
+    return letters
+
+
+def synthetic_transcripts(talks_count, words_per_talk, vocabulary_size=30000, seed=42):
+    rng = random.Random(seed)
+    vocabulary = [word(i) for i in range(vocabulary_size)]
+    cumulative = list(accumulate(1.0 / (rank + 1) for rank in range(vocabulary_size)))
+    transcripts = []
+    for _ in range(talks_count):
+        words = rng.choices(vocabulary, cum_weights=cumulative, k=rng.randrange(words_per_talk // 2, words_per_talk * 3 // 2))
+        cues, start = [], 0
+        while start < len(words):
+            size = rng.randrange(5, 16)
+            cues.append(" ".join(words[start:start + size]).capitalize() + ".")
+            start += size
+        transcripts.append("\n".join(cues))
+    return transcripts
+
+
+def synthetic_cue_times(transcripts, seed=42):
+    """Istanti di inizio delle cue (circa 150 parole al minuto) nel formato di transcript_cue_times."""
+    rng = random.Random(seed)
+    encoded = []
+    for transcript in transcripts:
+        starts, time_ms = [], rng.randrange(0, 15000)
+        for cue in transcript.split("\n"):
+            starts.append(time_ms)
+            time_ms += int(len(cue.split()) * 400 * rng.uniform(0.8, 1.2))
+        encoded.append(cue_times.encode_times(starts))
+    return encoded
+
+
+def scan_phrase(transcripts, phrase):
+    """Ricerca di frase senza indice: tokenizza ogni trascrizione e cerca la sequenza."""
+    pattern = re.compile(r"(?:^| )" + re.escape(" ".join(phrase)) + r"(?: |$)")
+    return {i for i, transcript in enumerate(transcripts) if transcript and pattern.search(" ".join(tokenize(transcript)))}
+
+
+def per_query_ms(index, queries):
+    started_at = time.perf_counter()
+    for query in queries:
+        index.search(query)
+    return (time.perf_counter() - started_at) / len(queries) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--talks", type=int, default=6000)
+    parser.add_argument("--words", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    transcripts = synthetic_transcripts(args.talks, args.words)
+    talk_ids = [str(100000 + i) for i in range(args.talks)]
+    raw_bytes = sum(len(t.encode("utf-8")) for t in transcripts)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "transcripts.snap")
+        started_at = time.perf_counter()
+        header, arrays = transcript_index.build_index(talk_ids, transcripts, "bench", synthetic_cue_times(transcripts))
+        graph_snapshot.write_snapshot(path, header, arrays, magic=transcript_index.MAGIC)
+        build_s = time.perf_counter() - started_at
+
+        started_at = time.perf_counter()
+        index = transcript_index.TranscriptIndex(path)
+        load_ms = (time.perf_counter() - started_at) * 1000
+
+        print(f"Talks: {args.talks}, positions: {header['tokens']}, terms: {header['terms']}, cues: {header['cues']}")
+        print(f"Raw text:                 {raw_bytes / 1024 / 1024:8.1f} MiB")
+        print(f"Index file:               {os.path.getsize(path) / 1024 / 1024:8.1f} MiB "
+              f"({len(arrays['posting_data']) / header['tokens']:.2f} bytes/position in postings)")
+        cue_bytes = sum(len(arrays[name]) * arrays[name].itemsize for name in ("cue_text_offsets", "cue_text_data", "cue_times"))
+        print(f"Cue text + times:         {cue_bytes / 1024 / 1024:8.1f} MiB ({cue_bytes / raw_bytes:.2f}x the raw text)")
+        print(f"Build + write:            {build_s:8.1f} s")
+        print(f"Cold load:                {load_ms:8.1f} ms")
+
+        rng = random.Random(7)
+        tokenized = [tokenize(t) for t in transcripts[:500]]
+        phrases = []
+        for _ in range(args.queries):
+            tokens = rng.choice(tokenized)
+            start = rng.randrange(len(tokens) - 3)
+            phrases.append(tokens[start:start + rng.choice((2, 3))])
+        rare = [[rng.choice(rng.choice(tokenized))] for _ in range(args.queries)]
+
+        print(f"Single term:              {per_query_ms(index, [t[0] for t in rare]):8.2f} ms/query")
+        print(f"Two terms (AND):          {per_query_ms(index, [f'{a[0]} {b[0]}' for a, b in zip(rare, rare[1:])]):8.2f} ms/query")
+        print(f"Phrase (2-3 words):       {per_query_ms(index, [chr(34) + ' '.join(p) + chr(34) for p in phrases]):8.2f} ms/query")
+
+        docs = [rng.randrange(args.talks) for _ in range(args.queries)]
+        started_at = time.perf_counter()
+        for doc, term in zip(docs, rare):
+            index.find_moments(doc, term[0])
+        print(f"Word -> moments (1 talk): {(time.perf_counter() - started_at) / len(docs) * 1000:8.2f} ms/query")
+        started_at = time.perf_counter()
+        for doc in docs:
+            index.moment_at(doc, rng.randrange(900000))
+        print(f"Time -> cue (1 talk):     {(time.perf_counter() - started_at) / len(docs) * 1000:8.2f} ms/query")
+
+        checked = phrases[:10]
+        started_at = time.perf_counter()
+        expected = [scan_phrase(transcripts, phrase) for phrase in checked]
+        scan_ms = (time.perf_counter() - started_at) / len(checked) * 1000
+        for phrase, talks in zip(checked, expected):
+            found = {index.index[r["id"]] for r in index.search('"' + " ".join(phrase) + '"', limit=args.talks)}
+            assert found == talks, (phrase, len(found), len(talks))
+        print(f"Phrase by rescanning:     {scan_ms:8.2f} ms/query (same results as the index)")
@@ -0,0 +1,133 @@
+"""
+Benchmark dell'indice vettoriale dei contenuti (tedxgraph.vector_index).
+
+Due scenari, entrambi confrontati con la ricerca esatta in float32 sui vettori
+non quantizzati (la "verità"):
+
+- corpus testuale sintetico con le dimensioni del dataset TEDx (documenti
+  generati da argomenti con vocabolario proprio), pipeline completa del job:
+  hashing TF-IDF -> SVD -> int8 -> grafo di vicinato;
+- vettori sintetici a cluster in numero maggiore (--vectors), per vedere il
+  comportamento della ricerca su grafo quando la forza bruta non basta più.
+
+Per ogni scenario: recall@k e latenza di forza bruta int8 e ricerca su grafo.
+Richiede numpy e scipy.
+
+    python benchmarks/bench_vector_index.py --talks 6000 --vectors 100000 --queries 500
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambda", "layer", "python"))
+
+from tedxgraph import graph_snapshot, vector_index  # noqa: E402
+
+
+def letters(number):
+    """Parola di sole lettere (la tokenizzazione scarta le cifre): 0 -> "aaa", 1 -> "aab"..."""
+    word = ""
+    for _ in range(3):
+        number, digit = divmod(number, 26)
+        word = chr(ord("a") + digit) + word
+    return word
+
+
+def synthetic_corpus(talks_count, topics_count=60, words_per_topic=80, seed=42):
+    """Documenti (titolo, descrizione, trascrizione) da 1-2 argomenti ciascuno."""
+    rng = random.Random(seed)
+    vocabulary = [[f"topic{letters(t)}{letters(w)}" for w in range(words_per_topic)] for t in range(topics_count)]
+    common = [f"common{letters(w)}" for w in range(400)]
+    documents = []
+    for _ in range(talks_count):
+        topics = rng.sample(range(topics_count), rng.choice((1, 2)))
+        words = [rng.choice(vocabulary[rng.choice(topics)]) if rng.random() < 0.6 else rng.choice(common)
+                 for _ in range(rng.randrange(200, 600))]
+        title = " ".join(rng.choice(vocabulary[topics[0]]) for _ in range(4))
+        documents.append([(title, 3), (" ".join(words[:40]), 2), (". ".join(words), 1)])
+    return documents
+
+
+def clustered_vectors(count, dimensions, clusters=500, spread=0.35, seed=42):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimensions)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, count)] + spread * rng.standard_normal((count, dimensions)).astype(np.float32)
+    return vector_index._normalize_rows(vectors)
+
+
+def exact_neighbours(vectors, queries, k):
+    scores = vectors[queries] @ vectors.T
+    scores[np.arange(len(queries)), queries] = -np.inf
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def evaluate(label, vectors, index, queries, truth, k, ef_values):
+    def run(search):
+        found, started_at = [], time.perf_counter()
+        for q in queries.tolist():
+            found.append([i for i, _ in search(index.vector(q), q)])
+        elapsed_us = (time.perf_counter() - started_at) / len(queries) * 1e6
+        hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth.tolist()))
+        return hits / (len(queries) * k), elapsed_us
+
+    print(f"{label}: {index.size} vettori x {index.dimensions}, file {os.path.getsize(index.path) / 1024 / 1024:.1f} MiB")
+    recall, us = run(lambda v, q: index.search_exact(v, k=k, exclude=q))
+    print(f"  forza bruta int8:        recall@{k} {recall:.3f}  {us:9.1f} us/query")
+    for ef in ef_values:
+        recall, us = run(lambda v, q: index.search_graph(v, k=k, ef=ef, exclude=q))
+        print(f"  grafo (ef={ef:<4}):         recall@{k} {recall:.3f}  {us:9.1f} us/query")
+
+
+def write_and_load(path, header, arrays):
+    graph_snapshot.write_snapshot(path, header, arrays, magic=vector_index.MAGIC)
+    started_at = time.perf_counter()
+    index = vector_index.ContentIndex(path)
+    return index, (time.perf_counter() - started_at) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--talks", type=int, default=6000)
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+    ef_values = (16, 32, 64, 128)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        documents = synthetic_corpus(args.talks)
+        talk_ids = [str(100000 + i) for i in range(args.talks)]
+        started_at = time.perf_counter()
+        vectors, components, idf = vector_index.lsa_vectors(documents)
+        header, arrays = vector_index.index_arrays(talk_ids, talk_ids, vectors, components, idf, "bench")
+        build_s = time.perf_counter() - started_at
+        index, load_ms = write_and_load(os.path.join(tmp, "corpus.snap"), header, arrays)
+        print(f"Corpus: build {build_s:.1f} s, cold load {load_ms:.1f} ms")
+
+        queries = np.random.default_rng(7).choice(args.talks, size=min(args.queries, args.talks), replace=False)
+        evaluate("Corpus testuale", vectors, index, queries, exact_neighbours(vectors, queries, args.k), args.k, ef_values)
+
+        text_query = [(documents[0][0][0], 1)]
+        started_at = time.perf_counter()
+        for _ in range(100):
+            index.embed_text(text_query)
+        print(f"  embed_text (titolo):     {(time.perf_counter() - started_at) / 100 * 1e6:9.1f} us/query")
+
+        if args.vectors:
+            dimensions = vector_index.DIMENSIONS
+            vectors = clustered_vectors(args.vectors, dimensions)
+            ids = [str(i) for i in range(args.vectors)]
+            started_at = time.perf_counter()
+            header, arrays = vector_index.index_arrays(
+                ids, ids, vectors, np.eye(dimensions, dtype=np.float32), np.ones(dimensions, dtype=np.float32), "bench")
+            build_s = time.perf_counter() - started_at
+            index, load_ms = write_and_load(os.path.join(tmp, "vectors.snap"), header, arrays)
+            print(f"Vettori a cluster: build {build_s:.1f} s, cold load {load_ms:.1f} ms")
+            queries = np.random.default_rng(7).choice(args.vectors, size=args.queries, replace=False)
+            evaluate("Vettori a cluster", vectors, index, queries, exact_neighbours(vectors, queries, args.k), args.k, ef_values)
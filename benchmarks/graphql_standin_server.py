@@ -0,0 +1,195 @@
+"""
+Server HTTP locale che imita l'endpoint GraphQL di ted.com per le trascrizioni.
+
+Serve a provare glue/transcript_harvest.py (blocchi di alias, throttling, errori
+dei singoli alias) senza richieste a ted.com: puntare TED_GRAPHQL_URL (o
+--GRAPHQL_URL del job) a http://127.0.0.1:<porta>/graphql.
+
+    python benchmarks/graphql_standin_server.py --port 8081 --scale 0.1 --latency 0.05 --rate-limit 20
+
+I talk sono quelli del generatore di tedxbench (stessi slug di final_list.csv
+generato con la stessa scala e lo stesso seme). Ogni campo
+``alias: translation(videoId: $v, language: $l)`` del documento riceve:
+- i paragrafi, se il talk ha la trascrizione in quella lingua (inglese per i
+  talk con trascrizione, le altre lingue per circa un terzo di essi);
+- null, se il talk non ha trascrizione in quella lingua;
+- null e un errore con ``path: [alias]``: "Video not found" per slug
+  sconosciuti, "Internal error" con probabilità --alias-error-rate.
+
+--latency        secondi di attesa per richiesta
+--alias-latency  secondi aggiuntivi per alias
+--rate-limit     richieste al secondo oltre le quali si risponde 429 con Retry-After
+--max-aliases    oltre questo numero di alias il documento viene rifiutato (400)
+
+Per i test, StandInCatalog.inject(429, 500, ...) fa rispondere alle prossime
+richieste con quegli status HTTP, nell'ordine (429 con Retry-After: 1).
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tedxbench import datagen
+
+CUE_TIME_RE = re.compile(r"cues\s*\{[^}]*\btime\b")
+FIELD_RE = re.compile(r"(?:(\w+)\s*:\s*)?translation\(\s*videoId:\s*\$(\w+)\s*,\s*language:\s*\$(\w+)\s*\)")
+# Le lingue diverse dall'inglese esistono per circa un talk su tre
+TRANSLATED_SHARE = 3
+
+
+class StandInCatalog:
+    def __init__(self, scale=0.1, seed=datagen.DEFAULT_SEED, latency=0.0, alias_latency=0.0, rate_limit=None,
+                 max_aliases=None, alias_error_rate=0.0):
+        self.generator = datagen.CatalogGenerator(scale, seed)
+        self.talks = {talk["slug"]: talk for talk in self.generator.talks()}
+        self.latency = latency
+        self.alias_latency = alias_latency
+        self.rate_limit = rate_limit
+        self.max_aliases = max_aliases
+        self.random = random.Random(seed)
+        self.alias_error_rate = alias_error_rate
+        self.requests = 0
+        self.aliases = 0
+        self.throttled = 0
+        self.injected = 0
+        self._injected = deque()
+        self._window = []
+        self._lock = threading.Lock()
+
+    def inject(self, *statuses):
+        """Le prossime richieste ricevono questi status HTTP (uno per richiesta) invece della risposta."""
+        with self._lock:
+            self._injected.extend(statuses)
+
+    def slugs(self):
+        return list(self.talks)
+
+    def _throttle(self):
+        if not self.rate_limit:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            self._window = [t for t in self._window if now - t < 1.0]
+            if len(self._window) >= self.rate_limit:
+                self.throttled += 1
+                return True
+            self._window.append(now)
+        return False
+
+    def translation(self, slug, language, cue_times=False):
+        """(paragrafi o None, messaggio d'errore o None); ``time`` delle cue solo se richiesto."""
+        talk = self.talks.get(slug)
+        if talk is None:
+            return None, f"Video not found: {slug}"
+        with self._lock:
+            failed = self.random.random() < self.alias_error_rate
+        if failed:
+            return None, "Internal error"
+        if language != "en" and zlib.crc32(f"{slug}:{language}".encode("utf-8")) % TRANSLATED_SHARE:
+            return None, None
+        paragraphs = self.generator.transcript(talk)
+        if paragraphs is None:
+            return None, None
+        prefix = "" if language == "en" else f"[{language}] "
+        return [{"cues": [{"text": prefix + cue["text"], **({"time": cue["time"]} if cue_times else {})} for cue in p["cues"]]}
+                for p in paragraphs], None
+
+    def execute(self, payload):
+        """Restituisce (status HTTP, corpo, header aggiuntivi)."""
+        with self._lock:
+            status = self._injected.popleft() if self._injected else None
+            if status is not None:
+                self.injected += 1
+        if status is not None:
+            return status, {"errors": [{"message": f"HTTP {status}"}]}, {"Retry-After": "1"} if status == 429 else {}
+        if self._throttle():
+            return 429, {"errors": [{"message": "Too many requests"}]}, {"Retry-After": "1"}
+        fields = FIELD_RE.findall(payload.get("query") or "")
+        if not fields:
+            return 400, {"errors": [{"message": "Unsupported query"}]}, {}
+        if self.max_aliases and len(fields) > self.max_aliases:
+            return 400, {"errors": [{"message": f"Query too complex: {len(fields)} fields (max {self.max_aliases})"}]}, {}
+        variables = payload.get("variables") or {}
+        cue_times = CUE_TIME_RE.search(payload["query"]) is not None
+        with self._lock:
+            self.requests += 1
+            self.aliases += len(fields)
+        time.sleep(self.latency + self.alias_latency * len(fields))
+
+        data, errors = {}, []
+        for alias, slug_variable, language_variable in fields:
+            alias = alias or "translation"
+            paragraphs, error = self.translation(str(variables.get(slug_variable)), str(variables.get(language_variable)), cue_times)
+            data[alias] = {"paragraphs": paragraphs} if paragraphs else None
+            if error:
+                errors.append({"message": error, "path": [alias]})
+        body = {"data": data}
+        if errors:
+            body["errors"] = errors
+        return 200, body, {}
+
+
+def make_handler(catalog):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            try:
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except json.JSONDecodeError:
+                self._reply(400, {"errors": [{"message": "invalid json"}]}, {})
+                return
+            self._reply(*catalog.execute(payload))
+
+        def _reply(self, status, body, headers):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_server(port=0, **catalog_options):
+    """Avvia il server in un thread e restituisce (server, catalog, url)."""
+    catalog = StandInCatalog(**catalog_options)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(catalog))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, catalog, f"http://127.0.0.1:{server.server_address[1]}/graphql"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--scale", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=datagen.DEFAULT_SEED)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--alias-latency", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, default=None)
+    parser.add_argument("--max-aliases", type=int, default=None)
+    parser.add_argument("--alias-error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server, catalog, url = start_server(
+        args.port, scale=args.scale, seed=args.seed, latency=args.latency, alias_latency=args.alias_latency,
+        rate_limit=args.rate_limit, max_aliases=args.max_aliases, alias_error_rate=args.alias_error_rate,
+    )
+    print(f"Stand-in GraphQL con {len(catalog.talks)} talk in ascolto su {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,89 @@
+"""
+Server HTTP locale che imita l'Inference API di Hugging Face per i riassunti.
+
+Serve a provare la cache e il precalcolo dei riassunti senza token né costi:
+puntare HF_API_BASE_URL a http://127.0.0.1:<porta>/models.
+
+    python benchmarks/hf_standin_server.py --port 8080 --latency 2.0 --loading-calls 1
+
+--latency       secondi di attesa simulati per ogni generazione
+--loading-calls numero di richieste iniziali a cui rispondere 503 "is currently loading"
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StandInModel:
+    def __init__(self, latency=0.0, loading_calls=0, estimated_time=20.0):
+        self.latency = latency
+        self.loading_calls = loading_calls
+        self.estimated_time = estimated_time
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate(self, model_id, inputs):
+        """Restituisce (status, body). Il testo dipende solo dall'input: è deterministico."""
+        with self._lock:
+            self.calls += 1
+            still_loading = self.calls <= self.loading_calls
+        if still_loading:
+            return 503, {"error": f"Model {model_id} is currently loading", "estimated_time": self.estimated_time}
+        time.sleep(self.latency)
+        digest = hashlib.sha256(inputs.encode("utf-8")).hexdigest()[:12]
+        words = len(inputs.split())
+        return 200, [{"generated_text": f"Stand-in summary {digest} of a {words}-word prompt."}]
+
+
+def make_handler(model):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            try:
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except json.JSONDecodeError:
+                self._reply(400, {"error": "invalid json"})
+                return
+            model_id = self.path.split("/models/", 1)[-1]
+            status, body = model.generate(model_id, str(payload.get("inputs", "")))
+            self._reply(status, body)
+
+        def _reply(self, status, body):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_server(port=0, **model_options):
+    """Avvia il server in un thread e restituisce (server, model, base_url)."""
+    model = StandInModel(**model_options)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(model))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, model, f"http://127.0.0.1:{server.server_address[1]}/models"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--loading-calls", type=int, default=0)
+    args = parser.parse_args()
+
+    server, _, base_url = start_server(args.port, latency=args.latency, loading_calls=args.loading_calls)
+    print(f"Stand-in model in ascolto su {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,30 @@
+"""
+Suite di benchmark riproducibile di TEDxGRAPH.
+
+    python -m benchmarks.tedxbench generate --scale 10 --out /tmp/tedx-10x
+    python -m benchmarks.tedxbench run --suite lambdas --scale 1 --results benchmarks/results
+    python -m benchmarks.tedxbench compare benchmarks/results/a.json benchmarks/results/b.json
+
+- ``datagen``: generatore con seme fisso di final_list.csv, details.csv, tags.csv
+  e delle trascrizioni (nel formato della risposta GraphQL di ted.com), a 1x, 10x
+  e 100x il catalogo attuale, con la distribuzione sbilanciata dei tag e la
+  lunghezza realistica delle trascrizioni;
+- ``spark_transforms``: le trasformazioni di tedXjob in Spark locale (richiede pyspark);
+- ``sync_phases``: le fasi di neo4jLink su un Neo4j locale (BENCH_NEO4J_URI) o, in
+  sua assenza, su una transazione finta che registra query e parametri;
+- ``lambda_handlers``: gli handler delle Lambda con snapshot e indici costruiti
+  dai dati generati;
+- ``results``: ogni esecuzione scrive un file JSON (commit, parametri, statistiche)
+  da confrontare nel tempo con ``compare``.
+"""
+
+import os
+import sys
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+LAYER_PATH = os.path.join(REPO_ROOT, "lambda", "layer", "python")
+LAMBDA_PATH = os.path.join(REPO_ROOT, "lambda")
+GLUE_PATH = os.path.join(REPO_ROOT, "glue")
+
+if LAYER_PATH not in sys.path:
+    sys.path.insert(0, LAYER_PATH)
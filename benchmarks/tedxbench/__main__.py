@@ -0,0 +1,70 @@
+import argparse
+import os
+import sys
+import tempfile
+
+from . import REPO_ROOT, datagen
+from .results import ResultSet, compare
+
+# L'ordine conta: la suite lambdas imposta i percorsi degli snapshot prima che
+# i moduli tedxgraph vengano importati dalle altre suite.
+SUITES = ("lambdas", "sync", "spark")
+
+
+def generate(args):
+    summary = datagen.write_dataset(args.out, args.scale, args.seed, args.transcript_ratio)
+    print(f"Generated {summary['talks']} talks ({summary['transcripts']} transcripts, "
+          f"{summary['transcript_words']} words, {summary['tag_assignments']} tag assignments) in {args.out}")
+    for name, size in summary["bytes"].items():
+        print(f"  {name:<20} {size / 1e6:10.1f} MB")
+
+
+def run(args):
+    from . import lambda_handlers, spark_transforms, sync_phases
+
+    modules = {"lambdas": lambda_handlers, "sync": sync_phases, "spark": spark_transforms}
+    suites = SUITES if args.suite == "all" else (args.suite,)
+    workdir = args.workdir or tempfile.mkdtemp(prefix=f"tedxbench-{args.scale}x-")
+    os.makedirs(workdir, exist_ok=True)
+    for suite in suites:
+        print(f"Suite {suite} (scale {args.scale}x, seed {args.seed}, workdir {workdir})")
+        results = ResultSet(suite, scale=args.scale, seed=args.seed, repeat=args.repeat)
+        modules[suite].run(results, scale=args.scale, seed=args.seed, workdir=workdir, repeat=args.repeat)
+        results.write(args.results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.tedxbench", description="TEDxGRAPH benchmark suite")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate_parser = commands.add_parser("generate", help="write the synthetic CSV and transcript files")
+    generate_parser.add_argument("--scale", type=float, default=1, help=f"multiple of today's catalogue (e.g. {datagen.SCALES})")
+    generate_parser.add_argument("--seed", type=int, default=datagen.DEFAULT_SEED)
+    generate_parser.add_argument("--transcript-ratio", type=float, default=1.0,
+                                 help="fraction of talks with a transcript, on top of the built-in missing ones")
+    generate_parser.add_argument("--out", required=True)
+
+    run_parser = commands.add_parser("run", help="run one or all benchmark suites and write JSON results")
+    run_parser.add_argument("--suite", choices=SUITES + ("all",), default="all")
+    run_parser.add_argument("--scale", type=float, default=1)
+    run_parser.add_argument("--seed", type=int, default=datagen.DEFAULT_SEED)
+    run_parser.add_argument("--repeat", type=int, default=50, help="measured invocations per Lambda case")
+    run_parser.add_argument("--workdir", help="where to write datasets and snapshots (default: a new temp dir)")
+    run_parser.add_argument("--results", default=os.path.join(REPO_ROOT, "benchmarks", "results"))
+
+    compare_parser = commands.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--metric", default="p50")
+
+    args = parser.parse_args(argv)
+    if args.command == "generate":
+        generate(args)
+    elif args.command == "run":
+        run(args)
+    else:
+        compare(args.old, args.new, args.metric)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,232 @@
+"""
+Generatore con seme fisso di un catalogo sintetico "alla TED".
+
+Produce gli stessi file letti da tedXjob (stesse colonne degli export originali)
+più le trascrizioni, nel formato della risposta GraphQL di ted.com
+(paragraphs -> cues -> text/time), una riga JSON per talk:
+
+    final_list.csv   id, slug, speakers, title, url
+    details.csv      id, slug, internalId, description, duration, socialDescription,
+                     presenterDisplayName, publishedAt
+    tags.csv         id, slug, internalId, tag
+    transcripts.jsonl {"slug", "language", "paragraphs": [{"cues": [{"text", "time"}]}]}
+
+Caratteristiche riprodotte: tag con frequenza a legge di Zipf (alcuni oltre la
+soglia di 500 talk che tedXjob scarta), tag e parole correlati agli argomenti
+del talk, speaker con più talk, durate log-normali (mediana ~12 minuti) e
+trascrizioni di ~150 parole al minuto in cue da 5-15 parole; una parte dei
+talk non ha trascrizione. Stesso seme e stessa scala -> stessi file.
+"""
+
+import csv
+import json
+import math
+import os
+import random
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+
+from tedxgraph.cue_times import cue_line, encode_times
+
+# Ordine di grandezza del catalogo attuale (final_list.csv)
+BASE_TALKS = 6000
+SCALES = (1, 10, 100)
+DEFAULT_SEED = 42
+
+TOPICS = 200
+TAGS = 400
+TAG_ZIPF_EXPONENT = 1.0
+WORDS_PER_MINUTE = 150
+NO_TRANSCRIPT_RATIO = 0.08
+
+_SYLLABLES = ("ka", "lo", "mi", "ne", "ri", "sa", "tu", "vo", "ze", "bra", "cle", "dri", "fla", "gro",
+              "pli", "sto", "tra", "qua", "shi", "mon", "ter", "lin", "dar", "pes", "col", "ven")
+# Parole funzionali reali: la rimozione delle stopword deve avere qualcosa da togliere
+_FUNCTION_WORDS = ("the", "and", "of", "to", "a", "in", "that", "is", "we", "it", "you", "this", "for",
+                   "was", "so", "but", "on", "are", "with", "they", "what", "can", "be", "have", "not",
+                   "about", "all", "our", "there", "at", "like", "one", "just", "how", "from", "people")
+
+
+def _word(rng, min_syllables=2, max_syllables=4):
+    return "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(min_syllables, max_syllables)))
+
+
+def _zipf_cumulative(size, exponent):
+    return list(accumulate(1.0 / (rank + 1) ** exponent for rank in range(size)))
+
+
+class CatalogGenerator:
+    """Talk sintetici deterministici: ``talks()`` produce un dict per talk."""
+
+    def __init__(self, scale=1, seed=DEFAULT_SEED, transcript_ratio=1.0):
+        self.scale = scale
+        self.seed = seed
+        self.size = int(BASE_TALKS * scale)
+        self.transcript_ratio = transcript_ratio
+        rng = random.Random(seed)
+        self.vocabulary = list(dict.fromkeys(_word(rng) for _ in range(20000)))
+        self.topic_words = [rng.sample(self.vocabulary, 60) for _ in range(TOPICS)]
+        self.tags = list(dict.fromkeys(" ".join(_word(rng, 2, 3) for _ in range(rng.choice((1, 1, 2)))) for _ in range(TAGS)))
+        self.tag_cumulative = _zipf_cumulative(len(self.tags), TAG_ZIPF_EXPONENT)
+        self.topic_tags = [rng.sample(range(len(self.tags)), 6) for _ in range(TOPICS)]
+        self.speakers = [f"{_word(rng, 2, 3).capitalize()} {_word(rng, 2, 4).capitalize()}" for _ in range(max(1, self.size * 4 // 5))]
+        self.speaker_cumulative = _zipf_cumulative(len(self.speakers), 0.6)
+        self.general_cumulative = _zipf_cumulative(len(self.vocabulary), 1.0)
+
+    def _text(self, rng, topics, words):
+        topic_share = 0.35
+        out = []
+        for _ in range(words):
+            r = rng.random()
+            if r < topic_share:
+                out.append(rng.choice(self.topic_words[rng.choice(topics)]))
+            elif r < topic_share + 0.4:
+                out.append(rng.choice(_FUNCTION_WORDS))
+            else:
+                out.append(rng.choices(self.vocabulary, cum_weights=self.general_cumulative)[0])
+        return out
+
+    def _sentence(self, words):
+        return " ".join(words).capitalize() + "."
+
+    def talks(self):
+        start = datetime(2006, 6, 27, tzinfo=timezone.utc)
+        span_seconds = int((datetime(2025, 5, 1, tzinfo=timezone.utc) - start).total_seconds())
+        for i in range(self.size):
+            # Un generatore per talk: ogni talk dipende solo da (seme, indice)
+            rng = random.Random(self.seed * 1_000_003 + i)
+            talk_id = str(100000 + i)
+            topics = rng.sample(range(TOPICS), rng.choice((1, 1, 2)))
+            speaker = rng.choices(self.speakers, cum_weights=self.speaker_cumulative)[0]
+            title_words = self._text(rng, topics, rng.randint(3, 8))
+            title = " ".join(title_words).capitalize()
+            slug = "_".join([speaker.lower().replace(" ", "_")] + [w for w in title_words if w not in _FUNCTION_WORDS][:5])
+            tags = set()
+            for _ in range(rng.randint(2, 8)):
+                if rng.random() < 0.5:
+                    tags.add(self.tags[rng.choice(self.topic_tags[rng.choice(topics)])])
+                else:
+                    tags.add(rng.choices(self.tags, cum_weights=self.tag_cumulative)[0])
+            duration = int(min(3600, max(60, rng.lognormvariate(math.log(720), 0.45))))
+            published = start + timedelta(seconds=rng.randrange(span_seconds))
+            description = " ".join(self._sentence(self._text(rng, topics, rng.randint(8, 20))) for _ in range(rng.randint(2, 5)))
+            yield {
+                "id": talk_id,
+                "slug": slug,
+                "speakers": speaker,
+                "title": title,
+                "url": f"https://www.ted.com/talks/{slug}",
+                "internalId": f"{rng.getrandbits(48):012x}",
+                "description": description,
+                "duration": str(duration),
+                "publishedAt": published.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "tags": sorted(tags),
+                "topics": topics,
+                "has_transcript": rng.random() >= NO_TRANSCRIPT_RATIO and rng.random() < self.transcript_ratio,
+                "transcript_seed": rng.getrandbits(32),
+            }
+
+    def transcript(self, talk):
+        """Paragrafi e cue (testo e istante di inizio in ms) del talk, o None."""
+        if not talk["has_transcript"]:
+            return None
+        rng = random.Random(talk["transcript_seed"])
+        words = self._text(rng, talk["topics"], int(int(talk["duration"]) / 60 * WORDS_PER_MINUTE * rng.uniform(0.8, 1.2)))
+        ms_per_word = int(talk["duration"]) * 1000 / max(1, len(words))
+        paragraphs, cues, position = [], [], 0
+        while position < len(words):
+            size = rng.randint(5, 15)
+            cues.append({"text": self._sentence(words[position:position + size]), "time": int(position * ms_per_word)})
+            position += size
+            if len(cues) >= rng.randint(3, 8):
+                paragraphs.append({"cues": cues})
+                cues = []
+        if cues:
+            paragraphs.append({"cues": cues})
+        return paragraphs
+
+
+def _kept_cues(paragraphs):
+    return [cue for paragraph in paragraphs or () for cue in paragraph["cues"] if cue_line(cue.get("text"))]
+
+
+def flatten_transcript(paragraphs):
+    """Come tedXjob: testo delle cue (una per riga) unito con "\\n"."""
+    if not paragraphs:
+        return None
+    return "\n".join(cue_line(cue["text"]) for cue in _kept_cues(paragraphs))
+
+
+def cue_start_times(paragraphs):
+    """Come tedXjob: istanti di inizio (ms) delle cue di flatten_transcript, o None."""
+    cues = _kept_cues(paragraphs)
+    if not cues or any(cue.get("time") is None for cue in cues):
+        return None
+    return [cue["time"] for cue in cues]
+
+
+def write_dataset(out_dir, scale=1, seed=DEFAULT_SEED, transcript_ratio=1.0):
+    """Scrive i quattro file in ``out_dir``; restituisce un riepilogo (conteggi e byte)."""
+    os.makedirs(out_dir, exist_ok=True)
+    generator = CatalogGenerator(scale, seed, transcript_ratio)
+    paths = {name: os.path.join(out_dir, name) for name in ("final_list.csv", "details.csv", "tags.csv", "transcripts.jsonl")}
+    summary = {"scale": scale, "seed": seed, "talks": 0, "tag_assignments": 0, "transcripts": 0, "transcript_words": 0}
+    with open(paths["final_list.csv"], "w", newline="", encoding="utf-8") as final_list, \
+            open(paths["details.csv"], "w", newline="", encoding="utf-8") as details, \
+            open(paths["tags.csv"], "w", newline="", encoding="utf-8") as tags, \
+            open(paths["transcripts.jsonl"], "w", encoding="utf-8") as transcripts:
+        final_writer = csv.writer(final_list)
+        details_writer = csv.writer(details)
+        tags_writer = csv.writer(tags)
+        final_writer.writerow(["id", "slug", "speakers", "title", "url"])
+        details_writer.writerow(["id", "slug", "internalId", "description", "duration", "socialDescription",
+                                 "presenterDisplayName", "publishedAt"])
+        tags_writer.writerow(["id", "slug", "internalId", "tag"])
+        for talk in generator.talks():
+            final_writer.writerow([talk["id"], talk["slug"], talk["speakers"], talk["title"], talk["url"]])
+            details_writer.writerow([talk["id"], talk["slug"], talk["internalId"], talk["description"], talk["duration"],
+                                     talk["description"].split(".")[0] + ".", talk["speakers"], talk["publishedAt"]])
+            for tag in talk["tags"]:
+                tags_writer.writerow([talk["id"], talk["slug"], talk["internalId"], tag])
+            summary["talks"] += 1
+            summary["tag_assignments"] += len(talk["tags"])
+            paragraphs = generator.transcript(talk)
+            if paragraphs is not None:
+                transcripts.write(json.dumps({"slug": talk["slug"], "language": "en", "paragraphs": paragraphs}) + "\n")
+                summary["transcripts"] += 1
+                summary["transcript_words"] += sum(len(cue["text"].split()) for p in paragraphs for cue in p["cues"])
+    summary["bytes"] = {name: os.path.getsize(path) for name, path in paths.items()}
+    return summary
+
+
+def talk_documents(scale=1, seed=DEFAULT_SEED, transcript_ratio=1.0, next_watch_size=5, tag_threshold=500):
+    """
+    Documenti come quelli che tedXjob scrive in MongoDB (_id, campi dei CSV, tags,
+    transcript, transcript_cue_times, next_watch), calcolati in Python per i benchmark che non usano
+    Spark: next_watch sono i talk con più tag in comune, ignorando i tag presenti
+    in più di ``tag_threshold`` talk (come il job).
+    """
+    generator = CatalogGenerator(scale, seed, transcript_ratio)
+    docs = []
+    for talk in generator.talks():
+        doc = {key: talk[key] for key in ("slug", "speakers", "title", "url", "description", "duration", "publishedAt", "tags")}
+        doc["_id"] = talk["id"]
+        paragraphs = generator.transcript(talk)
+        doc["transcript"] = flatten_transcript(paragraphs)
+        doc["transcript_cue_times"] = encode_times(cue_start_times(paragraphs) or [])
+        docs.append(doc)
+
+    talks_by_tag = {}
+    for i, doc in enumerate(docs):
+        for tag in doc["tags"]:
+            talks_by_tag.setdefault(tag, []).append(i)
+    kept = {tag: members for tag, members in talks_by_tag.items() if len(members) <= tag_threshold}
+    for i, doc in enumerate(docs):
+        common = {}
+        for tag in doc["tags"]:
+            for j in kept.get(tag, ()):
+                if j != i:
+                    common[j] = common.get(j, 0) + 1
+        best = sorted(common.items(), key=lambda item: (-item[1], docs[item[0]]["_id"]))[:next_watch_size]
+        doc["next_watch"] = [docs[j]["_id"] for j, _ in best]
+    return docs
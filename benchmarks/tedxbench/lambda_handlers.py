@@ -0,0 +1,189 @@
+"""
+Benchmark degli handler delle Lambda.
+
+Dai documenti generati (datagen.talk_documents) costruisce lo snapshot del grafo,
+l'indice dei contenuti e l'indice delle trascrizioni, li configura tramite le
+stesse variabili d'ambiente usate in produzione e invoca ogni handler con
+eventi API Gateway realistici: latenza (p50/p95) e dimensione della risposta
+(byte trasmessi, dopo l'eventuale compressione chiesta con Accept-Encoding).
+
+Gli handler che richiedono Neo4j o MongoDB per il caso misurato rispondono 503
+in assenza del database: vengono segnati come "skipped". Con le variabili
+NEO4J_* / MONGODB_* configurate (database di test) vengono misurati anche quelli.
+"""
+
+import base64
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import random
+import time
+
+from . import LAMBDA_PATH, datagen
+from .results import measure
+
+def configure_environment(workdir):
+    """
+    Percorsi dei file locali: vanno impostati prima del primo import dei moduli
+    tedxgraph, che leggono la configurazione all'import (come nelle Lambda).
+    """
+    paths = {
+        "GRAPH_SNAPSHOT_PATH": os.path.join(workdir, "graph.snap"),
+        "CONTENT_INDEX_PATH": os.path.join(workdir, "vectors.snap"),
+        "TRANSCRIPT_INDEX_PATH": os.path.join(workdir, "transcripts.snap"),
+    }
+    os.environ.update(paths)
+    return paths
+
+
+def build_artifacts(docs, paths, results):
+    from tedxgraph import graph_snapshot, transcript_index
+
+    talks = [
+        {**doc, "id": doc["_id"], "node_id": i, "published": doc.get("publishedAt")}
+        for i, doc in enumerate(docs)
+    ]
+    edges = [(doc["_id"], related, rank) for doc in docs for rank, related in enumerate(doc.get("next_watch") or [])]
+    started_at = time.perf_counter()
+    header, arrays = graph_snapshot.build_snapshot(talks, edges, "bench")
+    graph_snapshot.write_snapshot(paths["GRAPH_SNAPSHOT_PATH"], header, arrays)
+    results.record("build graph snapshot", value=round(time.perf_counter() - started_at, 3), unit="s")
+    results.record("graph snapshot size", value=os.path.getsize(paths["GRAPH_SNAPSHOT_PATH"]), unit="bytes")
+
+    with_transcript = [doc for doc in docs if doc.get("transcript")]
+    started_at = time.perf_counter()
+    header, arrays = transcript_index.build_index([d["_id"] for d in with_transcript], [d["transcript"] for d in with_transcript], "bench",
+                                                  [d.get("transcript_cue_times") for d in with_transcript])
+    graph_snapshot.write_snapshot(paths["TRANSCRIPT_INDEX_PATH"], header, arrays, magic=transcript_index.MAGIC)
+    results.record("build transcript index", value=round(time.perf_counter() - started_at, 3), unit="s")
+    results.record("transcript index size", value=os.path.getsize(paths["TRANSCRIPT_INDEX_PATH"]), unit="bytes")
+
+    try:
+        from tedxgraph import vector_index
+
+        started_at = time.perf_counter()
+        header, arrays = vector_index.build_index(
+            [d["_id"] for d in docs], [d["title"] for d in docs],
+            [[(d["title"], 3), (d["description"], 2), (d.get("transcript"), 1)] for d in docs], "bench")
+        graph_snapshot.write_snapshot(paths["CONTENT_INDEX_PATH"], header, arrays, magic=vector_index.MAGIC)
+        results.record("build content index", value=round(time.perf_counter() - started_at, 3), unit="s")
+    except ImportError as e:
+        os.environ.pop("CONTENT_INDEX_PATH", None)
+        results.skip("build content index", f"numpy/scipy not available ({e})")
+
+
+def load_handler(name):
+    spec = importlib.util.spec_from_file_location(name.replace("-", "_"), os.path.join(LAMBDA_PATH, f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.lambda_handler
+
+
+def _get(params, encoding=None):
+    headers = {"Accept-Encoding": encoding} if encoding else {}
+    return {"httpMethod": "GET", "queryStringParameters": params, "headers": headers}
+
+
+def _post(body, encoding=None):
+    headers = {"Accept-Encoding": encoding} if encoding else {}
+    return {"httpMethod": "POST", "queryStringParameters": None, "body": json.dumps(body), "headers": headers}
+
+
+def response_bytes(response):
+    """Byte del corpo come arrivano al client (decodificato il base64 dei corpi compressi)."""
+    body = response.get("body") or ""
+    if response.get("isBase64Encoded"):
+        return len(base64.b64decode(body))
+    return len(body.encode("utf-8"))
+
+
+def cases(docs, seed):
+    """(nome, handler, funzione che genera l'evento) con input casuali ma riproducibili."""
+    rng = random.Random(seed)
+    ids = [doc["_id"] for doc in docs]
+    tags = sorted({tag for doc in docs for tag in doc["tags"]})
+    words = [w for doc in docs[:200] if doc.get("transcript") for w in doc["transcript"].split()[:50]]
+    with_transcript = [doc["_id"] for doc in docs if doc.get("transcript")]
+
+    def random_id():
+        return rng.choice(ids)
+
+    def random_tags():
+        return ",".join(rng.sample(tags, 2))
+
+    def random_phrase():
+        start = rng.randrange(len(words) - 3)
+        return '"' + " ".join(words[start:start + 2]).strip(".").lower() + '"'
+
+    return [
+        ("get-nexts-by-id-neo4j", "get-nexts-by-id-neo4j", lambda: _get({"id": random_id()})),
+        ("get-tags", "get-tags", lambda: _get(None)),
+        ("get-talks-by-tags", "get-talks-by-tags", lambda: _get({"tags": random_tags()})),
+        ("get-talks-by-tags filtered", "get-talks-by-tags", lambda: _get({
+            "tags": random_tags(), "published_after": "2015-01-01", "max_duration": "900", "sort": "newest"})),
+        ("graph-api nexts", "graph-api", lambda: _get({"op": "nexts", "id": random_id()})),
+        ("graph-api nexts fields=id,title", "graph-api", lambda: _get({"op": "nexts", "id": random_id(),
+                                                                       "fields": "id,title"})),
+        ("graph-api nexts rank=content", "graph-api", lambda: _get({"op": "nexts", "id": random_id(), "rank": "content"})),
+        ("graph-api nexts include=speakers", "graph-api", lambda: _get({"op": "nexts", "id": random_id(),
+                                                                        "include": "speakers"})),
+        ("graph-api speaker", "graph-api", lambda: _get({"op": "speaker", "name": rng.choice(docs)["speakers"]})),
+        ("graph-api k-hop", "graph-api", lambda: _get({"op": "k-hop", "id": random_id(), "k": "2"})),
+        ("graph-api k-hop gzip", "graph-api", lambda: _get({"op": "k-hop", "id": random_id(), "k": "2"}, "gzip")),
+        ("graph-api k-hop br", "graph-api", lambda: _get({"op": "k-hop", "id": random_id(), "k": "2"}, "br, gzip")),
+        ("graph-api k-hop fields=id,title gzip", "graph-api", lambda: _get({"op": "k-hop", "id": random_id(), "k": "2",
+                                                                            "fields": "id,title"}, "gzip")),
+        ("graph-api path", "graph-api", lambda: _get({"op": "path", "from": random_id(), "to": random_id()})),
+        ("graph-api tags", "graph-api", lambda: _get({"op": "tags"})),
+        ("graph-api talks-by-tags", "graph-api", lambda: _get({"op": "talks-by-tags", "tags": random_tags()})),
+        ("graph-api talks-by-tags fields=id,title", "graph-api", lambda: _get({"op": "talks-by-tags", "tags": random_tags(),
+                                                                               "fields": "id,title"})),
+        ("graph-api similar-by-content", "graph-api", lambda: _get({"op": "similar-by-content", "id": random_id()})),
+        ("graph-api moments q", "graph-api", lambda: _get({"op": "moments", "id": rng.choice(with_transcript),
+                                                            "q": random_phrase().strip('"').split()[0]})),
+        ("graph-api moments t", "graph-api", lambda: _get({"op": "moments", "id": rng.choice(with_transcript),
+                                                            "t": str(rng.randrange(600000))})),
+        ("graph-api batch (mind-map screen)", "graph-api", lambda: _post({"operations": [
+            {"op": "tags"}, {"op": "talks-by-tags", "tags": random_tags()}, {"op": "nexts", "id": random_id()}]})),
+        ("graph-api batch (mind-map screen) gzip", "graph-api", lambda: _post({"operations": [
+            {"op": "tags"}, {"op": "talks-by-tags", "tags": random_tags()}, {"op": "nexts", "id": random_id()}]}, "gzip")),
+        ("search-agent title", "search-agent", lambda: _post({"search": rng.choice(docs)["title"].split()[0]})),
+        ("search-agent transcript", "search-agent", lambda: _post({"search": random_phrase(), "mode": "transcript"})),
+        ("search-agent hybrid", "search-agent", lambda: _post({"search": rng.choice(docs)["title"], "mode": "hybrid"})),
+        ("get-neighbourhood", "get-neighbourhood", lambda: _get({"id": random_id()})),
+    ]
+
+
+def run(results, scale=1, seed=datagen.DEFAULT_SEED, workdir=None, repeat=50):
+    paths = configure_environment(workdir)
+    started_at = time.perf_counter()
+    docs = datagen.talk_documents(scale, seed)
+    results.record("generate documents", value=round(time.perf_counter() - started_at, 3), unit="s", talks=len(docs))
+    build_artifacts(docs, paths, results)
+
+    handlers = {}
+    for name, handler_name, make_event in cases(docs, seed):
+        try:
+            if handler_name not in handlers:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    handlers[handler_name] = load_handler(handler_name)
+            handler = handlers[handler_name]
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                first = handler(make_event(), None)
+            if first.get("statusCode") != 200:
+                results.skip(name, f"status {first.get('statusCode')}: {str(first.get('body'))[:120]}")
+                continue
+            sizes = []
+
+            def invoke():
+                response = handler(make_event(), None)
+                sizes.append(response_bytes(response))
+
+            # L'output degli handler (log, metriche EMF) viene scritto ma non mostrato
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                samples = measure(invoke, repeat=repeat, warmup=3)
+            results.record(name, samples, response_bytes_p50=sorted(sizes)[len(sizes) // 2])
+        except Exception as e:
+            results.skip(name, f"{type(e).__name__}: {e}")
@@ -0,0 +1,121 @@
+"""
+Misure e file di risultati JSON dei benchmark.
+
+Ogni esecuzione di una suite produce un file con l'ambiente (commit git,
+Python, piattaforma), i parametri (scala, seme) e una voce per misura:
+
+    {"name": "graph-api nexts", "unit": "ms", "n": 200,
+     "mean": 0.41, "p50": 0.38, "p95": 0.62, "min": 0.3, "max": 1.9, "params": {...}}
+
+oppure, per le misure singole (dimensioni, conteggi), ``"value"`` al posto delle
+statistiche. ``compare`` confronta due file misura per misura.
+"""
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from . import REPO_ROOT
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def summarize(samples_ms):
+    ordered = sorted(samples_ms)
+
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    return {
+        "n": len(ordered),
+        "mean": round(statistics.fmean(ordered), 4),
+        "p50": round(percentile(50), 4),
+        "p95": round(percentile(95), 4),
+        "min": round(ordered[0], 4),
+        "max": round(ordered[-1], 4),
+    }
+
+
+def measure(function, repeat=20, warmup=2):
+    """Esegue ``function`` ``warmup`` + ``repeat`` volte; restituisce i tempi in ms delle ultime ``repeat``."""
+    for _ in range(warmup):
+        function()
+    samples = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - started_at) * 1000)
+    return samples
+
+
+class ResultSet:
+    def __init__(self, suite, **params):
+        self.suite = suite
+        self.params = params
+        self.entries = []
+        self.started_at = datetime.now(timezone.utc)
+
+    def record(self, name, samples_ms=None, value=None, unit="ms", **params):
+        entry = {"name": name, "unit": unit}
+        if samples_ms is not None:
+            entry.update(summarize(samples_ms))
+        else:
+            entry["value"] = value
+        if params:
+            entry["params"] = params
+        self.entries.append(entry)
+        shown = f"p50 {entry['p50']:.3f} p95 {entry['p95']:.3f}" if samples_ms is not None else f"{value}"
+        print(f"  {name:<45} {shown} {unit}")
+        return entry
+
+    def skip(self, name, reason):
+        self.entries.append({"name": name, "skipped": reason})
+        print(f"  {name:<45} skipped: {reason}")
+
+    def to_dict(self):
+        return {
+            "suite": self.suite,
+            "params": self.params,
+            "started_at": self.started_at.isoformat(),
+            "git_commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "results": self.entries,
+        }
+
+    def write(self, results_dir):
+        os.makedirs(results_dir, exist_ok=True)
+        scale = self.params.get("scale")
+        name = f"{self.suite}{f'-{scale}x' if scale is not None else ''}-{self.started_at.strftime('%Y%m%dT%H%M%SZ')}.json"
+        path = os.path.join(results_dir, name)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        print(f"Results written to {path}")
+        return path
+
+
+def compare(old_path, new_path, metric="p50"):
+    """Stampa, per ogni misura presente in entrambi i file, valore vecchio, nuovo e rapporto."""
+    with open(old_path, encoding="utf-8") as f:
+        old = {entry["name"]: entry for entry in json.load(f)["results"]}
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)["results"]
+    print(f"{'measure':<45} {'old':>12} {'new':>12} {'ratio':>8}")
+    for entry in new:
+        before = old.get(entry["name"])
+        key = metric if metric in entry else "value"
+        if before is None or key not in before or not isinstance(entry.get(key), (int, float)):
+            continue
+        ratio = entry[key] / before[key] if before[key] else float("inf")
+        print(f"{entry['name']:<45} {before[key]:>12.4g} {entry[key]:>12.4g} {ratio:>7.2f}x")
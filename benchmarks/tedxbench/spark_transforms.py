@@ -0,0 +1,90 @@
+"""
+Benchmark delle trasformazioni di tedXjob (glue/tedx_pipeline.py) in Spark locale (local[*]).
+
+Legge i CSV generati da datagen e, al posto della UDF che scarica le
+trascrizioni da ted.com, il file transcripts.jsonl. Ogni fase di
+build_tedx_dataset viene materializzata (persist + count) e cronometrata
+separatamente, così il tempo di una fase non include quello delle precedenti:
+
+    read        lettura dei tre CSV
+    transcripts trascrizioni appiattite in testo (cue unite con "\\n") e join per slug
+    details     join con details.csv
+    tags        filtro dei tag comuni (> 500 talk) e aggregazione per talk
+    next_watch  self-join sui tag, rank e top 5
+    keywords    pandas UDF dei termini candidati + TF-IDF sul corpus
+    write       scrittura JSON locale (il sink al posto di MongoDB)
+
+Richiede pyspark (e pandas/pyarrow per la pandas UDF); tedx_pipeline e il
+pacchetto tedxgraph vengono resi visibili agli executor tramite PYTHONPATH.
+"""
+
+import os
+import shutil
+import sys
+import time
+
+from . import GLUE_PATH, LAYER_PATH, datagen
+
+
+def spark_session(shuffle_partitions=None):
+    from pyspark.sql import SparkSession
+
+    os.environ["PYTHONPATH"] = os.pathsep.join(filter(None, [GLUE_PATH, LAYER_PATH, os.environ.get("PYTHONPATH")]))
+    if GLUE_PATH not in sys.path:
+        sys.path.insert(0, GLUE_PATH)
+    builder = SparkSession.builder.master("local[*]").appName("tedxbench") \
+        .config("spark.ui.enabled", "false") \
+        .config("spark.sql.execution.arrow.pyspark.enabled", "true")
+    if shuffle_partitions:
+        builder = builder.config("spark.sql.shuffle.partitions", str(shuffle_partitions))
+    return builder.getOrCreate()
+
+
+def _materialize(results, name, df):
+    from pyspark import StorageLevel
+
+    started_at = time.perf_counter()
+    df = df.persist(StorageLevel.MEMORY_AND_DISK)
+    rows = df.count()
+    results.record(name, value=round(time.perf_counter() - started_at, 3), unit="s", rows=rows)
+    return df
+
+
+def run(results, scale=1, seed=datagen.DEFAULT_SEED, workdir=None, repeat=1, shuffle_partitions=None):
+    try:
+        import pyspark  # noqa: F401
+    except ImportError as e:
+        results.skip("spark transforms", f"pyspark not available ({e})")
+        return
+
+    data_dir = os.path.join(workdir, "dataset")
+    if not os.path.exists(os.path.join(data_dir, "transcripts.jsonl")):
+        summary = datagen.write_dataset(data_dir, scale, seed)
+        results.record("dataset bytes", value=sum(summary["bytes"].values()), unit="bytes", talks=summary["talks"])
+
+    spark = spark_session(shuffle_partitions)
+    try:
+        import tedx_pipeline
+
+        talks, details, tags = tedx_pipeline.read_inputs(spark, tedx_pipeline.input_paths(data_dir))
+        started_at = time.perf_counter()
+        talks = _materialize(results, "read", talks)
+        details, tags = details.persist(), tags.persist()
+        details.count(), tags.count()
+        results.record("read (all files)", value=round(time.perf_counter() - started_at, 3), unit="s")
+
+        talks = tedx_pipeline.add_transcripts(spark, talks, os.path.join(data_dir, "transcripts.jsonl"))
+        final = tedx_pipeline.build_tedx_dataset(talks, details, tags,
+                                                 on_stage=lambda name, df: _materialize(results, name, df))
+        started_at = time.perf_counter()
+        codec, dictionary = tedx_pipeline.train_transcript_dictionary(final)
+        results.record(f"train {codec} dictionary", value=round(time.perf_counter() - started_at, 3), unit="s")
+        final = _materialize(results, "compress", tedx_pipeline.compress_transcripts(final, codec, dictionary))
+
+        output = os.path.join(workdir, "tedx_data")
+        shutil.rmtree(output, ignore_errors=True)
+        started_at = time.perf_counter()
+        tedx_pipeline.write_json_documents(final, output)
+        results.record("write", value=round(time.perf_counter() - started_at, 3), unit="s")
+    finally:
+        spark.stop()
@@ -0,0 +1,176 @@
+"""
+Benchmark delle fasi di glue/neo4jLink_V2.py sui documenti generati.
+
+Le fasi ripetono i cicli del job con le sue funzioni di query (caricamento di
+una nuova versione del grafo con UNWIND a blocchi da WRITE_BATCH_SIZE nelle
+Phase 1 e 2, da KEYWORD_BATCH_SIZE nella Phase 2b, da SPEAKER_BATCH_SIZE nella
+Phase 2c) e la Phase 3 costruisce lo snapshot:
+
+- con BENCH_NEO4J_URI (più BENCH_NEO4J_USER / BENCH_NEO4J_PASSWORD) le fasi girano
+  su un Neo4j locale dedicato ai benchmark: i nodi Talk, Keyword, Speaker e GraphVersion
+  vengono cancellati prima della misura;
+- altrimenti su una sessione finta che registra transazioni, istruzioni e byte
+  dei parametri: misura il costo lato client e il numero di round-trip, la
+  grandezza che le ottimizzazioni del sync devono ridurre.
+
+L'import di neo4jLink_V2 richiede i pacchetti neo4j e pymongo.
+"""
+
+import importlib.util
+import json
+import os
+import time
+from collections import Counter
+
+from . import GLUE_PATH, datagen
+
+KEYWORDS_PER_TALK = 10
+VERSION = "bench"
+
+
+class RecordingResult:
+    def consume(self):
+        return None
+
+    def __iter__(self):
+        return iter(())
+
+
+class RecordingTransaction:
+    def __init__(self, stats):
+        self.stats = stats
+
+    def run(self, query, **params):
+        self.stats["statements"] += 1
+        self.stats["parameter_bytes"] += len(json.dumps(params, default=str))
+        return RecordingResult()
+
+
+class RecordingSession:
+    """Sessione finta: ogni execute_write conta come una transazione (un round-trip)."""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, **params):
+        return RecordingTransaction(self.stats).run(query, **params)
+
+    def execute_write(self, function, *args):
+        self.stats["transactions"] += 1
+        return function(RecordingTransaction(self.stats), *args)
+
+    execute_read = execute_write
+
+
+class RecordingDriver:
+    def __init__(self):
+        self.stats = Counter()
+
+    def session(self, **kwargs):
+        return RecordingSession(self.stats)
+
+
+def load_sync_module():
+    spec = importlib.util.spec_from_file_location("neo4jLink_V2", os.path.join(GLUE_PATH, "neo4jLink_V2.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def add_keywords(docs):
+    """Parole chiave come quelle di tedXjob (qui semplici frequenze dei termini del titolo e della descrizione)."""
+    from tedxgraph.text import candidate_terms
+
+    for doc in docs:
+        counts = Counter(candidate_terms(f"{doc['title']}. {doc['description']}"))
+        doc["keywords"] = [{"term": term, "weight": float(count)} for term, count in counts.most_common(KEYWORDS_PER_TALK)]
+
+
+def phases(sync, docs):
+    """(nome, funzione(session)) per ogni fase, con gli stessi cicli del job."""
+
+    def phase_1(session):
+        rows = [dict(zip(("id", "props"), sync.talk_properties(talk))) for talk in docs]
+        sync.write_batches(session, sync.create_talk_nodes, VERSION, rows, sync.WRITE_BATCH_SIZE)
+
+    def phase_2(session):
+        rows = sync.edge_rows(docs, {str(talk["_id"]) for talk in docs})
+        sync.write_batches(session, sync.create_relationships, VERSION, rows, sync.WRITE_BATCH_SIZE)
+
+    def phase_2b(session):
+        rows = sync.keyword_rows(docs)
+        sync.write_batches(session, sync.create_talk_keywords, VERSION, rows, sync.KEYWORD_BATCH_SIZE)
+
+    def phase_2c(session):
+        rows = sync.speaker_rows(docs)
+        sync.write_batches(session, sync.create_talk_speakers, VERSION, rows, sync.SPEAKER_BATCH_SIZE)
+
+    return [("phase 1 talk nodes", phase_1), ("phase 2 RELATED_TO", phase_2), ("phase 2b keywords", phase_2b),
+            ("phase 2c speakers", phase_2c)]
+
+
+def build_snapshot_locally(docs, workdir):
+    from tedxgraph import graph_snapshot
+
+    talks = [{**doc, "id": doc["_id"], "node_id": i, "published": doc.get("publishedAt")} for i, doc in enumerate(docs)]
+    edges = [(doc["_id"], related, rank) for doc in docs for rank, related in enumerate(doc.get("next_watch") or [])]
+    header, arrays = graph_snapshot.build_snapshot(talks, edges, "bench")
+    graph_snapshot.write_snapshot(os.path.join(workdir, "sync-graph.snap"), header, arrays)
+
+
+def run(results, scale=1, seed=datagen.DEFAULT_SEED, workdir=None, repeat=1):
+    try:
+        sync = load_sync_module()
+    except ImportError as e:
+        results.skip("neo4jLink_V2", f"cannot import the sync job ({e})")
+        return
+
+    docs = datagen.talk_documents(scale, seed)
+    add_keywords(docs)
+    uri = os.environ.get("BENCH_NEO4J_URI")
+    if uri:
+        from neo4j import GraphDatabase
+        from tedxgraph import graph_versions
+
+        driver = GraphDatabase.driver(uri, auth=(os.environ.get("BENCH_NEO4J_USER", "neo4j"),
+                                                 os.environ.get("BENCH_NEO4J_PASSWORD", "")))
+        with driver.session() as session:
+            session.run("MATCH (n) WHERE n:Talk OR n:Keyword OR n:Speaker OR n:GraphVersion DETACH DELETE n").consume()
+            session.run("CREATE INDEX talk_id_index IF NOT EXISTS FOR (t:Talk) ON (t.id)").consume()
+            graph_versions.create_indexes(session)
+            session.run("CREATE CONSTRAINT keyword_name_unique IF NOT EXISTS FOR (k:Keyword) REQUIRE k.name IS UNIQUE").consume()
+    else:
+        driver = RecordingDriver()
+    backend = "neo4j" if uri else "recording"
+
+    try:
+        for name, phase in phases(sync, docs):
+            before = Counter(getattr(driver, "stats", {}))
+            started_at = time.perf_counter()
+            with driver.session() as session:
+                phase(session)
+            elapsed = time.perf_counter() - started_at
+            params = {"backend": backend}
+            if not uri:
+                params.update({key: driver.stats[key] - before[key] for key in ("transactions", "statements", "parameter_bytes")})
+            results.record(name, value=round(elapsed, 3), unit="s", **params)
+
+        started_at = time.perf_counter()
+        if uri:
+            sync.neo4j_driver = driver
+            with driver.session() as session:
+                talks, edges = session.execute_read(sync.read_graph_for_snapshot, VERSION)
+            results.record("phase 3 read graph", value=round(time.perf_counter() - started_at, 3), unit="s",
+                           talks=len(talks), edges=len(edges))
+            started_at = time.perf_counter()
+        build_snapshot_locally(docs, workdir)
+        results.record("phase 3 build snapshot", value=round(time.perf_counter() - started_at, 3), unit="s")
+    finally:
+        if uri:
+            driver.close()
@@ -0,0 +1,108 @@
+###### TEDx-Content-Vectors ######
+#
+# Job Glue Python Shell da eseguire dopo tedXjob. Calcola un vettore denso per
+# ogni talk da titolo, descrizione e trascrizione (hashing TF-IDF + SVD troncata,
+# solo CPU, nessun modello da scaricare), li quantizza in int8 e costruisce
+# l'indice vettoriale letto dalle Lambda (vedi tedxgraph/vector_index.py):
+# endpoint "similar-by-content" del router graph-api e riordino dei next_watch per contenuto.
+#
+# Il file viene pubblicato su S3 con una chiave versionata e il puntatore CURRENT
+# (come lo snapshot del grafo), oppure solo scritto in locale con --OUTPUT_PATH.
+# Richiede il pacchetto tedxgraph (--extra-py-files) e numpy/scipy.
+#
+# Parametri (con fallback sulle variabili d'ambiente):
+#   --MONGODB_CONN_STRING, --MONGODB_DATABASE_NAME, --MONGODB_COLLECTION_NAME
+#   --CONTENT_INDEX_S3_URI   es. s3://bucket/content-index
+#   --OUTPUT_PATH            file locale (default nella directory temporanea)
+#   --DIMENSIONS             dimensioni dei vettori (default 128)
+#   --HASH_FEATURES          colonne del feature hashing (default 32768)
+#   --GRAPH_DEGREE           vicini per nodo del grafo di ricerca (default 16)
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import traceback
+from datetime import datetime, timezone
+
+FORWARDED_SETTINGS = ["MONGODB_CONN_STRING", "MONGODB_DATABASE_NAME", "MONGODB_COLLECTION_NAME"]
+# Un termine del titolo pesa come tre occorrenze nella trascrizione (come per le parole chiave)
+FIELD_WEIGHTS = (("title", 3), ("description", 2), ("transcript", 1))
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Calcola i vettori di contenuto dei talk TEDx")
+    for name in FORWARDED_SETTINGS + ["CONTENT_INDEX_S3_URI"]:
+        parser.add_argument(f"--{name}", default=os.environ.get(name))
+    parser.add_argument("--OUTPUT_PATH", default=None)
+    parser.add_argument("--DIMENSIONS", type=int, default=128)
+    parser.add_argument("--HASH_FEATURES", type=int, default=2 ** 15)
+    parser.add_argument("--GRAPH_DEGREE", type=int, default=16)
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+
+def load_documents(talks_collection):
+    from tedxgraph import transcript_codec
+
+    projection = {**{field: 1 for field, _ in FIELD_WEIGHTS}, **transcript_codec.TRANSCRIPT_PROJECTION}
+    talk_ids, titles, documents = [], [], []
+    for doc in talks_collection.find({}, projection).sort("_id", 1):
+        if doc.get("_id") is None:
+            continue
+        # Trascrizione compressa (transcript_z) o in chiaro
+        doc["transcript"] = transcript_codec.read_transcript(doc)
+        talk_ids.append(str(doc["_id"]))
+        titles.append(doc.get("title"))
+        documents.append([(doc.get(field), weight) for field, weight in FIELD_WEIGHTS if isinstance(doc.get(field), str)])
+    return talk_ids, titles, documents
+
+
+if __name__ == "__main__":
+
+    print("Starting TEDx content vectors job...")
+    args = parse_args(sys.argv[1:])
+    for name in FORWARDED_SETTINGS:
+        value = getattr(args, name)
+        if value:
+            os.environ[name] = value
+
+    from tedxgraph import graph_snapshot, mongo_runtime, vector_index
+
+    try:
+        talks_collection = mongo_runtime.get_talks_collection()
+        if talks_collection is None:
+            sys.exit("Job failed: MongoDB non raggiungibile o non configurato.")
+        talk_ids, titles, documents = load_documents(talks_collection)
+        print(f"Loaded {len(talk_ids)} talks ({sum(1 for d in documents if len(d) == len(FIELD_WEIGHTS))} with transcript).")
+        if len(talk_ids) < 2:
+            sys.exit("Job failed: servono almeno due talk per costruire l'indice.")
+
+        version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        started_at = time.perf_counter()
+        header, arrays = vector_index.build_index(
+            talk_ids, titles, documents, version,
+            dimensions=args.DIMENSIONS, n_features=args.HASH_FEATURES, graph_degree=args.GRAPH_DEGREE,
+        )
+        print(f"Index built in {time.perf_counter() - started_at:.1f}s: {header['dimensions']} dimensions, "
+              f"{len(arrays['graph_neighbours'])} graph links.")
+
+        output_path = args.OUTPUT_PATH or os.path.join(tempfile.gettempdir(), f"vectors-{version}.snap")
+        graph_snapshot.write_snapshot(output_path, header, arrays, magic=vector_index.MAGIC)
+        print(f"Index written to {output_path} ({os.path.getsize(output_path)} bytes).")
+
+        if args.CONTENT_INDEX_S3_URI:
+            published_uri = graph_snapshot.publish_snapshot(output_path, args.CONTENT_INDEX_S3_URI, version)
+            print(f"Index published at {published_uri}.")
+        else:
+            print("CONTENT_INDEX_S3_URI not set: index not published.")
+
+        print("Content vectors job completed.")
+
+    except SystemExit:
+        raise
+    except Exception as e:
+        print(f"FATAL: An unexpected error occurred: {e}")
+        traceback.print_exc()
+        sys.exit("Job failed due to an unexpected error.")
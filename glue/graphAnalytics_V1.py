@@ -0,0 +1,224 @@
+###### TEDx-Graph-Analytics ######
+#
+# Job Glue Python Shell da eseguire dopo neo4jLink. Carica il grafo RELATED_TO
+# in una matrice sparsa e calcola, con operazioni vettoriali NumPy/SciPy:
+#
+#   - pagerank             importanza del talk nel grafo dei "next watch"
+#   - in_degree/out_degree numero di archi entranti/uscenti (degree = somma)
+#   - component            componente debolmente connessa
+#   - community            cluster di talk (label propagation sul grafo non orientato),
+#                          numerati per dimensione decrescente: 0 è il cluster più grande
+#
+# Il job lavora sulla versione corrente del grafo (puntatore :GraphVersion, vedi
+# tedxgraph/graph_versions.py). I risultati vengono scritti sui suoi nodi :Talk
+# con un unico aggiornamento batch (UNWIND in una sola transazione); neo4jLink li
+# copia nella versione successiva finché questo job non la ricalcola. Le query di lettura ordinano per pagerank
+# senza costi a runtime e la mappa mentale può colorare i nodi per community.
+# Lo snapshot CSR delle Lambda (Phase 3 di neo4jLink) include pagerank e
+# community: i valori calcolati qui entrano nello snapshot alla sync successiva.
+#
+# Richiede il pacchetto tedxgraph (--extra-py-files) e numpy/scipy (librerie
+# "analytics" del runtime Python Shell).
+#
+# Parametri (con fallback sulle variabili d'ambiente):
+#   --NEO4J_URI, --NEO4J_USER, --NEO4J_PASSWORD, --NEO4J_DATABASE
+#   --DAMPING             fattore di smorzamento del PageRank (default 0.85)
+#   --WRITE_BATCH_SIZE    righe per ogni UNWIND (default 2000)
+
+import argparse
+import os
+import sys
+import time
+import traceback
+from datetime import datetime, timezone
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+
+FORWARDED_SETTINGS = ["NEO4J_URI", "NEO4J_USER", "NEO4J_PASSWORD", "NEO4J_DATABASE"]
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Calcola PageRank, componenti e community del grafo TEDx")
+    for name in FORWARDED_SETTINGS:
+        parser.add_argument(f"--{name}", default=os.environ.get(name))
+    parser.add_argument("--DAMPING", type=float, default=0.85)
+    parser.add_argument("--WRITE_BATCH_SIZE", type=int, default=2000)
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+
+# --- Lettura del grafo ---
+
+def read_graph(tx, version):
+    talk_ids = [
+        record["id"]
+        for record in tx.run("MATCH (t:Talk {graph: $graph}) WHERE t.id IS NOT NULL RETURN t.id AS id ORDER BY t.id",
+                             graph=version)
+    ]
+    edges = [
+        (record["source"], record["target"])
+        for record in tx.run("MATCH (a:Talk {graph: $graph})-[:RELATED_TO]->(b:Talk) RETURN a.id AS source, b.id AS target",
+                             graph=version)
+    ]
+    return talk_ids, edges
+
+
+def adjacency_matrix(talk_ids, edges):
+    """Matrice di adiacenza CSR n x n (archi duplicati e self-loop rimossi)."""
+    index = {talk_id: i for i, talk_id in enumerate(talk_ids)}
+    pairs = np.array(
+        [(index[s], index[t]) for s, t in edges if s in index and t in index and s != t],
+        dtype=np.int32,
+    ).reshape(-1, 2)
+    n = len(talk_ids)
+    matrix = sparse.csr_matrix((np.ones(len(pairs), dtype=np.float64), (pairs[:, 0], pairs[:, 1])), shape=(n, n))
+    matrix.data[:] = 1.0  # le coppie ripetute vengono sommate dal costruttore: si torna a peso 1
+    return matrix
+
+
+# --- Metriche ---
+
+def pagerank(adjacency, damping=0.85, tol=1e-10, max_iter=100):
+    """PageRank per iterazione di potenza; la massa dei nodi senza archi uscenti è ridistribuita uniformemente."""
+    n = adjacency.shape[0]
+    if n == 0:
+        return np.zeros(0)
+    out_degree = np.asarray(adjacency.sum(axis=1)).ravel()
+    dangling = out_degree == 0
+    inverse_degree = np.divide(1.0, out_degree, out=np.zeros(n), where=~dangling)
+    transition_t = (sparse.diags(inverse_degree) @ adjacency).T.tocsr()
+
+    scores = np.full(n, 1.0 / n)
+    for iteration in range(max_iter):
+        updated = damping * (transition_t @ scores + scores[dangling].sum() / n) + (1.0 - damping) / n
+        delta = np.abs(updated - scores).sum()
+        scores = updated
+        if delta < tol:
+            break
+    print(f"PageRank converged after {iteration + 1} iterations (delta {delta:.2e}).")
+    return scores
+
+
+def label_propagation(adjacency, max_iter=50, seed=42):
+    """
+    Community per label propagation sul grafo non orientato: a ogni iterazione
+    ogni nodo prende l'etichetta più pesante tra i vicini (il proprio voto incluso,
+    che evita oscillazioni). L'aggiornamento è semi-sincrono (metà dei nodi per
+    iterazione, scelti a caso con seme fisso) e interamente vettoriale.
+    """
+    n = adjacency.shape[0]
+    undirected = ((adjacency + adjacency.T) > 0).astype(np.float64)
+    voters = (undirected + sparse.identity(n, format="csr")).tocsr()
+    labels = np.arange(n)
+    rng = np.random.default_rng(seed)
+    for iteration in range(max_iter):
+        one_hot = sparse.csr_matrix((np.ones(n), (np.arange(n), labels)), shape=(n, n))
+        candidates = np.asarray((voters @ one_hot).argmax(axis=1)).ravel()
+        changed = candidates != labels
+        if not changed.any():
+            break
+        update = changed & (rng.random(n) < 0.5)
+        labels[update] = candidates[update]
+    print(f"Label propagation stopped after {iteration + 1} iterations.")
+
+    # Community numerate per dimensione decrescente
+    unique, inverse, counts = np.unique(labels, return_inverse=True, return_counts=True)
+    order = np.argsort(-counts, kind="stable")
+    renumber = np.empty(len(unique), dtype=np.int64)
+    renumber[order] = np.arange(len(unique))
+    return renumber[inverse], undirected
+
+
+def modularity(undirected, communities):
+    """Modularità della partizione (grafo non orientato, pesi unitari)."""
+    coo = undirected.tocoo()
+    total = coo.data.sum()
+    if total == 0:
+        return 0.0
+    inside = communities[coo.row] == communities[coo.col]
+    internal = np.bincount(communities[coo.row[inside]], weights=coo.data[inside], minlength=communities.max() + 1)
+    degree = np.asarray(undirected.sum(axis=1)).ravel()
+    community_degree = np.bincount(communities, weights=degree, minlength=communities.max() + 1)
+    return float((internal / total - (community_degree / total) ** 2).sum())
+
+
+# --- Scrittura ---
+
+def write_properties(tx, version, rows, batch_size):
+    query = (
+        "UNWIND $rows AS row "
+        "MATCH (t:Talk {graph: $graph, id: row.id}) "
+        "SET t.pagerank = row.pagerank, t.in_degree = row.in_degree, t.out_degree = row.out_degree, "
+        "    t.degree = row.in_degree + row.out_degree, t.component = row.component, "
+        "    t.community = row.community, t.analytics_at = row.analytics_at"
+    )
+    updated = 0
+    for start in range(0, len(rows), batch_size):
+        summary = tx.run(query, rows=rows[start:start + batch_size], graph=version).consume()
+        updated += summary.counters.properties_set
+    return updated
+
+
+if __name__ == "__main__":
+
+    print("Starting TEDx graph analytics job...")
+    args = parse_args(sys.argv[1:])
+    for name in FORWARDED_SETTINGS:
+        value = getattr(args, name)
+        if value:
+            os.environ[name] = value
+
+    from tedxgraph import graph_versions, neo4j_runtime
+
+    try:
+        driver = neo4j_runtime.get_neo4j_driver()
+        with driver.session(database=neo4j_runtime.NEO4J_DATABASE) as session:
+            version = session.execute_read(graph_versions.read_current_version)
+            talk_ids, edges = session.execute_read(read_graph, version)
+        print(f"Loaded graph version {version}: {len(talk_ids)} talks, {len(edges)} RELATED_TO edges.")
+        if not talk_ids:
+            print("No talks in Neo4j: nothing to compute.")
+            sys.exit(0)
+
+        started_at = time.perf_counter()
+        adjacency = adjacency_matrix(talk_ids, edges)
+        scores = pagerank(adjacency, damping=args.DAMPING)
+        in_degree = np.asarray(adjacency.sum(axis=0)).ravel().astype(np.int64)
+        out_degree = np.asarray(adjacency.sum(axis=1)).ravel().astype(np.int64)
+        components_count, components = connected_components(adjacency, directed=True, connection="weak")
+        communities, undirected = label_propagation(adjacency)
+        print(f"Components: {components_count}, communities: {communities.max() + 1}, "
+              f"modularity: {modularity(undirected, communities):.3f}, "
+              f"computed in {(time.perf_counter() - started_at) * 1000:.0f} ms.")
+
+        analytics_at = datetime.now(timezone.utc).isoformat()
+        rows = [
+            {
+                "id": talk_id,
+                "pagerank": float(scores[i]),
+                "in_degree": int(in_degree[i]),
+                "out_degree": int(out_degree[i]),
+                "component": int(components[i]),
+                "community": int(communities[i]),
+                "analytics_at": analytics_at,
+            }
+            for i, talk_id in enumerate(talk_ids)
+        ]
+        with driver.session(database=neo4j_runtime.NEO4J_DATABASE) as session:
+            properties_set = session.execute_write(write_properties, version, rows, args.WRITE_BATCH_SIZE)
+        print(f"Written analytics for {len(rows)} talks ({properties_set} properties set).")
+
+        top = np.argsort(-scores)[:5]
+        print("Top talks by PageRank: " + ", ".join(f"{talk_ids[i]} ({scores[i]:.5f})" for i in top))
+        print("Graph analytics completed.")
+
+    except SystemExit:
+        raise
+    except Exception as e:
+        print(f"FATAL: An unexpected error occurred: {e}")
+        traceback.print_exc()
+        sys.exit("Job failed due to an unexpected error.")
+    finally:
+        neo4j_runtime.reset_neo4j_driver()
@@ -0,0 +1,167 @@
+###### TEDx-Neighbourhood-Precompute ######
+#
+# Job Glue Python Shell da eseguire dopo il sync (tedXjob + neo4jLink).
+# Precalcola per ogni talk il vicinato a 2 hop lungo RELATED_TO (archi next_watch)
+# con i campi delle card (titolo, speaker, url, tag) e lo salva come JSON
+# compresso nella collezione "neighbourhoods", pronto per la Lambda get-neighbourhood.
+#
+# Il calcolo è incrementale: viene creata una nuova versione del dataset che
+# contiene solo i vicinati cambiati (confronto sull'hash del contenuto); gli altri
+# talk continuano a usare il documento della versione precedente. Il puntatore
+# alla versione corrente si sposta solo a scrittura completata, quindi le Lambda
+# non vedono mai una versione a metà. Formato: vedi tedxgraph/neighbourhoods.py.
+#
+# Il pacchetto tedxgraph va passato al job con --extra-py-files.
+#
+# Parametri (con fallback sulle variabili d'ambiente):
+#   --MONGODB_CONN_STRING, --MONGODB_DATABASE_NAME, --MONGODB_COLLECTION_NAME
+#   --KEEP_VERSIONS   versioni leggibili da conservare per il rollback (default 2)
+#   --FULL_REBUILD    "true" per riscrivere tutti i vicinati
+
+import argparse
+import os
+import sys
+import traceback
+from datetime import datetime, timezone
+
+FORWARDED_SETTINGS = ["MONGODB_CONN_STRING", "MONGODB_DATABASE_NAME", "MONGODB_COLLECTION_NAME"]
+WRITE_BATCH_SIZE = 500
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Precalcola i vicinati dei talk TEDx")
+    for name in FORWARDED_SETTINGS:
+        parser.add_argument(f"--{name}", default=os.environ.get(name))
+    parser.add_argument("--KEEP_VERSIONS", type=int, default=2)
+    parser.add_argument("--FULL_REBUILD", default="false")
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+
+def load_talks(talks_collection, neighbourhoods):
+    projection = {field: 1 for field in neighbourhoods.CARD_FIELDS}
+    projection["next_watch"] = 1
+    projection["keywords"] = 1
+    talks = {}
+    for doc in talks_collection.find({}, projection):
+        if doc.get("_id") is None:
+            continue
+        talks[str(doc["_id"])] = doc
+    return talks
+
+
+def load_latest_state(collection, current_version):
+    """Hash (e stato di cancellazione) del vicinato di ogni talk alla versione corrente."""
+    if current_version is None:
+        return {}
+    pipeline = [
+        {"$match": {"version": {"$lte": current_version}}},
+        {"$sort": {"talk_id": 1, "version": -1}},
+        {"$group": {"_id": "$talk_id", "hash": {"$first": "$hash"}, "deleted": {"$first": "$deleted"}}},
+    ]
+    return {doc["_id"]: doc for doc in collection.aggregate(pipeline, allowDiskUse=True)}
+
+
+def write_in_batches(collection, operations):
+    for start in range(0, len(operations), WRITE_BATCH_SIZE):
+        collection.bulk_write(operations[start:start + WRITE_BATCH_SIZE], ordered=False)
+        print(f"Written {min(start + WRITE_BATCH_SIZE, len(operations))}/{len(operations)} neighbourhood documents...")
+
+
+def prune_old_versions(collection, new_version, keep_versions):
+    """
+    Elimina i documenti che nessuna delle ultime ``keep_versions`` versioni può più leggere:
+    per ogni talk si tengono i documenti più recenti della soglia e il più recente sotto di essa.
+    """
+    floor = new_version - keep_versions + 1
+    newest_below_floor = {}
+    deletable = []
+    for doc in collection.find({"version": {"$lte": floor}}, {"talk_id": 1, "version": 1}).sort("version", -1):
+        if doc["talk_id"] in newest_below_floor:
+            deletable.append(doc["_id"])
+        else:
+            newest_below_floor[doc["talk_id"]] = doc["_id"]
+    for start in range(0, len(deletable), WRITE_BATCH_SIZE):
+        collection.delete_many({"_id": {"$in": deletable[start:start + WRITE_BATCH_SIZE]}})
+    print(f"Pruned {len(deletable)} superseded neighbourhood documents (keeping {keep_versions} versions).")
+
+
+if __name__ == "__main__":
+
+    print("Starting TEDx neighbourhood precompute job...")
+    args = parse_args(sys.argv[1:])
+    for name in FORWARDED_SETTINGS:
+        value = getattr(args, name)
+        if value:
+            os.environ[name] = value
+
+    from pymongo import ASCENDING, DESCENDING, ReplaceOne
+    from tedxgraph import mongo_runtime, neighbourhoods
+
+    try:
+        talks_collection = mongo_runtime.get_talks_collection()
+        if talks_collection is None:
+            sys.exit("Job failed: MongoDB non raggiungibile o non configurato.")
+        collection = mongo_runtime.get_collection(neighbourhoods.NEIGHBOURHOODS_COLLECTION_NAME)
+        versions_collection = mongo_runtime.get_collection(neighbourhoods.DATASET_VERSIONS_COLLECTION_NAME)
+        collection.create_index([("talk_id", ASCENDING), ("version", DESCENDING)])
+
+        talks = load_talks(talks_collection, neighbourhoods)
+        print(f"Loaded {len(talks)} talks from MongoDB.")
+        adjacency = neighbourhoods.build_adjacency(talks)
+
+        current_version = neighbourhoods.get_current_version(force_refresh=True)
+        previous = {} if args.FULL_REBUILD.lower() == "true" else load_latest_state(collection, current_version)
+        new_version = (current_version or 0) + 1
+        now = datetime.now(timezone.utc)
+        print(f"Current dataset version: {current_version}. Building version {new_version}...")
+
+        operations = []
+        for talk_id in talks:
+            neighbourhood = neighbourhoods.build_neighbourhood(talk_id, talks, adjacency)
+            content_hash, body = neighbourhoods.encode_neighbourhood(neighbourhood)
+            state = previous.get(talk_id)
+            if state and not state.get("deleted") and state.get("hash") == content_hash:
+                continue
+            doc_id = neighbourhoods.neighbourhood_doc_id(talk_id, new_version)
+            operations.append(ReplaceOne(
+                {"_id": doc_id},
+                {"_id": doc_id, "talk_id": talk_id, "version": new_version, "hash": content_hash,
+                 "body": body, "deleted": False, "created_at": now},
+                upsert=True,
+            ))
+        changed = len(operations)
+
+        # Talk spariti dal dataset: una "tombstone" nasconde le versioni precedenti
+        for talk_id, state in previous.items():
+            if talk_id not in talks and not state.get("deleted"):
+                doc_id = neighbourhoods.neighbourhood_doc_id(talk_id, new_version)
+                operations.append(ReplaceOne(
+                    {"_id": doc_id},
+                    {"_id": doc_id, "talk_id": talk_id, "version": new_version, "hash": None,
+                     "body": None, "deleted": True, "created_at": now},
+                    upsert=True,
+                ))
+        print(f"Neighbourhoods changed: {changed}, removed: {len(operations) - changed}, unchanged: {len(talks) - changed}.")
+
+        if not operations:
+            print("No neighbourhood changed: dataset version left at", current_version)
+        else:
+            write_in_batches(collection, operations)
+            # Cambio di versione atomico: da qui le Lambda leggono la nuova versione
+            versions_collection.update_one(
+                {"_id": neighbourhoods.POINTER_ID},
+                {"$set": {"current": new_version, "previous": current_version, "updated_at": now}},
+                upsert=True,
+            )
+            print(f"Dataset version switched to {new_version}.")
+            prune_old_versions(collection, new_version, max(1, args.KEEP_VERSIONS))
+
+        print("Neighbourhood precompute completed.")
+
+    except SystemExit:
+        raise
+    except Exception as e:
+        print(f"FATAL: An unexpected error occurred: {e}")
+        traceback.print_exc()
+        sys.exit("Job failed due to an unexpected error.")
@@ -5,8 +5,12 @@ from pymongo import MongoClient, errors as pymongo_errors # Import specifico per
 from neo4j import GraphDatabase, basic_auth, exceptions as neo4j_exceptions # Import specifico per errori
 from urllib.parse import quote_plus
 import traceback # Import per stack trace
+import argparse
+import tempfile
 from datetime import datetime # Aggiunto per la conversione di publishedAt
 
+from tedxgraph import graph_versions, ids, speakers
+
 
 # Credenziali da configurare tramite ambiente o secret manager
 MONGO_USER = "[inserire il proprio username MongoDB]"
@@ -19,6 +23,25 @@ NEO4J_URI = "[inserire l'URI Neo4j, es. neo4j+s://... ]"
 NEO4J_USER = "[inserire il proprio username Neo4j]"
 NEO4J_PASSWORD = "[inserire la propria password Neo4j]"
 
+NEO4J_DATABASE = "neo4j"
+
+# Ogni sync viene caricata in una nuova versione del grafo (nodi :Talk con la
+# proprietà graph) e resa visibile alle Lambda solo dopo la validazione dei
+# conteggi, spostando il puntatore :GraphVersion (vedi tedxgraph/graph_versions.py).
+# La versione precedente resta per il rollback: --ROLLBACK true la rende di nuovo
+# corrente senza ricaricare nulla (e riporta il puntatore dello snapshot su S3).
+#
+# Snapshot CSR del grafo per le Lambda (Phase 3, vedi tedxgraph/graph_snapshot.py).
+# Prefisso S3 passato come parametro del job (--GRAPH_SNAPSHOT_S3_URI s3://bucket/graph-snapshots);
+# se assente la Phase 3 viene saltata. Lo snapshot ha la stessa versione del grafo.
+# Richiede il pacchetto tedxgraph (--extra-py-files).
+_job_parser = argparse.ArgumentParser(add_help=False)
+_job_parser.add_argument("--GRAPH_SNAPSHOT_S3_URI", default=os.environ.get("GRAPH_SNAPSHOT_S3_URI"))
+_job_parser.add_argument("--ROLLBACK", default="false")
+_job_args = _job_parser.parse_known_args(sys.argv[1:])[0]
+GRAPH_SNAPSHOT_S3_URI = _job_args.GRAPH_SNAPSHOT_S3_URI
+ROLLBACK = str(_job_args.ROLLBACK).lower() == "true"
+
 # --- Basic Validation ---
 # Aggiungi i nuovi campi Mongo alla validazione
 if not all([MONGO_USER, MONGO_PASSWORD, MONGO_HOST, MONGO_DB_NAME, MONGO_COLLECTION_NAME,
@@ -91,17 +114,29 @@ def cleanup_clients():
     # Il client Mongo gestisce il pool, non serve chiuderlo esplicitamente qui
 
 # --- Neo4j Query Functions ---
-def create_or_update_talk_node(tx, talk_data):
+# Tutte le scritture creano nodi e archi della nuova versione ``graph`` con
+# UNWIND a blocchi (CREATE, non MERGE: la versione è vuota). I nodi letti dalle
+# Lambda non vengono toccati, quindi non ci sono lock in comune con le letture.
+WRITE_BATCH_SIZE = 1000
+KEYWORD_BATCH_SIZE = 500
+# Un MERGE per speaker, come per le keyword: blocchi più piccoli
+SPEAKER_BATCH_SIZE = 500
+# Proprietà calcolate da glue/graphAnalytics_V1.py: copiate dalla versione corrente
+# finché il job di analytics non le ricalcola sulla nuova.
+ANALYTICS_PROPERTIES = ["pagerank", "in_degree", "out_degree", "degree", "component", "community", "analytics_at"]
+
+
+def talk_properties(talk_data, id_type=ids.ID_TYPE_STRING):
     """
-    Uses MERGE to create a Talk node or update properties.
-    Uses 'id' property derived from MongoDB '_id'.
+    Returns (talk_id, props) for a Talk node.
+    Uses 'id' property derived from MongoDB '_id' (string, or int64 with id_type "int").
     All other fields from MongoDB (except 'next_watch') are set as properties.
     """
-    talk_id = str(talk_data['_id']) # Assicura che sia stringa
+    talk_id = ids.store_id(talk_data['_id'], id_type)
     
     props = {}
     for k, v in talk_data.items():
-        if k not in ['_id', 'next_watch'] and v is not None: # Esclude _id, next_watch e valori null
+        if k not in ['_id', 'next_watch', 'keywords', 'transcript_cue_times', 'transcript_z'] and v is not None: # Esclude _id, next_watch, keywords (nodi a parte), trascrizione compressa e istanti delle cue (binari) e valori null
             if isinstance(v, list):
                 # Assicura che le liste contengano solo tipi primitivi supportati da Neo4j
                 # o che il driver Python possa convertire (es. str, int, float, bool).
@@ -150,48 +185,302 @@ def create_or_update_talk_node(tx, talk_data):
             # Lascia props['publishedAt'] come stringa se il parsing fallisce. Neo4j lo memorizzerà come stringa.
             # Se si preferisce non memorizzare stringhe malformate, si può fare: del props['publishedAt']
 
+    return talk_id, props
+
+
+def create_talk_nodes(tx, version, rows):
+    """Crea i nodi Talk della versione ``version``; ``rows``: [{id, props}]."""
     query = (
-        "MERGE (t:Talk {id: $talk_id}) "
-        "ON CREATE SET t = $props, t.id = $talk_id " # t.id è ridondante se props contiene id, ma sicuro
-        "ON MATCH SET t += $props, t.id = $talk_id " # Sovrascrive/aggiunge proprietà, t.id assicura che non venga perso
+        "UNWIND $rows AS row "
+        "CREATE (t:Talk) "
+        "SET t = row.props, t.id = row.id, t.graph = $graph"
     )
-    tx.run(query, talk_id=talk_id, props=props)
+    tx.run(query, rows=rows, graph=version).consume()
 
 
-def create_relationship(tx, source_talk_id, related_talk_id):
+def carry_over_analytics(tx, version, previous):
+    """Copia le proprietà di analytics dai talk della versione ``previous`` a quelli di ``version``."""
+    projection = ", ".join(f".{name}" for name in ANALYTICS_PROPERTIES)
+    query = (
+        "MATCH (t:Talk {graph: $graph}) "
+        "MATCH (old:Talk {graph: $previous, id: t.id}) "
+        f"SET t += old {{{projection}}} "
+        "RETURN count(t) AS n"
+    )
+    return tx.run(query, graph=version, previous=previous).single()["n"]
+
+
+def edge_rows(talks_data, talk_ids, id_type=ids.ID_TYPE_STRING):
     """
-    Uses MERGE to create a RELATED_TO relationship between two Talk nodes.
+    Archi RELATED_TO da creare: [{source, target, rank}], con rank = posizione
+    nella lista next_watch del talk di origine. Scarta self-loop, duplicati e
+    destinazioni senza nodo: il numero di righe è quello atteso nel grafo.
     """
-    source_id_str = str(source_talk_id)
-    related_id_str = str(related_talk_id) # Assicurati che anche related_id sia una stringa
+    rows, seen = [], set()
+    for talk in talks_data:
+        source_id = talk.get('_id')
+        next_watch_list = talk.get('next_watch')
+        if source_id is None or not isinstance(next_watch_list, list):
+            continue
+        source_id = ids.store_id(source_id, id_type)
+        for rank, related_data_item in enumerate(next_watch_list):
+            # Se next_watch contiene oggetti, es: {'_id': 'xyz'}, andrebbe estratto l'id
+            if related_data_item is None or not str(related_data_item).strip():
+                continue
+            related_id = ids.store_id(related_data_item, id_type)
+            if related_id == source_id:
+                continue
+            if related_id not in talk_ids or (source_id, related_id) in seen:
+                continue
+            seen.add((source_id, related_id))
+            rows.append({"source": source_id, "target": related_id, "rank": rank})
+    return rows
 
-    # Verifica che related_id_str non sia vuoto o problematico
-    if not related_id_str: # Questa verifica è già fatta nel loop principale, ma è una doppia sicurezza
-        print(f"Warning: Attempted to create relationship from {source_id_str} to an empty related_id. Skipping (inside create_relationship).")
-        return
 
+def create_relationships(tx, version, rows):
+    """Crea gli archi RELATED_TO {rank} tra talk della versione ``version``."""
     query = (
-        "MATCH (source:Talk {id: $source_id}) "
-        "MATCH (related:Talk {id: $related_id}) "
-        # Non è necessario "WHERE related.id IS NOT NULL" se $related_id non è mai null o stringa vuota
-        # e se c'è un vincolo di esistenza sull'ID o se i nodi sono creati prima.
-        # Il MATCH stesso non troverà nodi se l'ID è problematico.
-        "MERGE (source)-[:RELATED_TO]->(related)"
+        "UNWIND $rows AS row "
+        "MATCH (source:Talk {graph: $graph, id: row.source}) "
+        "MATCH (related:Talk {graph: $graph, id: row.target}) "
+        "CREATE (source)-[:RELATED_TO {rank: row.rank}]->(related)"
     )
+    tx.run(query, rows=rows, graph=version).consume()
+
+
+def create_talk_keywords(tx, version, rows):
+    """
+    Crea i nodi (:Keyword) mancanti e le relazioni (:Talk)-[:HAS_KEYWORD {weight}]->(:Keyword)
+    per un blocco di talk della versione ``version``.
+    ``rows``: [{talk_id, keywords: [{term, weight}]}].
+    """
+    query = (
+        "UNWIND $rows AS row "
+        "MATCH (t:Talk {graph: $graph, id: row.talk_id}) "
+        "UNWIND row.keywords AS kw "
+        "MERGE (k:Keyword {name: kw.term}) "
+        "CREATE (t)-[:HAS_KEYWORD {weight: kw.weight}]->(k)"
+    )
+    tx.run(query, rows=rows, graph=version).consume()
+
+
+def keyword_rows(talks_data, id_type=ids.ID_TYPE_STRING):
+    rows = []
+    for talk in talks_data:
+        if talk.get('_id') is None or not isinstance(talk.get('keywords'), list):
+            continue
+        keywords = {}
+        for kw in talk['keywords']:
+            if isinstance(kw, dict) and kw.get("term"):
+                keywords.setdefault(str(kw["term"]), float(kw.get("weight") or 0.0))
+        rows.append({"talk_id": ids.store_id(talk['_id'], id_type),
+                     "keywords": [{"term": term, "weight": weight} for term, weight in keywords.items()]})
+    return rows
+
+
+def create_talk_speakers(tx, version, rows):
+    """
+    Crea i nodi (:Speaker) mancanti e le relazioni (:Speaker)-[:GAVE]->(:Talk)
+    per un blocco di talk della versione ``version``.
+    ``rows``: [{talk_id, speakers: [{key, name}]}].
+    """
+    query = (
+        "UNWIND $rows AS row "
+        "MATCH (t:Talk {graph: $graph, id: row.talk_id}) "
+        "UNWIND row.speakers AS sp "
+        "MERGE (s:Speaker {key: sp.key}) "
+        "SET s.name = sp.name "
+        "CREATE (s)-[:GAVE]->(t)"
+    )
+    tx.run(query, rows=rows, graph=version).consume()
+
+
+def speaker_rows(talks_data, id_type=ids.ID_TYPE_STRING):
+    """Speaker di ogni talk con il nome normalizzato (tedxgraph/speakers.py)."""
+    rows = []
+    for talk in talks_data:
+        talk_speakers = speakers.talk_speakers(talk.get('speakers'))
+        if talk.get('_id') is None or not talk_speakers:
+            continue
+        rows.append({"talk_id": ids.store_id(talk['_id'], id_type),
+                     "speakers": [{"key": key, "name": name} for key, name in talk_speakers]})
+    return rows
+
+
+def write_batches(session, function, version, rows, batch_size):
+    for start in range(0, len(rows), batch_size):
+        session.execute_write(function, version, rows[start:start + batch_size])
+
+
+def validate_version(counts, expected):
+    """Confronta i conteggi della versione caricata con quelli attesi da MongoDB."""
+    mismatches = [f"{name}: expected {expected[name]}, found {counts[name]}"
+                  for name in expected if counts[name] != expected[name]]
+    if mismatches:
+        raise RuntimeError("Graph validation failed (" + "; ".join(mismatches) + ")")
+
+# --- Graph Snapshot Export ---
+def read_graph_for_snapshot(tx, version):
+    """Legge da Neo4j nodi Talk (con le proprietà delle card) e archi RELATED_TO di una versione."""
+    talks = [
+        dict(record) for record in tx.run(
+            "MATCH (t:Talk {graph: $graph}) "
+            "RETURN toString(t.id) AS id, id(t) AS node_id, t.title AS title, t.url AS url, "
+            "       t.speakers AS speakers, t.description AS description, t.tags AS tags, "
+            "       t.pagerank AS pagerank, t.community AS community, t.publishedAt AS published, "
+            "       t.duration AS duration "
+            "ORDER BY t.id",
+            graph=version,
+        )
+    ]
+    edges = [
+        (record["source"], record["target"], record["rank"])
+        for record in tx.run(
+            "MATCH (a:Talk {graph: $graph})-[r:RELATED_TO]->(b:Talk) "
+            "RETURN toString(a.id) AS source, toString(b.id) AS target, coalesce(r.rank, 65535) AS rank",
+            graph=version,
+        )
+    ]
+    return talks, edges
+
+
+def export_graph_snapshot(version, s3_uri):
+    """
+    Esporta la versione appena caricata come snapshot CSR e la carica su S3
+    con la stessa versione; il puntatore CURRENT viene spostato dopo lo switch.
+    """
+    from tedxgraph import graph_snapshot
+
+    with neo4j_driver.session(database=NEO4J_DATABASE) as session:
+        talks, edges = session.execute_read(read_graph_for_snapshot, version)
+
+    header, arrays = graph_snapshot.build_snapshot(talks, edges, version)
+    local_path = os.path.join(tempfile.gettempdir(), f"graph-{version}.snap")
+    graph_snapshot.write_snapshot(local_path, header, arrays)
+    print(f"Snapshot {version}: {header['talks']} talks, {header['edges']} edges, {os.path.getsize(local_path)} bytes.")
+    return graph_snapshot.upload_snapshot(local_path, s3_uri, version)
+
+
+def point_snapshot(version):
+    from tedxgraph import graph_snapshot
+
     try:
-        result = tx.run(query, source_id=source_id_str, related_id=related_id_str)
-        summary = result.consume()
-        # Logica di conteggio relazioni effettivamente create/unite potrebbe basarsi su summary.counters
+        published_uri = graph_snapshot.point_current(GRAPH_SNAPSHOT_S3_URI, version)
+        print(f"Snapshot pointer moved to {published_uri}.")
     except Exception as e:
-        print(f"Error executing relationship MERGE ({source_id_str})->({related_id_str}): {e}. Skipping this relationship.")
-        # Non rilanciare l'eccezione per permettere al job di continuare
+        # Es. rollback a una versione sincronizzata senza Phase 3: le Lambda tengono lo snapshot attuale
+        print(f"Warning: could not move the snapshot pointer to {version}: {e}")
+
+
+def rollback():
+    with neo4j_driver.session(database=NEO4J_DATABASE) as session:
+        pointer = session.execute_write(graph_versions.rollback_pointer)
+    print(f"Rolled back: current graph version {pointer['version']} (previous {pointer['previous']}).")
+    if GRAPH_SNAPSHOT_S3_URI:
+        point_snapshot(pointer['version'])
+
+
+def load_version(version, current, talks_data, id_type):
+    """Phases 1-3: carica, valida ed esporta la versione ``version``; restituisce i conteggi."""
+    print(f"Phase 1: Creating Talk nodes of graph version {version} ({id_type} ids)...")
+    node_rows = []
+    for i, talk in enumerate(talks_data):
+        if '_id' not in talk or talk['_id'] is None:
+            print(f"Skipping document at index {i} due to missing or null '_id'.")
+            continue
+        talk_id, props = talk_properties(talk, id_type)
+        node_rows.append({"id": talk_id, "props": props})
+    talk_ids = {row["id"] for row in node_rows}
+    with neo4j_driver.session(database=NEO4J_DATABASE) as session:
+        write_batches(session, create_talk_nodes, version, node_rows, WRITE_BATCH_SIZE)
+        carried = session.execute_write(carry_over_analytics, version, current)
+    print(f"Finished Phase 1. Created {len(node_rows)} nodes ({carried} with analytics from version {current}).")
+
+    print("Phase 2: Creating RELATED_TO relationships...")
+    relationship_rows = edge_rows(talks_data, talk_ids, id_type)
+    with neo4j_driver.session(database=NEO4J_DATABASE) as session:
+        write_batches(session, create_relationships, version, relationship_rows, WRITE_BATCH_SIZE)
+    print(f"Finished Phase 2. Created {len(relationship_rows)} relationships.")
+
+    print("Phase 2b: Creating Keyword nodes and HAS_KEYWORD relationships...")
+    rows = keyword_rows(talks_data, id_type)
+    with neo4j_driver.session(database=NEO4J_DATABASE) as session:
+        session.run("CREATE CONSTRAINT keyword_name_unique IF NOT EXISTS FOR (k:Keyword) REQUIRE k.name IS UNIQUE").consume()
+        write_batches(session, create_talk_keywords, version, rows, KEYWORD_BATCH_SIZE)
+    print(f"Finished Phase 2b. Keywords linked for {len(rows)} talks.")
+
+    print("Phase 2c: Creating Speaker nodes and GAVE relationships...")
+    talk_speaker_rows = speaker_rows(talks_data, id_type)
+    with neo4j_driver.session(database=NEO4J_DATABASE) as session:
+        write_batches(session, create_talk_speakers, version, talk_speaker_rows, SPEAKER_BATCH_SIZE)
+    print(f"Finished Phase 2c. Speakers linked for {len(talk_speaker_rows)} talks.")
+
+    with neo4j_driver.session(database=NEO4J_DATABASE) as session:
+        counts = session.execute_read(graph_versions.count_version, version)
+    validate_version(counts, {
+        "talks": len(node_rows),
+        "edges": len(relationship_rows),
+        "keywords": sum(len(row["keywords"]) for row in rows if row["talk_id"] in talk_ids),
+        "speakers": sum(len(row["speakers"]) for row in talk_speaker_rows if row["talk_id"] in talk_ids),
+    })
+    print(f"Validated graph version {version}: {counts['talks']} talks, {counts['edges']} edges, "
+          f"{counts['keywords']} keyword links, {counts['speakers']} speaker links.")
+
+    if GRAPH_SNAPSHOT_S3_URI:
+        print("Phase 3: Exporting CSR graph snapshot for the Lambdas...")
+        uploaded_uri = export_graph_snapshot(version, GRAPH_SNAPSHOT_S3_URI)
+        print(f"Finished Phase 3. Snapshot uploaded at {uploaded_uri}.")
+    else:
+        print("Phase 3 skipped: GRAPH_SNAPSHOT_S3_URI not set.")
+    return counts
+
+
+def sync(talks_data):
+    with neo4j_driver.session(database=NEO4J_DATABASE) as session:
+        graph_versions.create_indexes(session)
+        # Indice su :Talk(id): usato dai MATCH del caricamento e dalle query senza versione
+        session.run("CREATE INDEX talk_id_index IF NOT EXISTS FOR (t:Talk) ON (t.id)").consume()
+        adopted = session.execute_write(graph_versions.adopt_legacy)
+        if adopted:
+            print(f"Adopted {adopted} unversioned Talk nodes as graph version '{graph_versions.LEGACY_VERSION}'.")
+        current = session.execute_read(graph_versions.read_current_version)
+
+    version = graph_versions.new_version()
+    # Id interi solo se tutti i documenti li hanno (tedXjob con --TYPED_IDS o dopo
+    # talkIdMigration_V1): con un dataset misto il grafo resta a stringhe
+    id_type = ids.id_type_of(talk['_id'] for talk in talks_data if talk.get('_id') is not None)
+    print(f"Current graph version: {current}. Loading new version {version}.")
+    try:
+        counts = load_version(version, current, talks_data, id_type)
+    except Exception:
+        print(f"Loading of graph version {version} failed: removing it, the Lambdas keep reading {current}.")
+        with neo4j_driver.session(database=NEO4J_DATABASE) as session:
+            graph_versions.delete_version(session, version)
+        raise
+
+    with neo4j_driver.session(database=NEO4J_DATABASE) as session:
+        previous = session.execute_write(graph_versions.switch_pointer, version, current, counts, id_type)
+    print(f"Switched current graph version: {previous} -> {version}.")
+    if GRAPH_SNAPSHOT_S3_URI:
+        point_snapshot(version)
+
+    # Restano la versione corrente e la precedente (rollback); le altre vengono cancellate
+    with neo4j_driver.session(database=NEO4J_DATABASE) as session:
+        for retired in session.execute_read(graph_versions.stored_versions):
+            if retired not in (version, previous):
+                deleted = graph_versions.delete_version(session, retired)
+                print(f"Deleted retired graph version {retired} ({deleted} talks).")
+        orphans = session.execute_write(graph_versions.delete_orphan_keywords)
+        if orphans:
+            print(f"Deleted {orphans} Keyword nodes no longer linked to any talk.")
+        orphans = session.execute_write(graph_versions.delete_orphan_speakers)
+        if orphans:
+            print(f"Deleted {orphans} Speaker nodes no longer linked to any talk.")
 
 # --- Main Execution Logic for Glue Python Shell ---
 if __name__ == "__main__":
 
     print("Starting AWS Glue Python Shell Job...")
-    processed_nodes = 0
-    created_relationships_attempts = 0 # Rinominato per chiarezza, dato che MERGE potrebbe non creare
     clients_initialized_successfully = False
 
     try:
@@ -200,13 +489,18 @@ if __name__ == "__main__":
         clients_initialized_successfully = True
         print("Database clients initialized successfully.")
 
+        if ROLLBACK:
+            rollback()
+            sys.exit(0)
+
         db = mongo_client[MONGO_DB_NAME]
         collection = db[MONGO_COLLECTION_NAME]
         print(f"Accessed MongoDB collection: {MONGO_DB_NAME}.{MONGO_COLLECTION_NAME}")
 
         print("Fetching talks data from MongoDB...")
         try:
-             talks_cursor = collection.find({})
+             # Trascrizione compressa e istanti delle cue non finiscono nel grafo: non serve scaricarli
+             talks_cursor = collection.find({}, {"transcript_cue_times": 0, "transcript_z": 0})
              talks_data = list(talks_cursor)
              found_count = len(talks_data)
              print(f"Found {found_count} talks in MongoDB.")
@@ -214,60 +508,7 @@ if __name__ == "__main__":
              if not talks_data:
                  print("No data found in MongoDB collection. Job will exit successfully.")
              else:
-                print("Phase 1: Creating/Updating Talk nodes in Neo4j...")
-                with neo4j_driver.session(database="neo4j") as session:
-                    for i, talk in enumerate(talks_data):
-                        if '_id' not in talk or talk['_id'] is None:
-                            print(f"Skipping document at index {i} due to missing or null '_id'.")
-                            continue
-                        try:
-                            session.execute_write(create_or_update_talk_node, talk)
-                            processed_nodes += 1
-                            if processed_nodes % 100 == 0 or processed_nodes == found_count:
-                                print(f"Processed {processed_nodes}/{found_count} nodes...")
-                        except Exception as e:
-                            print(f"Error processing node for talk ID {talk.get('_id', 'N/A')}: {e}")
-                            traceback.print_exc()
-                            continue
-                print(f"Finished Phase 1. Processed {processed_nodes} nodes.")
-
-                print("Phase 2: Creating RELATED_TO relationships in Neo4j...")
-                with neo4j_driver.session(database="neo4j") as session:
-                     for i, talk in enumerate(talks_data):
-                         source_id = talk.get('_id')
-                         next_watch_list = talk.get('next_watch')
-
-                         if not source_id:
-                             print(f"Skipping relationship creation for talk at index {i} without source ID.")
-                             continue
-
-                         if isinstance(next_watch_list, list) and next_watch_list:
-                             for related_data_item in next_watch_list:
-                                 # Estrai l'ID dal related_data_item.
-                                 # Se next_watch contiene direttamente gli ID:
-                                 related_id = str(related_data_item) if related_data_item is not None else None
-                                 # Se next_watch contiene oggetti, es: {'_id': 'xyz'}, dovresti estrarre l'id:
-                                 # related_id = str(related_data_item.get('_id')) if isinstance(related_data_item, dict) and related_data_item.get('_id') is not None else None
-
-                                 if related_id is None or related_id.strip() == "" or str(source_id) == related_id:
-                                     if str(source_id) == related_id:
-                                         pass # Skip self-relationship
-                                     else:
-                                         print(f"Skipping invalid/null related_id '{related_id}' for source {source_id}")
-                                     continue
-                                 
-                                 created_relationships_attempts += 1
-                                 try:
-                                     session.execute_write(create_relationship, source_id, related_id)
-                                     if created_relationships_attempts % 100 == 0:
-                                         print(f"Attempted to create/merge {created_relationships_attempts} relationships...")
-                                 except Exception as e:
-                                     # create_relationship gestisce errori di query, questo catch è per errori di transazione
-                                     print(f"Unexpected error during relationship write transaction ({source_id})->({related_id}): {e}")
-                                     traceback.print_exc()
-                                     continue
-
-                print(f"Finished Phase 2. Attempted to create/merge approximately {created_relationships_attempts} relationships (MERGE skips duplicates).")
+                sync(talks_data)
                 print("Data synchronization process completed.")
 
         except Exception as e:
@@ -275,6 +516,8 @@ if __name__ == "__main__":
              traceback.print_exc()
              sys.exit("Job failed during data fetching or processing.")
 
+    except SystemExit:
+        raise
     except (pymongo_errors.ConnectionFailure, neo4j_exceptions.ServiceUnavailable, neo4j_exceptions.AuthError) as e:
         print(f"FATAL: Database connection or authentication error during initialization: {e}")
         traceback.print_exc()
@@ -289,4 +532,4 @@ if __name__ == "__main__":
              cleanup_clients()
         else:
              print("Skipping client cleanup as initialization may have failed.")
-        print("AWS Glue Python Shell Job Finished.")
\ No newline at end of file
+        print("AWS Glue Python Shell Job Finished.")
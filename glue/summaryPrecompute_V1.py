@@ -0,0 +1,116 @@
+###### TEDx-Summary-Precompute ######
+#
+# Job Glue Python Shell che pre-genera i riassunti AI dei talk più richiesti e di
+# quelli più recenti, popolando la cache (collezione "summaries") usata dalla
+# Lambda openai-agent e dal router graph-api. Le richieste successive degli utenti
+# vengono così servite dalla cache in pochi millisecondi.
+#
+# Il codice del riassunto è quello del layer delle Lambda (pacchetto tedxgraph),
+# da passare al job con --extra-py-files (zip generato da lambda/layer/build.sh).
+#
+# Parametri (tutti opzionali, con fallback sulle variabili d'ambiente):
+#   --MONGODB_CONN_STRING, --MONGODB_DATABASE_NAME, --MONGODB_COLLECTION_NAME
+#   --HUGGINGFACE_API_TOKEN, --HF_MODEL_ID
+#   --HF_API_BASE_URL   es. http://localhost:8080/models per un modello locale di prova
+#   --TOP_REQUESTED     numero di talk più richiesti da considerare (default 200)
+#   --NEWEST            numero di talk più recenti da considerare (default 200)
+#   --CONCURRENCY       chiamate parallele al modello (default 2)
+
+import argparse
+import os
+import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+FORWARDED_SETTINGS = [
+    "MONGODB_CONN_STRING",
+    "MONGODB_DATABASE_NAME",
+    "MONGODB_COLLECTION_NAME",
+    "HUGGINGFACE_API_TOKEN",
+    "HF_MODEL_ID",
+    "HF_API_BASE_URL",
+]
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Pre-genera i riassunti dei talk TEDx")
+    for name in FORWARDED_SETTINGS:
+        parser.add_argument(f"--{name}", default=os.environ.get(name))
+    parser.add_argument("--TOP_REQUESTED", type=int, default=200)
+    parser.add_argument("--NEWEST", type=int, default=200)
+    parser.add_argument("--CONCURRENCY", type=int, default=2)
+    # Glue aggiunge i propri parametri (--job-bookmark-option, ...): vanno ignorati
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+
+def select_talk_ids(mongo_runtime, summarizer, top_requested, newest):
+    """Talk più richiesti prima, poi i più recenti, senza duplicati."""
+    talk_ids = []
+
+    requests_collection = mongo_runtime.get_collection(summarizer.SUMMARY_REQUESTS_COLLECTION_NAME)
+    if requests_collection is not None and top_requested > 0:
+        for doc in requests_collection.find({}, {"_id": 1}).sort("count", -1).limit(top_requested):
+            talk_ids.append(str(doc["_id"]))
+    print(f"Talk più richiesti selezionati: {len(talk_ids)}")
+
+    talks_collection = mongo_runtime.get_talks_collection()
+    if talks_collection is not None and newest > 0:
+        from tedxgraph import transcript_codec
+
+        # publishedAt è una stringa ISO 8601: l'ordinamento lessicografico è cronologico
+        cursor = talks_collection.find(transcript_codec.TRANSCRIPT_QUERY, {"_id": 1}).sort("publishedAt", -1).limit(newest)
+        talk_ids.extend(str(doc["_id"]) for doc in cursor)
+
+    return list(dict.fromkeys(talk_ids))
+
+
+if __name__ == "__main__":
+
+    print("Starting TEDx summary precompute job...")
+    args = parse_args(sys.argv[1:])
+
+    # Il layer legge la configurazione dalle variabili d'ambiente al momento dell'import
+    for name in FORWARDED_SETTINGS:
+        value = getattr(args, name)
+        if value:
+            os.environ[name] = value
+
+    from tedxgraph import mongo_runtime, summarizer
+
+    if mongo_runtime.get_mongodb_client() is None:
+        sys.exit("Job failed: MongoDB non raggiungibile o non configurato.")
+
+    talk_ids = select_talk_ids(mongo_runtime, summarizer, args.TOP_REQUESTED, args.NEWEST)
+    print(f"Talk da elaborare: {len(talk_ids)} (modello {summarizer.HF_MODEL_ID}, prompt v{summarizer.PROMPT_VERSION})")
+
+    stats = {"cached": 0, "generated": 0, "failed": 0}
+    with ThreadPoolExecutor(max_workers=max(1, args.CONCURRENCY)) as executor:
+        futures = {
+            executor.submit(summarizer.summarize_talk, talk_id, record_request=False): talk_id
+            for talk_id in talk_ids
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            talk_id = futures[future]
+            try:
+                status_code, body = future.result()
+            except Exception as e:
+                print(f"Error summarizing talk {talk_id}: {e}")
+                traceback.print_exc()
+                stats["failed"] += 1
+                continue
+
+            if status_code != 200:
+                print(f"Talk {talk_id}: riassunto non disponibile ({status_code}) {body.get('error')}")
+                stats["failed"] += 1
+            elif body.get("cached"):
+                stats["cached"] += 1
+            else:
+                stats["generated"] += 1
+
+            if done % 20 == 0 or done == len(futures):
+                print(f"Processed {done}/{len(futures)} talks... {stats}")
+
+    print(f"Summary precompute finished: {stats}")
+    if talk_ids and stats["failed"] == len(talk_ids):
+        sys.exit("Job failed: nessun riassunto generato.")
@@ -0,0 +1,135 @@
+###### TEDx-Talk-Id-Migration ######
+#
+# Job Glue Python Shell da eseguire una volta prima di passare tedXjob alla
+# modalità typed-id (--TYPED_IDS true, vedi tedxgraph/ids.py). Converte i
+# documenti di tedx_data scritti con id stringa ("567505") in documenti con
+# _id int64 (567505) e next_watch come lista di interi.
+#
+# L'_id di un documento MongoDB non si può modificare: ogni documento viene
+# riscritto con il nuovo _id (ReplaceOne con upsert, quindi rieseguire il job è
+# sicuro) e il vecchio viene cancellato, a blocchi con bulk_write. Gli id non
+# numerici vengono lasciati invariati e segnalati: in quel caso il job termina
+# con errore e le Lambda non vanno passate a TALK_ID_TYPE=int.
+#
+# Le collezioni derivate (cache dei riassunti, vicinati, richieste) usano la
+# forma stringa dell'API e non cambiano. Neo4j non va migrato: la sync
+# successiva di neo4jLink carica una nuova versione del grafo con id interi e
+# il puntatore alla versione (graph_versions) cambia tipo degli id insieme ad
+# essa; PageRank e community vanno ricalcolati con graphAnalytics_V1.
+#
+# Ordine consigliato: questo job, TALK_ID_TYPE=int nelle Lambda, tedXjob con
+# --TYPED_IDS true, neo4jLink, graphAnalytics. Con --TO string la conversione
+# inversa (rollback).
+#
+# Parametri (con fallback sulle variabili d'ambiente):
+#   --MONGODB_CONN_STRING, --MONGODB_DATABASE_NAME, --MONGODB_COLLECTION_NAME
+#   --TO          tipo di destinazione: "int" (default) o "string"
+#   --DRY_RUN     "true" per contare i documenti da convertire senza scrivere
+#   --BATCH_SIZE  operazioni per bulk_write (default 200)
+
+import argparse
+import os
+import sys
+import traceback
+
+FORWARDED_SETTINGS = ["MONGODB_CONN_STRING", "MONGODB_DATABASE_NAME", "MONGODB_COLLECTION_NAME"]
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Converte gli id dei talk TEDx in interi (o di nuovo in stringhe)")
+    for name in FORWARDED_SETTINGS:
+        parser.add_argument(f"--{name}", default=os.environ.get(name))
+    parser.add_argument("--TO", choices=("int", "string"), default="int")
+    parser.add_argument("--DRY_RUN", default="false")
+    parser.add_argument("--BATCH_SIZE", type=int, default=200)
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+
+def convert_id(value, to):
+    """Id nel tipo di destinazione; None se non convertibile (id non numerico)."""
+    if to == "string":
+        return str(value)
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    text = str(value).strip()
+    return int(text) if text.isascii() and text.isdigit() else None
+
+
+def pending_query(to):
+    """Documenti con _id o elementi di next_watch ancora nel tipo di partenza."""
+    source_types = ["string"] if to == "int" else ["long", "int"]
+    return {"$or": [
+        {"_id": {"$type": source_types}},
+        {"next_watch": {"$elemMatch": {"$type": source_types}}},
+    ]}
+
+
+def convert_document(doc, to):
+    """(nuovo documento, vecchio _id da cancellare o None); (None, None) se l'_id non è convertibile."""
+    new_id = convert_id(doc["_id"], to)
+    if new_id is None:
+        return None, None
+    converted = dict(doc, _id=new_id)
+    if isinstance(doc.get("next_watch"), list):
+        next_watch = [convert_id(related, to) for related in doc["next_watch"] if related is not None]
+        converted["next_watch"] = [related for related in next_watch if related is not None]
+    return converted, doc["_id"] if new_id != doc["_id"] else None
+
+
+if __name__ == "__main__":
+
+    print("Starting TEDx talk id migration job...")
+    args = parse_args(sys.argv[1:])
+    for name in FORWARDED_SETTINGS:
+        value = getattr(args, name)
+        if value:
+            os.environ[name] = value
+    dry_run = args.DRY_RUN.lower() == "true"
+
+    from pymongo import DeleteOne, ReplaceOne
+    from tedxgraph import mongo_runtime
+
+    try:
+        talks_collection = mongo_runtime.get_talks_collection()
+        if talks_collection is None:
+            sys.exit("Job failed: MongoDB non raggiungibile o non configurato.")
+
+        total = talks_collection.estimated_document_count()
+        query = pending_query(args.TO)
+        pending = talks_collection.count_documents(query)
+        print(f"Documents to convert to {args.TO} ids: {pending} of about {total}.")
+        if dry_run:
+            print("DRY_RUN: no document written.")
+            sys.exit(0)
+
+        converted, skipped, operations = 0, [], []
+        # Gli _id convertiti non corrispondono più alla query: il cursore non li rilegge
+        for doc in talks_collection.find(query):
+            new_doc, old_id = convert_document(doc, args.TO)
+            if new_doc is None:
+                skipped.append(doc["_id"])
+                continue
+            operations.append(ReplaceOne({"_id": new_doc["_id"]}, new_doc, upsert=True))
+            if old_id is not None:
+                operations.append(DeleteOne({"_id": old_id}))
+            converted += 1
+            if len(operations) >= args.BATCH_SIZE:
+                talks_collection.bulk_write(operations, ordered=True)
+                operations = []
+                print(f"Converted {converted}/{pending} documents...")
+        if operations:
+            talks_collection.bulk_write(operations, ordered=True)
+        print(f"Converted {converted} documents to {args.TO} ids.")
+
+        if skipped:
+            print(f"Non-numeric ids left unchanged ({len(skipped)}): {skipped[:20]}")
+            sys.exit("Job failed: some talk ids are not numeric, keep TALK_ID_TYPE=string.")
+        print("Talk id migration completed. Next: set TALK_ID_TYPE on the Lambdas and run neo4jLink.")
+
+    except SystemExit:
+        raise
+    except Exception as e:
+        print(f"FATAL: An unexpected error occurred: {e}")
+        traceback.print_exc()
+        sys.exit("Job failed due to an unexpected error.")
@@ -0,0 +1,88 @@
+# Esecuzione in locale di tedXjob, senza awsglue: PySpark con master local[*],
+# file locali e, al posto di MongoDB, un sink che scrive i documenti come JSON
+# (uno per riga). Serve a profilare e migliorare le fasi più lente senza un job
+# Glue a pagamento; le trasformazioni sono le stesse (tedx_pipeline.py).
+#
+#   python glue/tedXjob_local.py --input /tmp/tedx-1x --transcripts /tmp/tedx-1x/transcripts.jsonl \
+#       --output /tmp/tedx-1x/tedx_data --profile
+#
+# --input contiene final_list.csv, details.csv e tags.csv (es. generati con
+# `python -m benchmarks.tedxbench generate`). --transcripts è la directory degli
+# shard di transcriptHarvest_V1.py (anche eseguito in locale) o un file JSON Lines
+# nello stesso formato; senza, i talk restano senza trascrizione. Con --profile
+# ogni fase viene materializzata e cronometrata separatamente (più lento nel
+# complesso, ma dice dove va il tempo). L'interfaccia di Spark resta su http://localhost:4040.
+# Le trascrizioni sono compresse come nel job Glue; il dizionario è scritto in
+# <output>_dictionaries (--codec per scegliere zstd o zlib, --codec none per il testo in chiaro).
+# --typed-ids scrive _id e next_watch come interi, come il job Glue con --TYPED_IDS true.
+
+import argparse
+import os
+import sys
+import time
+
+GLUE_DIR = os.path.dirname(os.path.abspath(__file__))
+LAYER_DIR = os.path.join(GLUE_DIR, "..", "lambda", "layer", "python")
+
+# Gli executor locali sono processi Python separati: devono poter importare
+# tedx_pipeline e tedxgraph (pandas UDF delle parole chiave)
+os.environ["PYTHONPATH"] = os.pathsep.join(filter(None, [GLUE_DIR, os.path.abspath(LAYER_DIR), os.environ.get("PYTHONPATH")]))
+sys.path[:0] = [GLUE_DIR, os.path.abspath(LAYER_DIR)]
+
+from pyspark import StorageLevel
+from pyspark.sql import SparkSession
+
+import tedx_pipeline
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the tedXjob pipeline locally (no awsglue)")
+    parser.add_argument("--input", required=True, help="directory with final_list.csv, details.csv, tags.csv")
+    parser.add_argument("--transcripts", help="transcript shards directory or JSON Lines file (default: no transcripts)")
+    parser.add_argument("--output", required=True, help="directory for the JSON documents (MongoDB stand-in)")
+    parser.add_argument("--master", default="local[*]")
+    parser.add_argument("--shuffle-partitions", type=int, default=None)
+    parser.add_argument("--profile", action="store_true", help="materialize and time every stage")
+    parser.add_argument("--codec", choices=("zstd", "zlib", "none"), default="zlib",
+                        help="transcript compression (zstd needs zstandard in the Lambda layer too)")
+    parser.add_argument("--typed-ids", action="store_true", help="cast talk ids to int64 (typed-id mode)")
+    return parser.parse_args(argv)
+
+
+def profiled_stage(name, df):
+    started_at = time.perf_counter()
+    df = df.persist(StorageLevel.MEMORY_AND_DISK)
+    rows = df.count()
+    print(f"Fase {name:<12} {time.perf_counter() - started_at:8.2f} s  ({rows} righe)")
+    return df
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    builder = SparkSession.builder.master(args.master).appName("tedXjob-local") \
+        .config("spark.sql.execution.arrow.pyspark.enabled", "true")
+    if args.shuffle_partitions:
+        builder = builder.config("spark.sql.shuffle.partitions", str(args.shuffle_partitions))
+    spark = builder.getOrCreate()
+
+    try:
+        started_at = time.perf_counter()
+        talks, details, tags = tedx_pipeline.read_inputs(spark, tedx_pipeline.input_paths(args.input))
+        if args.transcripts:
+            talks = tedx_pipeline.add_transcripts(spark, talks, args.transcripts)
+
+        on_stage = profiled_stage if args.profile else (lambda name, df: df)
+        final = tedx_pipeline.build_tedx_dataset(talks, details, tags, on_stage=on_stage, typed_ids=args.typed_ids)
+        if args.codec != "none":
+            codec, dictionary = tedx_pipeline.train_transcript_dictionary(final, args.codec)
+            final = on_stage("compress", tedx_pipeline.compress_transcripts(final, codec, dictionary))
+            tedx_pipeline.write_json_documents(tedx_pipeline.transcript_dictionary_frame(spark, codec, dictionary),
+                                               args.output.rstrip("/") + "_dictionaries")
+        tedx_pipeline.write_json_documents(final, args.output)
+        print(f"Job locale completato in {time.perf_counter() - started_at:.1f} s.")
+    finally:
+        spark.stop()
+
+
+if __name__ == "__main__":
+    main()
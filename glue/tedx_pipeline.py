@@ -0,0 +1,368 @@
+# Pipeline di tedXjob come funzioni su DataFrame, senza dipendenze da awsglue.
+#
+# Ogni fase riceve e restituisce DataFrame PySpark, così la stessa pipeline gira:
+# - nel job Glue (tedXjob_V3.py): lettura da S3 e scrittura su MongoDB con il connettore Glue;
+# - in locale (tedXjob_local.py): Spark local[*], file locali e un sink che scrive
+#   i documenti come file JSON (uno per riga, come mongoexport) al posto di MongoDB;
+# - nei benchmark (benchmarks/tedxbench/spark_transforms.py), che cronometrano ogni fase.
+#
+# Fasi, nell'ordine di build_tedx_dataset:
+#   transcripts (a parte: lette dagli shard di transcriptHarvest_V1.py, vedi add_transcripts)
+#   ids         con typed_ids, id dei tre dataset convertiti in int64 (vedi cast_ids)
+#   details     join con details.csv
+#   tags        filtro dei tag comuni e aggregazione per talk
+#   next_watch  talk con più tag in comune (top NEXT_WATCH_SIZE)
+#   keywords    termini candidati (pandas UDF) pesati con TF-IDF
+#   compress    (a parte, prima della scrittura) trascrizioni compresse con un
+#               dizionario condiviso, vedi compress_transcripts
+#
+# Le UDF sono eseguite dagli executor: in Glue questo file e il pacchetto tedxgraph
+# vanno passati con --extra-py-files, in locale basta che siano nel PYTHONPATH.
+
+import os
+
+from pyspark import StorageLevel
+from pyspark.sql.functions import col, collect_list, array_join, explode, lit, coalesce, array, count, rank, pandas_udf, log, row_number, struct, sort_array, expr, from_json
+from pyspark.sql.functions import max as spark_max
+from pyspark.sql.window import Window
+from pyspark.sql.types import ArrayType, StringType, MapType, IntegerType, LongType, StructType, StructField, BinaryType
+import pandas as pd
+
+INPUT_FILES = ("final_list.csv", "details.csv", "tags.csv")
+STATUS_OK = "ok"            # come transcript_harvest.STATUS_OK
+STATUS_NOT_FOUND = "not_found"  # come transcript_harvest.STATUS_NOT_FOUND
+STATUS_MISSING = "missing"  # talk non presente negli shard delle trascrizioni
+TAG_THRESHOLD = 500
+
+# Righe degli shard delle trascrizioni: paragrafi così come restituiti da GraphQL
+# (time in millisecondi, presente solo se raccolto con --CUE_TIMES). Le altre
+# chiavi delle righe (languages, error) non servono a tedXjob e sono ignorate.
+PARAGRAPHS_TYPE = ArrayType(StructType([
+    StructField("cues", ArrayType(StructType([
+        StructField("text", StringType()),
+        StructField("time", LongType()),
+    ]))),
+]))
+SHARD_ROW_SCHEMA = StructType([
+    StructField("slug", StringType()),
+    StructField("status", StringType()),
+    StructField("paragraphs", PARAGRAPHS_TYPE),
+])
+NEXT_WATCH_SIZE = 5
+
+# --- Parole chiave dei talk (nodi secondari della mappa mentale) ---
+# Candidati alla maniera di RAKE (parole e coppie di parole di contenuto, vedi
+# tedxgraph/text.py) estratti da titolo, descrizione e trascrizione con una pandas
+# UDF (batch Arrow), poi pesati con TF-IDF sull'intero corpus. Per ogni talk
+# vengono salvate le prime KEYWORDS_TOP_N come [{term, weight}] (peso massimo 1.0);
+# neo4jLink le trasforma in nodi (:Keyword).
+KEYWORDS_TOP_N = 10
+# Un termine del titolo conta come tre occorrenze nella trascrizione
+KEYWORD_FIELD_WEIGHTS = (("title", 3), ("description", 2), ("transcript", 1))
+KEYWORD_MIN_DOC_FREQ = 2        # scarta refusi e termini presenti in un solo talk
+KEYWORD_MAX_DOC_RATIO = 0.3     # scarta termini presenti in troppi talk
+
+# --- Trascrizioni compresse (tedxgraph/transcript_codec.py) ---
+# Il dizionario è addestrato sul driver con un campione delle trascrizioni e
+# scritto una volta nella collezione transcript_dictionaries; gli executor
+# comprimono ogni batch Arrow con lo stesso compressore.
+TRANSCRIPT_DICTIONARY_SAMPLES = 2000
+TRANSCRIPT_Z_TYPE = StructType([
+    StructField("format", IntegerType()),
+    StructField("codec", StringType()),
+    StructField("dict", StringType()),
+    StructField("size", IntegerType()),
+    StructField("sha256", StringType()),
+    StructField("data", BinaryType()),
+])
+
+
+def input_paths(base):
+    """Percorsi dei tre CSV sotto ``base`` (prefisso S3 o directory locale)."""
+    return {name: f"{base.rstrip('/')}/{name}" for name in INPUT_FILES}
+
+
+def read_csv(spark, path):
+    return spark.read \
+        .option("header", "true") \
+        .option("quote", "\"") \
+        .option("escape", "\"") \
+        .csv(path)
+
+
+def read_inputs(spark, paths):
+    """(talk, dettagli, tag) dai CSV; ``paths`` come restituito da input_paths."""
+    talks = read_csv(spark, paths["final_list.csv"])
+    details = read_csv(spark, paths["details.csv"])
+    tags = spark.read.option("header", "true").csv(paths["tags.csv"])
+    return talks, details, tags
+
+
+@pandas_udf(BinaryType())
+def cue_times_udf(times: pd.Series) -> pd.Series:
+    from tedxgraph.cue_times import encode_times
+
+    def encode(values):
+        if values is None or len(values) == 0 or pd.isna(values).any():
+            return None
+        return encode_times([int(value) for value in values])
+
+    return pd.Series([encode(values) for values in times])
+
+
+def add_transcripts(spark, talks, path):
+    """
+    Colonne transcript, transcript_cue_times e transcript_status dagli shard di
+    transcriptHarvest_V1.py (directory o prefisso S3) o da un file JSON Lines nello
+    stesso formato {slug, status, paragraphs: [{cues: [{text, time}]}]}.
+
+    Le righe sono lette come testo e convertite con from_json e uno schema
+    dichiarato (SHARD_ROW_SCHEMA): niente passata di inferenza sull'intero
+    dataset. Il testo (cue non vuote, ognuna su una riga, unite con "\\n") è
+    calcolato con funzioni native di Spark; transcript_cue_times contiene gli istanti di inizio delle
+    stesse cue, int32 a delta (tedxgraph.cue_times: 4 byte per cue), o null se
+    gli shard non hanno gli istanti (harvest senza --CUE_TIMES). Senza "status"
+    (es. i file di benchmarks/tedxbench) vale "ok" se ci sono cue, altrimenti
+    "not_found"; i talk assenti dagli shard hanno status "missing".
+    """
+    harvested = spark.read.text(path) \
+        .select(from_json(col("value"), SHARD_ROW_SCHEMA).alias("row")) \
+        .select("row.*") \
+        .filter(col("slug").isNotNull())
+    # Una cue per riga: gli a capo dentro una cue diventano spazi (tedxgraph.cue_times.cue_line)
+    cue_text = "trim(regexp_replace(c.text, '\\\\s+', ' '))"
+    cues = f"filter(flatten(transform(paragraphs, p -> p.cues)), c -> {cue_text} != '')"
+    transcripts = harvested.select(
+        col("slug").alias("transcript_slug"),
+        array_join(expr(f"transform({cues}, c -> {cue_text})"), "\n").alias("transcript"),
+        cue_times_udf(expr(f"transform({cues}, c -> c.time)")).alias("transcript_cue_times"),
+        coalesce(col("status"),
+                 expr(f"CASE WHEN size(paragraphs) > 0 THEN '{STATUS_OK}' ELSE '{STATUS_NOT_FOUND}' END")).alias("transcript_status"),
+    ).withColumn("transcript", expr("CASE WHEN transcript = '' THEN NULL ELSE transcript END"))
+    if "slug" not in talks.columns:
+        print("Errore: colonna 'slug' non trovata in tedx_dataset. Impossibile associare le trascrizioni.")
+        return talks.withColumn("transcript", lit(None).cast(StringType())) \
+            .withColumn("transcript_cue_times", lit(None).cast(BinaryType())) \
+            .withColumn("transcript_status", lit(STATUS_MISSING))
+    return talks.join(transcripts, talks["slug"] == transcripts["transcript_slug"], "left") \
+        .drop("transcript_slug") \
+        .withColumn("transcript_status", coalesce(col("transcript_status"), lit(STATUS_MISSING)))
+
+
+def cast_ids(talks, details, tags):
+    """
+    Modalità typed-id: la colonna id dei tre dataset diventa int64. I join (details,
+    tags, self-join di next_watch) confrontano e spostano nello shuffle 8 byte fissi
+    invece di stringhe, e _id e next_watch arrivano a MongoDB come interi (vedi
+    tedxgraph/ids.py). Gli id non numerici diventano null e vengono scartati.
+    """
+    def cast(df):
+        return df.withColumn("id", col("id").cast(LongType())) if "id" in df.columns else df
+
+    return cast(talks), cast(details).filter(col("id").isNotNull()), cast(tags).filter(col("id").isNotNull())
+
+
+def _id_array_type(talks):
+    """Tipo di next_watch: array dello stesso tipo di _id (stringa o int64)."""
+    return ArrayType(talks.schema["_id"].dataType if "_id" in talks.columns else StringType())
+
+
+def filter_valid_ids(talks):
+    """Scarta i talk senza id (chiave del documento MongoDB)."""
+    if 'id' not in talks.columns:
+        print("Attenzione: colonna 'id' (numerica) non trovata in tedx_dataset. Salto il controllo delle chiavi nulle.")
+        return talks
+    return talks.filter(col("id").isNotNull())
+
+
+def add_details(talks, details):
+    details = details.select(col("id").alias("id_ref"),
+                             col("description"),
+                             col("duration"),
+                             col("publishedAt"))
+    return talks.join(details, talks["id"] == details["id_ref"], "left").drop("id_ref")
+
+
+def add_tags(talks, tags, tag_threshold=TAG_THRESHOLD):
+    """
+    Rinomina id in _id e aggiunge la colonna tags, senza i tag presenti in più di
+    ``tag_threshold`` talk (troppo generici per collegare talk affini).
+    """
+    renamed = talks.select([col("id").alias("_id")] + [talks[c] for c in talks.columns if c != "id"])
+    if 'id' not in tags.columns or 'tag' not in tags.columns:
+        print("Attenzione: colonna 'id' o 'tag' non trovata in tags_dataset. Salto aggregazione tag e calcolo next_watch.")
+        return renamed.withColumn("tags", array().cast(ArrayType(StringType())))
+
+    tag_counts = tags.groupBy("tag").agg(count("*").alias("tag_occurrence"))
+    filtered_tag_counts = tag_counts.filter(col("tag_occurrence") <= tag_threshold)
+    tags_filtered = tags.join(filtered_tag_counts.select("tag"), "tag", "inner")
+    tags_agg = tags_filtered.groupBy(col("id").alias("id_ref_tags")).agg(collect_list("tag").alias("tags"))
+
+    return renamed.join(tags_agg, renamed["_id"] == tags_agg["id_ref_tags"], "left") \
+        .drop("id_ref_tags") \
+        .withColumn("tags", coalesce(col("tags"), array().cast("array<string>")))
+
+
+def add_next_watch(talks, size=NEXT_WATCH_SIZE):
+    """
+    next_watch: i ``size`` talk con più tag in comune (a parità, in ordine di id:
+    numerico con gli id int64 di cast_ids, lessicografico con gli id stringa).
+    """
+    exploded_tags = talks.select("_id", explode("tags").alias("tag"))
+
+    t1 = exploded_tags.alias("t1")
+    t2 = exploded_tags.alias("t2")
+
+    common_tags_count_df = t1.join(t2, (col("t1.tag") == col("t2.tag")) & (col("t1._id") != col("t2._id")), "inner") \
+                             .groupBy(col("t1._id").alias("source_id"), col("t2._id").alias("related_id")) \
+                             .agg(count("*").alias("common_tags_count"))
+
+    window_spec = Window.partitionBy("source_id").orderBy(col("common_tags_count").desc())
+    ranked_related_talks = common_tags_count_df.withColumn("rank", rank().over(window_spec))
+    top_related_talks = ranked_related_talks.filter(col("rank") <= size)
+
+    next_watch_mapping = top_related_talks \
+        .orderBy("source_id", col("common_tags_count").desc(), "related_id") \
+        .groupBy("source_id") \
+        .agg(collect_list("related_id").alias("next_watch")) \
+        .withColumnRenamed("source_id", "join_id")
+
+    return talks.join(next_watch_mapping, talks["_id"] == next_watch_mapping["join_id"], "left") \
+        .drop("join_id") \
+        .withColumn("next_watch", coalesce(col("next_watch"), lit(None).cast(_id_array_type(talks))))
+
+
+def ensure_output_columns(talks):
+    """Colonne sempre presenti nei documenti scritti (anche se vuote)."""
+    for name in ("slug", "transcript"):
+        if name not in talks.columns:
+            print(f"Attenzione: colonna '{name}' mancante nel dataset finale. Aggiunta come colonna vuota.")
+            talks = talks.withColumn(name, lit(None).cast(StringType()))
+    if "transcript_status" not in talks.columns:
+        talks = talks.withColumn("transcript_status", lit(STATUS_MISSING))
+    if "tags" not in talks.columns:
+        talks = talks.withColumn("tags", array().cast(ArrayType(StringType())))
+    if "next_watch" not in talks.columns:
+        talks = talks.withColumn("next_watch", array().cast(_id_array_type(talks)))
+    return talks
+
+
+@pandas_udf(MapType(StringType(), IntegerType()))
+def keyword_term_counts_udf(title: pd.Series, description: pd.Series, transcript: pd.Series) -> pd.Series:
+    from collections import Counter
+    from tedxgraph.text import candidate_terms
+
+    def term_counts(*fields):
+        counts = Counter()
+        for value, (_, weight) in zip(fields, KEYWORD_FIELD_WEIGHTS):
+            if isinstance(value, str) and value:
+                for term in candidate_terms(value):
+                    counts[term] += weight
+        return dict(counts)
+
+    return pd.Series([term_counts(*fields) for fields in zip(title, description, transcript)])
+
+
+def add_keywords(talks):
+    """Colonna keywords: [{term, weight}] per talk. ``talks`` va reso persistente prima (viene letto due volte)."""
+    total_talks = talks.count()
+    text_columns = [
+        coalesce(col(name), lit("")) if name in talks.columns else lit("")
+        for name, _ in KEYWORD_FIELD_WEIGHTS
+    ]
+
+    term_counts = talks \
+        .select(col("_id").alias("kw_id"), explode(keyword_term_counts_udf(*text_columns)).alias("term", "tf")) \
+        .persist(StorageLevel.MEMORY_AND_DISK)
+
+    doc_freq = term_counts.groupBy("term").agg(count("*").alias("df")) \
+        .filter((col("df") >= KEYWORD_MIN_DOC_FREQ) & (col("df") <= KEYWORD_MAX_DOC_RATIO * total_talks))
+
+    scored_terms = term_counts.join(doc_freq, "term", "inner") \
+        .withColumn("score", (lit(1.0) + log(col("tf"))) * (log((lit(total_talks) + 1) / (col("df") + 1)) + 1))
+
+    talk_window = Window.partitionBy("kw_id").orderBy(col("score").desc(), col("term"))
+    top_terms = scored_terms \
+        .withColumn("position", row_number().over(talk_window)) \
+        .filter(col("position") <= KEYWORDS_TOP_N) \
+        .withColumn("max_score", spark_max("score").over(Window.partitionBy("kw_id")))
+
+    keywords_by_talk = top_terms \
+        .groupBy("kw_id") \
+        .agg(sort_array(collect_list(struct((col("score") / col("max_score")).alias("weight"), col("term"))), asc=False).alias("ranked")) \
+        .select("kw_id", expr("transform(ranked, k -> named_struct('term', k.term, 'weight', round(k.weight, 4)))").alias("keywords"))
+
+    return talks.join(keywords_by_talk, talks["_id"] == keywords_by_talk["kw_id"], "left").drop("kw_id")
+
+
+def train_transcript_dictionary(talks, codec=None, samples=TRANSCRIPT_DICTIONARY_SAMPLES):
+    """
+    (codec, dizionario) da un campione casuale delle trascrizioni di ``talks``.
+    Senza ``codec`` usa transcript_codec.DEFAULT_CODEC (zlib): zstd solo se richiesto.
+    """
+    from tedxgraph import transcript_codec
+
+    codec = codec or transcript_codec.DEFAULT_CODEC
+    if codec not in transcript_codec.CODECS:
+        raise ValueError(f"Codec delle trascrizioni non valido: {codec} (ammessi: {', '.join(transcript_codec.CODECS)})")
+    with_transcript = talks.filter(col("transcript").isNotNull())
+    total = with_transcript.count()
+    fraction = min(1.0, 1.2 * samples / total) if total else 1.0
+    sample = [row.transcript for row in with_transcript.select("transcript").sample(fraction=fraction, seed=42).limit(samples).collect()]
+    dictionary = transcript_codec.train_dictionary(sample, codec)
+    print(f"Dizionario {codec} delle trascrizioni: {len(dictionary)} byte da {len(sample)} campioni.")
+    return codec, dictionary
+
+
+def transcript_dictionary_frame(spark, codec, dictionary):
+    """Documento da scrivere in transcript_dictionaries (vuoto se non c'è dizionario)."""
+    from tedxgraph import transcript_codec
+
+    schema = StructType([StructField("_id", StringType()), StructField("codec", StringType()), StructField("data", BinaryType())])
+    dict_id = transcript_codec.dictionary_id(codec, dictionary)
+    return spark.createDataFrame([(dict_id, codec, bytearray(dictionary))] if dict_id else [], schema)
+
+
+def compress_transcripts(talks, codec, dictionary):
+    """Sostituisce la colonna transcript con transcript_z (trascrizione compressa, vedi tedxgraph/transcript_codec.py)."""
+
+    @pandas_udf(TRANSCRIPT_Z_TYPE)
+    def compress_udf(transcripts: pd.Series) -> pd.DataFrame:
+        from tedxgraph.transcript_codec import Compressor
+
+        compressor = Compressor(codec, dictionary)
+        rows = [compressor.compress(text) if isinstance(text, str) else None for text in transcripts]
+        frame = pd.DataFrame([row or {} for row in rows], columns=[field.name for field in TRANSCRIPT_Z_TYPE.fields])
+        return frame.astype({"format": "Int32", "size": "Int32"})
+
+    return talks.withColumn("transcript_z", compress_udf(col("transcript"))) \
+        .withColumn("transcript_z", expr("CASE WHEN transcript IS NULL THEN NULL ELSE transcript_z END")) \
+        .drop("transcript")
+
+
+def _unchanged(name, df):
+    return df
+
+
+def build_tedx_dataset(talks, details, tags, on_stage=_unchanged, typed_ids=False):
+    """
+    Documenti finali (un talk per riga) dai talk (già con le colonne di add_transcripts),
+    dettagli e tag. ``on_stage(nome, df)`` è chiamata dopo ogni fase e ne
+    restituisce il DataFrame: i benchmark la usano per materializzare e
+    cronometrare le singole fasi. Con ``typed_ids`` gli id sono int64 (cast_ids).
+    """
+    if typed_ids:
+        talks, details, tags = cast_ids(talks, details, tags)
+    talks = on_stage("transcripts", filter_valid_ids(talks))
+    talks = on_stage("details", add_details(talks, details))
+    talks = on_stage("tags", add_tags(talks, tags))
+    talks = on_stage("next_watch", add_next_watch(talks))
+    # add_keywords legge il dataset due volte (conteggio e termini)
+    talks = ensure_output_columns(talks).persist(StorageLevel.MEMORY_AND_DISK)
+    return on_stage("keywords", add_keywords(talks))
+
+
+def write_json_documents(df, path):
+    """Sink locale al posto di MongoDB: un documento JSON per riga, un file per partizione."""
+    df.write.mode("overwrite").json(path)
+    print(f"Documenti scritti in {os.path.abspath(path)}")
@@ -0,0 +1,119 @@
+###### TEDx-Transcript-Harvest ######
+#
+# Job Glue Python Shell da eseguire prima di tedXjob. Scarica le trascrizioni
+# da ted.com a shard (vedi transcript_harvest.py): ogni shard completato viene
+# scritto atomicamente con lo status di ogni talk (ok / not_found / throttled /
+# error). Se il job si interrompe (throttling, timeout di Glue) basta rilanciarlo:
+# gli shard già scritti vengono saltati. Più esecuzioni possono lavorare in
+# parallelo su intervalli diversi (--SHARDS 0-31 e --SHARDS 32-63); l'ultima,
+# o una con --MERGE_ONLY, scrive il manifest con i conteggi.
+#
+# Richiede transcript_harvest.py (--extra-py-files) e il pacchetto requests.
+#
+# Parametri (con fallback sulle variabili d'ambiente):
+#   --INPUT_URI          final_list.csv (s3://... o percorso locale)
+#   --OUTPUT_URI         prefisso S3 o directory locale degli shard
+#   --SHARD_COUNT        numero totale di shard (default 64; va tenuto fisso tra le esecuzioni)
+#   --SHARDS             shard di questa esecuzione: "all" (default) o es. "0-15,40"
+#   --WORKERS            richieste in parallelo per shard (default 4)
+#   --LANGUAGES          lingue delle trascrizioni, la prima è quella principale (default en; es. "en,it,es")
+#   --BATCH_SIZE         talk/lingue per richiesta GraphQL all'inizio (default 10, poi adattivo)
+#   --MAX_BATCH_SIZE     limite del blocco adattivo (default 50)
+#   --GRAPHQL_URL        endpoint GraphQL (default ted.com; per prove in locale il server stand-in)
+#   --CUE_TIMES          richiede anche l'istante di inizio di ogni cue, per i link al
+#                        passaggio nel video (default true; "false" per il solo testo)
+#   --RETRY_FAILED       riprende anche gli shard completati con righe throttled/error
+#   --MERGE_ONLY         non scarica: verifica gli shard e scrive il manifest
+#   --MAX_THROTTLED_RATIO se uno shard supera questa quota di righe throttled il job
+#                        si ferma (gli shard scritti restano): default 0.5
+
+import argparse
+import os
+import sys
+import time
+import traceback
+
+SETTINGS = ["INPUT_URI", "OUTPUT_URI", "SHARD_COUNT", "SHARDS", "WORKERS", "LANGUAGES", "BATCH_SIZE",
+            "MAX_BATCH_SIZE", "GRAPHQL_URL", "MAX_THROTTLED_RATIO"]
+FLAGS = ["RETRY_FAILED", "MERGE_ONLY", "CUE_TIMES"]
+FLAG_DEFAULTS = {"CUE_TIMES": "true"}
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Scarica a shard le trascrizioni dei talk TEDx")
+    for name in SETTINGS:
+        parser.add_argument(f"--{name}", default=os.environ.get(name))
+    for name in FLAGS:
+        # Glue passa i parametri sempre come coppie chiave/valore: "--RETRY_FAILED true"
+        parser.add_argument(f"--{name}", nargs="?", const="true", default=os.environ.get(name, FLAG_DEFAULTS.get(name, "false")))
+    args, _ = parser.parse_known_args(argv)
+    for name in FLAGS:
+        setattr(args, name, str(getattr(args, name)).lower() in ("1", "true", "yes"))
+    return args
+
+
+if __name__ == "__main__":
+
+    print("Starting TEDx transcript harvest job...")
+    args = parse_args(sys.argv[1:])
+
+    import transcript_harvest
+
+    try:
+        if not args.OUTPUT_URI:
+            sys.exit("Job failed: OUTPUT_URI is required.")
+        shard_count = int(args.SHARD_COUNT or transcript_harvest.SHARD_COUNT)
+        store = transcript_harvest.open_store(args.OUTPUT_URI)
+
+        if not args.MERGE_ONLY:
+            import requests
+
+            if not args.INPUT_URI:
+                sys.exit("Job failed: INPUT_URI is required.")
+            shards = transcript_harvest.parse_shards(args.SHARDS, shard_count)
+            slugs = transcript_harvest.read_slugs(args.INPUT_URI)
+            by_shard = {}
+            for slug in slugs:
+                by_shard.setdefault(transcript_harvest.shard_of(slug, shard_count), []).append(slug)
+            print(f"{len(slugs)} slugs in {shard_count} shards; this run handles {len(shards)} of them.")
+
+            max_throttled_ratio = float(args.MAX_THROTTLED_RATIO or 0.5)
+            languages = tuple(l.strip() for l in (args.LANGUAGES or "en").split(",") if l.strip())
+            fetcher = transcript_harvest.BatchFetcher(
+                requests.Session(),
+                batch_size=int(args.BATCH_SIZE or transcript_harvest.INITIAL_BATCH_SIZE),
+                max_batch_size=int(args.MAX_BATCH_SIZE or transcript_harvest.MAX_BATCH_SIZE),
+                url=args.GRAPHQL_URL,
+                cue_times=args.CUE_TIMES,
+            )
+            started_at = time.perf_counter()
+            for shard in shards:
+                shard_slugs = by_shard.get(shard, [])
+                counts = transcript_harvest.harvest_shard(
+                    store, shard, shard_count, shard_slugs, fetcher,
+                    workers=int(args.WORKERS or 4), languages=languages, retry_failed=args.RETRY_FAILED,
+                )
+                if counts is None:
+                    print(f"Shard {shard}: already complete, skipped.")
+                    continue
+                print(f"Shard {shard}: {len(shard_slugs)} talks {counts}, batch size {fetcher.batch_size}, "
+                      f"{fetcher.stats['requests']} requests so far ({time.perf_counter() - started_at:.0f}s elapsed).")
+                if shard_slugs and counts.get(transcript_harvest.STATUS_THROTTLED, 0) / len(shard_slugs) > max_throttled_ratio:
+                    sys.exit(f"Job stopped: shard {shard} was mostly throttled. Completed shards are kept; "
+                             f"rerun later with --RETRY_FAILED true to resume.")
+
+        manifest = transcript_harvest.merge_report(store, shard_count)
+        print(f"Manifest: {manifest['talks']} talks, statuses {manifest['statuses']}, "
+              f"{len(manifest['missing_shards'])} missing shards.")
+        if manifest["complete"]:
+            print("All shards complete: tedXjob can read the transcripts.")
+        else:
+            print(f"Missing shards (other runs may still be working on them): {manifest['missing_shards']}")
+        print("Transcript harvest job completed.")
+
+    except SystemExit:
+        raise
+    except Exception as e:
+        print(f"FATAL: An unexpected error occurred: {e}")
+        traceback.print_exc()
+        sys.exit("Job failed due to an unexpected error.")
@@ -0,0 +1,110 @@
+###### TEDx-Transcript-Index ######
+#
+# Job Glue Python Shell da eseguire dopo tedXjob. Costruisce l'indice invertito
+# posizionale delle trascrizioni (termine -> talk, cue, posizione della parola),
+# in formato compatto a delta varint (vedi tedxgraph/transcript_index.py), usato
+# dalla Lambda search-agent per la ricerca nel testo ("mode": "transcript"):
+# risultati con snippet evidenziati e numero di cue per saltare al passaggio.
+# L'indice contiene anche testo e istanti di inizio delle cue (campo
+# transcript_cue_times scritto da tedXjob), usati dall'operazione "moments" di
+# graph-api per passare da una parola o da uno snippet all'istante del video.
+#
+# Il file viene pubblicato su S3 con una chiave versionata e il puntatore CURRENT
+# (come lo snapshot del grafo), oppure solo scritto in locale con --OUTPUT_PATH.
+# Richiede il pacchetto tedxgraph (--extra-py-files); solo libreria standard.
+#
+# Parametri (con fallback sulle variabili d'ambiente):
+#   --MONGODB_CONN_STRING, --MONGODB_DATABASE_NAME, --MONGODB_COLLECTION_NAME
+#   --TRANSCRIPT_INDEX_S3_URI   es. s3://bucket/transcript-index
+#   --OUTPUT_PATH               file locale (default nella directory temporanea)
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import traceback
+from datetime import datetime, timezone
+
+FORWARDED_SETTINGS = ["MONGODB_CONN_STRING", "MONGODB_DATABASE_NAME", "MONGODB_COLLECTION_NAME"]
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Costruisce l'indice delle trascrizioni dei talk TEDx")
+    for name in FORWARDED_SETTINGS + ["TRANSCRIPT_INDEX_S3_URI"]:
+        parser.add_argument(f"--{name}", default=os.environ.get(name))
+    parser.add_argument("--OUTPUT_PATH", default=None)
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+
+def load_transcripts(talks_collection):
+    from tedxgraph import transcript_codec
+
+    talk_ids, transcripts, cue_times = [], [], []
+    skipped = 0
+    projection = {**transcript_codec.TRANSCRIPT_PROJECTION, "transcript_cue_times": 1}
+    for doc in talks_collection.find(transcript_codec.TRANSCRIPT_QUERY, projection).sort("_id", 1):
+        if doc.get("_id") is None:
+            continue
+        # Trascrizione vuota (es. transcript "" o transcript_z senza testo): il talk non va nell'indice
+        transcript = transcript_codec.read_transcript(doc)
+        if not transcript:
+            skipped += 1
+            continue
+        talk_ids.append(str(doc["_id"]))
+        transcripts.append(transcript)
+        cue_times.append(doc.get("transcript_cue_times"))
+    if skipped:
+        print(f"Skipped {skipped} talks with an empty transcript.")
+    return talk_ids, transcripts, cue_times
+
+
+if __name__ == "__main__":
+
+    print("Starting TEDx transcript index job...")
+    args = parse_args(sys.argv[1:])
+    for name in FORWARDED_SETTINGS:
+        value = getattr(args, name)
+        if value:
+            os.environ[name] = value
+
+    from tedxgraph import graph_snapshot, mongo_runtime, transcript_index
+
+    try:
+        talks_collection = mongo_runtime.get_talks_collection()
+        if talks_collection is None:
+            sys.exit("Job failed: MongoDB non raggiungibile o non configurato.")
+        talk_ids, transcripts, cue_times = load_transcripts(talks_collection)
+        raw_bytes = sum(len(t.encode("utf-8")) for t in transcripts if t)
+        print(f"Loaded {len(talk_ids)} transcripts ({raw_bytes / 1024 / 1024:.1f} MiB of text).")
+        if not talk_ids:
+            sys.exit("Job failed: nessuna trascrizione da indicizzare.")
+
+        version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        started_at = time.perf_counter()
+        header, arrays = transcript_index.build_index(talk_ids, transcripts, version, cue_times)
+        print(f"Index built in {time.perf_counter() - started_at:.1f}s: {header['terms']} terms, "
+              f"{header['tokens']} positions, {header['cues']} cues, "
+              f"{len(arrays['posting_data']) / 1024 / 1024:.1f} MiB of postings.")
+        print(f"Cue times for {header['timed_talks']} of {header['talks']} talks "
+              f"(talks without them were harvested without --CUE_TIMES).")
+
+        output_path = args.OUTPUT_PATH or os.path.join(tempfile.gettempdir(), f"transcripts-{version}.snap")
+        graph_snapshot.write_snapshot(output_path, header, arrays, magic=transcript_index.MAGIC)
+        print(f"Index written to {output_path} ({os.path.getsize(output_path)} bytes).")
+
+        if args.TRANSCRIPT_INDEX_S3_URI:
+            published_uri = graph_snapshot.publish_snapshot(output_path, args.TRANSCRIPT_INDEX_S3_URI, version)
+            print(f"Index published at {published_uri}.")
+        else:
+            print("TRANSCRIPT_INDEX_S3_URI not set: index not published.")
+
+        print("Transcript index job completed.")
+
+    except SystemExit:
+        raise
+    except Exception as e:
+        print(f"FATAL: An unexpected error occurred: {e}")
+        traceback.print_exc()
+        sys.exit("Job failed due to an unexpected error.")
@@ -0,0 +1,446 @@
+# Raccolta delle trascrizioni da ted.com a shard, riprendibile.
+#
+# Gli slug vengono divisi in SHARD_COUNT shard con un hash stabile (crc32, non
+# hash() che cambia a ogni processo). Ogni shard completato viene scritto in un
+# colpo solo come file JSON Lines:
+#
+#   <output>/shard-00007-of-00064.jsonl
+#   {"slug", "status", "http_status", "error", "attempts", "fetched_at", "paragraphs": [{"cues": [{"text", "time"}]}],
+#    "languages": {"it": {"status", "error", "paragraphs"}, ...}}   (solo con più lingue)
+#
+# "paragraphs" è il campo della risposta GraphQL così com'è, senza visitare le cue
+# in Python ("time", in ms, solo con cue_times): il testo unito e la struttura
+# vengono ricavati in Spark con from_json e uno schema dichiarato
+# (tedx_pipeline.add_transcripts).
+#
+# Le richieste sono a blocchi: un documento GraphQL con un alias per ogni coppia
+# (talk, lingua), di dimensione adattiva (vedi BatchFetcher), invece di un POST
+# per talk e solo in inglese.
+#
+# status distingue i casi che la vecchia UDF confondeva in None:
+#   ok         trascrizione presente
+#   not_found  il talk non ha una trascrizione nella lingua richiesta
+#   throttled  ted.com ha risposto 429/503 anche dopo i tentativi con backoff
+#   error      errore di rete, HTTP o GraphQL (messaggio in "error")
+#
+# La scrittura è atomica (file temporaneo + rename in locale, PUT singolo su S3):
+# un file di shard esiste solo se lo shard è completo, quindi al riavvio gli
+# shard già presenti vengono saltati e più job possono lavorare in parallelo su
+# insiemi diversi di shard (o anche sugli stessi: l'ultimo PUT vince, il
+# contenuto è equivalente). tedx_pipeline.add_transcripts legge la directory
+# degli shard; merge_report verifica che ci siano tutti.
+
+import csv
+import io
+import json
+import os
+import threading
+import time
+import zlib
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+SHARD_COUNT = 64
+STATUS_OK = "ok"
+STATUS_NOT_FOUND = "not_found"
+STATUS_THROTTLED = "throttled"
+STATUS_ERROR = "error"
+RETRY_STATUSES = (STATUS_THROTTLED, STATUS_ERROR)
+MANIFEST_NAME = "_MANIFEST.json"
+
+MAX_ATTEMPTS = 4
+BACKOFF_SECONDS = 2.0
+MAX_BACKOFF_SECONDS = 60.0
+REQUEST_TIMEOUT_SECONDS = 30
+
+# Blocchi di alias GraphQL (vedi BatchFetcher)
+INITIAL_BATCH_SIZE = 10
+MAX_BATCH_SIZE = 50
+BATCH_SIZE_STEP = 2
+TARGET_RESPONSE_BYTES = 4 * 1024 * 1024
+MAX_ALIAS_ERROR_RATIO = 0.2
+
+# Sovrascrivibile per provare il job su un server locale (benchmarks/graphql_standin_server.py)
+GRAPHQL_URL = os.environ.get("TED_GRAPHQL_URL", 'https://www.ted.com/graphql')
+COMMON_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64; rv:138.0) Gecko/20100101 Firefox/138.0',
+    'Accept': '*/*',
+    'client-id': 'Zenith production',
+    'content-type': 'application/json',
+    'Origin': 'https://www.ted.com',
+    'Referer': 'https://www.ted.com/'
+}
+
+def shard_of(slug, shard_count=SHARD_COUNT):
+    return zlib.crc32(slug.encode("utf-8")) % shard_count
+
+
+def shard_name(shard, shard_count=SHARD_COUNT):
+    return f"shard-{shard:05d}-of-{shard_count:05d}.jsonl"
+
+
+def parse_shards(spec, shard_count=SHARD_COUNT):
+    """"all" oppure elenco di numeri e intervalli ("0-15,20,32-47") -> lista ordinata di shard."""
+    if not spec or spec == "all":
+        return list(range(shard_count))
+    shards = set()
+    for part in spec.split(","):
+        start, _, end = part.strip().partition("-")
+        shards.update(range(int(start), int(end or start) + 1))
+    invalid = [s for s in shards if not 0 <= s < shard_count]
+    if invalid:
+        raise ValueError(f"Shard fuori intervallo (0-{shard_count - 1}): {sorted(invalid)}")
+    return sorted(shards)
+
+
+# --- Download ---
+
+def batch_document(count, cue_times=False):
+    """
+    Documento GraphQL con ``count`` alias t0..t<count-1> del campo translation,
+    uno per (talk, lingua), con variabili $v<i> (videoId) e $l<i> (lingua).
+    Con ``cue_times`` ogni cue include anche l'istante di inizio (time, in ms).
+    """
+    cue_fields = "text time" if cue_times else "text"
+    params = ", ".join(f"$v{i}: ID!, $l{i}: String!" for i in range(count))
+    fields = " ".join(
+        f"t{i}: translation(videoId: $v{i}, language: $l{i}) {{ paragraphs {{ cues {{ {cue_fields} }} }} }}"
+        for i in range(count)
+    )
+    return f"query Transcripts({params}) {{ {fields} }}"
+
+
+def _retry_after(response, attempt):
+    header = response.headers.get("Retry-After") if response is not None else None
+    if header and header.isdigit():
+        return min(float(header), MAX_BACKOFF_SECONDS)
+    return min(BACKOFF_SECONDS * 2 ** attempt, MAX_BACKOFF_SECONDS)
+
+
+def _result(status, http_status=None, error=None, paragraphs=None, attempts=1):
+    return {"status": status, "http_status": http_status, "error": error, "attempts": attempts,
+            "paragraphs": paragraphs or None}
+
+
+class BatchFetcher:
+    """
+    Scarica coppie (slug, lingua) a blocchi: un solo POST per blocco, con un alias
+    GraphQL per coppia (batch_document). La dimensione del blocco si adatta
+    (incremento additivo, dimezzamento):
+
+    - cresce di BATCH_SIZE_STEP dopo un blocco riuscito, fino a ``max_batch_size``;
+    - si dimezza con throttling (429/503), errori di rete o HTTP, documento
+      rifiutato (es. troppo complesso), risposte oltre TARGET_RESPONSE_BYTES o più
+      di MAX_ALIAS_ERROR_RATIO alias falliti.
+
+    Un blocco fallito per intero torna in coda (con backoff se throttling o rete);
+    gli alias falliti singolarmente (errore diverso da "not found") vengono
+    ripresi uno alla volta, così un talk problematico non fa fallire gli altri.
+    Dopo MAX_ATTEMPTS tentativi una coppia resta con status throttled o error.
+    """
+
+    def __init__(self, session, batch_size=INITIAL_BATCH_SIZE, max_batch_size=MAX_BATCH_SIZE, url=None,
+                 cue_times=False, sleep=time.sleep):
+        self.session = session
+        self.cue_times = cue_times
+        self.max_batch_size = max(1, max_batch_size)
+        self.batch_size = max(1, min(batch_size, self.max_batch_size))
+        self.url = url or GRAPHQL_URL
+        self.sleep = sleep
+        self.stats = {"requests": 0, "items": 0, "response_bytes": 0, "throttled": 0, "rejected": 0,
+                      "failed": 0, "single_retries": 0}
+        self._lock = threading.Lock()
+
+    def _shrink(self, size):
+        with self._lock:
+            self.batch_size = max(1, min(self.batch_size, size // 2))
+
+    def _grow(self):
+        with self._lock:
+            self.batch_size = min(self.max_batch_size, self.batch_size + BATCH_SIZE_STEP)
+
+    def fetch_batch(self, items):
+        """
+        Un POST per ``items`` [(slug, lingua)]. Restituisce (risultati, esito,
+        risposta): con esito "ok" risultati è {coppia: risultato}; altrimenti esito
+        è "throttled", "rejected" (documento rifiutato) o "failed" e risultati è
+        None o {"error": messaggio}.
+        """
+        import requests
+
+        variables = {}
+        for i, (slug, language) in enumerate(items):
+            variables[f"v{i}"] = slug
+            variables[f"l{i}"] = language
+        payload = {"operationName": "Transcripts", "variables": variables, "query": batch_document(len(items), self.cue_times)}
+        headers = COMMON_HEADERS.copy()
+        headers['Accept-Language'] = 'en-US,en;q=0.9'
+
+        response = None
+        try:
+            response = self.session.post(self.url, headers=headers, json=payload, timeout=REQUEST_TIMEOUT_SECONDS)
+            with self._lock:
+                self.stats["requests"] += 1
+                self.stats["items"] += len(items)
+                self.stats["response_bytes"] += len(response.content or b"")
+            if response.status_code in (429, 503):
+                return None, "throttled", response
+            if response.status_code in (400, 413):
+                return None, "rejected", response
+            if response.status_code == 404:
+                return {item: _result(STATUS_NOT_FOUND, 404) for item in items}, "ok", response
+            response.raise_for_status()
+            data = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            # Errori di rete, HTTP 5xx e JSON non valido
+            return {"error": f"{type(e).__name__}: {e}"[:500]}, "failed", response
+
+        fields = data.get("data") or {}
+        alias_errors, global_errors = {}, []
+        for error in data.get("errors") or []:
+            path = error.get("path") or []
+            message = str(error.get("message", error))
+            if path and str(path[0]) in fields:
+                alias_errors[str(path[0])] = message
+            else:
+                global_errors.append(message)
+        if global_errors and not fields:
+            return {"error": "; ".join(global_errors)[:500]}, "rejected", response
+
+        results = {}
+        for i, item in enumerate(items):
+            alias = f"t{i}"
+            paragraphs = (fields.get(alias) or {}).get("paragraphs")
+            if paragraphs:
+                results[item] = _result(STATUS_OK, response.status_code, paragraphs=paragraphs)
+            elif alias in alias_errors and "not found" not in alias_errors[alias].lower():
+                results[item] = _result(STATUS_ERROR, response.status_code, alias_errors[alias][:500])
+            else:
+                results[item] = _result(STATUS_NOT_FOUND, response.status_code, alias_errors.get(alias))
+        return results, "ok", response
+
+    def _work(self, queue, singles, results, attempts):
+        while True:
+            with self._lock:
+                if queue:
+                    batch = [queue.popleft() for _ in range(min(self.batch_size, len(queue)))]
+                    single = False
+                elif singles:
+                    batch, single = [singles.popleft()], True
+                else:
+                    return
+            batch_results, outcome, response = self.fetch_batch(batch)
+
+            if outcome == "ok":
+                failed = [item for item, result in batch_results.items() if result["status"] in RETRY_STATUSES]
+                for item, result in batch_results.items():
+                    if item not in failed:
+                        result["attempts"] = attempts[item] + 1
+                        results[item] = result
+                        continue
+                    # Alias fallito: ripreso da solo (un tentativo in meno per ogni fallimento da solo)
+                    if len(batch) == 1:
+                        attempts[item] += 1
+                    if attempts[item] + 1 >= MAX_ATTEMPTS:
+                        result["attempts"] = attempts[item] + 1
+                        results[item] = result
+                    else:
+                        with self._lock:
+                            singles.append(item)
+                            self.stats["single_retries"] += 1
+                too_large = response is not None and len(response.content or b"") > TARGET_RESPONSE_BYTES
+                if too_large or len(failed) > MAX_ALIAS_ERROR_RATIO * len(batch):
+                    self._shrink(len(batch))
+                else:
+                    self._grow()
+                continue
+
+            with self._lock:
+                self.stats[outcome] += 1
+            if outcome == "rejected" and len(batch) > 1:
+                # Il documento è troppo grande per il server: colpa del blocco, non dei
+                # talk. Il limite scende sotto questa dimensione per il resto dell'esecuzione.
+                with self._lock:
+                    self.max_batch_size = min(self.max_batch_size, len(batch) - 1)
+                    queue.extendleft(reversed(batch))
+                self._shrink(len(batch))
+                continue
+            self._shrink(len(batch))
+            retry = []
+            for item in batch:
+                attempts[item] += 1
+                if attempts[item] >= MAX_ATTEMPTS or outcome == "rejected":
+                    status = STATUS_THROTTLED if outcome == "throttled" else STATUS_ERROR
+                    error = f"HTTP {response.status_code}" if response is not None else (batch_results or {}).get("error")
+                    results[item] = _result(status, response.status_code if response is not None else None,
+                                            error, attempts=attempts[item])
+                else:
+                    retry.append(item)
+            if retry:
+                self.sleep(_retry_after(response, max(attempts[item] for item in retry) - 1))
+                with self._lock:
+                    (singles if single else queue).extendleft(reversed(retry))
+
+    def fetch_all(self, items, workers=1):
+        """{(slug, lingua): risultato} per tutte le coppie, con ``workers`` richieste in parallelo."""
+        queue, singles = deque(dict.fromkeys(items)), deque()
+        results, attempts = {}, Counter()
+        if workers <= 1:
+            self._work(queue, singles, results, attempts)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for future in [executor.submit(self._work, queue, singles, results, attempts) for _ in range(workers)]:
+                    future.result()
+        return results
+
+
+def harvest_rows(fetcher, slugs, languages=("en",), workers=1):
+    """
+    Righe degli shard per ``slugs``: status e paragrafi della prima lingua al primo
+    livello, le altre lingue in "languages" {lingua: {status, error, paragraphs}}.
+    """
+    results = fetcher.fetch_all([(slug, language) for slug in slugs for language in languages], workers)
+    fetched_at = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    rows = []
+    for slug in slugs:
+        row = {"slug": slug, **results[(slug, languages[0])], "fetched_at": fetched_at}
+        if len(languages) > 1:
+            row["languages"] = {
+                language: {key: results[(slug, language)][key] for key in ("status", "error", "paragraphs")}
+                for language in languages[1:]
+            }
+        rows.append(row)
+    return rows
+
+
+def needs_retry(row):
+    return row["status"] in RETRY_STATUSES or any(
+        translation["status"] in RETRY_STATUSES for translation in (row.get("languages") or {}).values())
+
+
+# --- Archiviazione degli shard ---
+
+class LocalShardStore:
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def exists(self, name):
+        return os.path.exists(os.path.join(self.directory, name))
+
+    def read(self, name):
+        with open(os.path.join(self.directory, name), "rb") as f:
+            return f.read()
+
+    def write(self, name, data):
+        # File nascosto (ignorato da Spark) poi rename atomico
+        temporary = os.path.join(self.directory, f".{name}.{os.getpid()}.tmp")
+        with open(temporary, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, os.path.join(self.directory, name))
+
+
+class S3ShardStore:
+    def __init__(self, uri):
+        import boto3
+
+        self.bucket, _, prefix = uri[len("s3://"):].partition("/")
+        self.prefix = prefix.rstrip("/")
+        self.s3 = boto3.client("s3")
+
+    def _key(self, name):
+        return f"{self.prefix}/{name}" if self.prefix else name
+
+    def exists(self, name):
+        from botocore.exceptions import ClientError
+
+        try:
+            self.s3.head_object(Bucket=self.bucket, Key=self._key(name))
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def read(self, name):
+        return self.s3.get_object(Bucket=self.bucket, Key=self._key(name))["Body"].read()
+
+    def write(self, name, data):
+        # Un PUT è atomico: l'oggetto è visibile solo quando è completo
+        self.s3.put_object(Bucket=self.bucket, Key=self._key(name), Body=data)
+
+
+def open_store(uri):
+    return S3ShardStore(uri) if uri.startswith("s3://") else LocalShardStore(uri)
+
+
+def read_slugs(uri):
+    """Slug unici di final_list.csv (percorso locale o s3://), in ordine."""
+    if uri.startswith("s3://"):
+        import boto3
+
+        bucket, _, key = uri[len("s3://"):].partition("/")
+        text = boto3.client("s3").get_object(Bucket=bucket, Key=key)["Body"].read().decode("utf-8")
+    else:
+        with open(uri, encoding="utf-8") as f:
+            text = f.read()
+    return list(dict.fromkeys(row["slug"].strip() for row in csv.DictReader(io.StringIO(text)) if (row.get("slug") or "").strip()))
+
+
+def read_shard(store, name):
+    return [json.loads(line) for line in store.read(name).decode("utf-8").splitlines() if line.strip()]
+
+
+def encode_rows(rows):
+    return "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows).encode("utf-8")
+
+
+# --- Esecuzione ---
+
+def harvest_shard(store, shard, shard_count, slugs, fetcher, workers=4, languages=("en",), retry_failed=False):
+    """
+    Scarica e scrive uno shard; restituisce i conteggi per status (prima lingua),
+    oppure None se lo shard era già completo. Con ``retry_failed`` uno shard
+    esistente viene ripreso rifacendo solo le righe con status throttled/error.
+    """
+    name = shard_name(shard, shard_count)
+    previous = {}
+    if store.exists(name):
+        if not retry_failed:
+            return None
+        previous = {row["slug"]: row for row in read_shard(store, name) if not needs_retry(row)}
+        if len(previous) == len(slugs):
+            return None
+
+    pending = [slug for slug in slugs if slug not in previous]
+    fetched = {row["slug"]: row for row in harvest_rows(fetcher, pending, languages, workers)}
+    rows = [previous.get(slug) or fetched[slug] for slug in slugs]
+    store.write(name, encode_rows(rows))
+    counts = {}
+    for row in rows:
+        counts[row["status"]] = counts.get(row["status"], 0) + 1
+    return counts
+
+
+def merge_report(store, shard_count=SHARD_COUNT):
+    """
+    Verifica gli shard e scrive _MANIFEST.json con i conteggi per status e gli
+    shard mancanti; restituisce il manifest. La tabella finale è la directory
+    stessa (letta da tedx_pipeline.add_transcripts).
+    """
+    manifest = {"shard_count": shard_count, "missing_shards": [], "statuses": {}, "talks": 0}
+    for shard in range(shard_count):
+        name = shard_name(shard, shard_count)
+        if not store.exists(name):
+            manifest["missing_shards"].append(shard)
+            continue
+        for row in read_shard(store, name):
+            manifest["talks"] += 1
+            manifest["statuses"][row["status"]] = manifest["statuses"].get(row["status"], 0) + 1
+    manifest["complete"] = not manifest["missing_shards"]
+    manifest["written_at"] = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    store.write(MANIFEST_NAME, json.dumps(manifest, indent=2).encode("utf-8"))
+    return manifest
@@ -0,0 +1,66 @@
+import base64
+import gzip
+import json
+
+from tedxgraph import neighbourhoods
+from tedxgraph.metrics import instrument_handler
+
+# Vicinato a 2 hop di un talk per la mappa mentale, precalcolato dal job
+# glue/neighbourhoodPrecompute_V1.py e salvato come JSON già compresso:
+#
+#   GET /neighbourhood?id=567505
+#
+# Se il client accetta gzip i byte salvati vengono restituiti così come sono
+# (Content-Encoding: gzip), senza query a Neo4j né serializzazione. L'ETag è
+# l'hash del contenuto: con If-None-Match la risposta è un 304 senza corpo.
+
+CORS_HEADERS = {'Access-Control-Allow-Origin': '*', 'Access-Control-Allow-Headers': 'Content-Type,If-None-Match', 'Access-Control-Allow-Methods': 'GET,OPTIONS', 'Access-Control-Expose-Headers': 'ETag'}
+
+
+def _response(status_code, body):
+    return {'statusCode': status_code, 'headers': {**CORS_HEADERS, 'Content-Type': 'application/json'}, 'body': json.dumps(body, ensure_ascii=False)}
+
+
+def _header(event, name):
+    for key, value in (event.get('headers') or {}).items():
+        if key.lower() == name:
+            return value or ''
+    return ''
+
+
+@instrument_handler('get-neighbourhood')
+def lambda_handler(event, context):
+    print(f"Evento ricevuto: {json.dumps(event, default=str)}")
+
+    if event.get('httpMethod') == 'OPTIONS':
+        return {'statusCode': 200, 'headers': CORS_HEADERS, 'body': ''}
+
+    talk_id = (event.get('queryStringParameters') or {}).get('id') or (event.get('pathParameters') or {}).get('id') or event.get('id')
+    if not talk_id:
+        return _response(400, {'error': "Parametro 'id' mancante nella richiesta."})
+
+    try:
+        doc = neighbourhoods.fetch_neighbourhood(talk_id)
+        if doc is None:
+            return _response(404, {'error': f"Vicinato del talk {talk_id} non trovato."})
+
+        etag = f'"{doc["hash"]}"'
+        headers = {**CORS_HEADERS, 'ETag': etag, 'Cache-Control': 'public, max-age=300', 'Vary': 'Accept-Encoding'}
+        if etag in _header(event, 'if-none-match'):
+            return {'statusCode': 304, 'headers': headers, 'body': ''}
+
+        headers['Content-Type'] = 'application/json'
+        body = bytes(doc['body'])
+        if 'gzip' in _header(event, 'accept-encoding'):
+            headers['Content-Encoding'] = 'gzip'
+            return {'statusCode': 200, 'headers': headers, 'isBase64Encoded': True, 'body': base64.b64encode(body).decode('ascii')}
+        return {'statusCode': 200, 'headers': headers, 'body': gzip.decompress(body).decode('utf-8')}
+
+    except ConnectionError as ce:
+        print(f"Errore di connessione: {ce}")
+        return _response(503, {'error': 'Database connection failed', 'details': str(ce)})
+    except Exception as e:
+        print(f"Errore imprevisto nel lambda_handler: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return _response(500, {'error': f'Errore interno del server: {str(e)}'})
@@ -1,51 +1,17 @@
 import json
-import os
-from neo4j import GraphDatabase, basic_auth
 
-# Variabili d'ambiente (da configurare nella Lambda)
-NEO4J_URI = os.environ.get('NEO4J_URI')
-NEO4J_USER = os.environ.get('NEO4J_USER')
-NEO4J_PASSWORD = os.environ.get('NEO4J_PASSWORD')
+from tedxgraph import graph_snapshot, ids, neo4j_runtime, responses
+from tedxgraph.graph_queries import NEIGHBOUR_FIELDS, get_connected_nodes
+from tedxgraph.metrics import instrument_handler
 
-driver = None
-
-def get_neo4j_driver():
-    global driver
-    if driver is None:
-        try:
-            driver = GraphDatabase.driver(NEO4J_URI, auth=basic_auth(NEO4J_USER, NEO4J_PASSWORD))
-            # Verifica la connessione (opzionale ma utile per il debug iniziale)
-            driver.verify_connectivity()
-            print("Successfully connected to Neo4j.")
-        except Exception as e:
-            print(f"Error connecting to Neo4j: {e}")
-            # Se la connessione fallisce, driver rimarrà None e gestito dopo
-            # Potresti voler sollevare un'eccezione qui se la connessione è critica all'avvio
-            raise ConnectionError(f"Failed to connect to Neo4j: {e}") from e
-    return driver
-
-def get_connected_nodes(tx, node_id_param):
-    query = (
-        "MATCH (startNode {id: $node_id_param})-->(connectedNode) "
-        "RETURN connectedNode.id AS id, "
-        "       connectedNode.url AS url, "
-        "       connectedNode.title AS title, "
-        "       connectedNode.speakers AS speakers, "
-        "       connectedNode.description AS description"
-    )
-    result = tx.run(query, node_id_param=node_id_param)
-    
-    nodes_data = []
-    for record in result:
-        nodes_data.append({
-            "id": record["id"],
-            "title": record["title"],
-            "url": record["url"],
-            "speakers": record["speakers"], # Assumendo sia una lista o una stringa
-            "description": record["description"]
-        })
-    return nodes_data
+# Driver, pool e sessioni sono gestiti dal layer condiviso (tedxgraph.neo4j_runtime),
+# configurato tramite le variabili d'ambiente NEO4J_* della Lambda.
+# Se è configurato lo snapshot del grafo (GRAPH_SNAPSHOT_*) i vicini vengono letti
+# in memoria e Neo4j resta il fallback.
+# Con fields=id,title restituisce solo i campi richiesti; la risposta è compressa
+# se il client la accetta (vedi tedxgraph/responses.py).
 
+@instrument_handler('get-nexts-by-id-neo4j')
 def lambda_handler(event, context):
     print(f"Received event: {event}")
 
@@ -54,12 +20,10 @@ def lambda_handler(event, context):
         query_params = event.get('queryStringParameters', {})
         if not query_params: # Prova a vedere se arriva nel body (per POST o test diretti)
             try:
-                body = json.loads(event.get('body', '{}'))
-                node_id = body.get('id')
+                query_params = json.loads(event.get('body', '{}'))
             except json.JSONDecodeError:
-                node_id = None
-        else:
-            node_id = query_params.get('id')
+                query_params = {}
+        node_id = query_params.get('id')
 
         if not node_id:
             return {
@@ -71,25 +35,31 @@ def lambda_handler(event, context):
                 'body': json.dumps({'error': 'Parameter "id" is missing'})
             }
 
+        try:
+            node_id = ids.parse_talk_id(node_id)
+            fields = responses.parse_fields(query_params.get('fields'), NEIGHBOUR_FIELDS)
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({'error': str(e)})
+            }
+
         print(f"Querying for connections to node with id: {node_id}")
 
-        # Ottieni il driver
-        db_driver = get_neo4j_driver()
-        
-        connected_nodes_list = []
-        with db_driver.session() as session:
-            connected_nodes_list = session.read_transaction(get_connected_nodes, node_id)
+        snapshot = graph_snapshot.get_snapshot()
+        if snapshot is not None and snapshot.has(node_id):
+            connected_nodes_list = snapshot.neighbours(node_id, fields)
+        else:
+            connected_nodes_list = neo4j_runtime.execute_read(get_connected_nodes, node_id, fields)
         
         print(f"Found {len(connected_nodes_list)} connected nodes.")
 
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*' # Importante per le app mobili/web
-            },
-            'body': json.dumps(connected_nodes_list)
-        }
+        # Access-Control-Allow-Origin importante per le app mobili/web
+        return responses.json_response(event, 200, connected_nodes_list, {'Access-Control-Allow-Origin': '*'})
 
     except ConnectionError as ce:
         print(f"Connection Error: {ce}")
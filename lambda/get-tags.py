@@ -1,53 +1,13 @@
 import json
-import os
-from neo4j import GraphDatabase, basic_auth
 
-# Variabili d'ambiente (da configurare nelle impostazioni della Lambda)
-NEO4J_URI = os.environ.get('NEO4J_URI')
-NEO4J_USER = os.environ.get('NEO4J_USER')
-NEO4J_PASSWORD = os.environ.get('NEO4J_PASSWORD')
+from tedxgraph import graph_snapshot, neo4j_runtime, responses
+from tedxgraph.graph_queries import get_all_tags
+from tedxgraph.metrics import instrument_handler
 
-# Il driver Neo4j viene inizializzato globalmente per essere riutilizzato
-# tra le invocazioni della Lambda (se l'ambiente di esecuzione viene riutilizzato da AWS)
-driver = None
-
-def get_neo4j_driver():
-    global driver
-    if driver is None:
-        if not NEO4J_URI or not NEO4J_USER or not NEO4J_PASSWORD:
-            print("Errore: Variabili d'ambiente NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD non configurate.")
-            raise ValueError("Variabili d'ambiente Neo4j non configurate correttamente.")
-        try:
-            print(f"Tentativo di connessione a Neo4j URI: {NEO4J_URI}")
-            driver = GraphDatabase.driver(NEO4J_URI, auth=basic_auth(NEO4J_USER, NEO4J_PASSWORD))
-            # Verifica la connettività per assicurarsi che il driver sia funzionante
-            driver.verify_connectivity()
-            print("Connessione a Neo4j stabilita con successo.")
-        except Exception as e:
-            print(f"Errore durante la connessione a Neo4j: {e}")
-            # Rilancia l'eccezione per essere gestita dal chiamante (lambda_handler)
-            # Questo assicura che driver rimanga None se la connessione fallisce
-            driver = None # Assicurati che rimanga None se fallisce
-            raise ConnectionError(f"Impossibile connettersi a Neo4j: {e}") from e
-    return driver
-
-def get_all_tags(tx):
-    """
-    Esegue una query Cypher per ottenere tutti i tag distinti dai nodi.
-    """
-    # Query per estrarre tutti i tag unici dai nodi che hanno una proprietà 'tags'
-    # La proprietà 'tags' è assunta essere una lista di stringhe.
-    query = """
-    MATCH (n)
-    WHERE n.tags IS NOT NULL AND size(n.tags) > 0 // Assicura che esista e non sia vuota
-    UNWIND n.tags AS tag // Scompatta la lista di tags
-    RETURN DISTINCT tag // Restituisce solo i tag unici
-    ORDER BY tag // Ordina i tag alfabeticamente
-    """
-    result = tx.run(query)
-    # Estrae il valore 'tag' da ogni record del risultato
-    return [record["tag"] for record in result]
+# Driver, pool e sessioni sono gestiti dal layer condiviso (tedxgraph.neo4j_runtime),
+# configurato tramite le variabili d'ambiente NEO4J_* della Lambda.
 
+@instrument_handler('get-tags')
 def lambda_handler(event, context):
     """
     Funzione principale della Lambda.
@@ -56,26 +16,22 @@ def lambda_handler(event, context):
     print(f"Evento ricevuto: {json.dumps(event)}")
 
     try:
-        db_driver = get_neo4j_driver() # Ottiene o inizializza il driver
-
-        # Utilizza una sessione per interagire con il database
-        # La sessione viene chiusa automaticamente all'uscita dal blocco 'with'
-        with db_driver.session() as session:
-            # Esegue la transazione in modalità lettura
-            tag_list = session.read_transaction(get_all_tags)
+        # Vocabolario dei tag dallo snapshot del grafo, se disponibile; altrimenti
+        # transazione in lettura sulla sessione Neo4j riutilizzata dal layer
+        snapshot = graph_snapshot.get_snapshot()
+        if snapshot is not None:
+            tag_list = list(snapshot.tags)
+        else:
+            tag_list = neo4j_runtime.execute_read(get_all_tags)
         
         print(f"Tag recuperati: {tag_list}")
 
-        # Costruisce la risposta HTTP di successo
-        # Il corpo della risposta è una stringa JSON contenente la lista dei tag
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/json',       # Fondamentale per indicare al client il tipo di contenuto
-                'Access-Control-Allow-Origin': '*'        # Permette richieste CORS da qualsiasi origine (da restringere se necessario)
-            },
-            'body': json.dumps(tag_list) # Serializza la lista di tag in una stringa JSON
-        }
+        # Costruisce la risposta HTTP di successo: lista dei tag in JSON, compressa
+        # se il client la accetta (vedi tedxgraph/responses.py)
+        return responses.json_response(
+            event, 200, tag_list,
+            {'Access-Control-Allow-Origin': '*'}  # Permette richieste CORS da qualsiasi origine (da restringere se necessario)
+        )
 
     except ValueError as ve: # Errore di configurazione
         print(f"Errore di configurazione: {ve}")
@@ -1,37 +1,26 @@
 import json
-import os
-from neo4j import GraphDatabase, basic_auth
 
-# Variabili d'ambiente (da configurare nella Lambda)
-NEO4J_URI = os.environ.get('NEO4J_URI')
-NEO4J_USER = os.environ.get('NEO4J_USER')
-NEO4J_PASSWORD = os.environ.get('NEO4J_PASSWORD')
+from tedxgraph import graph_snapshot, ids, neo4j_runtime, responses
+from tedxgraph.graph_queries import LISTING_FIELDS, find_talks, parse_tags_param
+from tedxgraph.metrics import instrument_handler
+from tedxgraph.talk_filters import TalkFilter
 
-driver = None
-
-def get_neo4j_driver():
-    global driver
-    if driver is None:
-        try:
-            driver = GraphDatabase.driver(NEO4J_URI, auth=basic_auth(NEO4J_USER, NEO4J_PASSWORD))
-            # Verifica la connessione (opzionale ma utile per il debug iniziale)
-            driver.verify_connectivity()
-            print("Successfully connected to Neo4j.")
-        except Exception as e:
-            print(f"Error connecting to Neo4j: {e}")
-            # Se la connessione fallisce, driver rimarrà None e gestito dopo
-            # Potresti voler sollevare un'eccezione qui se la connessione è critica all'avvio
-            raise ConnectionError(f"Failed to connect to Neo4j: {e}") from e
-    return driver
+# Driver, pool e sessioni sono gestiti dal layer condiviso (tedxgraph.neo4j_runtime),
+# configurato tramite le variabili d'ambiente NEO4J_* della Lambda.
+#
+# Oltre ai tag l'elenco accetta filtri per data di pubblicazione e durata e un
+# ordinamento (vedi tedxgraph/talk_filters.py), anche senza tag:
+#   GET ?tags=climate&published_after=2018-01-01&max_duration=600&sort=newest
+#   GET ?tags=climate&fields=id,title   (solo i campi richiesti, l'id è sempre incluso)
 
 def get_connected_nodes(tx, node_id_param):
     query = (
-        "MATCH (startNode {id: $node_id_param})-->(connectedNode) "
+        "MATCH (startNode:Talk {graph: $graph, id: $node_id_param})-[:RELATED_TO]->(connectedNode:Talk) "
         "RETURN connectedNode.title AS title, "
         "       connectedNode.speakers AS speakers, "
         "       connectedNode.description AS description"
     )
-    result = tx.run(query, node_id_param=node_id_param)
+    result = tx.run(query, node_id_param=tx.talk_id(node_id_param))
     
     nodes_data = []
     for record in result:
@@ -42,28 +31,11 @@ def get_connected_nodes(tx, node_id_param):
         })
     return nodes_data
 
-def get_talks_by_tags(tx, tags):
-    query = """
-    MATCH (t:Talk)
-    WHERE t.tags IS NOT NULL AND ANY(tag IN $tags WHERE tag IN t.tags)
-    RETURN id(t) AS id, t.title AS title, t.speakers AS speakers, t.description AS description, t.tags AS tags
-    LIMIT 20
-    """
-    result = tx.run(query, tags=tags)
-    return [
-        {
-            "id": record["id"],
-            "title": record["title"],
-            "speakers": record["speakers"],
-            "description": record["description"],
-            "tags": record["tags"]
-        }
-        for record in result
-    ]
-
+@instrument_handler('get-talks-by-tags')
 def lambda_handler(event, context):
-        print(f"Received event: {event}")
+    print(f"Received event: {event}")
 
+    try:
         query_params = event.get('queryStringParameters', {})
         body = {}
 
@@ -76,30 +48,55 @@ def lambda_handler(event, context):
         node_id = query_params.get('id') if query_params else body.get('id')
         tags = query_params.get('tags') if query_params else body.get('tags')
 
-        db_driver = get_neo4j_driver()
+        try:
+            # Converte la stringa "tag1,tag2" in una lista
+            talk_filter = TalkFilter.from_params(query_params or body, parse_tags_param(tags))
+            fields = responses.parse_fields((query_params or body).get('fields'), LISTING_FIELDS)
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': {'Content-Type': 'application/json'},
+                'body': json.dumps({'error': str(e)})
+            }
 
-        with db_driver.session() as session:
-            if tags:
-                # Converte la stringa "tag1,tag2" in una lista
-                tags_list = [tag.strip() for tag in tags.split(',')] if isinstance(tags, str) else tags
-                talks = session.read_transaction(get_talks_by_tags, tags_list)
-                return {
-                    'statusCode': 200,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps(talks)
-                }
+        if talk_filter.has_predicates():
+            snapshot = graph_snapshot.get_snapshot()
+            if snapshot is not None:
+                talks = snapshot.find_talks(talk_filter, fields=fields)
+            else:
+                talks = neo4j_runtime.execute_read(find_talks, talk_filter, fields=fields)
+            return responses.json_response(event, 200, talks, {'Access-Control-Allow-Origin': '*'})
 
-            if node_id:
-                connected_nodes_list = session.read_transaction(get_connected_nodes, node_id)
+        if node_id:
+            try:
+                node_id = ids.parse_talk_id(node_id)
+            except ValueError as e:
                 return {
-                    'statusCode': 200,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps(connected_nodes_list)
+                    'statusCode': 400,
+                    'headers': {'Content-Type': 'application/json'},
+                    'body': json.dumps({'error': str(e)})
                 }
+            connected_nodes_list = neo4j_runtime.execute_read(get_connected_nodes, node_id)
+            return responses.json_response(event, 200, connected_nodes_list, {'Access-Control-Allow-Origin': '*'})
 
         return {
             'statusCode': 400,
             'headers': {'Content-Type': 'application/json'},
-            'body': json.dumps({'error': 'Missing required parameters "tags" or "id"'})
+            'body': json.dumps({'error': 'Missing required parameters "tags" (or a published/duration filter) or "id"'})
         }
 
+    except ConnectionError as ce:
+        # Anche GraphNotVersionedError: il grafo non ha ancora una versione servita
+        print(f"Connection Error: {ce}")
+        return {
+            'statusCode': 503, # Service Unavailable
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps({'error': 'Database connection failed', 'details': str(ce)})
+        }
+    except Exception as e:
+        print(f"Error processing request: {e}")
+        return {
+            'statusCode': 500,
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps({'error': 'Internal server error', 'details': str(e)})
+        }
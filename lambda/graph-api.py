@@ -0,0 +1,400 @@
+import gzip
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from tedxgraph import graph_queries, graph_snapshot, ids, neo4j_runtime, responses, speakers
+from tedxgraph.metrics import instrument_handler
+from tedxgraph.talk_filters import TalkFilter
+
+# Router unico per le API del grafo: sostituisce le singole Lambda (nexts, tags,
+# talks-by-tags, search, summary) con un solo endpoint, un solo pool di connessioni
+# e un solo cold start. Accetta sia una singola operazione sia un batch:
+#
+#   GET  /graph?op=nexts&id=567505
+#   POST /graph  {"op": "search", "search": "climate"}
+#   GET  /graph?op=path&from=567505&to=1234&max_hops=6&k=3
+#   GET  /graph?op=talks-by-tags&tags=ai&published_after=2018-01-01&max_duration=600&sort=newest
+#   GET  /graph?op=similar-by-content&id=567505&k=10  (talk simili per contenuto)
+#   GET  /graph?op=nexts&id=567505&rank=content    (next_watch riordinati per contenuto)
+#   GET  /graph?op=nexts&id=567505&include=speakers (più gli altri talk degli stessi speaker)
+#   GET  /graph?op=speaker&name=Brené Brown         (talk dello speaker e speaker correlati)
+#   GET  /graph?op=nexts&id=567505&fields=id,title  (solo i campi richiesti)
+#   GET  /graph?op=moments&id=567505&q=vulnerability  (istanti del video in cui se ne parla)
+#   GET  /graph?op=moments&id=567505&cue=42           (istante di una cue, es. da uno snippet)
+#   GET  /graph?op=moments&id=567505&t=95000          (cue in corso a 95 s)
+#   POST /graph  {"operations": [{"op": "tags"},
+#                                {"op": "talks-by-tags", "tags": "ai,ethics"},
+#                                {"op": "nexts", "id": "567505"}]}
+#
+# Le operazioni di un batch vengono eseguite in parallelo e restituite, nello stesso
+# ordine della richiesta, come {"results": [{"op", "status", "data" | "error"}]}.
+# Con {"op": "summary", "async": true} il riassunto diventa un job asincrono
+# (status 202), da interrogare con {"op": "summary-status", "job_id": ...}.
+#
+# nexts, k-hop, talks-by-tags e speaker vengono serviti dallo snapshot CSR del grafo
+# (tedxgraph.graph_snapshot) quando è disponibile, altrimenti da Neo4j.
+# Gli id dei talk vengono validati all'ingresso (tedxgraph.ids): con TALK_ID_TYPE=int
+# un id non numerico restituisce 400; nelle risposte gli id sono sempre stringhe.
+# nexts, k-hop e talks-by-tags accettano fields=... (l'id è sempre incluso); le
+# risposte sono compresse (br o gzip) se il client lo chiede con Accept-Encoding:
+# vedi tedxgraph/responses.py.
+
+MAX_BATCH_OPERATIONS = int(os.environ.get('GRAPH_API_MAX_BATCH_OPERATIONS', '20'))
+MAX_WORKERS = int(os.environ.get('GRAPH_API_MAX_WORKERS', '6'))
+MAX_K_HOP = 3
+MAX_PATH_HOPS = int(os.environ.get('GRAPH_API_MAX_PATH_HOPS', '8'))
+MAX_PATHS = 10
+MAX_MOMENTS = 50
+MAX_SPEAKER_TALKS = 200
+MAX_SPEAKER_NEXTS = 10
+MAX_CO_TAGGED_SPEAKERS = 20
+
+# Executor a livello di modulo: i thread (e quindi le sessioni Neo4j associate
+# a ciascun thread) vengono riutilizzati tra le invocazioni.
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='graph-api')
+
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Content-Type',
+    'Access-Control-Allow-Methods': 'GET,POST,OPTIONS',
+}
+
+
+def _snapshot_with(talk_id=None):
+    """Snapshot del grafo se disponibile (e se contiene il talk), altrimenti None."""
+    snapshot = graph_snapshot.get_snapshot()
+    if snapshot is None or (talk_id is not None and not snapshot.has(talk_id)):
+        return None
+    return snapshot
+
+
+def _talk_id_param(params, name='id'):
+    """Id del talk validato (vedi tedxgraph.ids), in forma canonica stringa."""
+    value = params.get(name)
+    if value is None or value == '':
+        raise ValueError(f'Parameter "{name}" is missing')
+    return ids.parse_talk_id(value)
+
+
+def _int_param(params, name, default, minimum, maximum):
+    try:
+        value = int(params.get(name, default))
+    except (TypeError, ValueError):
+        raise ValueError(f'Parameter "{name}" must be an integer')
+    if not minimum <= value <= maximum:
+        raise ValueError(f'Parameter "{name}" must be between {minimum} and {maximum}')
+    return value
+
+
+def op_nexts(params):
+    node_id = _talk_id_param(params)
+    fields = responses.parse_fields(params.get('fields'), graph_queries.NEIGHBOUR_FIELDS)
+    snapshot = _snapshot_with(node_id)
+    if snapshot is not None:
+        nodes = snapshot.neighbours(node_id, fields)
+    else:
+        nodes = neo4j_runtime.execute_read(graph_queries.get_connected_nodes, node_id, fields)
+    if params.get('include') == 'speakers':
+        # Candidati aggiunti in lettura: altri talk degli stessi speaker (archi GAVE), senza scansioni
+        if snapshot is not None:
+            speaker_nodes = snapshot.speaker_neighbours(node_id, MAX_SPEAKER_NEXTS, fields)
+        else:
+            speaker_nodes = neo4j_runtime.execute_read(graph_queries.get_speaker_neighbours, node_id,
+                                                       MAX_SPEAKER_NEXTS, fields)
+        seen = {node_id} | {node['id'] for node in nodes}
+        nodes = [dict(node, via='next_watch') for node in nodes] + \
+            [dict(node, via='speaker') for node in speaker_nodes if node['id'] not in seen]
+    if params.get('rank') == 'content':
+        # Riordino dei next_watch (scelti per tag in comune) per similarità di contenuto
+        from tedxgraph.vector_index import get_content_index
+        index = get_content_index()
+        if index is not None:
+            scores = index.similarity(node_id, [node['id'] for node in nodes])
+            for node in nodes:
+                node['similarity'] = scores.get(node['id'])
+            nodes.sort(key=lambda node: node['similarity'] if node['similarity'] is not None else -1.0, reverse=True)
+    return 200, nodes
+
+
+def op_k_hop(params):
+    node_id = _talk_id_param(params)
+    k = _int_param(params, 'k', 2, 1, MAX_K_HOP)
+    limit = _int_param(params, 'limit', 50, 1, 500)
+    fields = responses.parse_fields(params.get('fields'), graph_queries.K_HOP_FIELDS)
+    snapshot = _snapshot_with(node_id)
+    if snapshot is not None:
+        return 200, snapshot.k_hop(node_id, k=k, limit=limit, fields=fields)
+    return 200, neo4j_runtime.execute_read(graph_queries.get_k_hop_nodes, node_id, k, limit, fields)
+
+
+def op_path(params):
+    if not params.get('from') or not params.get('to'):
+        raise ValueError('Parameters "from" and "to" are required')
+    source_id, target_id = _talk_id_param(params, 'from'), _talk_id_param(params, 'to')
+    max_hops = _int_param(params, 'max_hops', 6, 1, MAX_PATH_HOPS)
+    k = _int_param(params, 'k', 1, 1, MAX_PATHS)
+
+    snapshot = graph_snapshot.get_snapshot()
+    paths = snapshot.shortest_paths(source_id, target_id, max_hops=max_hops, k=k) if snapshot is not None else None
+    if paths is None:
+        if source_id == target_id:
+            paths = [[{'id': source_id}]]
+        else:
+            paths = neo4j_runtime.execute_read(graph_queries.get_shortest_paths, source_id, target_id, max_hops, k)
+    return 200, {
+        'from': source_id,
+        'to': target_id,
+        'length': len(paths[0]) - 1 if paths else None,
+        'paths': paths,
+    }
+
+
+def op_similar_by_content(params):
+    talk_id = _talk_id_param(params)
+    k = _int_param(params, 'k', 10, 1, 50)
+    from tedxgraph.vector_index import get_content_index
+    index = get_content_index()
+    if index is None:
+        raise ConnectionError('Content index not available')
+    similar = index.similar(talk_id, k=k)
+    if similar is None:
+        return 404, {'error': f'Talk {talk_id} not found in the content index'}
+    return 200, similar
+
+
+def op_moments(params):
+    talk_id = _talk_id_param(params)
+    if not params.get('q') and params.get('cue') is None and params.get('t') is None:
+        raise ValueError('One of the parameters "q", "cue" or "t" is required')
+    from tedxgraph.transcript_index import get_transcript_index
+    index = get_transcript_index()
+    if index is None:
+        raise ConnectionError('Transcript index not available')
+    doc = index.index.get(str(talk_id))
+    if doc is None:
+        return 404, {'error': f'Transcript of talk {talk_id} not found'}
+
+    if params.get('q'):
+        moments = index.find_moments(doc, params['q'], limit=_int_param(params, 'limit', 10, 1, MAX_MOMENTS))
+    elif params.get('cue') is not None:
+        moments = index.moments(doc, [_int_param(params, 'cue', 0, 0, max(index.cue_count(doc) - 1, 0))])
+    else:
+        moment = index.moment_at(doc, _int_param(params, 't', 0, 0, 2 ** 31 - 1))
+        moments = [moment] if moment is not None else []
+    return 200, {'id': str(talk_id), 'timed': bool(index.timed[doc]), 'moments': moments}
+
+
+def op_speaker(params):
+    name = params.get('name')
+    if not name:
+        raise ValueError('Parameter "name" is missing')
+    key = speakers.speaker_key(name)
+    if not key:
+        raise ValueError('Parameter "name" must contain letters or digits')
+    limit = _int_param(params, 'limit', 50, 1, MAX_SPEAKER_TALKS)
+    snapshot = _snapshot_with()
+    if snapshot is not None:
+        speaker = snapshot.speaker(key, limit)
+        co_tagged = snapshot.co_tagged_speakers(key, MAX_CO_TAGGED_SPEAKERS) if speaker else []
+    else:
+        speaker = neo4j_runtime.execute_read(graph_queries.get_speaker, key, limit)
+        co_tagged = neo4j_runtime.execute_read(graph_queries.get_co_tagged_speakers, key, MAX_CO_TAGGED_SPEAKERS) \
+            if speaker else []
+    if speaker is None:
+        return 404, {'error': f'Speaker "{name}" not found'}
+    return 200, dict(speaker, co_tagged_speakers=co_tagged)
+
+
+def op_keywords(params):
+    talk_id = _talk_id_param(params)
+    return 200, neo4j_runtime.execute_read(graph_queries.get_talk_keywords, talk_id)
+
+
+def op_tags(params):
+    snapshot = _snapshot_with()
+    if snapshot is not None:
+        return 200, list(snapshot.tags)
+    return 200, neo4j_runtime.execute_read(graph_queries.get_all_tags)
+
+
+def op_talks_by_tags(params):
+    # Tag, range di data e durata e ordinamento: vedi tedxgraph/talk_filters.py
+    talk_filter = TalkFilter.from_params(params, graph_queries.parse_tags_param(params.get('tags')))
+    if not talk_filter.has_predicates():
+        raise ValueError('Parameter "tags" is missing')
+    fields = responses.parse_fields(params.get('fields'), graph_queries.LISTING_FIELDS)
+    snapshot = _snapshot_with()
+    if snapshot is not None:
+        return 200, snapshot.find_talks(talk_filter, fields=fields)
+    return 200, neo4j_runtime.execute_read(graph_queries.find_talks, talk_filter, fields=fields)
+
+
+def op_search(params):
+    search_string = params.get('search')
+    if not search_string:
+        raise ValueError('Parameter "search" is missing')
+    return 200, neo4j_runtime.execute_read(graph_queries.search_nodes_by_title_cypher, search_string)
+
+
+def op_neighbourhood(params):
+    talk_id = _talk_id_param(params)
+    from tedxgraph.neighbourhoods import fetch_neighbourhood
+    doc = fetch_neighbourhood(talk_id)
+    if doc is None:
+        return 404, {'error': f'Neighbourhood for talk {talk_id} not found'}
+    # Nel router il vicinato fa parte di una risposta JSON più ampia: va decompresso
+    return 200, json.loads(gzip.decompress(doc['body']))
+
+
+def op_summary(params):
+    talk_id = _talk_id_param(params)
+    # Import differiti: pymongo/requests servono solo ai riassunti
+    if str(params.get('async', '')).lower() == 'true':
+        # Non bloccante: 200 se in cache, altrimenti 202 con il job da interrogare
+        from tedxgraph.summary_jobs import submit_summary_job
+        return submit_summary_job(talk_id)
+    from tedxgraph.summarizer import summarize_talk
+    return summarize_talk(talk_id)
+
+
+def op_summary_status(params):
+    job_id = params.get('job_id')
+    if not job_id:
+        raise ValueError('Parameter "job_id" is missing')
+    from tedxgraph.summary_jobs import get_summary_job
+    return get_summary_job(job_id)
+
+
+OPERATIONS = {
+    'nexts': op_nexts,
+    'k-hop': op_k_hop,
+    'path': op_path,
+    'similar-by-content': op_similar_by_content,
+    'moments': op_moments,
+    'tags': op_tags,
+    'keywords': op_keywords,
+    'speaker': op_speaker,
+    'talks-by-tags': op_talks_by_tags,
+    'search': op_search,
+    'neighbourhood': op_neighbourhood,
+    'summary': op_summary,
+    'summary-status': op_summary_status,
+}
+
+
+def run_operation(params):
+    """
+    Esegue una singola operazione e restituisce il risultato nel formato del batch.
+    Gli errori vengono confinati alla singola operazione.
+    """
+    op = params.get('op')
+    result = {'op': op}
+    if 'key' in params:
+        # Chiave opzionale scelta dal client per correlare richieste e risultati
+        result['key'] = params['key']
+
+    handler = OPERATIONS.get(op)
+    if handler is None:
+        result.update(status=400, error=f'Unknown operation "{op}"')
+        return result
+
+    try:
+        status_code, data = handler(params)
+    except ValueError as ve:
+        status_code, data = 400, {'error': str(ve)}
+    except ConnectionError as ce:
+        print(f"Connection Error ({op}): {ce}")
+        status_code, data = 503, {'error': 'Database connection failed', 'details': str(ce)}
+    except Exception as e:
+        print(f"Error processing operation {op}: {e}")
+        status_code, data = 500, {'error': 'Internal server error', 'details': str(e)}
+
+    result['status'] = status_code
+    if status_code in (200, 202):
+        result['data'] = data
+    else:
+        result.update(data if isinstance(data, dict) else {'error': data})
+    return result
+
+
+def _operation_signature(params):
+    return json.dumps({k: v for k, v in params.items() if k != 'key'}, sort_keys=True, default=str)
+
+
+def run_batch(operations):
+    """
+    Esegue le operazioni in parallelo. Operazioni identiche nello stesso batch
+    (es. due "tags") vengono eseguite una sola volta.
+    """
+    futures = {}
+    ordered = []
+    for params in operations:
+        signature = _operation_signature(params)
+        if signature not in futures:
+            futures[signature] = _executor.submit(run_operation, {k: v for k, v in params.items() if k != 'key'})
+        ordered.append((params, futures[signature]))
+
+    results = []
+    for params, future in ordered:
+        result = dict(future.result())
+        if 'key' in params:
+            result['key'] = params['key']
+        results.append(result)
+    return results
+
+
+def _parse_request(event):
+    params = dict(event.get('queryStringParameters') or {})
+    path_params = event.get('pathParameters') or {}
+    if path_params.get('op'):
+        params['op'] = path_params['op']
+
+    body = event.get('body')
+    if isinstance(body, str) and body:
+        body = json.loads(body)
+    if isinstance(body, dict):
+        params.update(body)
+    return params
+
+
+def _response(event, status_code, payload):
+    return responses.json_response(event, status_code, payload, CORS_HEADERS)
+
+
+@instrument_handler('graph-api')
+def lambda_handler(event, context):
+    print(f"Received event: {event}")
+
+    if event.get('httpMethod') == 'OPTIONS':
+        return {'statusCode': 200, 'headers': CORS_HEADERS, 'body': ''}
+
+    try:
+        params = _parse_request(event)
+    except json.JSONDecodeError:
+        return _response(event, 400, {'error': 'Invalid JSON in request body'})
+
+    try:
+        operations = params.get('operations')
+        if operations is not None:
+            if not isinstance(operations, list) or not all(isinstance(op, dict) for op in operations):
+                return _response(event, 400, {'error': '"operations" must be a list of objects'})
+            if len(operations) > MAX_BATCH_OPERATIONS:
+                return _response(event, 400, {'error': f'Too many operations (max {MAX_BATCH_OPERATIONS})'})
+            print(f"Batch request with {len(operations)} operations.")
+            return _response(event, 200, {'results': run_batch(operations)})
+
+        if not params.get('op'):
+            return _response(event, 400, {'error': 'Parameter "op" is missing'})
+
+        # Richiesta singola: stessa risposta (status e body) delle vecchie Lambda dedicate
+        result = run_operation(params)
+        status_code = result.pop('status')
+        if status_code in (200, 202):
+            return _response(event, status_code, result['data'])
+        result.pop('op', None)
+        return _response(event, status_code, result)
+
+    except Exception as e:
+        print(f"Error processing request: {e}")
+        return _response(event, 500, {'error': 'Internal server error', 'details': str(e)})
@@ -0,0 +1,26 @@
+#!/usr/bin/env bash
+# Crea lo zip del Lambda Layer condiviso (tedxgraph + dipendenze) e lo zip del solo
+# pacchetto tedxgraph da passare ai job Glue con --extra-py-files.
+# Uso: ./build.sh [output.zip]
+set -euo pipefail
+
+HERE="$(cd "$(dirname "$0")" && pwd)"
+OUT="${1:-$HERE/tedxgraph-layer.zip}"
+GLUE_OUT="$(dirname "$OUT")/tedxgraph-py.zip"
+BUILD_DIR="$(mktemp -d)"
+trap 'rm -rf "$BUILD_DIR"' EXIT
+
+mkdir -p "$BUILD_DIR/python"
+pip install --quiet --requirement "$HERE/requirements.txt" \
+    --target "$BUILD_DIR/python" \
+    --platform manylinux2014_x86_64 --only-binary=:all: --python-version 3.11
+cp -r "$HERE/python/tedxgraph" "$BUILD_DIR/python/"
+find "$BUILD_DIR" -name '__pycache__' -type d -prune -exec rm -rf {} +
+
+rm -f "$OUT"
+(cd "$BUILD_DIR" && zip -qr "$OUT" python)
+echo "Layer creato: $OUT"
+
+rm -f "$GLUE_OUT"
+(cd "$BUILD_DIR/python" && zip -qr "$GLUE_OUT" tedxgraph)
+echo "Pacchetto per Glue creato: $GLUE_OUT"
@@ -0,0 +1,10 @@
+"""
+Layer condiviso dalle Lambda di TEDxGRAPH.
+
+Il pacchetto viene distribuito come Lambda Layer (cartella ``python/`` dello zip)
+e contiene il codice comune a tutte le funzioni: configurazione del driver Neo4j,
+metriche di cold start, ecc.
+
+I sotto-moduli non vengono importati qui di proposito: ogni Lambda importa solo
+quello che le serve, così il cold start non paga import inutili.
+"""
@@ -0,0 +1,71 @@
+"""
+Istanti di inizio delle cue delle trascrizioni, per i link "salta al passaggio".
+
+GraphQL restituisce per ogni cue l'istante di inizio in millisecondi dall'inizio
+del video (transcriptHarvest_V1.py --CUE_TIMES). Per ogni talk gli istanti sono
+salvati come int32 little-endian codificati a delta (il primo è assoluto): 4 byte
+per cue, allineati alle righe del campo transcript (una cue per riga). tedXjob li
+scrive in MongoDB nel campo binario transcript_cue_times; l'indice delle
+trascrizioni (tedxgraph.transcript_index) li copia accanto al testo delle cue.
+
+Una cue dura fino all'inizio della successiva: la cue in corso a un certo istante
+si trova con una ricerca binaria sugli istanti cumulati.
+"""
+
+import array
+import bisect
+import sys
+from itertools import accumulate
+
+INT32_MAX = 2 ** 31 - 1
+
+
+def cue_line(text):
+    """
+    Testo di una cue su una sola riga (spazi e a capo compressi in uno spazio),
+    come in tedx_pipeline.add_transcripts: le cue di GraphQL possono andare a
+    capo, ma solo con una cue per riga gli istanti restano allineati alle cue.
+    """
+    return " ".join((text or "").split())
+
+
+def delta_encode(times):
+    """Istanti (ms) -> delta int32 (array "i"); None se mancano istanti o non stanno in un int32."""
+    if not times or any(time is None for time in times):
+        return None
+    deltas = array.array("i")
+    previous = 0
+    for time in times:
+        delta, previous = int(time) - previous, int(time)
+        if not -INT32_MAX <= delta <= INT32_MAX:
+            return None
+        deltas.append(delta)
+    return deltas
+
+
+def encode_times(times):
+    """Istanti (ms) -> bytes del campo transcript_cue_times, o None."""
+    deltas = delta_encode(times)
+    if deltas is None:
+        return None
+    if sys.byteorder != "little":
+        deltas.byteswap()
+    return deltas.tobytes()
+
+
+def decode_times(data):
+    """bytes di transcript_cue_times (o array di delta) -> istanti assoluti in ms."""
+    if not data:
+        return []
+    if isinstance(data, array.array):
+        deltas = data
+    else:
+        deltas = array.array("i", bytes(data))
+        if sys.byteorder != "little":
+            deltas.byteswap()
+    return list(accumulate(deltas))
+
+
+def cue_at(starts, time_ms):
+    """Indice della cue in corso all'istante ``time_ms`` (``starts`` ordinati); -1 se prima della prima cue."""
+    return bisect.bisect_right(starts, time_ms) - 1
@@ -0,0 +1,325 @@
+"""
+Funzioni di transazione Cypher condivise dalle Lambda di lettura e dal router graph-api.
+Ogni funzione riceve la transazione ``tx`` ed è pensata per neo4j_runtime.execute_read,
+che passa a ogni query il parametro ``$graph``: la versione corrente del grafo
+(vedi graph_versions.py). I MATCH sui :Talk filtrano sempre per ``graph``.
+Gli id ricevuti sono stringhe: ``tx.talk_id`` li converte nel tipo della versione
+corrente (stringa o intero, vedi ids.py); quelli restituiti sono sempre stringhe.
+"""
+
+from tedxgraph import talk_filters
+
+
+# Campi selezionabili con ``fields`` (vedi responses.parse_fields) e loro espressione
+# Cypher: solo quelli richiesti finiscono nella RETURN e vengono letti dallo store.
+NEIGHBOUR_FIELDS = ("id", "title", "url", "speakers", "description", "community")
+K_HOP_FIELDS = ("id", "title", "url", "speakers", "description")
+LISTING_FIELDS = ("id", "title", "speakers", "description", "tags", "publishedAt", "duration")
+_NODE_EXPRESSIONS = {
+    "id": "toString({v}.id)",
+    "title": "{v}.title",
+    "url": "{v}.url",
+    "speakers": "{v}.speakers",
+    "description": "{v}.description",
+    "community": "{v}.community",
+}
+# Anche negli elenchi l'id è quello del talk (stringa), non id(t): l'id interno di
+# Neo4j cambia a ogni versione caricata e i client non potrebbero conservarlo
+_LISTING_EXPRESSIONS = dict(_NODE_EXPRESSIONS, tags="{v}.tags",
+                            publishedAt="{v}.publishedAt", duration="{v}.duration")
+
+
+def _projection(variable, fields, expressions=_NODE_EXPRESSIONS):
+    return ", ".join(f"{expressions[field].format(v=variable)} AS {field}" for field in fields)
+
+
+def get_connected_nodes(tx, node_id_param, fields=NEIGHBOUR_FIELDS):
+    query = (
+        # Solo talk correlati: dal talk partono anche gli archi HAS_KEYWORD verso i nodi :Keyword
+        "MATCH (startNode:Talk {graph: $graph, id: $node_id_param})-[:RELATED_TO]->(connectedNode:Talk) "
+        f"RETURN {_projection('connectedNode', fields)}"
+    )
+    result = tx.run(query, node_id_param=tx.talk_id(node_id_param))
+    return [{field: record[field] for field in fields} for record in result]
+
+
+def get_talk_keywords(tx, talk_id):
+    """Parole chiave del talk (nodi secondari della mappa mentale), dalla più rilevante."""
+    query = (
+        "MATCH (:Talk {graph: $graph, id: $talk_id})-[r:HAS_KEYWORD]->(k:Keyword) "
+        "RETURN k.name AS keyword, r.weight AS weight "
+        "ORDER BY r.weight DESC"
+    )
+    result = tx.run(query, talk_id=tx.talk_id(talk_id))
+    return [{"keyword": record["keyword"], "weight": record["weight"]} for record in result]
+
+
+def get_all_tags(tx):
+    """
+    Esegue una query Cypher per ottenere tutti i tag distinti dai nodi.
+    """
+    # Query per estrarre tutti i tag unici dai nodi che hanno una proprietà 'tags'
+    # La proprietà 'tags' è assunta essere una lista di stringhe.
+    query = """
+    MATCH (n:Talk {graph: $graph})
+    WHERE n.tags IS NOT NULL AND size(n.tags) > 0 // Assicura che esista e non sia vuota
+    UNWIND n.tags AS tag // Scompatta la lista di tags
+    RETURN DISTINCT tag // Restituisce solo i tag unici
+    ORDER BY tag // Ordina i tag alfabeticamente
+    """
+    result = tx.run(query)
+    # Estrae il valore 'tag' da ogni record del risultato
+    return [record["tag"] for record in result]
+
+
+def get_talks_by_tags(tx, tags):
+    return find_talks(tx, talk_filters.TalkFilter(tags))
+
+
+# Predicati Cypher dei filtri (vedi talk_filters): solo quelli richiesti, perché
+# un range scritto come "($x IS NULL OR ...)" non può usare l'indice.
+_RANGE_PROPERTIES = {"published": "publishedAt", "duration": "duration"}
+_ORDER_BY = {
+    "pagerank": "coalesce(t.pagerank, 0) DESC, t.id",  # calcolato offline da glue/graphAnalytics_V1.py
+    "newest": "t.publishedAt IS NULL, t.publishedAt DESC, t.id",
+    "oldest": "t.publishedAt IS NULL, t.publishedAt, t.id",
+    "shortest": "t.duration IS NULL, t.duration, t.id",
+    "longest": "t.duration IS NULL, t.duration DESC, t.id",
+}
+
+
+def _filter_conditions(talk_filter):
+    """(condizioni WHERE su ``t``, parametri) dei predicati di ``talk_filter``."""
+    conditions, params = [], {}
+    if talk_filter.tags:
+        conditions.append("ANY(tag IN $tags WHERE tag IN coalesce(t.tags, []))")
+        params["tags"] = talk_filter.tags
+    bounds = {
+        "published": (talk_filter.published_after, talk_filter.published_before),
+        "duration": (talk_filter.min_duration, talk_filter.max_duration),
+    }
+    for field, (low, high) in bounds.items():
+        prop = _RANGE_PROPERTIES[field]
+        if low is not None:
+            conditions.append(f"t.{prop} >= ${field}_min")
+            params[f"{field}_min"] = low
+        if high is not None:
+            conditions.append(f"t.{prop} <= ${field}_max")
+            params[f"{field}_max"] = high
+    return conditions, params
+
+
+def count_range_candidates(tx, talk_filter):
+    """Talk della versione in ogni range richiesto, contati sugli indici (graph, publishedAt) e (graph, duration)."""
+    conditions, params = _filter_conditions(talk_filters.TalkFilter(
+        published_after=talk_filter.published_after, published_before=talk_filter.published_before))
+    costs = {}
+    if conditions:
+        costs["published"] = tx.run(
+            "MATCH (t:Talk) USING INDEX t:Talk(graph, publishedAt) "
+            f"WHERE t.graph = $graph AND {' AND '.join(conditions)} RETURN count(t) AS n", **params
+        ).single()["n"]
+    conditions, params = _filter_conditions(talk_filters.TalkFilter(
+        min_duration=talk_filter.min_duration, max_duration=talk_filter.max_duration))
+    if conditions:
+        costs["duration"] = tx.run(
+            "MATCH (t:Talk) USING INDEX t:Talk(graph, duration) "
+            f"WHERE t.graph = $graph AND {' AND '.join(conditions)} RETURN count(t) AS n", **params
+        ).single()["n"]
+    return costs
+
+
+def find_talks(tx, talk_filter, limit=20, fields=LISTING_FIELDS):
+    """
+    Talk che passano ``talk_filter``, ordinati e limitati. Senza tag il planner
+    parte dal range più selettivo (conteggi sugli indici, se i range sono due)
+    con un hint sul suo indice. I tag non hanno un indice e vengono verificati
+    sui candidati: con un filtro sui tag l'hint non viene forzato (un range
+    poco selettivo letto dall'indice aggiunge letture senza ridurre i talk da
+    verificare) e la scelta resta al planner di Neo4j, che stima la
+    selettività dei predicati. Senza range la query parte dall'indice (graph).
+    """
+    if talk_filter.tags:
+        costs = {}
+    elif len(talk_filter.ranges()) > 1:
+        costs = count_range_candidates(tx, talk_filter)
+    else:
+        costs = {field: 0 for field in talk_filter.ranges()}
+    driver = talk_filters.choose_driver(costs)
+    hint = f"USING INDEX t:Talk(graph, {_RANGE_PROPERTIES[driver]}) " if driver else ""
+    conditions, params = _filter_conditions(talk_filter)
+    query = (
+        f"MATCH (t:Talk) {hint}"
+        f"WHERE {' AND '.join(['t.graph = $graph'] + conditions)} "
+        f"RETURN {_projection('t', fields, _LISTING_EXPRESSIONS)} "
+        f"ORDER BY {_ORDER_BY[talk_filter.sort or 'pagerank']} "
+        "LIMIT $limit"
+    )
+    result = tx.run(query, limit=limit, **params)
+    talks = [{field: record[field] for field in fields} for record in result]
+    for talk in talks:
+        if "publishedAt" in talk:
+            talk["publishedAt"] = talk_filters.iso_date(talk_filters.epoch_seconds(talk["publishedAt"]))
+        if "duration" in talk:
+            talk["duration"] = talk_filters.duration_seconds(talk["duration"]) or None
+    return talks
+
+
+def search_nodes_by_title_cypher(tx, search_term_param):
+
+    query = (
+        "MATCH (n:Talk {graph: $graph}) "
+        "WHERE toLower(n.title) CONTAINS toLower($search_term) "
+        "RETURN toString(n.id) AS id, n.title AS title "
+        "ORDER BY n.title " # Opzionale: ordina i risultati, ma non per "affinità"
+        "LIMIT 5"
+    )
+
+    result = tx.run(query, search_term=search_term_param)
+
+    nodes_data = []
+    for record in result:
+        nodes_data.append({
+            "id": record["id"], # Assicurati che i tuoi nodi abbiano una proprietà 'id'
+                                # o usa id(n) se vuoi l'ID interno di Neo4j
+            "title": record["title"]
+        })
+    return nodes_data
+
+
+def search_talks_by_title(tx, search_term, limit, talk_filter=None):
+    """
+    Ricerca per titolo con un ordine di rilevanza: prima i titoli che iniziano con
+    il testo, poi per PageRank. I predicati di ``talk_filter`` sono verificati
+    nella stessa query, prima del LIMIT.
+    """
+    conditions, params = _filter_conditions(talk_filter) if talk_filter is not None else ([], {})
+    query = (
+        "MATCH (t:Talk {graph: $graph}) "
+        f"WHERE {' AND '.join(['toLower(t.title) CONTAINS toLower($search_term)'] + conditions)} "
+        "RETURN toString(t.id) AS id, t.title AS title "
+        "ORDER BY CASE WHEN toLower(t.title) STARTS WITH toLower($search_term) THEN 0 ELSE 1 END, "
+        "         coalesce(t.pagerank, 0) DESC "
+        "LIMIT $limit"
+    )
+    result = tx.run(query, search_term=search_term, limit=limit, **params)
+    return [{"id": record["id"], "title": record["title"]} for record in result]
+
+
+def filter_talk_ids(tx, talk_ids, talk_filter):
+    """
+    Talk di ``talk_ids`` che passano i predicati di ``talk_filter``, ordinati
+    secondo ``talk_filter.sort`` se indicato. Stessa semantica di GraphSnapshot.filter_ids.
+    """
+    conditions, params = _filter_conditions(talk_filter)
+    order_by = f"ORDER BY {_ORDER_BY[talk_filter.sort]}" if talk_filter.sort else ""
+    query = (
+        f"MATCH (t:Talk {{graph: $graph}}) WHERE {' AND '.join(['t.id IN $talk_ids'] + conditions)} "
+        f"RETURN toString(t.id) AS id {order_by}"
+    )
+    result = tx.run(query, talk_ids=tx.talk_ids(talk_ids), **params)
+    return [record["id"] for record in result]
+
+
+def get_k_hop_nodes(tx, node_id_param, k, limit, fields=K_HOP_FIELDS):
+    # La lunghezza massima di un path variabile non può essere un parametro:
+    # k è validato dal chiamante (intero piccolo) prima di essere inserito nella query.
+    query = (
+        f"MATCH path = (startNode:Talk {{graph: $graph, id: $node_id_param}})-[:RELATED_TO*1..{int(k)}]->(n:Talk) "
+        "WHERE n <> startNode "
+        "WITH n, min(length(path)) AS hop "
+        f"RETURN {_projection('n', fields)}, hop "
+        "ORDER BY hop, n.title "
+        "LIMIT $limit"
+    )
+    result = tx.run(query, node_id_param=tx.talk_id(node_id_param), limit=limit)
+    return [dict({field: record[field] for field in fields}, hop=record["hop"]) for record in result]
+
+
+def get_shortest_paths(tx, source_id, target_id, max_hops, k):
+    # Come per il k-hop, la profondità massima va inserita nella query come intero
+    # validato. L'indice su :Talk(graph, id) (creato da neo4jLink) rende immediati i due MATCH.
+    query = (
+        "MATCH (source:Talk {graph: $graph, id: $source_id}), (target:Talk {graph: $graph, id: $target_id}) "
+        f"MATCH path = allShortestPaths((source)-[:RELATED_TO*..{int(max_hops)}]->(target)) "
+        "RETURN [n IN nodes(path) | {id: toString(n.id), title: n.title, speakers: n.speakers, url: n.url}] AS nodes "
+        "LIMIT $k"
+    )
+    result = tx.run(query, source_id=tx.talk_id(source_id), target_id=tx.talk_id(target_id), k=k)
+    return [record["nodes"] for record in result]
+
+
+def get_speaker(tx, key, limit):
+    """Nome e talk dello speaker ``key`` (speakers.speaker_key), dal più recente; None se non ha talk."""
+    query = (
+        # Indice univoco su :Speaker(key), poi gli archi GAVE verso i talk della versione
+        "MATCH (s:Speaker {key: $key})-[:GAVE]->(t:Talk {graph: $graph}) "
+        "RETURN s.name AS name, toString(t.id) AS id, t.title AS title, t.url AS url, "
+        "       t.speakers AS speakers, t.description AS description, t.publishedAt AS published "
+        "ORDER BY t.publishedAt IS NULL, t.publishedAt DESC, t.id "
+        "LIMIT $limit"
+    )
+    records = list(tx.run(query, key=key, limit=limit))
+    if not records:
+        return None
+    return {
+        "key": key,
+        "name": records[0]["name"],
+        "talks": [
+            {
+                "id": record["id"],
+                "title": record["title"],
+                "url": record["url"],
+                "speakers": record["speakers"],
+                "description": record["description"],
+                "publishedAt": talk_filters.iso_date(talk_filters.epoch_seconds(record["published"])),
+            }
+            for record in records
+        ],
+    }
+
+
+def get_co_tagged_speakers(tx, key, limit):
+    """
+    Speaker dei talk collegati da RELATED_TO (in entrambe le direzioni) ai talk
+    di ``key``: gli archi sono costruiti da tedXjob sui tag in comune, quindi
+    basta attraversarli invece di confrontare i tag di tutti i talk. Per ogni
+    speaker i tag in comune sui collegamenti e il numero di collegamenti.
+    """
+    query = (
+        "MATCH (s:Speaker {key: $key})-[:GAVE]->(t:Talk {graph: $graph})-[:RELATED_TO]-(o:Talk {graph: $graph})"
+        "<-[:GAVE]-(other:Speaker) "
+        "WHERE other <> s "
+        "WITH other, [tag IN coalesce(t.tags, []) WHERE tag IN coalesce(o.tags, [])] AS shared "
+        "WITH other, count(*) AS links, "
+        "     reduce(acc = [], tags IN collect(shared) | acc + [tag IN tags WHERE NOT tag IN acc]) AS shared_tags "
+        "RETURN other.key AS key, other.name AS name, shared_tags, links "
+        "ORDER BY size(shared_tags) DESC, links DESC, key "
+        "LIMIT $limit"
+    )
+    result = tx.run(query, key=key, limit=limit)
+    return [
+        {"key": record["key"], "name": record["name"], "shared_tags": sorted(record["shared_tags"]), "links": record["links"]}
+        for record in result
+    ]
+
+
+def get_speaker_neighbours(tx, talk_id, limit, fields=NEIGHBOUR_FIELDS):
+    """Altri talk degli speaker del talk (dal più recente), con gli stessi campi di get_connected_nodes."""
+    query = (
+        "MATCH (t:Talk {graph: $graph, id: $talk_id})<-[:GAVE]-(:Speaker)-[:GAVE]->(o:Talk {graph: $graph}) "
+        "WHERE o <> t "
+        "WITH DISTINCT o "
+        "ORDER BY o.publishedAt IS NULL, o.publishedAt DESC, o.id "
+        "LIMIT $limit "
+        f"RETURN {_projection('o', fields)}"
+    )
+    result = tx.run(query, talk_id=tx.talk_id(talk_id), limit=limit)
+    return [{field: record[field] for field in fields} for record in result]
+
+
+def parse_tags_param(tags):
+    """Converte la stringa "tag1,tag2" in una lista (le liste passano invariate)."""
+    if isinstance(tags, str):
+        return [tag.strip() for tag in tags.split(',') if tag.strip()]
+    return tags
@@ -0,0 +1,738 @@
+"""
+Snapshot in memoria del grafo RELATED_TO per le Lambda di lettura.
+
+Il grafo dei talk cambia solo a ogni esecuzione dell'ETL: il job neo4jLink lo
+esporta (Phase 3) in un unico file binario in formato CSR, che le Lambda mappano
+in memoria (mmap) al cold start. Vicini, k-hop e filtro per tag diventano letture
+di array, senza round-trip verso Neo4j; se lo snapshot manca, non è caricabile o
+non contiene il talk richiesto, le Lambda ricadono su Neo4j.
+
+Formato del file (little-endian):
+
+    b"TEDXSNAP" | uint32 lunghezza header | header JSON | array allineati a 64 byte
+
+L'header descrive ogni array (typecode, numero di elementi, offset) e contiene il
+vocabolario dei tag. Array principali (n talk, m archi):
+
+    out_offsets[n+1], out_targets[m], out_rank[m]   archi uscenti (rank = posizione in next_watch)
+    in_offsets[n+1], in_sources[m]                  archi entranti
+    tag_offsets[n+1], tag_ids                       tag di ogni talk
+    tag_talk_offsets[T+1], tag_talks                talk di ogni tag
+    node_ids[n]                                     id interno Neo4j (id(t)), non esposto nelle risposte
+    pagerank[n], community[n]                       da glue/graphAnalytics_V1.py (0.0 e -1 se assenti)
+    published[n], duration[n]                       publishedAt in secondi epoch, durata in secondi (0 se assenti)
+    published_order, duration_order                 talk con il valore, ordinati per valore (per i range)
+    <colonna>_offsets[n+1], <colonna>_data          tabella delle card, una colonna UTF-8 per campo
+    speaker_offsets[n+1], speaker_ids               speaker di ogni talk (nomi normalizzati, vedi speakers.py)
+    speaker_talk_offsets[S+1], speaker_talks        talk di ogni speaker
+    speaker_key_*, speaker_name_*                   chiave e nome degli S speaker (colonne di testo)
+
+Gli array sono memoryview sul file mappato: nessuna copia, le pagine vengono
+lette dal sistema operativo solo quando servono.
+"""
+
+import array
+import bisect
+import glob
+import heapq
+import json
+import mmap
+import os
+import sys
+import threading
+import time
+from collections import deque
+from itertools import chain
+
+from tedxgraph import metrics, speakers, talk_filters
+
+MAGIC = b"TEDXSNAP"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+TEXT_COLUMNS = ("id", "title", "url", "speakers", "description")
+PATH_CARD_FIELDS = ("id", "title", "speakers", "url")
+# Campi predefiniti delle risposte (come graph_queries.*_FIELDS): i metodi leggono solo le colonne richieste
+CARD_FIELDS = TEXT_COLUMNS
+NEIGHBOUR_FIELDS = CARD_FIELDS + ("community",)
+LISTING_FIELDS = ("id", "title", "speakers", "description", "tags", "publishedAt", "duration")
+
+# File locale (es. incluso nel layer) oppure prefisso S3 con il puntatore CURRENT
+GRAPH_SNAPSHOT_PATH = os.environ.get("GRAPH_SNAPSHOT_PATH")
+GRAPH_SNAPSHOT_S3_URI = os.environ.get("GRAPH_SNAPSHOT_S3_URI")
+GRAPH_SNAPSHOT_CACHE_DIR = os.environ.get("GRAPH_SNAPSHOT_CACHE_DIR", "/tmp")
+# Ogni quanto una Lambda calda controlla se c'è uno snapshot più recente
+GRAPH_SNAPSHOT_REFRESH_SECONDS = float(os.environ.get("GRAPH_SNAPSHOT_REFRESH_SECONDS", "300"))
+POINTER_NAME = "CURRENT"
+
+
+# --- Costruzione (job neo4jLink) ---
+
+def _text(value):
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return ", ".join(str(v) for v in value)
+    return str(value)
+
+
+def value_order(values):
+    """Indici dei talk con un valore (diverso da 0) ordinati per (valore, indice)."""
+    return array.array("i", sorted((i for i, value in enumerate(values) if value), key=lambda i: (values[i], i)))
+
+
+def _csr(lists, typecode="i"):
+    offsets = array.array("i", [0])
+    values = array.array(typecode)
+    for items in lists:
+        values.extend(items)
+        offsets.append(len(values))
+    return offsets, values
+
+
+def text_column(values):
+    """Colonna di testo UTF-8: (offsets[n+1], byte concatenati). None diventa stringa vuota."""
+    encoded = [_text(value).encode("utf-8") for value in values]
+    offsets = array.array("q", [0])
+    for value in encoded:
+        offsets.append(offsets[-1] + len(value))
+    return offsets, array.array("B", b"".join(encoded))
+
+
+def decode_column(arrays, column):
+    """Tutti i valori di una colonna di testo come lista di stringhe."""
+    offsets = arrays[f"{column}_offsets"]
+    data = bytes(arrays[f"{column}_data"])
+    if data.isascii():
+        text = data.decode("ascii")
+        return [text[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+    return [data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+
+def speaker_arrays(values):
+    """
+    Speaker di ogni talk e talk di ogni speaker (CSR), con chiavi e nomi degli
+    speaker, dai valori ``speakers`` dei talk (stesse regole di neo4jLink).
+    """
+    vocabulary = {}
+    talk_lists = []
+    for value in values:
+        talk_lists.append([vocabulary.setdefault(key, (len(vocabulary), name))[0]
+                           for key, name in speakers.talk_speakers(value)])
+    speaker_lists = [[] for _ in vocabulary]
+    for i, speaker_ids in enumerate(talk_lists):
+        for s in speaker_ids:
+            speaker_lists[s].append(i)
+    arrays = {}
+    arrays["speaker_offsets"], arrays["speaker_ids"] = _csr(talk_lists)
+    arrays["speaker_talk_offsets"], arrays["speaker_talks"] = _csr(speaker_lists)
+    arrays["speaker_key_offsets"], arrays["speaker_key_data"] = text_column(list(vocabulary))
+    arrays["speaker_name_offsets"], arrays["speaker_name_data"] = text_column([name for _, name in vocabulary.values()])
+    return arrays
+
+
+def build_snapshot(talks, edges, version):
+    """
+    ``talks``: lista di dict con id, node_id (id interno Neo4j), title, url, speakers,
+    description, tags, published, duration. ``edges``: tuple (source_id, target_id, rank).
+    Restituisce (header, arrays) da passare a write_snapshot.
+    """
+    index = {str(talk["id"]): i for i, talk in enumerate(talks)}
+    out_ranks = [{} for _ in talks]
+    for source, target, rank in edges:
+        s, t = index.get(str(source)), index.get(str(target))
+        if s is None or t is None or s == t:
+            continue
+        out_ranks[s][t] = min(rank, out_ranks[s].get(t, rank))
+    out_lists = [sorted((rank, t) for t, rank in targets.items()) for targets in out_ranks]
+    in_lists = [[] for _ in talks]
+    for s, targets in enumerate(out_lists):
+        for _, t in targets:
+            in_lists[t].append(s)
+
+    tag_vocabulary = sorted({tag for talk in talks for tag in (talk.get("tags") or []) if isinstance(tag, str)})
+    tag_index = {tag: i for i, tag in enumerate(tag_vocabulary)}
+    talk_tags = [sorted({tag_index[tag] for tag in (talk.get("tags") or []) if tag in tag_index}) for talk in talks]
+    tag_lists = [[] for _ in tag_vocabulary]
+    for i, tags in enumerate(talk_tags):
+        for tag in tags:
+            tag_lists[tag].append(i)
+
+    arrays = {}
+    arrays["out_offsets"], arrays["out_targets"] = _csr([[t for _, t in targets] for targets in out_lists])
+    arrays["out_rank"] = array.array("H", [min(rank, 65535) for targets in out_lists for rank, _ in targets])
+    arrays["in_offsets"], arrays["in_sources"] = _csr(in_lists)
+    arrays["tag_offsets"], arrays["tag_ids"] = _csr(talk_tags)
+    arrays["tag_talk_offsets"], arrays["tag_talks"] = _csr(tag_lists)
+    arrays["node_ids"] = array.array("q", [int(talk.get("node_id") if talk.get("node_id") is not None else -1) for talk in talks])
+    arrays["pagerank"] = array.array("f", [float(talk.get("pagerank") or 0.0) for talk in talks])
+    arrays["community"] = array.array("i", [int(talk["community"]) if talk.get("community") is not None else -1 for talk in talks])
+    arrays["published"] = array.array("q", [talk_filters.epoch_seconds(talk.get("published")) for talk in talks])
+    arrays["duration"] = array.array("i", [talk_filters.duration_seconds(talk.get("duration")) for talk in talks])
+    arrays["published_order"] = value_order(arrays["published"])
+    arrays["duration_order"] = value_order(arrays["duration"])
+    for column in TEXT_COLUMNS:
+        arrays[f"{column}_offsets"], arrays[f"{column}_data"] = text_column([talk.get(column) for talk in talks])
+    arrays.update(speaker_arrays([talk.get("speakers") for talk in talks]))
+
+    header = {
+        "format": FORMAT_VERSION,
+        "version": version,
+        "talks": len(talks),
+        "edges": len(arrays["out_targets"]),
+        "tags": tag_vocabulary,
+    }
+    return header, arrays
+
+
+def write_snapshot(path, header, arrays, magic=MAGIC):
+    """
+    Scrive il file dello snapshot (prima su un file temporaneo, poi rename).
+    Lo stesso contenitore è usato da altri indici del layer con un ``magic`` diverso.
+    """
+    layout = {}
+    offset = 0
+    for name, values in arrays.items():
+        layout[name] = {"typecode": values.typecode, "length": len(values), "offset": offset}
+        offset += -(-len(values) * values.itemsize // ALIGNMENT) * ALIGNMENT
+    header = dict(header, arrays=layout, byteorder="little")
+    header_bytes = json.dumps(header, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    data_start = -(-(len(magic) + 4 + len(header_bytes)) // ALIGNMENT) * ALIGNMENT
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(magic)
+        f.write(len(header_bytes).to_bytes(4, "little"))
+        f.write(header_bytes)
+        for name, values in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            if sys.byteorder != "little":
+                values = array.array(values.typecode, values)
+                values.byteswap()
+            f.write(values.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _snapshot_key(prefix, version):
+    return f"{prefix}/{version}.snap" if prefix else f"{version}.snap"
+
+
+def upload_snapshot(path, s3_uri, version):
+    """Carica lo snapshot con la sua chiave versionata, senza renderlo corrente."""
+    import boto3
+
+    bucket, prefix = _split_s3_uri(s3_uri)
+    key = _snapshot_key(prefix, version)
+    boto3.client("s3").upload_file(path, bucket, key)
+    return f"s3://{bucket}/{key}"
+
+
+def point_current(s3_uri, version):
+    """
+    Sposta il puntatore CURRENT su uno snapshot già caricato (anche per il
+    rollback a una versione precedente, che resta su S3).
+    """
+    import boto3
+
+    bucket, prefix = _split_s3_uri(s3_uri)
+    key = _snapshot_key(prefix, version)
+    s3 = boto3.client("s3")
+    s3.head_object(Bucket=bucket, Key=key)
+    s3.put_object(Bucket=bucket, Key=_pointer_key(prefix), Body=key.encode("utf-8"))
+    return f"s3://{bucket}/{key}"
+
+
+def publish_snapshot(path, s3_uri, version):
+    """
+    Carica lo snapshot con una chiave versionata e solo dopo aggiorna il
+    puntatore CURRENT: le Lambda non leggono mai un file caricato a metà.
+    """
+    uri = upload_snapshot(path, s3_uri, version)
+    point_current(s3_uri, version)
+    return uri
+
+
+# --- Lettura (Lambda) ---
+
+def map_snapshot(path, magic=MAGIC, format_version=FORMAT_VERSION):
+    """Mappa in memoria un file scritto da write_snapshot: restituisce (mmap, header, arrays)."""
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if mapped[:len(magic)] != magic:
+        raise ValueError(f"{path} non è un file {magic.decode('ascii')}.")
+    header_length = int.from_bytes(mapped[len(magic):len(magic) + 4], "little")
+    header_end = len(magic) + 4 + header_length
+    header = json.loads(mapped[len(magic) + 4:header_end].decode("utf-8"))
+    if header.get("format") != format_version or header.get("byteorder") != sys.byteorder:
+        raise ValueError(f"Formato dello snapshot non supportato: {header.get('format')}")
+
+    data_start = -(-header_end // ALIGNMENT) * ALIGNMENT
+    buffer = memoryview(mapped)
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        itemsize = array.array(spec["typecode"]).itemsize
+        start = data_start + spec["offset"]
+        arrays[name] = buffer[start:start + spec["length"] * itemsize].cast(spec["typecode"])
+    return mapped, header, arrays
+
+
+class GraphSnapshot:
+    """Vista in sola lettura su uno snapshot mappato in memoria."""
+
+    def __init__(self, path):
+        self._mmap, self.header, self.arrays = map_snapshot(path)
+        self.path = path
+        self.version = self.header.get("version")
+        self.tags = self.header["tags"]
+        for name, values in self.arrays.items():
+            setattr(self, name, values)
+
+        self.size = len(self.node_ids)
+        # Snapshot esportati prima del job di analytics: nessun punteggio né community
+        if "pagerank" not in self.arrays:
+            self.pagerank = array.array("f", bytes(4 * self.size))
+            self.community = array.array("i", [-1]) * self.size
+        if "published" not in self.arrays:
+            self.published = array.array("q", bytes(8 * self.size))
+        if "duration" not in self.arrays:
+            self.duration = array.array("i", bytes(4 * self.size))
+        if "published_order" not in self.arrays:
+            self.published_order = value_order(self.published)
+            self.duration_order = value_order(self.duration)
+        if "speaker_offsets" not in self.arrays:
+            self.arrays.update(speaker_arrays(decode_column(self.arrays, "speakers")))
+            for name in ("speaker_offsets", "speaker_ids", "speaker_talk_offsets", "speaker_talks"):
+                setattr(self, name, self.arrays[name])
+        self.index = {talk_id: i for i, talk_id in enumerate(decode_column(self.arrays, "id"))}
+        self._tag_index = {tag: i for i, tag in enumerate(self.tags)}
+        # Chiave dello speaker -> posizione, costruito alla prima richiesta per speaker
+        self._speaker_index = None
+
+    # Accesso alle colonne
+
+    def text(self, column, i):
+        offsets = self.arrays[f"{column}_offsets"]
+        value = bytes(self.arrays[f"{column}_data"][offsets[i]:offsets[i + 1]]).decode("utf-8")
+        return value or None
+
+    def talk_tags(self, i):
+        return [self.tags[t] for t in self.tag_ids[self.tag_offsets[i]:self.tag_offsets[i + 1]]]
+
+    def card(self, i, fields=CARD_FIELDS):
+        card = {}
+        for field in fields:
+            if field == "tags":
+                card[field] = self.talk_tags(i)
+            elif field == "community":
+                card[field] = self.community_of(i)
+            else:
+                card[field] = self.text(field, i)
+        return card
+
+    def community_of(self, i):
+        community = self.community[i]
+        return community if community >= 0 else None
+
+    def has(self, talk_id):
+        return str(talk_id) in self.index
+
+    # Interrogazioni
+
+    def neighbour_indices(self, i):
+        return self.out_targets[self.out_offsets[i]:self.out_offsets[i + 1]]
+
+    def predecessor_indices(self, i):
+        return self.in_sources[self.in_offsets[i]:self.in_offsets[i + 1]]
+
+    def neighbours(self, talk_id, fields=NEIGHBOUR_FIELDS):
+        """Stesso risultato di graph_queries.get_connected_nodes, in ordine di rank."""
+        i = self.index.get(str(talk_id))
+        if i is None:
+            return []
+        return [self.card(j, fields) for j in self.neighbour_indices(i)]
+
+    def k_hop(self, talk_id, k=2, limit=50, fields=CARD_FIELDS):
+        """Talk raggiungibili in al più ``k`` passi (BFS), con la distanza ``hop``."""
+        start = self.index.get(str(talk_id))
+        if start is None:
+            return []
+        seen = {start}
+        frontier = deque([(start, 0)])
+        result = []
+        while frontier and len(result) < limit:
+            i, depth = frontier.popleft()
+            if depth == k:
+                continue
+            for j in self.neighbour_indices(i):
+                if j in seen:
+                    continue
+                seen.add(j)
+                result.append(dict(self.card(j, fields), hop=depth + 1))
+                if len(result) >= limit:
+                    break
+                frontier.append((j, depth + 1))
+        return result
+
+    def shortest_path_indices(self, source, target, max_hops=6, k=1):
+        """
+        Fino a ``k`` cammini minimi (tutti della stessa lunghezza) da ``source`` a
+        ``target`` lungo gli archi uscenti, con BFS bidirezionale: a ogni passo si
+        espande la frontiera più piccola, in avanti sugli archi uscenti o all'indietro
+        su quelli entranti. Restituisce [] se non esiste un cammino entro ``max_hops``.
+        """
+        if source == target:
+            return [[source]]
+        # Per ogni nodo visitato: i predecessori (avanti) o i successori (indietro) a distanza minima
+        forward, backward = {source: []}, {target: []}
+        # Distanza dalla radice dei nodi visitati, per lato
+        forward_depth, backward_depth = {source: 0}, {target: 0}
+        forward_frontier, backward_frontier = [source], [target]
+        hops = 0
+        while forward_frontier and backward_frontier and hops < max_hops:
+            expand_forward = len(forward_frontier) <= len(backward_frontier)
+            if expand_forward:
+                visited, depth, other_depth = forward, forward_depth, backward_depth
+                frontier, step = forward_frontier, self.neighbour_indices
+            else:
+                visited, depth, other_depth = backward, backward_depth, forward_depth
+                frontier, step = backward_frontier, self.predecessor_indices
+
+            level = {}
+            for u in frontier:
+                for v in step(u):
+                    if v in visited:
+                        continue
+                    level.setdefault(v, []).append(u)
+            visited.update(level)
+            level_depth = depth[frontier[0]] + 1
+            depth.update((v, level_depth) for v in level)
+            hops += 1
+            if expand_forward:
+                forward_frontier = list(level)
+            else:
+                backward_frontier = list(level)
+
+            meeting = [v for v in level if v in other_depth]
+            if meeting:
+                closest = min(other_depth[v] for v in meeting)
+                meeting = sorted(v for v in meeting if other_depth[v] == closest)
+                return self._join_paths(meeting, forward, backward, k)
+        return []
+
+    @staticmethod
+    def _join_paths(meeting, forward, backward, k):
+        def walk(node, links):
+            # Cammini da ``node`` fino alla radice della BFS seguendo i collegamenti
+            if not links[node]:
+                yield [node]
+                return
+            for previous in links[node]:
+                for rest in walk(previous, links):
+                    yield [node] + rest
+
+        paths = []
+        for m in meeting:
+            for head in walk(m, forward):
+                for tail in walk(m, backward):
+                    paths.append(head[::-1] + tail[1:])
+                    if len(paths) >= k:
+                        return paths
+        return paths
+
+    def shortest_paths(self, source_id, target_id, max_hops=6, k=1):
+        """Cammini minimi tra due talk come liste di card; None se un talk non è nello snapshot."""
+        source, target = self.index.get(str(source_id)), self.index.get(str(target_id))
+        if source is None or target is None:
+            return None
+        paths = self.shortest_path_indices(source, target, max_hops=max_hops, k=k)
+        return [[self.card(i, PATH_CARD_FIELDS) for i in path] for path in paths]
+
+    def talks_by_tags(self, tags, limit=20):
+        """Stesso risultato di graph_queries.get_talks_by_tags (talk con almeno uno dei tag)."""
+        return self.find_talks(talk_filters.TalkFilter(tags), limit)
+
+    # Filtri e ordinamenti (vedi talk_filters)
+
+    def _range_slice(self, field, bounds):
+        """(inizio, fine) in ``<field>_order`` dei talk con il valore nell'intervallo, con ricerca binaria."""
+        order, values = getattr(self, f"{field}_order"), getattr(self, field)
+        low, high = bounds
+        start = 0 if low is None else bisect.bisect_left(order, low, key=values.__getitem__)
+        end = len(order) if high is None else bisect.bisect_right(order, high, key=values.__getitem__)
+        return start, max(start, end)
+
+    def plan(self, talk_filter, driver=None):
+        """
+        (predicato di partenza, indici candidati) per ``talk_filter``: il predicato
+        che legge meno talk, con i costi esatti delle liste dei tag e dei range.
+        ``driver`` forza la scelta ("tags", "published", "duration" o "scan"), per i benchmark.
+        """
+        tag_lists = [self._tag_index[tag] for tag in talk_filter.tags or [] if tag in self._tag_index]
+        slices = {field: self._range_slice(field, bounds) for field, bounds in talk_filter.ranges().items()}
+        costs = {field: end - start for field, (start, end) in slices.items()}
+        if talk_filter.tags:
+            costs["tags"] = sum(self.tag_talk_offsets[t + 1] - self.tag_talk_offsets[t] for t in tag_lists)
+        driver = driver or talk_filters.choose_driver(costs)
+        if driver is None or driver == "scan":
+            return None, range(self.size)
+        if driver == "tags":
+            candidates = set()
+            for t in tag_lists:
+                candidates.update(self.tag_talks[self.tag_talk_offsets[t]:self.tag_talk_offsets[t + 1]])
+            return driver, candidates
+        start, end = slices[driver]
+        return driver, getattr(self, f"{driver}_order")[start:end]
+
+    def _wanted_tags(self, talk_filter):
+        if not talk_filter.tags:
+            return None
+        return {self._tag_index[tag] for tag in talk_filter.tags if tag in self._tag_index}
+
+    def _matches(self, i, wanted_tags, ranges, skip=None):
+        """Il talk ``i`` passa i predicati, tranne ``skip`` (già garantito dai candidati)."""
+        if wanted_tags is not None and skip != "tags" and \
+                wanted_tags.isdisjoint(self.tag_ids[self.tag_offsets[i]:self.tag_offsets[i + 1]]):
+            return False
+        for field, bounds in ranges.items():
+            if field != skip and not talk_filters.in_range(getattr(self, field)[i], bounds):
+                return False
+        return True
+
+    def _sort_key(self, sort):
+        """Chiave di ordinamento degli indici: valori assenti in fondo, a parità l'indice (ordine degli id)."""
+        if sort in talk_filters.SORT_FIELDS:
+            field, descending = talk_filters.SORT_FIELDS[sort]
+            values, sign = getattr(self, field), -1 if descending else 1
+            return lambda i: (not values[i], sign * values[i], i)
+        return lambda i: (-self.pagerank[i], i)
+
+    def find_talks(self, talk_filter, limit=20, driver=None, fields=LISTING_FIELDS):
+        """Stesso risultato di graph_queries.find_talks: talk che passano ``talk_filter``, ordinati e limitati."""
+        driver, candidates = self.plan(talk_filter, driver)
+        wanted_tags, ranges = self._wanted_tags(talk_filter), talk_filter.ranges()
+        key = self._sort_key(talk_filter.sort)
+        sort_field, descending = talk_filters.SORT_FIELDS.get(talk_filter.sort, (None, False))
+        if driver is not None and driver == sort_field:
+            # Candidati già ordinati per il campo richiesto: ci si ferma dopo i primi ``limit``
+            # (e i pari merito dell'ultimo, riordinati per indice da ``key``)
+            values, matches = getattr(self, driver), []
+            for i in (reversed(candidates) if descending else candidates):
+                if len(matches) >= limit and values[i] != values[matches[-1]]:
+                    break
+                if self._matches(i, wanted_tags, ranges, driver):
+                    matches.append(i)
+        elif (wanted_tags is not None and driver != "tags") or any(field != driver for field in ranges):
+            matches = [i for i in candidates if self._matches(i, wanted_tags, ranges, driver)]
+        else:
+            # Un solo predicato, già garantito dai candidati
+            matches = candidates
+        return [self.listing(i, fields) for i in heapq.nsmallest(limit, matches, key=key)]
+
+    def listing(self, i, fields=LISTING_FIELDS):
+        """Elemento degli elenchi di talk (stessi campi di graph_queries.find_talks)."""
+        item = {}
+        for field in fields:
+            if field == "publishedAt":
+                item[field] = talk_filters.iso_date(self.published[i])
+            elif field == "duration":
+                item[field] = self.duration[i] or None
+            else:
+                item.update(self.card(i, (field,)))
+        return item
+
+    # Speaker (vedi speakers.py)
+
+    def speaker_position(self, key):
+        if self._speaker_index is None:
+            self._speaker_index = {k: s for s, k in enumerate(decode_column(self.arrays, "speaker_key"))}
+        return self._speaker_index.get(key)
+
+    def speaker_field(self, field, s):
+        offsets = self.arrays[f"speaker_{field}_offsets"]
+        return bytes(self.arrays[f"speaker_{field}_data"][offsets[s]:offsets[s + 1]]).decode("utf-8")
+
+    def talk_speaker_indices(self, i):
+        return self.speaker_ids[self.speaker_offsets[i]:self.speaker_offsets[i + 1]]
+
+    def speaker_talk_indices(self, s):
+        return self.speaker_talks[self.speaker_talk_offsets[s]:self.speaker_talk_offsets[s + 1]]
+
+    def speaker(self, key, limit=50):
+        """Stesso risultato di graph_queries.get_speaker: nome e talk, dal più recente; None se non c'è."""
+        s = self.speaker_position(key)
+        if s is None:
+            return None
+        talks = sorted(self.speaker_talk_indices(s), key=self._sort_key("newest"))[:limit]
+        return {
+            "key": key,
+            "name": self.speaker_field("name", s),
+            "talks": [dict(self.card(i), publishedAt=talk_filters.iso_date(self.published[i])) for i in talks],
+        }
+
+    def co_tagged_speakers(self, key, limit=20):
+        """
+        Stesso risultato di graph_queries.get_co_tagged_speakers: speaker dei talk
+        collegati da RELATED_TO (in entrambe le direzioni) ai talk di ``key``, con
+        i tag in comune sui collegamenti e il numero di collegamenti.
+        """
+        s = self.speaker_position(key)
+        if s is None:
+            return []
+        found = {}
+        for a in self.speaker_talk_indices(s):
+            tags = set(self.tag_ids[self.tag_offsets[a]:self.tag_offsets[a + 1]])
+            for b in chain(self.neighbour_indices(a), self.predecessor_indices(a)):
+                shared = tags.intersection(self.tag_ids[self.tag_offsets[b]:self.tag_offsets[b + 1]])
+                for other in self.talk_speaker_indices(b):
+                    if other == s:
+                        continue
+                    entry = found.setdefault(other, [0, set()])
+                    entry[0] += 1
+                    entry[1] |= shared
+        ranked = sorted(
+            ((self.speaker_field("key", other), links, shared) for other, (links, shared) in found.items()),
+            key=lambda item: (-len(item[2]), -item[1], item[0]),
+        )[:limit]
+        return [
+            {
+                "key": other_key,
+                "name": self.speaker_field("name", self.speaker_position(other_key)),
+                "shared_tags": sorted(self.tags[t] for t in shared),
+                "links": links,
+            }
+            for other_key, links, shared in ranked
+        ]
+
+    def speaker_neighbours(self, talk_id, limit=10, fields=NEIGHBOUR_FIELDS):
+        """Stesso risultato di graph_queries.get_speaker_neighbours: altri talk degli stessi speaker."""
+        i = self.index.get(str(talk_id))
+        if i is None:
+            return []
+        others = {j for s in self.talk_speaker_indices(i) for j in self.speaker_talk_indices(s) if j != i}
+        return [self.card(j, fields) for j in heapq.nsmallest(limit, others, key=self._sort_key("newest"))]
+
+    def matcher(self, talk_filter):
+        """Funzione id -> bool che verifica i predicati di ``talk_filter`` (False per i talk assenti dallo snapshot)."""
+        wanted_tags, ranges = self._wanted_tags(talk_filter), talk_filter.ranges()
+
+        def matches(talk_id):
+            i = self.index.get(str(talk_id))
+            return i is not None and self._matches(i, wanted_tags, ranges)
+
+        return matches
+
+    def filter_ids(self, talk_ids, talk_filter):
+        """
+        Talk di ``talk_ids`` che passano i predicati di ``talk_filter``, ordinati
+        secondo ``talk_filter.sort`` se indicato, altrimenti nell'ordine ricevuto.
+        I talk assenti dallo snapshot sono scartati.
+        """
+        wanted_tags, ranges = self._wanted_tags(talk_filter), talk_filter.ranges()
+        found = []
+        for talk_id in talk_ids:
+            i = self.index.get(str(talk_id))
+            if i is not None and self._matches(i, wanted_tags, ranges):
+                found.append((talk_id, i))
+        if talk_filter.sort:
+            key = self._sort_key(talk_filter.sort)
+            found.sort(key=lambda item: key(item[1]))
+        return [talk_id for talk_id, _ in found]
+
+
+def _split_s3_uri(uri):
+    bucket, _, prefix = uri[len("s3://"):].partition("/")
+    return bucket, prefix.rstrip("/")
+
+
+def _pointer_key(prefix):
+    return f"{prefix}/{POINTER_NAME}" if prefix else POINTER_NAME
+
+
+def _download_current(s3_uri, local_prefix):
+    """Scarica (se non è già in /tmp) il file indicato dal puntatore CURRENT."""
+    import boto3
+
+    bucket, prefix = _split_s3_uri(s3_uri)
+    s3 = boto3.client("s3")
+    key = s3.get_object(Bucket=bucket, Key=_pointer_key(prefix))["Body"].read().decode("utf-8").strip()
+    local_path = os.path.join(GRAPH_SNAPSHOT_CACHE_DIR, f"{local_prefix}-{os.path.basename(key)}")
+    if not os.path.exists(local_path):
+        s3.download_file(bucket, key, f"{local_path}.part")
+        os.replace(f"{local_path}.part", local_path)
+    return local_path
+
+
+def _remove_superseded(local_prefix, keep):
+    """
+    Cancella da GRAPH_SNAPSHOT_CACHE_DIR i file ``{local_prefix}-*`` diversi da
+    ``keep``: a ogni nuova versione /tmp (spazio limitato) conterrebbe un file in più.
+    Un file ancora mappato da una richiesta in corso resta leggibile fino alla chiusura.
+    """
+    for path in glob.glob(os.path.join(GRAPH_SNAPSHOT_CACHE_DIR, glob.escape(f"{local_prefix}-") + "*")):
+        if path != keep:
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"Impossibile cancellare lo snapshot superato {path}: {e}")
+
+
+class SnapshotSource:
+    """
+    Caricamento pigro e aggiornamento periodico di uno snapshot, da un file locale
+    (``path``) o dal puntatore CURRENT di un prefisso S3 (``s3_uri``).
+    ``get()`` restituisce None se non configurato o non caricabile: non solleva eccezioni.
+    """
+
+    def __init__(self, name, path, s3_uri, loader, refresh_seconds=GRAPH_SNAPSHOT_REFRESH_SECONDS):
+        self.name = name
+        self.path = path
+        self.s3_uri = s3_uri
+        self.loader = loader
+        self.refresh_seconds = refresh_seconds
+        self.current = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        if not (self.path or self.s3_uri):
+            return None
+        if self.current is not None and self.path:
+            return self.current
+        if self._checked_at and time.monotonic() - self._checked_at < self.refresh_seconds:
+            return self.current
+
+        with self._lock:
+            if self._checked_at and time.monotonic() - self._checked_at < self.refresh_seconds:
+                return self.current
+            try:
+                path = self.path or _download_current(self.s3_uri, self.name)
+                if self.current is None or self.current.path != path:
+                    self.current = self.loader(path)
+                    if not self.path:
+                        _remove_superseded(self.name, path)
+            except Exception as e:
+                # Si continua con lo snapshot precedente (se c'è) o con il fallback del chiamante
+                print(f"Snapshot {self.name} non disponibile: {e}")
+            # Aggiornato solo dopo il caricamento: gli altri thread attendono il lock
+            self._checked_at = time.monotonic()
+        return self.current
+
+
+def load_snapshot(path):
+    started_at = time.perf_counter()
+    snapshot = GraphSnapshot(path)
+    metrics.record_init_phase("GraphSnapshotLoadDuration", (time.perf_counter() - started_at) * 1000)
+    print(f"Snapshot del grafo {snapshot.version} caricato: {snapshot.size} talk, {len(snapshot.out_targets)} archi.")
+    return snapshot
+
+
+_graph_source = SnapshotSource("graph", GRAPH_SNAPSHOT_PATH, GRAPH_SNAPSHOT_S3_URI, load_snapshot)
+
+
+def get_snapshot():
+    """
+    Snapshot corrente del grafo, oppure None se non configurato o non caricabile:
+    in quel caso il chiamante usa Neo4j.
+    """
+    return _graph_source.get()
@@ -0,0 +1,199 @@
+"""
+Versioni del grafo in Neo4j e puntatore alla versione corrente.
+
+Il job neo4jLink non aggiorna il grafo letto dalle Lambda: carica ogni sync in
+un sottografo nuovo, con i nodi :Talk marcati dalla proprietà ``graph`` (la
+versione, es. "20261019T101500Z"). Gli archi RELATED_TO e HAS_KEYWORD partono
+solo da talk della stessa versione; i nodi :Keyword e :Speaker sono condivisi
+(gli archi GAVE arrivano ai talk di una versione). Durante il
+caricamento le scritture toccano solo nodi nuovi: nessun lock sui nodi letti e
+nessun dato misto per chi legge.
+
+Dopo la validazione dei conteggi il job sposta il puntatore
+
+    (:GraphVersion {name: "current", version, previous, id_type, previous_id_type,
+                    switched_at, talks, edges})
+
+in un'unica transazione: le Lambda (neo4j_runtime.execute_read) leggono la
+versione dal puntatore e la passano a ogni query come parametro ``$graph``.
+La versione precedente resta nel database per il rollback istantaneo
+(rollback_pointer); quelle più vecchie vengono cancellate a blocchi.
+``id_type`` è il tipo della proprietà id dei talk della versione ("string" o
+"int", vedi ids.py): cambia insieme alla versione, quindi le Lambda convertono
+sempre gli id nel tipo giusto, anche durante il passaggio agli id interi.
+
+I grafi scritti prima del versionamento (nodi senza ``graph``) vengono adottati
+come LEGACY_VERSION alla prima sync (adopt_legacy). Finché il puntatore non
+esiste le Lambda non leggono da Neo4j (read_served): le query filtrano per
+``graph`` e su nodi non ancora adottati restituirebbero risultati vuoti.
+"""
+
+from datetime import datetime, timezone
+
+from tedxgraph import ids
+
+POINTER_NAME = "current"
+LEGACY_VERSION = "legacy"
+DELETE_BATCH_SIZE = 5000
+
+
+class GraphNotVersionedError(ConnectionError):
+    """Il database non ha ancora il puntatore alla versione corrente (le Lambda rispondono 503)."""
+
+
+def new_version():
+    """Versione di una nuova sync: timestamp UTC, ordinabile come stringa."""
+    return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+# --- Lettura (Lambda e job) ---
+
+def read_pointer(tx):
+    """Puntatore come dict (version, previous, id_type, switched_at, talks, edges), None se non esiste."""
+    record = tx.run(
+        "MATCH (p:GraphVersion {name: $name}) "
+        "RETURN p.version AS version, p.previous AS previous, "
+        "       coalesce(p.id_type, $default_id_type) AS id_type, toString(p.switched_at) AS switched_at, "
+        "       p.talks AS talks, p.edges AS edges",
+        name=POINTER_NAME, default_id_type=ids.ID_TYPE_STRING,
+    ).single()
+    return dict(record) if record else None
+
+
+def read_current_version(tx):
+    """Versione corrente; LEGACY_VERSION se il puntatore non esiste ancora."""
+    return read_current(tx)[0]
+
+
+def read_current(tx):
+    """(versione corrente, tipo degli id dei talk) come li usano le Lambda."""
+    pointer = read_pointer(tx)
+    if not pointer or not pointer.get("version"):
+        return LEGACY_VERSION, ids.ID_TYPE_STRING
+    return pointer["version"], pointer["id_type"]
+
+
+def read_served(tx):
+    """
+    Come read_current, per le Lambda: senza puntatore solleva GraphNotVersionedError
+    invece di servire risultati vuoti (layer pubblicato prima della prima sync versionata).
+    """
+    pointer = read_pointer(tx)
+    if not pointer or not pointer.get("version"):
+        raise GraphNotVersionedError(
+            "Graph version pointer not found: run the neo4jLink job once to adopt the existing graph"
+        )
+    return pointer["version"], pointer["id_type"]
+
+
+def count_version(tx, version):
+    """Talk, archi RELATED_TO, HAS_KEYWORD e GAVE (speaker) di una versione."""
+    talks = tx.run("MATCH (t:Talk {graph: $graph}) RETURN count(t) AS n", graph=version).single()["n"]
+    edges = tx.run(
+        "MATCH (:Talk {graph: $graph})-[r:RELATED_TO]->() RETURN count(r) AS n", graph=version
+    ).single()["n"]
+    keywords = tx.run(
+        "MATCH (:Talk {graph: $graph})-[r:HAS_KEYWORD]->() RETURN count(r) AS n", graph=version
+    ).single()["n"]
+    speakers = tx.run(
+        "MATCH (:Speaker)-[r:GAVE]->(:Talk {graph: $graph}) RETURN count(r) AS n", graph=version
+    ).single()["n"]
+    return {"talks": talks, "edges": edges, "keywords": keywords, "speakers": speakers}
+
+
+def stored_versions(tx):
+    return [record["graph"] for record in tx.run("MATCH (t:Talk) RETURN DISTINCT t.graph AS graph")]
+
+
+# --- Scrittura (job neo4jLink) ---
+
+def create_indexes(session):
+    # (graph, id): i MATCH delle Lambda e del caricamento; (graph): scansioni e cancellazioni per versione
+    session.run("CREATE INDEX talk_graph_id_index IF NOT EXISTS FOR (t:Talk) ON (t.graph, t.id)").consume()
+    session.run("CREATE INDEX talk_graph_index IF NOT EXISTS FOR (t:Talk) ON (t.graph)").consume()
+    # Range index per i filtri degli elenchi (talk_filters): uguaglianza su graph, range sul secondo campo
+    session.run("CREATE INDEX talk_graph_published_index IF NOT EXISTS FOR (t:Talk) ON (t.graph, t.publishedAt)").consume()
+    session.run("CREATE INDEX talk_graph_duration_index IF NOT EXISTS FOR (t:Talk) ON (t.graph, t.duration)").consume()
+    session.run("CREATE CONSTRAINT graph_version_name_unique IF NOT EXISTS "
+                "FOR (p:GraphVersion) REQUIRE p.name IS UNIQUE").consume()
+    # Chiave normalizzata degli speaker (speakers.speaker_key): MERGE del job e punto di partenza delle Lambda
+    session.run("CREATE CONSTRAINT speaker_key_unique IF NOT EXISTS "
+                "FOR (s:Speaker) REQUIRE s.key IS UNIQUE").consume()
+
+
+def adopt_legacy(tx):
+    """
+    Marca come LEGACY_VERSION i talk senza ``graph`` e crea il puntatore se
+    manca: il grafo già presente resta leggibile finché la prima sync
+    versionata non lo sostituisce. Restituisce il numero di talk adottati.
+    """
+    adopted = tx.run(
+        "MATCH (t:Talk) WHERE t.graph IS NULL SET t.graph = $graph RETURN count(t) AS n", graph=LEGACY_VERSION
+    ).single()["n"]
+    tx.run("MERGE (p:GraphVersion {name: $name}) ON CREATE SET p.version = $graph, p.switched_at = datetime()",
+           name=POINTER_NAME, graph=LEGACY_VERSION).consume()
+    return adopted
+
+
+def switch_pointer(tx, version, expected_current, counts, id_type=ids.ID_TYPE_STRING):
+    """
+    Rende corrente ``version`` e sposta la corrente in ``previous``, in una sola
+    transazione. Fallisce se nel frattempo un'altra sync ha già spostato il
+    puntatore (``expected_current`` diverso dalla versione corrente).
+    """
+    record = tx.run(
+        "MERGE (p:GraphVersion {name: $name}) "
+        "WITH p, p.version AS current "
+        "WHERE coalesce(current, '') = coalesce($expected, '') "
+        "SET p.previous = current, p.previous_id_type = p.id_type, "
+        "    p.version = $graph, p.id_type = $id_type, p.switched_at = datetime(), "
+        "    p.talks = $talks, p.edges = $edges "
+        "RETURN current",
+        name=POINTER_NAME, graph=version, expected=expected_current, id_type=id_type,
+        talks=counts["talks"], edges=counts["edges"],
+    ).single()
+    if record is None:
+        raise RuntimeError(f"Graph pointer moved during the sync (expected {expected_current}): not switching to {version}")
+    return record["current"]
+
+
+def rollback_pointer(tx):
+    """Scambia versione corrente e precedente; restituisce il nuovo puntatore."""
+    record = tx.run(
+        "MATCH (p:GraphVersion {name: $name}) WHERE p.previous IS NOT NULL "
+        "WITH p, p.version AS current, p.previous AS previous, p.id_type AS id_type, p.previous_id_type AS previous_id_type "
+        "SET p.version = previous, p.previous = current, "
+        "    p.id_type = previous_id_type, p.previous_id_type = id_type, p.switched_at = datetime() "
+        "RETURN p.version AS version, p.previous AS previous, p.id_type AS id_type",
+        name=POINTER_NAME,
+    ).single()
+    if record is None:
+        raise RuntimeError("No previous graph version to roll back to")
+    return dict(record)
+
+
+def delete_version(session, version, batch_size=DELETE_BATCH_SIZE):
+    """Cancella i talk di una versione (e i loro archi) a blocchi; restituisce i talk cancellati."""
+    deleted = 0
+    while True:
+        count = session.execute_write(
+            lambda tx: tx.run(
+                "MATCH (t:Talk {graph: $graph}) WITH t LIMIT $batch DETACH DELETE t RETURN count(*) AS n",
+                graph=version, batch=batch_size,
+            ).single()["n"]
+        )
+        deleted += count
+        if count < batch_size:
+            return deleted
+
+
+def delete_orphan_keywords(tx):
+    return tx.run(
+        "MATCH (k:Keyword) WHERE NOT (k)<-[:HAS_KEYWORD]-() DELETE k RETURN count(k) AS n"
+    ).single()["n"]
+
+
+def delete_orphan_speakers(tx):
+    return tx.run(
+        "MATCH (s:Speaker) WHERE NOT (s)-[:GAVE]->() DELETE s RETURN count(s) AS n"
+    ).single()["n"]
@@ -0,0 +1,166 @@
+"""
+Ricerca ibrida: più "retriever" (titoli su Neo4j, indice delle trascrizioni,
+indice vettoriale dei contenuti) eseguiti in parallelo e fusi con la
+Reciprocal Rank Fusion:
+
+    score(talk) = somma sui retriever di 1 / (RRF_K + rank)
+
+RRF usa solo le posizioni, quindi non serve rendere confrontabili punteggi di
+natura diversa (BM25, coseno, ordine alfabetico). Ogni retriever ha un budget
+di latenza: se non risponde in tempo il suo risultato viene ignorato (il
+thread termina in background) e la risposta arriva comunque con gli altri.
+
+Gli stessi filtri (tag, data di pubblicazione, durata: vedi talk_filters)
+valgono per tutti i retriever e sono verificati dentro ciascuno, così ognuno
+restituisce i suoi migliori candidati tra i talk che passano i filtri: il
+retriever dei titoli li aggiunge alla query Cypher, gli altri usano il
+predicato dello snapshot del grafo (candidate_predicate). Senza snapshot gli
+indici in memoria non possono verificarli: quei retriever chiedono più
+candidati (FILTERED_CANDIDATES_FACTOR) e i filtri sono applicati dopo,
+sull'unione, con una query su Neo4j che ha il suo budget ("filter"); se la
+query fallisce o non risponde in tempo i risultati arrivano non filtrati,
+segnalati nel report. Con un ``sort`` per data o durata i primi risultati
+per rilevanza vengono riordinati.
+"""
+
+import os
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from tedxgraph import graph_queries, graph_snapshot, neo4j_runtime
+
+RRF_K = 60
+# Budget di latenza di ogni retriever e della verifica dei filtri su Neo4j (ms),
+# sovrascrivibili con HYBRID_BUDGET_MS_<NOME>
+DEFAULT_BUDGETS_MS = {"title": 800, "transcript": 300, "vector": 300, "filter": 300}
+# Candidati di ogni retriever rispetto a ``limit``: la fusione premia i talk trovati da più retriever
+CANDIDATES_FACTOR = 3
+# Senza snapshot i filtri sono verificati dopo il retriever: servono più candidati
+FILTERED_CANDIDATES_FACTOR = 10
+# Crescita della ricerca vettoriale filtrata (filtered_top) a ogni ripetizione
+WIDEN_FACTOR = 4
+
+
+def retriever_budgets():
+    return {
+        name: float(os.environ.get(f"HYBRID_BUDGET_MS_{name.upper()}", default))
+        for name, default in DEFAULT_BUDGETS_MS.items()
+    }
+
+
+def _timed(function):
+    started_at = time.perf_counter()
+    try:
+        return function(), None, (time.perf_counter() - started_at) * 1000
+    except Exception as e:
+        return None, e, (time.perf_counter() - started_at) * 1000
+
+
+def run_retrievers(executor, retrievers, budgets_ms):
+    """
+    Esegue i retriever ``{nome: funzione}`` in parallelo. Restituisce
+    ({nome: lista di (id, punteggio)}, {nome: {status, ms, candidates}}):
+    status è "ok", "timeout", "unavailable" (la funzione ha restituito None) o "error".
+    """
+    started_at = time.perf_counter()
+    futures = {name: executor.submit(_timed, function) for name, function in retrievers.items()}
+    results, report = {}, {}
+    for name, future in futures.items():
+        budget_ms = budgets_ms.get(name, 500)
+        remaining = budget_ms / 1000 - (time.perf_counter() - started_at)
+        try:
+            candidates, error, elapsed_ms = future.result(timeout=max(remaining, 0))
+        except FutureTimeoutError:
+            report[name] = {"status": "timeout", "ms": budget_ms}
+            continue
+        if error is not None:
+            print(f"Retriever {name} fallito: {error}")
+            report[name] = {"status": "error", "ms": round(elapsed_ms, 1)}
+        elif candidates is None:
+            report[name] = {"status": "unavailable", "ms": round(elapsed_ms, 1)}
+        else:
+            results[name] = candidates
+            report[name] = {"status": "ok", "ms": round(elapsed_ms, 1), "candidates": len(candidates)}
+    return results, report
+
+
+def candidate_predicate(talk_filter):
+    """
+    Funzione id -> bool dei predicati di ``talk_filter`` dallo snapshot del
+    grafo, da passare ai retriever; None se non ci sono predicati o snapshot.
+    """
+    if talk_filter is None or not talk_filter.has_predicates():
+        return None
+    snapshot = graph_snapshot.get_snapshot()
+    return snapshot.matcher(talk_filter) if snapshot is not None else None
+
+
+def filtered_top(search, accept, k, total):
+    """
+    Primi ``k`` risultati di ``search(n) -> [(chiave, punteggio)]`` che passano
+    ``accept(chiave)``, per i retriever che non sanno filtrare durante la ricerca: la
+    ricerca è ripetuta con n sempre più grande (x WIDEN_FACTOR) finché non ne
+    restano ``k`` o i candidati (``total``) sono finiti.
+    """
+    n = k
+    while True:
+        found = search(n)
+        kept = [(talk_id, score) for talk_id, score in found if accept(talk_id)]
+        if len(kept) >= k or len(found) < n or n >= total:
+            return kept[:k]
+        n = min(n * WIDEN_FACTOR, total)
+
+
+def filter_candidates(executor, talk_ids, talk_filter, budget_ms):
+    """
+    (id che passano i filtri, nell'ordine di ``talk_filter.sort`` se indicato,
+    report {status, ms}); senza filtri né ordinamento gli id così come sono.
+    Dallo snapshot se disponibile, altrimenti con una query su Neo4j entro
+    ``budget_ms``: se fallisce o scade gli id sono None (risultati non filtrati).
+    """
+    talk_ids = list(dict.fromkeys(str(talk_id) for talk_id in talk_ids))
+    if not talk_ids or talk_filter.is_empty():
+        return talk_ids, {"status": "ok", "ms": 0.0}
+    snapshot = graph_snapshot.get_snapshot()
+    if snapshot is not None:
+        started_at = time.perf_counter()
+        allowed = snapshot.filter_ids(talk_ids, talk_filter)
+        return allowed, {"status": "ok", "ms": round((time.perf_counter() - started_at) * 1000, 1)}
+    future = executor.submit(_timed, lambda: neo4j_runtime.execute_read(graph_queries.filter_talk_ids, talk_ids, talk_filter))
+    try:
+        allowed, error, elapsed_ms = future.result(timeout=budget_ms / 1000)
+    except FutureTimeoutError:
+        return None, {"status": "timeout", "ms": budget_ms}
+    if error is not None:
+        print(f"Verifica dei filtri su Neo4j fallita: {error}")
+        return None, {"status": "error", "ms": round(elapsed_ms, 1)}
+    return allowed, {"status": "ok", "ms": round(elapsed_ms, 1)}
+
+
+def sort_results(results, ordered_ids):
+    """Riordina i risultati fusi secondo ``ordered_ids`` (id filtrati e ordinati da filter_candidates)."""
+    position = {talk_id: i for i, talk_id in enumerate(ordered_ids)}
+    return sorted(results, key=lambda entry: position.get(entry["id"], len(position)))
+
+
+def reciprocal_rank_fusion(rankings, allowed=None, limit=10, k=RRF_K):
+    """
+    ``rankings``: {nome retriever: [(id, punteggio)] in ordine}. I rank sono
+    ricalcolati dopo il filtro ``allowed``, così un candidato scartato non
+    penalizza quelli che seguono. Restituisce [{id, score, sources}].
+    """
+    fused = {}
+    for name, candidates in rankings.items():
+        rank = 0
+        for talk_id, score in candidates:
+            talk_id = str(talk_id)
+            if (allowed is not None and talk_id not in allowed) or name in fused.get(talk_id, {}).get("sources", {}):
+                continue
+            rank += 1
+            entry = fused.setdefault(talk_id, {"id": talk_id, "score": 0.0, "sources": {}})
+            entry["score"] += 1.0 / (k + rank)
+            entry["sources"][name] = {"rank": rank, "score": round(score, 4) if score is not None else None}
+    results = sorted(fused.values(), key=lambda entry: (-entry["score"], entry["id"]))[:limit]
+    for entry in results:
+        entry["score"] = round(entry["score"], 6)
+    return results
@@ -0,0 +1,75 @@
+"""
+Id dei talk: stringhe nell'API, stringhe o interi a 64 bit nei database.
+
+Gli id dei talk sono numerici ("567505"). Con tedXjob in modalità typed-id
+(--TYPED_IDS true) l'_id dei documenti di tedx_data, gli elementi di next_watch
+e la proprietà id dei nodi :Talk sono int64: join Spark, indici MongoDB e Neo4j
+confrontano 8 byte invece di stringhe. L'API resta invariata: le Lambda
+validano e convertono gli id all'ingresso (parse_talk_id, store_id) e
+restituiscono sempre stringhe (api_id, toString() nelle query Cypher).
+
+Il tipo usato in MongoDB è TALK_ID_TYPE (variabile d'ambiente, da impostare a
+"int" dopo glue/talkIdMigration_V1.py); quello del grafo Neo4j è salvato nel
+puntatore alla versione corrente (graph_versions) e cambia insieme alla versione.
+Snapshot e indici in memoria delle Lambda usano sempre la forma stringa.
+"""
+
+import os
+
+ID_TYPE_STRING = "string"
+ID_TYPE_INT = "int"
+ID_TYPES = (ID_TYPE_STRING, ID_TYPE_INT)
+TALK_ID_TYPE = os.environ.get("TALK_ID_TYPE", ID_TYPE_STRING)
+INT64_MAX = 2 ** 63 - 1
+
+
+def parse_talk_id(value):
+    """
+    Valida un id ricevuto dall'API e lo restituisce nella forma canonica
+    (stringa). In modalità "int" accetta solo interi non negativi a 64 bit.
+    Solleva ValueError per id non validi.
+    """
+    if isinstance(value, bool) or value is None:
+        raise ValueError(f"Invalid talk id: {value!r}")
+    text = str(value).strip()
+    if not text:
+        raise ValueError("Invalid talk id: empty")
+    if TALK_ID_TYPE == ID_TYPE_INT:
+        if not text.isascii() or not text.isdigit() or int(text) > INT64_MAX:
+            raise ValueError(f"Invalid talk id: {text!r} (expected a non-negative integer)")
+        return str(int(text))
+    return text
+
+
+def store_id(value, id_type=None):
+    """Id nella forma salvata nel database (``id_type``, default TALK_ID_TYPE)."""
+    if (id_type or TALK_ID_TYPE) == ID_TYPE_INT:
+        return int(value)
+    return str(value)
+
+
+def store_ids(values, id_type=None):
+    return [store_id(value, id_type) for value in values]
+
+
+def api_id(value):
+    """Forma restituita dall'API: sempre stringa (None resta None)."""
+    return None if value is None else str(value)
+
+
+def document_id(value):
+    """
+    Id di un documento letto da MongoDB nella forma da scrivere nel grafo:
+    gli interi restano interi, il resto diventa stringa.
+    """
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    return str(value)
+
+
+def id_type_of(values):
+    """ID_TYPE_INT se tutti gli id sono interi, altrimenti ID_TYPE_STRING."""
+    values = list(values)
+    if values and all(isinstance(value, int) and not isinstance(value, bool) for value in values):
+        return ID_TYPE_INT
+    return ID_TYPE_STRING
@@ -0,0 +1,75 @@
+import functools
+import json
+import os
+import time
+
+# Istante in cui il layer viene importato: coincide (a meno di pochi ms) con
+# l'inizio dell'inizializzazione del modulo della Lambda.
+_LAYER_IMPORTED_AT = time.perf_counter()
+
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'TEDxGraph')
+
+_cold_start = True
+_extra_init_ms = {}
+
+
+def record_init_phase(name, duration_ms):
+    """
+    Registra la durata di una fase di inizializzazione (es. creazione del driver).
+    Viene emessa insieme alla prima invocazione del container.
+    """
+    _extra_init_ms[name] = round(duration_ms, 2)
+
+
+def emit_metrics(function_name, values, units=None):
+    """
+    Stampa le metriche in Embedded Metric Format: CloudWatch Logs le converte
+    in metriche senza chiamate API aggiuntive (nessun costo sulla latenza).
+    """
+    units = units or {}
+    payload = {
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': METRICS_NAMESPACE,
+                'Dimensions': [['FunctionName']],
+                'Metrics': [{'Name': name, 'Unit': units.get(name, 'Milliseconds')} for name in values]
+            }]
+        },
+        'FunctionName': function_name,
+    }
+    payload.update(values)
+    print(json.dumps(payload))
+
+
+def instrument_handler(function_name):
+    """
+    Decoratore per i lambda_handler: alla prima invocazione del container emette
+    ColdStart=1 e InitDuration (tempo dall'import del layer alla prima richiesta),
+    alle successive ColdStart=0. Emette inoltre la durata di ogni invocazione.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            global _cold_start
+            started_at = time.perf_counter()
+            is_cold = _cold_start
+            _cold_start = False
+            try:
+                return handler(event, context)
+            finally:
+                values = {
+                    'ColdStart': 1 if is_cold else 0,
+                    'HandlerDuration': round((time.perf_counter() - started_at) * 1000, 2),
+                }
+                units = {'ColdStart': 'Count'}
+                if is_cold:
+                    values['InitDuration'] = round((started_at - _LAYER_IMPORTED_AT) * 1000, 2)
+                # Le fasi di init (es. driver Neo4j) possono avvenire durante la prima
+                # invocazione, per questo vengono emesse solo quando disponibili.
+                for phase, duration_ms in _extra_init_ms.items():
+                    values[phase] = duration_ms
+                _extra_init_ms.clear()
+                emit_metrics(function_name, values, units)
+        return wrapper
+    return decorator
@@ -0,0 +1,66 @@
+import os
+
+# Variabili d'ambiente
+MONGODB_CONN_STRING = os.environ.get("MONGODB_CONN_STRING")
+MONGODB_DATABASE_NAME = os.environ.get("MONGODB_DATABASE_NAME")
+MONGODB_COLLECTION_NAME = os.environ.get("MONGODB_COLLECTION_NAME")
+
+mongo_client = None
+
+def get_mongodb_client():
+    """
+    Inizializza e restituisce il client MongoDB.
+    Riutilizza la connessione se già stabilita.
+    """
+    global mongo_client
+    if mongo_client is None:
+        from pymongo import MongoClient, errors as pymongo_errors
+
+        if not MONGODB_CONN_STRING:
+            print("Errore: la variabile d'ambiente MONGODB_CONN_STRING non è impostata.")
+            return None
+        try:
+            print("Tentativo di connessione a MongoDB...")
+            mongo_client = MongoClient(MONGODB_CONN_STRING)
+            mongo_client.admin.command('ping')
+            print("Connessione a MongoDB stabilita con successo.")
+        except pymongo_errors.ConfigurationError as e:
+            print(f"Errore di configurazione MongoDB (controlla la stringa di connessione): {e}")
+            mongo_client = None
+            return None
+        except pymongo_errors.ConnectionFailure as e:
+            print(f"Impossibile connettersi a MongoDB: {e}")
+            mongo_client = None
+            return None
+        except Exception as e:
+            print(f"Errore generico durante la connessione a MongoDB: {e}")
+            mongo_client = None
+            return None
+    return mongo_client
+
+
+def get_talks_collection():
+    """
+    Restituisce la collezione dei talk (tedx_data), o None se non configurata.
+    """
+    client = get_mongodb_client()
+    if not client:
+        return None
+    if not MONGODB_DATABASE_NAME or not MONGODB_COLLECTION_NAME:
+        print("Errore: MONGODB_DATABASE_NAME o MONGODB_COLLECTION_NAME non impostati.")
+        return None
+    return client[MONGODB_DATABASE_NAME][MONGODB_COLLECTION_NAME]
+
+
+def get_collection(collection_name):
+    """
+    Restituisce una collezione del database dei talk (es. la cache dei riassunti),
+    o None se il client non è configurato.
+    """
+    client = get_mongodb_client()
+    if not client:
+        return None
+    if not MONGODB_DATABASE_NAME:
+        print("Errore: MONGODB_DATABASE_NAME non impostato.")
+        return None
+    return client[MONGODB_DATABASE_NAME][collection_name]
@@ -0,0 +1,143 @@
+"""
+Vicinati precalcolati dei talk per la mappa mentale.
+
+Per ogni talk il job glue/neighbourhoodPrecompute_V1.py calcola il vicinato a 2
+hop lungo RELATED_TO (gli archi next_watch) con i campi delle card, lo serializza
+in JSON compatto e lo comprime con gzip. La Lambda get-neighbourhood restituisce
+quei byte così come sono, senza interrogare Neo4j né serializzare di nuovo.
+
+Formato della collezione ``neighbourhoods`` (un documento per talk e versione):
+
+    {_id: "<talk_id>:<version>", talk_id, version, hash, body: <gzip JSON>, deleted}
+
+Le versioni sono copy-on-write: una nuova versione del dataset scrive solo i
+talk il cui vicinato è cambiato (o le "tombstone" dei talk rimossi). Il vicinato
+di un talk alla versione V è il documento con la versione più alta <= V; il
+puntatore alla versione corrente è in ``dataset_versions`` (_id "neighbourhoods")
+e viene spostato solo a scrittura completata.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import time
+
+from tedxgraph import mongo_runtime
+
+NEIGHBOURHOODS_COLLECTION_NAME = os.environ.get("NEIGHBOURHOODS_COLLECTION_NAME", "neighbourhoods")
+DATASET_VERSIONS_COLLECTION_NAME = os.environ.get("DATASET_VERSIONS_COLLECTION_NAME", "dataset_versions")
+POINTER_ID = "neighbourhoods"
+# Per quanto una Lambda riusa la versione corrente letta dal puntatore
+VERSION_CACHE_SECONDS = float(os.environ.get("NEIGHBOURHOOD_VERSION_CACHE_SECONDS", "60"))
+
+CARD_FIELDS = ("title", "speakers", "url", "tags")
+FORMAT_VERSION = 1
+
+
+# --- Costruzione (job di precalcolo) ---
+
+def build_card(talk_id, talk):
+    card = {"id": talk_id}
+    for field in CARD_FIELDS:
+        card[field] = talk.get(field)
+    return card
+
+
+def build_adjacency(talks):
+    """
+    Archi RELATED_TO come li crea neo4jLink: da ogni talk verso i suoi next_watch,
+    senza self-loop e senza riferimenti a talk inesistenti. L'ordine è conservato.
+    """
+    adjacency = {}
+    for talk_id, talk in talks.items():
+        neighbours = []
+        for related in talk.get("next_watch") or []:
+            related_id = str(related) if related is not None else None
+            if not related_id or related_id == talk_id or related_id not in talks or related_id in neighbours:
+                continue
+            neighbours.append(related_id)
+        adjacency[talk_id] = neighbours
+    return adjacency
+
+
+def build_neighbourhood(talk_id, talks, adjacency):
+    """Vicinato a 2 hop: nodi (con distanza dal centro) e archi tra essi."""
+    hop1 = adjacency.get(talk_id, [])
+    seen = {talk_id, *hop1}
+    hop2 = []
+    edges = [[talk_id, n] for n in hop1]
+    for n in hop1:
+        for m in adjacency.get(n, []):
+            edges.append([n, m])
+            if m not in seen:
+                seen.add(m)
+                hop2.append(m)
+
+    nodes = [dict(build_card(n, talks[n]), hop=1) for n in hop1]
+    nodes += [dict(build_card(n, talks[n]), hop=2) for n in hop2]
+    center = build_card(talk_id, talks[talk_id])
+    # Parole chiave del talk (job tedXjob): nodi secondari della mappa attorno al centro
+    center["keywords"] = [
+        {"term": kw.get("term"), "weight": kw.get("weight")}
+        for kw in talks[talk_id].get("keywords") or []
+        if isinstance(kw, dict) and kw.get("term")
+    ]
+    return {
+        "format": FORMAT_VERSION,
+        "center": center,
+        "nodes": nodes,
+        "edges": edges,
+    }
+
+
+def encode_neighbourhood(neighbourhood):
+    """Restituisce (hash, byte gzip). L'hash è sul JSON non compresso."""
+    raw = json.dumps(neighbourhood, separators=(",", ":"), ensure_ascii=False, sort_keys=True).encode("utf-8")
+    # mtime=0: a parità di contenuto i byte compressi sono identici
+    return hashlib.sha256(raw).hexdigest(), gzip.compress(raw, compresslevel=9, mtime=0)
+
+
+def neighbourhood_doc_id(talk_id, version):
+    return f"{talk_id}:{version}"
+
+
+# --- Lettura (Lambda) ---
+
+_current_version = None
+_current_version_read_at = 0.0
+
+
+def get_current_version(force_refresh=False):
+    global _current_version, _current_version_read_at
+    now = time.monotonic()
+    if force_refresh or _current_version is None or now - _current_version_read_at > VERSION_CACHE_SECONDS:
+        collection = mongo_runtime.get_collection(DATASET_VERSIONS_COLLECTION_NAME)
+        if collection is None:
+            return None
+        pointer = collection.find_one({"_id": POINTER_ID}, {"current": 1})
+        _current_version = pointer.get("current") if pointer else None
+        _current_version_read_at = now
+    return _current_version
+
+
+def fetch_neighbourhood(talk_id, version=None):
+    """
+    Restituisce il documento (hash, body compresso, version) del vicinato del
+    talk alla versione indicata (default: corrente), o None se non esiste.
+    Usa l'indice (talk_id, version) con un solo accesso.
+    """
+    collection = mongo_runtime.get_collection(NEIGHBOURHOODS_COLLECTION_NAME)
+    if collection is None:
+        raise ConnectionError("MongoDB non configurato o non raggiungibile.")
+    version = version if version is not None else get_current_version()
+    if version is None:
+        return None
+    doc = collection.find_one(
+        {"talk_id": str(talk_id), "version": {"$lte": version}},
+        {"hash": 1, "body": 1, "version": 1, "deleted": 1},
+        sort=[("version", -1)],
+    )
+    if not doc or doc.get("deleted"):
+        return None
+    return doc
@@ -0,0 +1,194 @@
+import os
+import threading
+import time
+
+from tedxgraph import graph_versions, ids, metrics
+
+# Variabili d'ambiente (da configurare nella Lambda)
+NEO4J_URI = os.environ.get('NEO4J_URI')
+NEO4J_USER = os.environ.get('NEO4J_USER')
+NEO4J_PASSWORD = os.environ.get('NEO4J_PASSWORD')
+# Indicare il database evita al driver un round-trip per risolvere la "home database"
+NEO4J_DATABASE = os.environ.get('NEO4J_DATABASE', 'neo4j')
+
+# Parametri del pool: un container Lambda serve una richiesta alla volta, quindi
+# poche connessioni bastano (le richieste batch ne usano al massimo una per thread).
+NEO4J_MAX_POOL_SIZE = int(os.environ.get('NEO4J_MAX_POOL_SIZE', '8'))
+# Le connessioni vengono ruotate prima che load balancer/NAT le chiudano lato server
+NEO4J_MAX_CONNECTION_LIFETIME = float(os.environ.get('NEO4J_MAX_CONNECTION_LIFETIME', '240'))
+# Le connessioni rimaste inattive più di così vengono verificate prima dell'uso:
+# dopo un freeze/thaw del container evita di usare un socket già morto.
+NEO4J_LIVENESS_CHECK_TIMEOUT = float(os.environ.get('NEO4J_LIVENESS_CHECK_TIMEOUT', '30'))
+NEO4J_CONNECTION_TIMEOUT = float(os.environ.get('NEO4J_CONNECTION_TIMEOUT', '5'))
+NEO4J_ACQUISITION_TIMEOUT = float(os.environ.get('NEO4J_ACQUISITION_TIMEOUT', '10'))
+# Oltre questa pausa tra due invocazioni il container è stato quasi certamente
+# congelato: le sessioni in cache vengono scartate e ricreate.
+NEO4J_IDLE_RESET_SECONDS = float(os.environ.get('NEO4J_IDLE_RESET_SECONDS', '120'))
+# verify_connectivity() costa un round-trip completo: di default non viene eseguita
+NEO4J_VERIFY_ON_INIT = os.environ.get('NEO4J_VERIFY_ON_INIT', 'false').lower() == 'true'
+# Ogni quanto una Lambda calda rilegge il puntatore alla versione corrente del grafo
+# (vedi tedxgraph/graph_versions.py). La versione precedente resta nel database,
+# quindi una Lambda che la usa ancora per qualche secondo dopo una sync legge dati coerenti.
+GRAPH_VERSION_REFRESH_SECONDS = float(os.environ.get('GRAPH_VERSION_REFRESH_SECONDS', '30'))
+
+# Il driver viene inizializzato globalmente per essere riutilizzato
+# tra le invocazioni della Lambda (se l'ambiente di esecuzione viene riutilizzato da AWS)
+driver = None
+_driver_lock = threading.Lock()
+# Una sessione per thread: le sessioni non sono thread-safe, ma riutilizzarle in
+# sequenza dallo stesso thread è sicuro e risparmia l'apertura ad ogni invocazione.
+_local = threading.local()
+_graph_version = {'version': None, 'id_type': ids.ID_TYPE_STRING, 'checked_at': None}
+_graph_version_lock = threading.Lock()
+
+
+def get_neo4j_driver():
+    """
+    Restituisce il driver Neo4j condiviso, creandolo alla prima chiamata.
+    L'import di neo4j avviene qui per non pesare sull'init dei moduli che non lo usano.
+    """
+    global driver
+    if driver is not None:
+        return driver
+    with _driver_lock:
+        if driver is not None:
+            return driver
+        if not NEO4J_URI or not NEO4J_USER or not NEO4J_PASSWORD:
+            print("Errore: Variabili d'ambiente NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD non configurate.")
+            raise ValueError("Variabili d'ambiente Neo4j non configurate correttamente.")
+        started_at = time.perf_counter()
+        try:
+            from neo4j import GraphDatabase, basic_auth
+
+            new_driver = GraphDatabase.driver(
+                NEO4J_URI,
+                auth=basic_auth(NEO4J_USER, NEO4J_PASSWORD),
+                max_connection_pool_size=NEO4J_MAX_POOL_SIZE,
+                max_connection_lifetime=NEO4J_MAX_CONNECTION_LIFETIME,
+                liveness_check_timeout=NEO4J_LIVENESS_CHECK_TIMEOUT,
+                connection_timeout=NEO4J_CONNECTION_TIMEOUT,
+                connection_acquisition_timeout=NEO4J_ACQUISITION_TIMEOUT,
+                keep_alive=True,
+            )
+            if NEO4J_VERIFY_ON_INIT:
+                new_driver.verify_connectivity()
+        except Exception as e:
+            print(f"Errore durante la connessione a Neo4j: {e}")
+            raise ConnectionError(f"Impossibile connettersi a Neo4j: {e}") from e
+        driver = new_driver
+        metrics.record_init_phase('DriverInitDuration', (time.perf_counter() - started_at) * 1000)
+        print("Driver Neo4j inizializzato.")
+    return driver
+
+
+def reset_neo4j_driver():
+    """Chiude sessioni e driver: il prossimo accesso ricrea tutto da zero."""
+    global driver
+    _discard_session()
+    with _driver_lock:
+        if driver is not None:
+            try:
+                driver.close()
+            except Exception as e:
+                print(f"Warning: errore durante la chiusura del driver Neo4j: {e}")
+            driver = None
+
+
+def _discard_session():
+    session = getattr(_local, 'session', None)
+    _local.session = None
+    if session is not None:
+        try:
+            session.close()
+        except Exception:
+            pass
+
+
+def _get_session():
+    now = time.monotonic()
+    last_used = getattr(_local, 'last_used', None)
+    if last_used is not None and now - last_used > NEO4J_IDLE_RESET_SECONDS:
+        # Probabile thaw del container: la sessione (e la sua connessione) può essere stantia
+        _discard_session()
+    _local.last_used = now
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = get_neo4j_driver().session(database=NEO4J_DATABASE)
+        _local.session = session
+    return session
+
+
+class _GraphTransaction:
+    """
+    Transazione che aggiunge a ogni query il parametro ``$graph`` (versione
+    corrente) e converte gli id dei talk nel tipo usato da quella versione.
+    """
+
+    def __init__(self, tx, version, id_type):
+        self._tx = tx
+        self.graph_version = version
+        self.id_type = id_type
+
+    def talk_id(self, value):
+        return ids.store_id(value, self.id_type)
+
+    def talk_ids(self, values):
+        return ids.store_ids(values, self.id_type)
+
+    def run(self, query, parameters=None, **kwargs):
+        return self._tx.run(query, parameters, graph=self.graph_version, **kwargs)
+
+
+def graph_version(session=None):
+    """
+    (versione, tipo degli id) correnti del grafo, letti dal puntatore al più ogni
+    GRAPH_VERSION_REFRESH_SECONDS: tutte le query di una richiesta usano la stessa.
+    """
+    now = time.monotonic()
+    checked_at = _graph_version['checked_at']
+    if checked_at is not None and now - checked_at < GRAPH_VERSION_REFRESH_SECONDS:
+        return _graph_version['version'], _graph_version['id_type']
+    try:
+        version, id_type = (session or _get_session()).execute_read(graph_versions.read_served)
+    except graph_versions.GraphNotVersionedError as e:
+        # Errore di ordine del deploy: ben visibile nei log, e nessuna risposta vuota ai client
+        print(f"ERRORE: {e}. Le letture da Neo4j restano disabilitate finché il puntatore non esiste.")
+        raise
+    with _graph_version_lock:
+        if version != _graph_version['version'] and _graph_version['version'] is not None:
+            print(f"Versione del grafo cambiata: {_graph_version['version']} -> {version}")
+        _graph_version.update(version=version, id_type=id_type, checked_at=now)
+    return version, id_type
+
+
+def _read(work, args, kwargs):
+    session = _get_session()
+    version, id_type = graph_version(session)
+    return session.execute_read(lambda tx: work(_GraphTransaction(tx, version, id_type), *args, **kwargs))
+
+
+def execute_read(work, *args, **kwargs):
+    """
+    Esegue ``work(tx, *args, **kwargs)`` in una transazione di lettura sulla
+    sessione riutilizzata dal thread corrente. Le query di ``work`` ricevono il
+    parametro ``$graph`` con la versione corrente del grafo.
+
+    Se la connessione risulta morta (tipico dopo un freeze/thaw lungo) driver e
+    sessione vengono ricreati e la lettura viene ritentata una sola volta.
+    """
+    from neo4j.exceptions import ServiceUnavailable, SessionExpired
+
+    try:
+        return _read(work, args, kwargs)
+    except (ServiceUnavailable, SessionExpired) as e:
+        print(f"Connessione Neo4j non più valida ({e}), ricreo il driver e ritento.")
+        reset_neo4j_driver()
+    except Exception:
+        # Dopo un errore la sessione potrebbe avere una transazione pendente
+        _discard_session()
+        raise
+    try:
+        return _read(work, args, kwargs)
+    except (ServiceUnavailable, SessionExpired) as e:
+        _discard_session()
+        raise ConnectionError(f"Impossibile connettersi a Neo4j: {e}") from e
@@ -0,0 +1,116 @@
+"""
+Risposte JSON delle Lambda di lettura: selezione dei campi, serializzazione e
+compressione negoziata con il client.
+
+- ``fields=id,title`` (parse_fields): solo i campi richiesti, passati fino alla
+  RETURN delle query Cypher e alle colonne lette dallo snapshot; l'id è sempre
+  incluso. Senza il parametro la risposta è quella di sempre.
+- serializzazione compatta (dumps): orjson se installato nel layer (circa 7
+  volte più veloce), altrimenti json senza spazi; stessi dati, meno byte.
+- compressione (json_response): br se il client la accetta e il pacchetto brotli
+  è nel layer, altrimenti gzip; solo sopra RESPONSE_MIN_COMPRESS_BYTES, perché
+  sotto l'intestazione costa più di quanto si risparmia. Il corpo compresso è
+  restituito in base64 (isBase64Encoded), come in get-neighbourhood: API
+  Gateway deve avere */* tra i binary media types.
+"""
+
+import base64
+import gzip
+import json
+import os
+
+RESPONSE_MIN_COMPRESS_BYTES = int(os.environ.get("RESPONSE_MIN_COMPRESS_BYTES", "1024"))
+# Livelli veloci: la risposta viene compressa a ogni richiesta. Con i payload di
+# k-hop e talks-by-tags (benchmarks/bench_responses.py) br 5 comprime come gzip 6
+# nel tempo di gzip 5; i livelli massimi costano decine di ms per qualche punto in meno.
+GZIP_LEVEL = int(os.environ.get("RESPONSE_GZIP_LEVEL", "5"))
+BROTLI_QUALITY = int(os.environ.get("RESPONSE_BROTLI_QUALITY", "5"))
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def available_encodings():
+    """Codifiche supportate, in ordine di preferenza."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def parse_fields(value, allowed):
+    """
+    Campi richiesti con ``fields`` ("id,title" o lista), nell'ordine di
+    ``allowed``; tutti se il parametro manca. ValueError per un campo sconosciuto.
+    """
+    if not value:
+        return tuple(allowed)
+    requested = {field.strip() for field in (value.split(",") if isinstance(value, str) else value) if field.strip()}
+    unknown = requested.difference(allowed)
+    if unknown:
+        raise ValueError(f'Unknown fields: {", ".join(sorted(unknown))} (allowed: {", ".join(allowed)})')
+    return tuple(field for field in allowed if field == "id" or field in requested)
+
+
+def _default(value):
+    return str(value)
+
+
+def dumps(payload):
+    """JSON compatto in byte UTF-8."""
+    if orjson is not None:
+        # I datetime passano da _default come con json: stesso testo nelle risposte
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+    # ensure_ascii (predefinito) è il percorso più veloce dell'encoder C
+    return json.dumps(payload, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def header(event, name):
+    for key, value in ((event or {}).get("headers") or {}).items():
+        if key.lower() == name:
+            return value or ""
+    return ""
+
+
+def negotiate_encoding(event):
+    """Codifica da usare secondo Accept-Encoding (con i pesi q); None se nessuna."""
+    accepted = {}
+    for item in header(event, "accept-encoding").split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, number = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(number)
+                except ValueError:
+                    quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    candidates = [encoding for encoding in available_encodings()
+                  if accepted.get(encoding, accepted.get("*", 0.0)) > 0]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda encoding: accepted.get(encoding, accepted.get("*", 0.0)))
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def json_response(event, status_code, payload, headers=None):
+    """Risposta API Gateway con ``payload`` serializzato e, se conviene, compresso."""
+    body = dumps(payload)
+    headers = {**(headers or {}), "Content-Type": "application/json", "Vary": "Accept-Encoding"}
+    encoding = negotiate_encoding(event) if len(body) >= RESPONSE_MIN_COMPRESS_BYTES else None
+    if encoding is None:
+        return {"statusCode": status_code, "headers": headers, "body": body.decode("utf-8")}
+    headers["Content-Encoding"] = encoding
+    return {"statusCode": status_code, "headers": headers, "isBase64Encoded": True,
+            "body": base64.b64encode(compress(body, encoding)).decode("ascii")}
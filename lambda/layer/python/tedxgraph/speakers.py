@@ -0,0 +1,58 @@
+"""
+Speaker dei talk: nomi normalizzati condivisi da neo4jLink, snapshot del grafo e Lambda.
+
+Nel dataset ``speakers`` è una stringa copiata su ogni talk ("Brené Brown",
+"Jane Doe, John Roe"). Il job neo4jLink crea un nodo (:Speaker {key, name}) per
+ogni nome normalizzato e gli archi (:Speaker)-[:GAVE]->(:Talk); come i nodi
+:Keyword, gli speaker sono condivisi tra le versioni del grafo, gli archi GAVE
+partono verso i talk di una versione. Lo snapshot del grafo ha le stesse liste
+(speaker di ogni talk, talk di ogni speaker) calcolate con le stesse funzioni.
+
+La chiave (speaker_key) ignora maiuscole, accenti, punteggiatura e spazi
+ripetuti: "Brené  Brown" e "brene brown" sono lo stesso speaker. Il nome
+mostrato è quello originale.
+"""
+
+import re
+import unicodedata
+
+# Frammenti che dopo una virgola completano il nome precedente ("Martin Luther King, Jr.")
+NAME_SUFFIXES = {"jr", "sr", "ii", "iii", "iv", "phd", "md"}
+
+_SEPARATORS_RE = re.compile(r"[,;]")
+_NON_ALNUM_RE = re.compile(r"[^0-9a-z]+")
+
+
+def speaker_key(name):
+    """Chiave normalizzata di un nome ("" se non contiene lettere o cifre)."""
+    decomposed = unicodedata.normalize("NFKD", str(name))
+    ascii_name = "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+    return _NON_ALNUM_RE.sub(" ", ascii_name).strip()
+
+
+def split_speakers(value):
+    """Nomi degli speaker di un talk (stringa separata da virgole o lista), senza duplicati."""
+    if value is None:
+        return []
+    parts = []
+    for item in (value if isinstance(value, (list, tuple)) else [value]):
+        for part in _SEPARATORS_RE.split(str(item)):
+            part = " ".join(part.split())
+            if not part:
+                continue
+            if parts and speaker_key(part) in NAME_SUFFIXES:
+                parts[-1] = f"{parts[-1]}, {part}"
+            else:
+                parts.append(part)
+    names, seen = [], set()
+    for part in parts:
+        key = speaker_key(part)
+        if key and key not in seen:
+            seen.add(key)
+            names.append(part)
+    return names
+
+
+def talk_speakers(value):
+    """[(chiave, nome)] degli speaker di un talk."""
+    return [(speaker_key(name), name) for name in split_speakers(value)]
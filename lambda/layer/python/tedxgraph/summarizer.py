@@ -0,0 +1,709 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+from tedxgraph import ids, mongo_runtime, transcript_codec
+
+HUGGINGFACE_API_TOKEN = os.environ.get("HUGGINGFACE_API_TOKEN")
+HF_MODEL_ID = os.environ.get("HF_MODEL_ID", "mistralai/Mistral-7B-Instruct-v0.3") # O un altro modello adatto per riassunti
+# Sovrascrivibile per puntare a un endpoint locale che simula il modello (test/benchmark)
+HF_API_BASE_URL = os.environ.get("HF_API_BASE_URL", "https://api-inference.huggingface.co/models")
+
+SUMMARIES_COLLECTION_NAME = os.environ.get("SUMMARIES_COLLECTION_NAME", "summaries")
+SUMMARY_REQUESTS_COLLECTION_NAME = os.environ.get("SUMMARY_REQUESTS_COLLECTION_NAME", "summary_requests")
+SUMMARY_CHUNKS_COLLECTION_NAME = os.environ.get("SUMMARY_CHUNKS_COLLECTION_NAME", "summary_chunks")
+SUMMARY_CACHE_ENABLED = os.environ.get("SUMMARY_CACHE_ENABLED", "true").lower() == "true"
+
+# Budget (in token stimati) dei prompt: i transcript entro SUMMARY_SINGLE_PASS_TOKENS
+# vengono riassunti con una sola chiamata, quelli più lunghi vengono divisi in blocchi
+# da SUMMARY_CHUNK_TOKENS, riassunti in parallelo (map) e poi uniti (reduce).
+SUMMARY_SINGLE_PASS_TOKENS = int(os.environ.get("SUMMARY_SINGLE_PASS_TOKENS", "3000"))
+SUMMARY_CHUNK_TOKENS = int(os.environ.get("SUMMARY_CHUNK_TOKENS", "1500"))
+SUMMARY_MAP_CONCURRENCY = int(os.environ.get("SUMMARY_MAP_CONCURRENCY", "4"))
+CHUNK_SUMMARY_MAX_TOKENS = 150
+# Sotto questa quota per riassunto parziale il prompt finale non avrebbe più senso
+MIN_PARTIAL_SUMMARY_TOKENS = 20
+
+# Da incrementare ad ogni modifica del prompt o dei parametri di generazione:
+# le voci in cache con la versione precedente smettono semplicemente di essere usate.
+# PROMPT_VERSION riguarda il riassunto finale (passaggio singolo o reduce),
+# MAP_PROMPT_VERSION i riassunti dei singoli blocchi, che hanno una cache propria:
+# cambiare solo il prompt finale non costringe a riassumere di nuovo i blocchi.
+PROMPT_VERSION = "2"
+MAP_PROMPT_VERSION = "1"
+
+def get_talk_details_from_mongodb(talk_id_str):
+    """
+    Recupera i dettagli del talk da MongoDB usando un ID stringa.
+    """
+    collection = mongo_runtime.get_talks_collection()
+    if collection is None:
+        return None
+
+    try:
+        # _id è "567505" (stringa) o 567505 (int64, tedXjob con --TYPED_IDS): vedi ids.py
+        # Se talk_id_str fosse un ObjectId valido, la query sarebbe ObjectId(talk_id_str)
+        query = {"_id": ids.store_id(talk_id_str)}
+
+        print(f"Esecuzione query su MongoDB: {query} nella collezione {collection.name}")
+        # Servono solo titolo e transcript (in chiaro o compresso, vedi transcript_codec):
+        # evita di trasferire il resto del documento
+        document = collection.find_one(query, {"title": 1, **transcript_codec.TRANSCRIPT_PROJECTION})
+
+        if document:
+            print(f"Documento trovato in MongoDB per l'ID {talk_id_str}")
+            # Se _id fosse un ObjectId, convertirlo in stringa per la serializzazione JSON
+            from bson.objectid import ObjectId
+            if '_id' in document and isinstance(document['_id'], ObjectId):
+                document['_id'] = str(document['_id'])
+            return document
+        else:
+            print(f"Nessun documento trovato in MongoDB per l'ID: {talk_id_str} con la query {query}")
+            return None
+    except Exception as e: # Potrebbe includere bson.errors.InvalidId se si tentasse di convertire una stringa non valida in ObjectId
+        print(f"Errore durante l'accesso a MongoDB o ID non valido: {e}")
+        return None
+
+def build_summary_prompt(title, transcript_content):
+    # Nuovo prompt per il riassunto in inglese, basato sul transcript
+    return f"""
+    [INST] You are an expert assistant skilled in summarizing talk content.
+    Talk Title: "{title}"
+    Talk Transcript: "{transcript_content}"
+
+    Please provide a concise summary of the main topics and key points
+    discussed in this talk, based on the provided title and transcript.
+    The summary MUST be in English.
+    Focus on extracting the core message and relevant information.
+    The output should be only the summary text, without any preamble like "Here is the summary:". [/INST]
+    """
+
+
+def build_chunk_prompt(title, chunk_text):
+    # Fase "map": riassunto di una sola parte del transcript
+    return f"""
+    [INST] You are an expert assistant skilled in summarizing talk content.
+    Talk Title: "{title}"
+    Transcript excerpt: "{chunk_text}"
+
+    This is only one part of the talk. Summarize the key points made in this excerpt
+    in a few sentences, in English, without adding information that is not in the text.
+    The output should be only the summary text, without any preamble. [/INST]
+    """
+
+
+def build_reduce_prompt(title, partial_summaries):
+    # Fase "reduce": unisce i riassunti parziali (in ordine) nel riassunto finale
+    numbered = "\n".join(f"{i}. {text}" for i, text in enumerate(partial_summaries, start=1))
+    return f"""
+    [INST] You are an expert assistant skilled in summarizing talk content.
+    Talk Title: "{title}"
+    Summaries of consecutive parts of the talk:
+    {numbered}
+
+    Please provide a concise summary of the main topics and key points
+    discussed in this talk, based on the provided title and partial summaries.
+    The summary MUST be in English.
+    Focus on extracting the core message and relevant information.
+    The output should be only the summary text, without any preamble like "Here is the summary:". [/INST]
+    """
+
+
+# Modificata: nome, parametri, prompt, parametri modello
+def get_huggingface_summary(title, transcript_content):
+    """
+    Chiama le API di Hugging Face Inference per ottenere un riassunto del transcript
+    in un solo passaggio (transcript che rientra nel budget del prompt).
+    """
+    transcript_preview = transcript_content[:100] + "..." if len(transcript_content) > 100 else transcript_content
+    print(f"Payload (title: '{title}', transcript_preview: '{transcript_preview}', ...)")
+    return call_huggingface(build_summary_prompt(title, transcript_content))
+
+
+def call_huggingface(prompt_content, max_new_tokens=350, wait_for_model=True):
+    """
+    Invia un prompt all'Inference API di Hugging Face e restituisce il testo generato.
+    In caso di errore restituisce un messaggio leggibile (riconosciuto da summary_error_status).
+    """
+    if not HUGGINGFACE_API_TOKEN:
+        print("Errore: HUGGINGFACE_API_TOKEN non impostato.")
+        return "Configurazione API mancante."
+    if not HF_MODEL_ID:
+        print("Errore: HF_MODEL_ID non impostato.")
+        return "Configurazione modello mancante."
+
+    api_url = f"{HF_API_BASE_URL}/{HF_MODEL_ID}"
+    headers = {"Authorization": f"Bearer {HUGGINGFACE_API_TOKEN}"}
+
+    payload = {
+        "inputs": prompt_content,
+        "parameters": {
+            "max_new_tokens": max_new_tokens, # Adattato per un riassunto (es. ~250-500 parole)
+            "temperature": 0.6,         # Leggermente più basso per riassunti fattuali
+            "return_full_text": False,  # Solo il testo generato
+        },
+        "options": {
+            "use_cache": True,
+            "wait_for_model": wait_for_model
+        }
+    }
+
+    print(f"Invio richiesta a Hugging Face API: {api_url} per il modello {HF_MODEL_ID}")
+
+    import requests
+
+    try:
+        response = requests.post(api_url, headers=headers, json=payload, timeout=55) # Timeout per Lambda
+
+        print(f"Hugging Face API Response Status Code: {response.status_code}")
+        # print(f"Hugging Face API Response Headers: {response.headers}") # Può essere verboso
+        
+        response_text_preview = response.text[:500] if response.text else "VUOTO"
+        print(f"Hugging Face API Response Text (preview): '{response_text_preview}'")
+
+        if response.status_code == 200:
+            try:
+                result = response.json()
+                if isinstance(result, list) and len(result) > 0 and "generated_text" in result[0]:
+                    return result[0]["generated_text"].strip()
+                elif isinstance(result, dict) and "generated_text" in result: # Alcuni modelli restituiscono un dict
+                    return result["generated_text"].strip()
+                elif isinstance(result, dict) and "error" in result:
+                    error_msg = result.get("error")
+                    estimated_time = result.get("estimated_time")
+                    warnings = result.get("warnings")
+                    log_msg = f"Hugging Face API ha restituito 200 OK ma con errore JSON (riassunto): {error_msg}"
+                    if warnings: log_msg += f" Warnings: {warnings}"
+                    print(log_msg)
+                    if "Model" in error_msg and "is currently loading" in error_msg and estimated_time is not None:
+                        return f"Il modello ({HF_MODEL_ID}) è in fase di caricamento per il riassunto (stimato: {estimated_time}s). Riprova tra poco."
+                    return f"Errore da Hugging Face (contenuto in JSON) durante il riassunto: {error_msg}"
+                else:
+                    print(f"Risposta JSON 200 OK inattesa da Hugging Face API per riassunto: {result}")
+                    return "Risposta inattesa dal servizio di riassunto."
+            except json.JSONDecodeError as e:
+                print(f"Errore nel decodificare la risposta JSON (status 200) da Hugging Face API per riassunto: {e}")
+                print(f"Testo della risposta che ha causato l'errore: '{response.text}'")
+                return "Errore di comunicazione con il servizio di riassunto (JSON malformato)."
+        
+        elif response.status_code == 401:
+            print(f"Errore di autenticazione (401) con Hugging Face API (riassunto). Controlla HUGGINGFACE_API_TOKEN. Dettagli: {response.text}")
+            return "Errore di autenticazione con il servizio di riassunto."
+        elif response.status_code == 429:
+            print(f"Rate limit superato (429) per Hugging Face API (riassunto). Dettagli: {response.text}")
+            return "Limite richieste al servizio di riassunto superato. Riprova più tardi."
+        elif response.status_code == 503:
+            print(f"Modello Hugging Face ({HF_MODEL_ID}) non disponibile o in caricamento (503) (riassunto). Dettagli: {response.text}")
+            try:
+                error_detail = response.json()
+                if isinstance(error_detail, dict) and "error" in error_detail:
+                    error_msg = error_detail.get("error")
+                    estimated_time = error_detail.get("estimated_time")
+                    if "Model" in error_msg and "is currently loading" in error_msg and estimated_time is not None:
+                        return f"Il modello ({HF_MODEL_ID}) per il riassunto è in fase di caricamento (stimato: {estimated_time}s). Riprova tra poco."
+                    return f"Servizio di riassunto temporaneamente non disponibile: {error_msg}"
+            except json.JSONDecodeError:
+                 return f"Servizio di riassunto temporaneamente non disponibile (503). Dettagli: {response.text[:200]}" # Mostra parte del testo se non è JSON
+            return "Servizio di riassunto temporaneamente non disponibile (503)." # Fallback
+        else:
+            print(f"Errore HTTP {response.status_code} da Hugging Face API (riassunto). Dettagli: {response.text}")
+            return f"Errore {response.status_code} dal servizio di riassunto. Dettagli: {response.text[:200]}"
+
+    except requests.exceptions.Timeout:
+        print("Timeout durante la chiamata a Hugging Face API per riassunto.")
+        return "Il servizio di riassunto ha impiegato troppo tempo a rispondere."
+    except requests.exceptions.RequestException as req_err:
+        print(f"Errore di richiesta generico con Hugging Face API per riassunto: {req_err}")
+        return "Errore di connessione con il servizio di riassunto."
+    except Exception as e:
+        print(f"Errore generico non gestito durante la generazione del riassunto con Hugging Face: {e}")
+        import traceback
+        traceback.print_exc()
+        return "Errore imprevisto durante la generazione del riassunto."
+
+
+def check_model_ready():
+    """
+    Verifica, senza attendere, se il modello è caricato su Hugging Face.
+    Restituisce (pronto, secondi_stimati_di_caricamento). In caso di dubbio
+    (errori di rete, risposte inattese) considera il modello pronto e lascia
+    che sia la chiamata vera a gestire l'errore.
+    """
+    if not HUGGINGFACE_API_TOKEN or not HF_MODEL_ID:
+        return True, None
+    import requests
+
+    payload = {
+        "inputs": "ping",
+        "parameters": {"max_new_tokens": 1, "return_full_text": False},
+        "options": {"use_cache": True, "wait_for_model": False}
+    }
+    try:
+        response = requests.post(
+            f"{HF_API_BASE_URL}/{HF_MODEL_ID}",
+            headers={"Authorization": f"Bearer {HUGGINGFACE_API_TOKEN}"},
+            json=payload,
+            timeout=10,
+        )
+        if response.status_code == 503:
+            detail = response.json()
+            if isinstance(detail, dict) and "is currently loading" in str(detail.get("error", "")):
+                return False, detail.get("estimated_time")
+    except Exception as e:
+        print(f"Warning: verifica dello stato del modello fallita: {e}")
+    return True, None
+
+
+def transcript_hash(transcript_content):
+    return hashlib.sha256(transcript_content.encode("utf-8")).hexdigest()
+
+
+def pipeline_version():
+    """Versione del riassunto finale: prompt e parametri che ne cambiano il risultato."""
+    return f"{PROMPT_VERSION}.{MAP_PROMPT_VERSION}.{SUMMARY_SINGLE_PASS_TOKENS}.{SUMMARY_CHUNK_TOKENS}"
+
+
+def summary_cache_key(talk_id, transcript_digest, model_id=None, prompt_version=None):
+    """
+    Chiave della cache dei riassunti: cambia se cambia il transcript, il modello
+    o la versione del prompt, quindi una voce trovata è sempre ancora valida.
+    """
+    raw_key = f"{talk_id}|{transcript_digest}|{model_id or HF_MODEL_ID}|{prompt_version or pipeline_version()}"
+    return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+
+def get_cached_summary(cache_key):
+    if not SUMMARY_CACHE_ENABLED:
+        return None
+    collection = mongo_runtime.get_collection(SUMMARIES_COLLECTION_NAME)
+    if collection is None:
+        return None
+    try:
+        return collection.find_one({"_id": cache_key}, {"summary": 1, "created_at": 1})
+    except Exception as e:
+        # Un problema della cache non deve impedire di generare il riassunto
+        print(f"Warning: lettura della cache dei riassunti fallita: {e}")
+        return None
+
+
+def store_summary(cache_key, talk_id, transcript_digest, summary_text):
+    if not SUMMARY_CACHE_ENABLED:
+        return
+    collection = mongo_runtime.get_collection(SUMMARIES_COLLECTION_NAME)
+    if collection is None:
+        return
+    try:
+        collection.replace_one(
+            {"_id": cache_key},
+            {
+                "_id": cache_key,
+                "talk_id": talk_id,
+                "transcript_hash": transcript_digest,
+                "model_id": HF_MODEL_ID,
+                "prompt_version": pipeline_version(),
+                "summary": summary_text,
+                "created_at": datetime.now(timezone.utc),
+            },
+            upsert=True,
+        )
+    except Exception as e:
+        print(f"Warning: scrittura della cache dei riassunti fallita: {e}")
+
+
+def record_summary_request(talk_id):
+    """
+    Conta le richieste per talk: il job di precalcolo parte dai talk più richiesti.
+    La scrittura è "fire and forget" (w=0) per non aggiungere latenza alla risposta.
+    """
+    collection = mongo_runtime.get_collection(SUMMARY_REQUESTS_COLLECTION_NAME)
+    if collection is None:
+        return
+    try:
+        from pymongo import WriteConcern
+
+        collection.with_options(write_concern=WriteConcern(w=0)).update_one(
+            {"_id": talk_id},
+            {"$inc": {"count": 1}, "$set": {"last_requested_at": datetime.now(timezone.utc)}},
+            upsert=True,
+        )
+    except Exception as e:
+        print(f"Warning: impossibile registrare la richiesta di riassunto: {e}")
+
+
+def summary_error_status(summary_text):
+    """
+    Controllo robusto del risultato della generazione del riassunto.
+    Restituisce None se il testo è un riassunto valido, altrimenti lo status HTTP da usare.
+    """
+    # I messaggi di errore specifici sono già restituiti da get_huggingface_summary
+    # Qui si verifica se la stringa restituita indica un errore noto
+    is_error_string = False
+    if summary_text:
+        summary_lower = summary_text.lower()
+        error_keywords = ["errore", "temporaneamente non disponibile", "caricamento", "mancante", "autenticazione", "limite richieste"]
+        if any(keyword in summary_lower for keyword in error_keywords):
+            is_error_string = True
+
+    if summary_text and not is_error_string:
+        return None
+
+    status_code = 503 if summary_text and ("caricamento" in summary_text.lower() or "temporaneamente non disponibile" in summary_text.lower()) else 500
+    if summary_text and ("configurazione" in summary_text.lower() or "mancante" in summary_text.lower() or "autenticazione" in summary_text.lower()):
+        status_code = 500 # Errore di configurazione o autenticazione server-side
+    return status_code
+
+
+def estimate_tokens(text):
+    # Stima grossolana (circa 4 caratteri per token in inglese): evita di caricare un tokenizer
+    return max(1, len(text) // 4)
+
+
+def _split_long_cue(cue, token_budget):
+    if estimate_tokens(cue) <= token_budget:
+        yield cue
+        return
+    words, current = cue.split(), []
+    for word in words:
+        if current and estimate_tokens(" ".join(current + [word])) > token_budget:
+            yield " ".join(current)
+            current = []
+        current.append(word)
+    if current:
+        yield " ".join(current)
+
+
+def split_transcript(transcript_content, token_budget=None):
+    """
+    Divide il transcript in blocchi di al più ``token_budget`` token (stimati),
+    tagliando ai confini dei cue: il job Glue scrive un cue per riga.
+    Solo un cue più lungo dell'intero budget viene spezzato tra due parole.
+    """
+    token_budget = token_budget or SUMMARY_CHUNK_TOKENS
+    chunks, current, current_tokens = [], [], 0
+    for cue in transcript_content.split("\n"):
+        cue = cue.strip()
+        if not cue:
+            continue
+        for piece in _split_long_cue(cue, token_budget):
+            piece_tokens = estimate_tokens(piece)
+            if current and current_tokens + piece_tokens > token_budget:
+                chunks.append("\n".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += piece_tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def chunk_cache_key(title, chunk_text, model_id=None):
+    raw_key = f"{title}|{hashlib.sha256(chunk_text.encode('utf-8')).hexdigest()}|{model_id or HF_MODEL_ID}|{MAP_PROMPT_VERSION}"
+    return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+
+def get_cached_chunk_summaries(cache_keys):
+    if not SUMMARY_CACHE_ENABLED or not cache_keys:
+        return {}
+    collection = mongo_runtime.get_collection(SUMMARY_CHUNKS_COLLECTION_NAME)
+    if collection is None:
+        return {}
+    try:
+        # Una sola query per tutti i blocchi del talk
+        return {doc["_id"]: doc["summary"] for doc in collection.find({"_id": {"$in": cache_keys}}, {"summary": 1})}
+    except Exception as e:
+        print(f"Warning: lettura della cache dei blocchi fallita: {e}")
+        return {}
+
+
+def store_chunk_summaries(entries):
+    if not SUMMARY_CACHE_ENABLED or not entries:
+        return
+    collection = mongo_runtime.get_collection(SUMMARY_CHUNKS_COLLECTION_NAME)
+    if collection is None:
+        return
+    try:
+        from pymongo import ReplaceOne
+
+        now = datetime.now(timezone.utc)
+        collection.bulk_write(
+            [
+                ReplaceOne(
+                    {"_id": cache_key},
+                    {"_id": cache_key, "model_id": HF_MODEL_ID, "prompt_version": MAP_PROMPT_VERSION,
+                     "summary": summary_text, "created_at": now},
+                    upsert=True,
+                )
+                for cache_key, summary_text in entries
+            ],
+            ordered=False,
+        )
+    except Exception as e:
+        print(f"Warning: scrittura della cache dei blocchi fallita: {e}")
+
+
+def _call_concurrently(prompts, max_new_tokens, on_result=None):
+    """
+    Esegue i prompt in parallelo (al più SUMMARY_MAP_CONCURRENCY alla volta), risultati in ordine.
+    ``on_result(indice, testo)`` viene chiamata man mano che le risposte arrivano.
+    """
+    results = [None] * len(prompts)
+    with ThreadPoolExecutor(max_workers=max(1, min(SUMMARY_MAP_CONCURRENCY, len(prompts)))) as executor:
+        futures = {executor.submit(call_huggingface, prompt, max_new_tokens): i for i, prompt in enumerate(prompts)}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+            if on_result:
+                on_result(futures[future], results[futures[future]])
+    return results
+
+
+def summarize_chunks(title, chunks, progress=None):
+    """
+    Fase "map": riassume i blocchi in parallelo, riusando quelli già in cache.
+    Restituisce (riassunti_in_ordine, None) oppure (None, messaggio_di_errore).
+    I blocchi riusciti vengono salvati anche se altri falliscono: un nuovo
+    tentativo rielabora solo quelli mancanti.
+
+    ``progress(parziali)`` riceve la lista dei riassunti dei blocchi (None per
+    quelli non ancora pronti) ogni volta che un blocco viene completato.
+    """
+    cache_keys = [chunk_cache_key(title, chunk) for chunk in chunks]
+    summaries = get_cached_chunk_summaries(cache_keys)
+    missing = [i for i, key in enumerate(cache_keys) if key not in summaries]
+    print(f"Blocchi del transcript: {len(chunks)} (in cache: {len(chunks) - len(missing)})")
+
+    def report(index=None, summary_text=None):
+        if progress is None:
+            return
+        if index is not None and summary_error_status(summary_text) is None:
+            summaries[cache_keys[index]] = summary_text
+        progress([summaries.get(key) for key in cache_keys])
+
+    first_error = None
+    if missing:
+        report()
+        prompts = [build_chunk_prompt(title, chunks[i]) for i in missing]
+        results = _call_concurrently(prompts, CHUNK_SUMMARY_MAX_TOKENS, on_result=lambda j, text: report(missing[j], text))
+        new_entries = []
+        for i, summary_text in zip(missing, results):
+            if summary_error_status(summary_text) is not None:
+                first_error = first_error or summary_text or "Errore sconosciuto dal servizio di riassunto."
+                continue
+            summaries[cache_keys[i]] = summary_text
+            new_entries.append((cache_keys[i], summary_text))
+        store_chunk_summaries(new_entries)
+
+    if first_error:
+        return None, first_error
+    return [summaries[key] for key in cache_keys], None
+
+
+def fit_partial_summaries(partial_summaries, token_budget):
+    """
+    Accorcia ogni riassunto parziale alla stessa quota di token (tagliando tra
+    due parole) perché insieme stiano in ``token_budget``: tutte le parti del
+    talk restano rappresentate. None se la quota sarebbe sotto MIN_PARTIAL_SUMMARY_TOKENS.
+    """
+    # Una riga in meno di quota per ogni riassunto copre i "\n" che li separano
+    share = (token_budget - len(partial_summaries)) // len(partial_summaries)
+    if share < MIN_PARTIAL_SUMMARY_TOKENS:
+        return None
+    fitted = []
+    for text in partial_summaries:
+        if estimate_tokens(text) > share:
+            cut = text[:share * 4]
+            text = cut.rsplit(" ", 1)[0] if " " in cut else cut
+        fitted.append(text)
+    return fitted
+
+
+def reduce_summaries(title, partial_summaries):
+    """
+    Fase "reduce": unisce i riassunti parziali. Se insieme superano il budget di un
+    prompt vengono prima uniti a gruppi, su più livelli; se non basta (riassunti
+    già più lunghi di un gruppo) sono accorciati con fit_partial_summaries.
+    Il prompt finale non supera mai SUMMARY_SINGLE_PASS_TOKENS.
+    """
+    while len(partial_summaries) > 1 and estimate_tokens("\n".join(partial_summaries)) > SUMMARY_SINGLE_PASS_TOKENS:
+        groups, current, current_tokens = [], [], 0
+        for text in partial_summaries:
+            tokens = estimate_tokens(text)
+            if current and current_tokens + tokens > SUMMARY_CHUNK_TOKENS:
+                groups.append(current)
+                current, current_tokens = [], 0
+            current.append(text)
+            current_tokens += tokens
+        groups.append(current)
+        if len(groups) == len(partial_summaries):
+            # Ogni riassunto supera già da solo il budget: ulteriori livelli non servono
+            break
+        print(f"Reduce intermedio: {len(partial_summaries)} riassunti in {len(groups)} gruppi")
+        merged = _call_concurrently([build_reduce_prompt(title, group) for group in groups], CHUNK_SUMMARY_MAX_TOKENS * 2)
+        for text in merged:
+            if summary_error_status(text) is not None:
+                return text
+        partial_summaries = merged
+    if estimate_tokens("\n".join(partial_summaries)) > SUMMARY_SINGLE_PASS_TOKENS:
+        fitted = fit_partial_summaries(partial_summaries, SUMMARY_SINGLE_PASS_TOKENS)
+        if fitted is None:
+            return (f"Errore: {len(partial_summaries)} riassunti parziali non stanno nel prompt finale "
+                    f"({SUMMARY_SINGLE_PASS_TOKENS} token).")
+        print(f"Reduce finale: {len(partial_summaries)} riassunti parziali accorciati per stare nel budget del prompt.")
+        partial_summaries = fitted
+    return call_huggingface(build_reduce_prompt(title, partial_summaries))
+
+
+def generate_summary(title, transcript_content, progress=None):
+    """
+    Genera il riassunto: una sola chiamata per i transcript brevi, map-reduce sui
+    blocchi per quelli lunghi (che altrimenti supererebbero il contesto del modello).
+    ``progress`` riceve i riassunti parziali dei blocchi (vedi summarize_chunks).
+    """
+    if estimate_tokens(transcript_content) <= SUMMARY_SINGLE_PASS_TOKENS:
+        return get_huggingface_summary(title, transcript_content)
+
+    chunks = split_transcript(transcript_content)
+    print(f"Transcript lungo ({estimate_tokens(transcript_content)} token stimati): riassunto map-reduce su {len(chunks)} blocchi.")
+    partial_summaries, error = summarize_chunks(title, chunks, progress=progress)
+    if error:
+        return error
+    return reduce_summaries(title, partial_summaries)
+
+
+# Generazioni in corso in questo processo, per chiave di cache: richieste
+# concorrenti per lo stesso talk (es. thread del router o del precalcolo)
+# condividono un'unica chiamata al modello.
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def _single_flight(key, work):
+    with _inflight_lock:
+        future = _inflight.get(key)
+        is_owner = future is None
+        if is_owner:
+            future = Future()
+            _inflight[key] = future
+    if not is_owner:
+        print("Riassunto già in generazione in questo processo: attendo il risultato.")
+        return future.result()
+    try:
+        result = work()
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+def load_talk_for_summary(talk_id):
+    """
+    Recupera titolo e transcript del talk.
+    Restituisce (None, talk_details) oppure ((status_code, body), None) in caso di errore.
+    """
+    print(f"Recupero dettagli per l'ID (stringa): {talk_id} da MongoDB.")
+    talk_details = get_talk_details_from_mongodb(talk_id)
+
+    if not talk_details:
+        print(f"Nessun talk trovato con ID: {talk_id} nel database.")
+        return (404, {'error': f"Nessun talk trovato con ID: {talk_id} nel database."}), None
+
+    title = talk_details.get("title")
+    # La trascrizione viene decompressa solo se serve (riassunto non in cache)
+    has_transcript = transcript_codec.has_transcript(talk_details)
+
+    if not title or not has_transcript:
+        missing_fields = []
+        if not title: missing_fields.append("'title'")
+        if not has_transcript: missing_fields.append("'transcript'")
+        error_message = f"Dati { ' e '.join(missing_fields) } mancanti per il talk ID: {talk_id} nel database."
+        print(error_message)
+        # Logga il documento per aiutare a diagnosticare perché i campi sono mancanti
+        print(f"Documento recuperato da MongoDB (ID: {talk_id}): {json.dumps(talk_details, default=str)}") 
+        return (400, {'error': error_message}), None
+
+    return None, talk_details
+
+
+def _summary_response(talk_id, talk_details, summary_text, cached):
+    # Modifica: aggiorna response_body
+    return {
+        "talk_id_requested": talk_id,
+        "mongodb_document_id": talk_details.get("_id"), # _id dovrebbe essere già stringa
+        "original_title": talk_details.get("title"),
+        # "original_transcript_preview": transcript_content[:200] + "..." if transcript_content else None, # Opzionale
+        "summary": summary_text, # Rinominato da "elaborazione"
+        "cached": cached,
+    }
+
+
+def lookup_cached_summary(talk_id):
+    """
+    Consulta solo la cache, senza mai chiamare il modello.
+    Restituisce (risultato, transcript_digest): risultato è (status_code, body)
+    se il riassunto è in cache o il talk non è riassumibile (digest None), None
+    se il riassunto deve ancora essere generato per il transcript ``transcript_digest``.
+    """
+    talk_id = str(talk_id)
+    error, talk_details = load_talk_for_summary(talk_id)
+    if error:
+        return error, None
+    transcript_digest = transcript_codec.transcript_digest(talk_details)
+    cached = get_cached_summary(summary_cache_key(talk_id, transcript_digest))
+    if cached and cached.get("summary"):
+        return (200, _summary_response(talk_id, talk_details, cached["summary"], True)), transcript_digest
+    return None, transcript_digest
+
+
+def summarize_talk(talk_id, record_request=True, progress=None):
+    """
+    Recupera il talk da MongoDB e ne restituisce il riassunto, dalla cache se
+    disponibile, altrimenti generandolo (e salvandolo in cache).
+    Restituisce una tupla (status_code, body) già pronta per la risposta HTTP.
+    """
+    # Assicura che talk_id sia una stringa, come sembra essere nel DB (_id: "567505")
+    talk_id = str(talk_id)
+
+    error, talk_details = load_talk_for_summary(talk_id)
+    if error:
+        return error
+
+    title = talk_details["title"]
+
+    if record_request:
+        record_summary_request(talk_id)
+
+    # L'hash è salvato insieme alla trascrizione compressa: la cache si consulta senza decomprimere
+    transcript_digest = transcript_codec.transcript_digest(talk_details)
+    cache_key = summary_cache_key(talk_id, transcript_digest)
+    cached = get_cached_summary(cache_key)
+
+    if cached and cached.get("summary"):
+        print(f"Riassunto trovato in cache per l'ID: {talk_id}")
+        return (200, _summary_response(talk_id, talk_details, cached["summary"], True))
+
+    transcript_content = transcript_codec.read_transcript(talk_details)
+
+    def generate_and_store():
+        print(f"Richiesta di riassunto a Hugging Face per il titolo: '{title}' (transcript preview: '{transcript_content[:100]}...')")
+        summary_text = generate_summary(title, transcript_content, progress=progress)
+        # Gli errori non vengono mai salvati: solo i riassunti validi finiscono in cache
+        if summary_error_status(summary_text) is None:
+            store_summary(cache_key, talk_id, transcript_digest, summary_text)
+        return summary_text
+
+    summary_text = _single_flight(cache_key, generate_and_store)
+
+    status_code = summary_error_status(summary_text)
+    if status_code is not None:
+        print(f"Impossibile ottenere il riassunto: {summary_text}")
+        error_body = {'error': f"Impossibile ottenere il riassunto. Dettaglio: {summary_text if summary_text else 'Errore sconosciuto dal servizio di riassunto.'}"}
+        return (status_code, error_body)
+
+    print(f"Riassunto generato con successo per l'ID: {talk_id}")
+    return (200, _summary_response(talk_id, talk_details, summary_text, False))
@@ -0,0 +1,336 @@
+"""
+Job asincroni per i riassunti AI.
+
+Invece di tenere aperta una Lambda fino a 55 s mentre il modello genera (o si
+carica), la richiesta crea un job e restituisce subito il suo id; un worker
+(Lambda collegata alla coda SQS) genera il riassunto e aggiorna il job, che il
+client interroga con polling (anche "long polling" tramite ``wait``).
+
+- Il job id dipende da talk, transcript (stesso digest della chiave della
+  cache dei riassunti), modello e versione del prompt: richieste duplicate per
+  lo stesso talk finiscono sullo stesso job e solo la prima lo mette in coda;
+  se il transcript cambia, il job (e il suo risultato) è un altro.
+- Il worker "prende in carico" il job con un aggiornamento atomico, quindi due
+  consegne dello stesso messaggio non producono due chiamate al modello.
+- Se il modello è in caricamento il job torna in coda con un ritardo pari al
+  tempo stimato, senza bloccare nessuna Lambda. Ogni presa in carico conta
+  come tentativo: dopo SUMMARY_JOB_MAX_ATTEMPTS il job finisce in "failed".
+- Durante il map-reduce i riassunti dei blocchi già pronti vengono salvati nel
+  job (campo ``partial``), così il client può mostrare un risultato parziale.
+
+Senza SUMMARY_QUEUE_URL viene usata una coda in memoria con un worker locale
+(test e sviluppo); senza MongoDB, uno store dei job in memoria.
+"""
+
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from tedxgraph import mongo_runtime, summarizer
+
+SUMMARY_QUEUE_URL = os.environ.get("SUMMARY_QUEUE_URL")
+SUMMARY_JOBS_COLLECTION_NAME = os.environ.get("SUMMARY_JOBS_COLLECTION_NAME", "summary_jobs")
+# Un job "running" il cui worker è sparito (timeout, crash) torna disponibile dopo il lease
+SUMMARY_JOB_LEASE_SECONDS = int(os.environ.get("SUMMARY_JOB_LEASE_SECONDS", "300"))
+SUMMARY_JOB_MAX_ATTEMPTS = int(os.environ.get("SUMMARY_JOB_MAX_ATTEMPTS", "5"))
+# Massimo ritardo di SQS (DelaySeconds) per i job in attesa del caricamento del modello
+MAX_QUEUE_DELAY_SECONDS = 900
+
+STATUS_QUEUED = "queued"
+STATUS_WAITING_MODEL = "waiting_model"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def summary_job_id(talk_id, transcript_digest):
+    raw_key = f"{talk_id}|{transcript_digest}|{summarizer.HF_MODEL_ID}|{summarizer.pipeline_version()}"
+    return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()[:32]
+
+
+# --- Store dei job ---
+
+class MongoJobStore:
+    """Job persistiti nella collezione summary_jobs."""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def create_if_absent(self, job_id, talk_id):
+        """Crea il job se non esiste. Restituisce True solo a chi lo ha creato."""
+        now = _now()
+        result = self.collection.update_one(
+            {"_id": job_id},
+            {"$setOnInsert": {"talk_id": talk_id, "status": STATUS_QUEUED, "attempts": 0,
+                              "partial": [], "created_at": now, "updated_at": now}},
+            upsert=True,
+        )
+        return result.upserted_id is not None
+
+    def get(self, job_id):
+        return self.collection.find_one({"_id": job_id})
+
+    def restart_failed(self, job_id):
+        """Rimette in coda un job fallito. True solo per chi effettua il cambio di stato."""
+        result = self.collection.update_one(
+            {"_id": job_id, "status": STATUS_FAILED},
+            {"$set": {"status": STATUS_QUEUED, "attempts": 0, "error": None, "updated_at": _now()}},
+        )
+        return result.modified_count == 1
+
+    def claim(self, job_id):
+        from pymongo import ReturnDocument
+
+        now = _now()
+        return self.collection.find_one_and_update(
+            {"_id": job_id, "$or": [
+                {"status": {"$in": [STATUS_QUEUED, STATUS_WAITING_MODEL]}},
+                {"status": STATUS_RUNNING, "lease_until": {"$lt": now}},
+            ]},
+            {"$set": {"status": STATUS_RUNNING, "lease_until": now + timedelta(seconds=SUMMARY_JOB_LEASE_SECONDS),
+                      "updated_at": now},
+             "$inc": {"attempts": 1}},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def update(self, job_id, **fields):
+        fields["updated_at"] = _now()
+        self.collection.update_one({"_id": job_id}, {"$set": fields})
+
+
+class InMemoryJobStore:
+    """Stessa interfaccia di MongoJobStore, in memoria (test e sviluppo locale)."""
+
+    def __init__(self):
+        self.jobs = {}
+        self._lock = threading.Lock()
+
+    def create_if_absent(self, job_id, talk_id):
+        with self._lock:
+            if job_id in self.jobs:
+                return False
+            now = _now()
+            self.jobs[job_id] = {"_id": job_id, "talk_id": talk_id, "status": STATUS_QUEUED, "attempts": 0,
+                                 "partial": [], "created_at": now, "updated_at": now}
+            return True
+
+    def get(self, job_id):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def restart_failed(self, job_id):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if not job or job["status"] != STATUS_FAILED:
+                return False
+            job.update(status=STATUS_QUEUED, attempts=0, error=None, updated_at=_now())
+            return True
+
+    def claim(self, job_id):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if not job:
+                return None
+            now = _now()
+            lease_expired = job["status"] == STATUS_RUNNING and job.get("lease_until") and job["lease_until"] < now
+            if job["status"] not in (STATUS_QUEUED, STATUS_WAITING_MODEL) and not lease_expired:
+                return None
+            job.update(status=STATUS_RUNNING, lease_until=now + timedelta(seconds=SUMMARY_JOB_LEASE_SECONDS),
+                       attempts=job["attempts"] + 1, updated_at=now)
+            return dict(job)
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            self.jobs[job_id].update(fields, updated_at=_now())
+
+
+# --- Code ---
+
+class SqsQueue:
+    def __init__(self, queue_url):
+        import boto3
+
+        self.queue_url = queue_url
+        self.client = boto3.client("sqs")
+
+    def send(self, job_id, delay_seconds=0):
+        self.client.send_message(
+            QueueUrl=self.queue_url,
+            MessageBody=json.dumps({"job_id": job_id}),
+            DelaySeconds=int(min(max(delay_seconds, 0), MAX_QUEUE_DELAY_SECONDS)),
+        )
+
+
+class LocalQueue:
+    """
+    Coda in memoria che sostituisce SQS in test e sviluppo: un thread worker
+    consuma i messaggi con ``handler(job_id)``; i ritardi usano un timer.
+    """
+
+    def __init__(self, handler=None):
+        self.handler = handler
+        self.messages = queue.Queue()
+        self._worker = None
+
+    def send(self, job_id, delay_seconds=0):
+        if delay_seconds > 0:
+            timer = threading.Timer(delay_seconds, self.messages.put, args=(job_id,))
+            timer.daemon = True
+            timer.start()
+        else:
+            self.messages.put(job_id)
+        self._ensure_worker()
+
+    def _ensure_worker(self):
+        if self.handler is None or (self._worker and self._worker.is_alive()):
+            return
+        self._worker = threading.Thread(target=self._run, daemon=True, name="summary-local-worker")
+        self._worker.start()
+
+    def _run(self):
+        while True:
+            job_id = self.messages.get()
+            try:
+                self.handler(job_id)
+            except Exception as e:
+                print(f"Errore del worker locale sul job {job_id}: {e}")
+            finally:
+                self.messages.task_done()
+
+
+_job_store = None
+_job_queue = None
+
+
+def get_job_store():
+    global _job_store
+    if _job_store is None:
+        collection = mongo_runtime.get_collection(SUMMARY_JOBS_COLLECTION_NAME) if mongo_runtime.MONGODB_CONN_STRING else None
+        _job_store = MongoJobStore(collection) if collection is not None else InMemoryJobStore()
+    return _job_store
+
+
+def get_job_queue():
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = SqsQueue(SUMMARY_QUEUE_URL) if SUMMARY_QUEUE_URL else LocalQueue(handler=process_job)
+    return _job_queue
+
+
+# --- API ---
+
+def job_status_body(job):
+    body = {
+        "job_id": job["_id"],
+        "talk_id": job["talk_id"],
+        "status": job["status"],
+        "attempts": job.get("attempts", 0),
+    }
+    if job.get("partial"):
+        body["partial"] = [text for text in job["partial"] if text]
+        body["chunks_total"] = len(job["partial"])
+    if job.get("retry_at"):
+        body["retry_at"] = job["retry_at"].isoformat() if hasattr(job["retry_at"], "isoformat") else job["retry_at"]
+    if job["status"] == STATUS_DONE:
+        body["result"] = job.get("result")
+    if job["status"] == STATUS_FAILED:
+        body["error"] = job.get("error")
+    return body
+
+
+def submit_summary_job(talk_id):
+    """
+    Restituisce subito il riassunto se è in cache (200), altrimenti crea (o
+    riusa) il job e ne restituisce lo stato (202).
+    """
+    talk_id = str(talk_id)
+    cached, transcript_digest = summarizer.lookup_cached_summary(talk_id)
+    if cached is not None:
+        return cached
+
+    summarizer.record_summary_request(talk_id)
+    store = get_job_store()
+    job_id = summary_job_id(talk_id, transcript_digest)
+    if store.create_if_absent(job_id, talk_id) or store.restart_failed(job_id):
+        print(f"Job {job_id} creato per il talk {talk_id}: messo in coda.")
+        get_job_queue().send(job_id)
+    else:
+        print(f"Job {job_id} già esistente per il talk {talk_id}: richiesta accorpata.")
+
+    job = store.get(job_id)
+    if job["status"] == STATUS_DONE:
+        return (200, job.get("result"))
+    return (202, job_status_body(job))
+
+
+def get_summary_job(job_id, wait_seconds=0):
+    """
+    Stato del job. Con ``wait_seconds`` > 0 attende (long polling) finché lo
+    stato o il numero di risultati parziali cambia, o il tempo scade.
+    """
+    store = get_job_store()
+    job = store.get(job_id)
+    if not job:
+        return (404, {"error": f"Job {job_id} non trovato."})
+
+    deadline = time.monotonic() + max(0, min(wait_seconds, 25))
+    seen = (job["status"], len([t for t in job.get("partial", []) if t]))
+    while job["status"] not in (STATUS_DONE, STATUS_FAILED) and time.monotonic() < deadline:
+        time.sleep(0.5)
+        job = store.get(job_id)
+        if (job["status"], len([t for t in job.get("partial", []) if t])) != seen:
+            break
+
+    return (200, job_status_body(job))
+
+
+def process_job(job_id):
+    """
+    Elabora un job (chiamata dal worker). Restituisce lo stato finale del job,
+    oppure None se il job era già preso in carico da un altro worker.
+    """
+    store = get_job_store()
+    job = store.claim(job_id)
+    if job is None:
+        print(f"Job {job_id} già in elaborazione o completato: messaggio ignorato.")
+        return None
+
+    ready, estimated_time = summarizer.check_model_ready()
+    if not ready and job["attempts"] >= SUMMARY_JOB_MAX_ATTEMPTS:
+        # Ogni presa in carico conta come tentativo, anche se il modello non era pronto
+        print(f"Modello ancora in caricamento dopo {job['attempts']} tentativi: job {job_id} fallito.")
+        store.update(job_id, status=STATUS_FAILED, error=f"Modello non disponibile dopo {job['attempts']} tentativi.")
+        return STATUS_FAILED
+    if not ready:
+        delay = max(1, int(estimated_time or 30) + 5)
+        print(f"Modello in caricamento (stimato {estimated_time}s): job {job_id} rimandato di {delay}s.")
+        store.update(job_id, status=STATUS_WAITING_MODEL, retry_at=_now() + timedelta(seconds=delay))
+        get_job_queue().send(job_id, delay_seconds=delay)
+        return STATUS_WAITING_MODEL
+
+    def save_partial(partial_summaries):
+        store.update(job_id, partial=partial_summaries)
+
+    status_code, body = summarizer.summarize_talk(job["talk_id"], record_request=False, progress=save_partial)
+
+    if status_code == 200:
+        store.update(job_id, status=STATUS_DONE, result=body)
+        return STATUS_DONE
+    if status_code == 503 and job["attempts"] < SUMMARY_JOB_MAX_ATTEMPTS:
+        # Errore temporaneo (modello non disponibile): nuovo tentativo più tardi
+        delay = 30 * job["attempts"]
+        store.update(job_id, status=STATUS_WAITING_MODEL, retry_at=_now() + timedelta(seconds=delay))
+        get_job_queue().send(job_id, delay_seconds=delay)
+        return STATUS_WAITING_MODEL
+
+    store.update(job_id, status=STATUS_FAILED, error=body.get("error"))
+    return STATUS_FAILED
@@ -0,0 +1,174 @@
+"""
+Filtri e ordinamenti degli elenchi di talk: get-talks-by-tags, talks-by-tags
+di graph-api e ricerca ibrida di search-agent.
+
+Parametri (query string o corpo JSON, tutti opzionali):
+
+    tags                               "tag1,tag2": almeno uno dei tag
+    published_after, published_before  date ISO 8601, estremi inclusi (published_before
+                                       senza orario include tutto quel giorno)
+    min_duration, max_duration         secondi, estremi inclusi
+    sort                               pagerank, newest, oldest, shortest, longest
+
+I predicati si combinano in AND; un talk senza publishedAt (o senza duration)
+non passa un filtro su quel campo. Negli ordinamenti per data o durata i talk
+senza il valore vanno in fondo, a parità di valore decide l'id.
+
+Il planner (choose_driver) parte dal predicato più selettivo: ognuno ha un
+costo, il numero di talk da leggere se fosse lui a fornire i candidati, e gli
+altri vengono verificati solo su quei candidati. Nello snapshot del grafo i
+costi sono esatti (liste dei tag e ricerca binaria sugli ordinamenti per data
+e durata); in Neo4j i range usano gli indici (graph, publishedAt) e
+(graph, duration), mentre i tag, una lista nei nodi :Talk senza indice,
+costano quanto la scansione della versione; con un filtro sui tag la query
+Cypher non forza l'indice di un range (vedi graph_queries.find_talks).
+"""
+
+from datetime import date, datetime, timedelta, timezone
+
+SORTS = ("pagerank", "newest", "oldest", "shortest", "longest")
+# Campo e direzione (True = decrescente) di ogni ordinamento per data o durata
+SORT_FIELDS = {"newest": ("published", True), "oldest": ("published", False),
+               "shortest": ("duration", False), "longest": ("duration", True)}
+RANGE_FIELDS = ("published", "duration")
+MAX_DURATION_SECONDS = 24 * 3600
+
+
+def parse_date(value, end_of_day=False):
+    """
+    Data ISO 8601 ("2020-01-31" o con orario) in datetime UTC; None se assente.
+    ValueError se non valida. Una data senza orario vale l'inizio del giorno,
+    o con ``end_of_day`` il suo ultimo istante (estremo superiore incluso).
+    """
+    if value is None or value == "":
+        return None
+    if not isinstance(value, str):
+        # Da un corpo JSON possono arrivare numeri, liste o oggetti
+        raise ValueError(f"Not an ISO 8601 date: {value!r}")
+    try:
+        day = date.fromisoformat(value)
+    except ValueError:
+        parsed = datetime.fromisoformat(value[:-1] + "+00:00" if value.endswith("Z") else value)
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+    start = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+    return start + timedelta(days=1) - timedelta(microseconds=1) if end_of_day else start
+
+
+def epoch_seconds(value):
+    """publishedAt (DateTime di Neo4j, datetime o stringa ISO 8601) in secondi epoch; 0 se assente o non valido."""
+    if value is None:
+        return 0
+    if hasattr(value, "to_native"):
+        value = value.to_native()
+    if isinstance(value, str):
+        try:
+            value = parse_date(value)
+        except ValueError:
+            return 0
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp())
+    return 0
+
+
+def duration_seconds(value):
+    """duration (intero o stringa numerica) in secondi; 0 se assente o non valida."""
+    if isinstance(value, bool) or value is None:
+        return 0
+    if isinstance(value, (int, float)):
+        return max(int(value), 0)
+    text = str(value).strip()
+    return int(text) if text.isascii() and text.isdigit() else 0
+
+
+def iso_date(seconds):
+    """Secondi epoch in ISO 8601 UTC ("2015-06-01T10:00:00Z"); None se 0 (assente)."""
+    if not seconds:
+        return None
+    return datetime.fromtimestamp(seconds, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _duration_param(params, name):
+    value = params.get(name)
+    if value is None or value == "":
+        return None
+    try:
+        seconds = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'Parameter "{name}" must be an integer number of seconds')
+    if not 0 <= seconds <= MAX_DURATION_SECONDS:
+        raise ValueError(f'Parameter "{name}" must be between 0 and {MAX_DURATION_SECONDS}')
+    return seconds
+
+
+class TalkFilter:
+    """Predicati e ordinamento di un elenco di talk (vedi il docstring del modulo)."""
+
+    def __init__(self, tags=None, published_after=None, published_before=None,
+                 min_duration=None, max_duration=None, sort=None):
+        self.tags = list(tags) if tags else None
+        self.published_after = published_after
+        self.published_before = published_before
+        self.min_duration = min_duration
+        self.max_duration = max_duration
+        self.sort = sort
+
+    @classmethod
+    def from_params(cls, params, tags=None):
+        """
+        Filtro dai parametri di una richiesta; ``tags`` è la lista già
+        convertita (parse_tags_param). Solleva ValueError con un messaggio per il client.
+        """
+        try:
+            published_after = parse_date(params.get("published_after"))
+            published_before = parse_date(params.get("published_before"), end_of_day=True)
+        except (TypeError, ValueError):
+            raise ValueError('Parameters "published_after"/"published_before" must be ISO 8601 dates')
+        if tags is not None and not (isinstance(tags, list) and all(isinstance(tag, str) for tag in tags)):
+            raise ValueError('Parameter "tags" must be a comma-separated string or a list of strings')
+        sort = params.get("sort") or None
+        if sort is not None and sort not in SORTS:
+            raise ValueError(f'Parameter "sort" must be one of: {", ".join(SORTS)}')
+        return cls(tags, published_after, published_before,
+                   _duration_param(params, "min_duration"), _duration_param(params, "max_duration"), sort)
+
+    def ranges(self):
+        """
+        {campo: (minimo, massimo)} dei range richiesti, in secondi (epoch per
+        published); None per un estremo aperto.
+        """
+        ranges = {}
+        if self.published_after is not None or self.published_before is not None:
+            ranges["published"] = (
+                int(self.published_after.timestamp()) if self.published_after is not None else None,
+                int(self.published_before.timestamp()) if self.published_before is not None else None,
+            )
+        if self.min_duration is not None or self.max_duration is not None:
+            ranges["duration"] = (self.min_duration, self.max_duration)
+        return ranges
+
+    def has_predicates(self):
+        return bool(self.tags) or bool(self.ranges())
+
+    def is_empty(self):
+        return not self.has_predicates() and self.sort is None
+
+
+def in_range(value, bounds):
+    """``value`` (0 = assente) dentro ``bounds`` (minimo, massimo), estremi inclusi."""
+    low, high = bounds
+    if not value:
+        return False
+    return (low is None or value >= low) and (high is None or value <= high)
+
+
+def choose_driver(costs):
+    """
+    Predicato da cui partire: quello con il costo minore tra ``costs``
+    ({"tags" | "published" | "duration": talk da leggere}); None (scansione
+    completa) se non ci sono predicati. A parità vince un range.
+    """
+    if not costs:
+        return None
+    return min(costs, key=lambda name: (costs[name], name == "tags"))
@@ -0,0 +1,81 @@
+"""
+Tokenizzazione condivisa tra i job Glue (estrazione delle parole chiave) e le
+Lambda, così che indicizzazione e query usino esattamente gli stessi termini.
+Solo libreria standard: gira sugli executor Spark e nelle Lambda senza
+dipendenze aggiuntive né servizi NLP esterni.
+"""
+
+import re
+import unicodedata
+
+# Parole (anche con apostrofo o trattino interni): "don't", "well-being"
+_WORD_RE = re.compile(r"[^\W\d_]+(?:['’-][^\W\d_]+)*", re.UNICODE)
+# Separatori di frase: le parole chiave composte non li attraversano
+_PHRASE_BREAK_RE = re.compile(r"[.!?;:,()\[\]\"“”\n]+")
+
+MIN_TOKEN_LENGTH = 3
+
+STOPWORDS = frozenset("""
+a about above actually after again against all almost also although always am among an and another any anybody
+anyone anything anyway are aren't around as at back be became because become been before being below between
+both but by can can't cannot could couldn't did didn't do does doesn't doing don't done down during each either
+else enough even ever every everybody everyone everything few first for from further get gets getting go goes
+going gone got gotta had hadn't has hasn't have haven't having he he'd he'll he's her here here's hers herself
+him himself his how how's however i i'd i'll i'm i've if in into is isn't it it's its itself just kind know last
+least less let let's like little lot lots made make makes making many may maybe me might mine more most mostly
+much must mustn't my myself need never new next no nobody none nor not nothing now of off often oh ok okay on once
+one only or other others otherwise ought our ours ourselves out over own per perhaps put quite rather really right
+said same say saying says see seem seemed seems shall shan't she she'd she'll she's should shouldn't since so some
+somebody someone something sometimes somewhat still such sure take taken tell than that that's the their theirs
+them themselves then there there's these they they'd they'll they're they've thing things think this those though
+through thus to today together too toward towards two under unless until up upon us use used uses using very via
+want wanted wants was wasn't way we we'd we'll we're we've well went were weren't what what's whatever when when's
+where where's whether which while who who's whole whom whose why why's will with within without won't would
+wouldn't yeah yes yet you you'd you'll you're you've your yours yourself yourselves
+applause laughter music
+""".split())
+
+
+def normalize(text):
+    """Minuscolo, apostrofi tipografici uniformati, accenti conservati (forma NFC)."""
+    return unicodedata.normalize("NFC", text or "").lower().replace("’", "'")
+
+
+def tokenize(text):
+    """Tutte le parole del testo, normalizzate, nell'ordine in cui compaiono."""
+    return _WORD_RE.findall(normalize(text))
+
+
+def token_spans(text):
+    """Come tokenize, con la posizione (inizio, fine) di ogni parola nel testo normalizzato."""
+    return [(match.group(), match.start(), match.end()) for match in _WORD_RE.finditer(normalize(text))]
+
+
+def is_content_token(token):
+    return len(token) >= MIN_TOKEN_LENGTH and token not in STOPWORDS
+
+
+def content_tokens(text):
+    """Parole del testo senza stopword e parole troppo corte."""
+    return [token for token in tokenize(text) if is_content_token(token)]
+
+
+def candidate_terms(text, max_words=2):
+    """
+    Termini candidati come parole chiave, alla maniera di RAKE: le stopword e la
+    punteggiatura spezzano il testo in frasi di sole parole di contenuto; da
+    ogni frase si prendono le singole parole e le sequenze adiacenti fino a
+    ``max_words`` parole ("machine learning").
+    """
+    terms = []
+    for fragment in _PHRASE_BREAK_RE.split(normalize(text)):
+        run = []
+        for token in _WORD_RE.findall(fragment) + [None]:
+            if token is not None and is_content_token(token):
+                run.append(token)
+                continue
+            for size in range(1, max_words + 1):
+                for start in range(len(run) - size + 1):
+                    terms.append(" ".join(run[start:start + size]))
+            run = []
+    return terms
@@ -0,0 +1,229 @@
+"""
+Trascrizioni compresse nei documenti di tedx_data.
+
+Le trascrizioni sono la parte più grande di ogni documento. tedXjob le scrive
+compresse con un dizionario addestrato su un campione di trascrizioni e
+condiviso da tutti i talk: le trascrizioni hanno molte frasi e parole in comune,
+ma ognuna è troppo corta perché il compressore le impari da sola. Il dizionario
+è salvato una volta nella collezione transcript_dictionaries
+({_id, codec, data}); ogni documento ha il sottodocumento transcript_z:
+
+    format   versione del formato (FORMAT_COMPRESSED)
+    codec    "zstd" (dizionario addestrato con zstandard) o "zlib" (dizionario
+             preimpostato costruito dalle frasi più frequenti, solo libreria standard)
+    dict     _id del dizionario, None se compresso senza dizionario
+    size     byte del testo UTF-8
+    sha256   hash del testo: chiave della cache dei riassunti, senza decomprimere
+    data     testo compresso
+
+I documenti scritti prima (FORMAT_PLAIN) hanno il testo in chiaro nel campo
+transcript: read_transcript e transcript_digest accettano entrambi. I lettori
+decomprimono solo quando serve il testo; i dizionari sono letti una volta per
+container e tenuti in memoria.
+
+Il codec è una scelta esplicita di tedXjob (--TRANSCRIPT_CODEC, predefinito
+DEFAULT_CODEC = "zlib"), non dipende da cosa è installato nel job: zstd va
+scelto solo dopo aver aggiunto zstandard al layer delle Lambda e ai job che
+leggono le trascrizioni, altrimenti read_transcript fallisce con ImportError.
+"""
+
+import hashlib
+import os
+import re
+import threading
+import zlib
+from collections import Counter
+
+FORMAT_PLAIN = 1
+FORMAT_COMPRESSED = 2
+CODECS = ("zstd", "zlib")
+# Solo libreria standard: leggibile ovunque senza dipendenze aggiuntive
+DEFAULT_CODEC = "zlib"
+DICTIONARY_SIZE = {"zstd": 112 * 1024, "zlib": 32 * 1024}
+COMPRESSION_LEVEL = {"zstd": 12, "zlib": 9}
+# Sotto questo numero di campioni il dizionario non migliora la compressione
+MIN_DICTIONARY_SAMPLES = 20
+
+TRANSCRIPT_DICTIONARIES_COLLECTION = os.environ.get("TRANSCRIPT_DICTIONARIES_COLLECTION", "transcript_dictionaries")
+# Filtro e proiezione MongoDB per i talk con una trascrizione, in chiaro o compressa
+TRANSCRIPT_QUERY = {"$or": [{"transcript": {"$type": "string"}}, {"transcript_z": {"$type": "object"}}]}
+TRANSCRIPT_PROJECTION = {"transcript": 1, "transcript_z": 1}
+
+_WORDS_RE = re.compile(r"\S+")
+
+
+def available_codec():
+    """"zstd" se il pacchetto zstandard è installato, altrimenti "zlib"."""
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        return "zlib"
+    return "zstd"
+
+
+def digest(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# --- Dizionari ---
+
+def _phrase_dictionary(samples, size):
+    """
+    Dizionario preimpostato per zlib: le sequenze di 1-3 parole che fanno
+    risparmiare più byte nel campione, in ordine crescente di valore (zlib
+    codifica con meno bit i riferimenti più vicini alla fine del dizionario).
+    """
+    counts = Counter()
+    for sample in samples:
+        for line in sample.split("\n"):
+            words = _WORDS_RE.findall(line)
+            for n in (1, 2, 3):
+                for i in range(len(words) - n + 1):
+                    counts[" ".join(words[i:i + n]) + " "] += 1
+    ranked = sorted(((count * len(phrase), phrase) for phrase, count in counts.items()
+                     if count > 1 and len(phrase) > 3), reverse=True)
+    chosen, used = [], 0
+    for _, phrase in ranked:
+        encoded = phrase.encode("utf-8")
+        if used + len(encoded) > size:
+            break
+        chosen.append(encoded)
+        used += len(encoded)
+    return b"".join(reversed(chosen))
+
+
+def train_dictionary(samples, codec, size=None):
+    """Dizionario dal campione di trascrizioni (stringhe); b"" se il campione è troppo piccolo."""
+    samples = [sample for sample in samples if sample]
+    if len(samples) < MIN_DICTIONARY_SAMPLES:
+        return b""
+    size = size or DICTIONARY_SIZE[codec]
+    if codec == "zstd":
+        import zstandard
+
+        return zstandard.train_dictionary(size, [sample.encode("utf-8") for sample in samples]).as_bytes()
+    return _phrase_dictionary(samples, size)
+
+
+def dictionary_id(codec, dictionary):
+    """_id del dizionario: codec e hash del contenuto (stesso dizionario, stesso id)."""
+    if not dictionary:
+        return None
+    return f"{codec}-{hashlib.sha256(dictionary).hexdigest()[:16]}"
+
+
+# --- Compressione (tedXjob) ---
+
+class Compressor:
+    """Comprime le trascrizioni con un codec e un dizionario; da riusare per tutto un batch."""
+
+    def __init__(self, codec, dictionary=b"", level=None):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown transcript codec: {codec}")
+        self.codec = codec
+        self.dictionary = dictionary or b""
+        self.dict_id = dictionary_id(codec, self.dictionary)
+        self.level = level or COMPRESSION_LEVEL[codec]
+        if codec == "zstd":
+            import zstandard
+
+            dict_data = zstandard.ZstdCompressionDict(self.dictionary) if self.dictionary else None
+            self._zstd = zstandard.ZstdCompressor(level=self.level, dict_data=dict_data)
+        else:
+            # Il dizionario viene caricato una volta: ogni trascrizione parte da una copia
+            self._zlib = zlib.compressobj(self.level, zdict=self.dictionary) if self.dictionary else zlib.compressobj(self.level)
+
+    def compress_bytes(self, data):
+        if self.codec == "zstd":
+            return self._zstd.compress(data)
+        compressor = self._zlib.copy()
+        return compressor.compress(data) + compressor.flush()
+
+    def compress(self, text):
+        """Sottodocumento transcript_z per ``text`` (None se vuoto)."""
+        if not text:
+            return None
+        data = text.encode("utf-8")
+        return {
+            "format": FORMAT_COMPRESSED,
+            "codec": self.codec,
+            "dict": self.dict_id,
+            "size": len(data),
+            "sha256": hashlib.sha256(data).hexdigest(),
+            "data": self.compress_bytes(data),
+        }
+
+
+# --- Lettura ---
+
+def decompress(transcript_z, dictionary=b""):
+    """Testo di un sottodocumento transcript_z, dato il suo dizionario."""
+    if transcript_z.get("format") != FORMAT_COMPRESSED:
+        raise ValueError(f"Unsupported transcript format: {transcript_z.get('format')}")
+    data = bytes(transcript_z["data"])
+    if transcript_z["codec"] == "zstd":
+        import zstandard
+
+        dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        raw = zstandard.ZstdDecompressor(dict_data=dict_data).decompress(data, max_output_size=transcript_z.get("size") or 0)
+    elif transcript_z["codec"] == "zlib":
+        decompressor = zlib.decompressobj(zdict=dictionary) if dictionary else zlib.decompressobj()
+        raw = decompressor.decompress(data) + decompressor.flush()
+    else:
+        raise ValueError(f"Unknown transcript codec: {transcript_z['codec']}")
+    return raw.decode("utf-8")
+
+
+class DictionaryCache:
+    """Dizionari per _id, letti con ``loader(dict_id) -> bytes`` una volta sola."""
+
+    def __init__(self, loader):
+        self.loader = loader
+        self._dictionaries = {}
+        self._lock = threading.Lock()
+
+    def get(self, dict_id):
+        if not dict_id:
+            return b""
+        with self._lock:
+            if dict_id in self._dictionaries:
+                return self._dictionaries[dict_id]
+        dictionary = self.loader(dict_id)
+        if dictionary is None:
+            raise LookupError(f"Transcript dictionary {dict_id} not found")
+        with self._lock:
+            self._dictionaries[dict_id] = bytes(dictionary)
+        return self._dictionaries[dict_id]
+
+
+def _load_from_mongodb(dict_id):
+    from tedxgraph import mongo_runtime
+
+    collection = mongo_runtime.get_collection(TRANSCRIPT_DICTIONARIES_COLLECTION)
+    if collection is None:
+        raise ConnectionError("MongoDB not available for transcript dictionaries")
+    doc = collection.find_one({"_id": dict_id}, {"data": 1})
+    return doc["data"] if doc else None
+
+
+dictionaries = DictionaryCache(_load_from_mongodb)
+
+
+def has_transcript(doc):
+    return bool(doc.get("transcript_z") or doc.get("transcript"))
+
+
+def transcript_digest(doc):
+    """sha256 del testo della trascrizione senza decomprimerla (None se manca)."""
+    transcript_z = doc.get("transcript_z")
+    if transcript_z:
+        return transcript_z.get("sha256")
+    return digest(doc["transcript"]) if doc.get("transcript") else None
+
+
+def read_transcript(doc, cache=None):
+    """Testo della trascrizione di un documento di tedx_data, in chiaro o compressa; None se manca."""
+    transcript_z = doc.get("transcript_z")
+    if transcript_z:
+        return decompress(transcript_z, (cache or dictionaries).get(transcript_z.get("dict")))
+    return doc.get("transcript") or None
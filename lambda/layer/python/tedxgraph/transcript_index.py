@@ -0,0 +1,459 @@
+"""
+Indice invertito posizionale sulle trascrizioni dei talk.
+
+Le trascrizioni sono salvate in MongoDB come un'unica stringa con una riga per
+cue (la frase sottotitolata). Il job glue/transcriptIndex_V1.py le tokenizza con
+tedxgraph.text.tokenize (tutte le parole, stopword comprese, così le frasi
+esatte restano verificabili) e per ogni termine salva i talk e le posizioni in
+cui compare. La posizione è il numero della parola nel talk; cue e offset nella
+cue si ricavano dagli inizi delle cue, salvati una volta per talk.
+
+Formato: stesso contenitore dello snapshot del grafo (tedxgraph.graph_snapshot)
+con magic b"TEDXTEXT". Tutti gli interi delle liste sono varint (7 bit per
+byte) codificati a delta, quindi le liste ordinate occupano in media 1-2 byte
+per valore:
+
+    id_offsets, id_data             id dei talk (colonna di testo)
+    talk_lengths[n]                 parole di ogni talk (per BM25)
+    cue_offsets[n+1], cue_data      inizi delle cue di ogni talk (delta varint)
+    term_offsets, term_data         vocabolario ordinato (colonna di testo)
+    posting_offsets[T+1], posting_data
+
+Il testo e gli istanti delle cue (C in tutto) sono colonne a parte, così snippet
+e link al passaggio nel video leggono solo le cue che servono, senza caricare da
+MongoDB la trascrizione intera. Occupano poco più del testo: 4 byte di offset e
+4 di istante per cue.
+
+    cue_first[n+1]                  prima cue di ogni talk nelle colonne seguenti
+    cue_text_offsets[C+1], cue_text_data   testo delle cue (UTF-8)
+    cue_times[C]                    istanti di inizio in ms, int32 a delta per talk
+                                    (tedxgraph.cue_times); 0 se il talk non li ha
+    timed[n]                        1 se il talk ha gli istanti delle cue
+
+Blocco delle posting di un termine:
+
+    varint numero di talk
+    per ogni talk: delta dell'indice del talk, occorrenze, byte delle posizioni
+    blocchi delle posizioni (delta varint), nello stesso ordine
+
+Le posizioni di un talk si decodificano solo se il talk è un candidato: per
+"the" basta leggere l'intestazione del blocco. Le query tra virgolette sono
+frasi esatte, risolte intersecando le posizioni (p, p+1, ...) senza rileggere
+il testo; il testo serve solo per gli snippet dei risultati finali.
+"""
+
+import array
+import bisect
+import heapq
+import math
+import os
+import time
+from itertools import accumulate
+
+from tedxgraph import cue_times, graph_snapshot, ids, metrics
+from tedxgraph.text import is_content_token, normalize, token_spans, tokenize
+
+MAGIC = b"TEDXTEXT"
+FORMAT_VERSION = 2
+CUE_SEPARATOR = "\n"
+# Parametri BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TRANSCRIPT_INDEX_PATH = os.environ.get("TRANSCRIPT_INDEX_PATH")
+TRANSCRIPT_INDEX_S3_URI = os.environ.get("TRANSCRIPT_INDEX_S3_URI")
+
+
+# --- Varint ---
+
+def encode_varints(values, out):
+    """Accoda a ``out`` (bytearray) gli interi non negativi in formato varint."""
+    for value in values:
+        while value >= 0x80:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+    return out
+
+
+def encode_deltas(values, out):
+    """Lista ordinata -> delta varint (il primo valore è salvato così com'è)."""
+    previous = 0
+    for value in values:
+        value, previous = value - previous, value
+        while value >= 0x80:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+    return out
+
+
+def decode_varints(data, start=0, end=None, count=None):
+    """Decodifica i varint di ``data[start:end]`` (al massimo ``count``): restituisce (valori, fine)."""
+    end = len(data) if end is None else end
+    if count is None:
+        block = bytes(data[start:end])
+        if block.isascii():
+            # Tutti valori < 128 (un byte ciascuno): caso comune per le posizioni delle parole frequenti
+            return list(block), end
+    values = []
+    value = shift = 0
+    position = start
+    while position < end and (count is None or len(values) < count):
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(value)
+            value = shift = 0
+    return values, position
+
+
+def decode_deltas(data, start=0, end=None):
+    return list(accumulate(decode_varints(data, start, end)[0]))
+
+
+# --- Costruzione (job Glue) ---
+
+def split_cues(transcript):
+    return transcript.split(CUE_SEPARATOR) if transcript else []
+
+
+def build_index(talk_ids, transcripts, version, transcript_cue_times=None):
+    """
+    ``transcripts``: per ogni talk la trascrizione come salvata in MongoDB (una
+    riga per cue) o None. ``transcript_cue_times``: per ogni talk il campo
+    transcript_cue_times (o None); gli istanti che non corrispondono alle cue
+    vengono ignorati. Restituisce (header, arrays) per write_snapshot.
+    """
+    postings = {}
+    talk_lengths = array.array("I")
+    cue_offsets = array.array("q", [0])
+    cue_data = bytearray()
+    cue_first = array.array("q", [0])
+    cue_text_offsets = array.array("I", [0])
+    cue_text_data = bytearray()
+    times = array.array("i")
+    timed = array.array("B")
+    cues_count = 0
+    for doc, transcript in enumerate(transcripts):
+        position = 0
+        cue_starts = []
+        term_positions = {}
+        cues = split_cues(transcript)
+        for cue in cues:
+            cue_starts.append(position)
+            for token in tokenize(cue):
+                term_positions.setdefault(token, []).append(position)
+                position += 1
+            cue_text_data += cue.encode("utf-8")
+            cue_text_offsets.append(len(cue_text_data))
+        talk_lengths.append(position)
+        encode_deltas(cue_starts, cue_data)
+        cue_offsets.append(len(cue_data))
+        cues_count += len(cue_starts)
+        cue_first.append(cues_count)
+
+        starts = cue_times.decode_times(transcript_cue_times[doc]) if transcript_cue_times else []
+        deltas = cue_times.delta_encode(starts) if len(starts) == len(cues) else None
+        timed.append(deltas is not None)
+        times.extend(deltas if deltas is not None else [0] * len(cues))
+        for term, positions in term_positions.items():
+            postings.setdefault(term, []).append((doc, len(positions), bytes(encode_deltas(positions, bytearray()))))
+
+    terms = sorted(postings)
+    posting_offsets = array.array("q", [0])
+    posting_data = bytearray()
+    for term in terms:
+        entries = postings[term]
+        encode_varints([len(entries)], posting_data)
+        previous = 0
+        for doc, occurrences, block in entries:
+            encode_varints([doc - previous, occurrences, len(block)], posting_data)
+            previous = doc
+        for _, _, block in entries:
+            posting_data += block
+        posting_offsets.append(len(posting_data))
+
+    arrays = {"talk_lengths": talk_lengths, "cue_offsets": cue_offsets, "cue_data": array.array("B", cue_data)}
+    arrays["cue_first"] = cue_first
+    arrays["cue_text_offsets"] = cue_text_offsets
+    arrays["cue_text_data"] = array.array("B", cue_text_data)
+    arrays["cue_times"] = times
+    arrays["timed"] = timed
+    arrays["id_offsets"], arrays["id_data"] = graph_snapshot.text_column(talk_ids)
+    arrays["term_offsets"], arrays["term_data"] = graph_snapshot.text_column(terms)
+    arrays["posting_offsets"] = posting_offsets
+    arrays["posting_data"] = array.array("B", posting_data)
+    header = {
+        "format": FORMAT_VERSION,
+        "version": version,
+        "talks": len(talk_ids),
+        "terms": len(terms),
+        "tokens": sum(talk_lengths),
+        "cues": cues_count,
+        "timed_talks": sum(timed),
+    }
+    return header, arrays
+
+
+# --- Query ---
+
+def parse_query(query):
+    """
+    Clausole della query: ogni frase tra virgolette è una clausola con tutte le sue
+    parole; le parole fuori dalle virgolette sono clausole singole, senza stopword
+    (a meno che la query non contenga solo quelle).
+    """
+    clauses = []
+    words = []
+    for i, part in enumerate((query or "").split('"')):
+        tokens = tokenize(part)
+        if i % 2 and tokens:
+            clauses.append(tokens)
+        else:
+            words.extend(tokens)
+    content = [token for token in words if is_content_token(token)]
+    for token in dict.fromkeys(content or ([] if clauses else words)):
+        clauses.append([token])
+    return clauses
+
+
+class TranscriptIndex:
+    """Indice posizionale mappato in memoria."""
+
+    def __init__(self, path):
+        self._mmap, self.header, self.arrays = graph_snapshot.map_snapshot(path, magic=MAGIC, format_version=FORMAT_VERSION)
+        self.path = path
+        self.version = self.header.get("version")
+        self.size = self.header["talks"]
+        self.ids = graph_snapshot.decode_column(self.arrays, "id")
+        self.index = {talk_id: i for i, talk_id in enumerate(self.ids)}
+        self.terms = {term: i for i, term in enumerate(graph_snapshot.decode_column(self.arrays, "term"))}
+        self.talk_lengths = self.arrays["talk_lengths"]
+        self.cue_offsets = self.arrays["cue_offsets"]
+        self.cue_data = self.arrays["cue_data"]
+        self.posting_offsets = self.arrays["posting_offsets"]
+        self.posting_data = self.arrays["posting_data"]
+        self.cue_first = self.arrays["cue_first"]
+        self.cue_text_offsets = self.arrays["cue_text_offsets"]
+        self.cue_text_data = self.arrays["cue_text_data"]
+        self.cue_times = self.arrays["cue_times"]
+        self.timed = self.arrays["timed"]
+        self.average_length = self.header["tokens"] / max(1, self.size)
+
+    def postings(self, term):
+        """{talk: (occorrenze, inizio, fine delle posizioni in posting_data)}, senza decodificare le posizioni."""
+        t = self.terms.get(term)
+        if t is None:
+            return {}
+        start, end = self.posting_offsets[t], self.posting_offsets[t + 1]
+        (count,), position = decode_varints(self.posting_data, start, end, count=1)
+        header, position = decode_varints(self.posting_data, position, end, count=3 * count)
+        result = {}
+        doc = 0
+        for i in range(0, len(header), 3):
+            doc += header[i]
+            result[doc] = (header[i + 1], position, position + header[i + 2])
+            position += header[i + 2]
+        return result
+
+    def positions(self, span):
+        return decode_deltas(self.posting_data, span[1], span[2])
+
+    def cue_starts(self, doc):
+        return decode_deltas(self.cue_data, self.cue_offsets[doc], self.cue_offsets[doc + 1])
+
+    def cue_count(self, doc):
+        return self.cue_first[doc + 1] - self.cue_first[doc]
+
+    def cue_text(self, doc, cue):
+        """Testo di una cue, letto dalla sola porzione del file che la contiene."""
+        c = self.cue_first[doc] + cue
+        return bytes(self.cue_text_data[self.cue_text_offsets[c]:self.cue_text_offsets[c + 1]]).decode("utf-8")
+
+    def cue_starts_ms(self, doc):
+        """Istanti di inizio (ms) delle cue del talk, o None se il talk non li ha."""
+        if not self.timed[doc]:
+            return None
+        return cue_times.decode_times(self.cue_times[self.cue_first[doc]:self.cue_first[doc + 1]])
+
+    def locate(self, doc, positions):
+        """Posizioni nel talk -> [(cue, offset della parola nella cue)]."""
+        starts = self.cue_starts(doc)
+        located = []
+        for position in positions:
+            cue = bisect.bisect_right(starts, position) - 1
+            located.append((cue, position - starts[cue]))
+        return located
+
+    def clause_matches(self, clause):
+        """
+        Talk che contengono la clausola: {talk: (occorrenze, funzione che restituisce
+        le posizioni d'inizio)}. Per le frasi le posizioni sono intersecate
+        (p in pos(t0), p+1 in pos(t1), ...) partendo dal termine più raro.
+        """
+        lists = [self.postings(term) for term in clause]
+        if not all(lists):
+            return {}
+        if len(clause) == 1:
+            return {doc: (span[0], lambda span=span: self.positions(span)) for doc, span in lists[0].items()}
+
+        order = sorted(range(len(clause)), key=lambda i: len(lists[i]))
+        candidates = set(lists[order[0]])
+        for i in order[1:]:
+            candidates.intersection_update(lists[i])
+        matches = {}
+        for doc in candidates:
+            starts = None
+            for i in order:
+                shifted = {p - i for p in self.positions(lists[i][doc])}
+                starts = shifted if starts is None else starts & shifted
+                if not starts:
+                    break
+            if starts:
+                found = sorted(starts)
+                matches[doc] = (len(found), lambda found=found: found)
+        return matches
+
+    def search(self, query, limit=10, max_hits=3, accept=None):
+        """
+        Talk che contengono tutte le clausole della query, ordinati per BM25:
+        [{id, score, occurrences, hits: [{cue, offset, length}]}]. ``hits`` sono
+        le prime ``max_hits`` cue con una corrispondenza (offset e lunghezza in parole).
+        ``accept(id) -> bool`` scarta i talk prima del punteggio (filtri della ricerca ibrida).
+        """
+        clauses = parse_query(query)
+        if not clauses:
+            return []
+        matches = [self.clause_matches(clause) for clause in clauses]
+        docs = set(min(matches, key=len))
+        for clause_matches in matches:
+            docs.intersection_update(clause_matches)
+        if accept is not None:
+            docs = {doc for doc in docs if accept(self.ids[doc])}
+
+        scored = []
+        for doc in docs:
+            score = 0.0
+            length_norm = BM25_K1 * (1 - BM25_B + BM25_B * self.talk_lengths[doc] / self.average_length)
+            for clause_matches in matches:
+                occurrences = clause_matches[doc][0]
+                idf = math.log(1 + (self.size - len(clause_matches) + 0.5) / (len(clause_matches) + 0.5))
+                score += idf * occurrences * (BM25_K1 + 1) / (occurrences + length_norm)
+            scored.append((score, doc))
+
+        results = []
+        for score, doc in heapq.nlargest(limit, scored):
+            hits = {}
+            for clause, clause_matches in zip(clauses, matches) if max_hits else ():
+                for cue, offset in self.locate(doc, clause_matches[doc][1]()):
+                    hits.setdefault(cue, []).append({"cue": cue, "offset": offset, "length": len(clause)})
+            first_cues = sorted(hits)[:max_hits]
+            results.append({
+                "id": self.ids[doc],
+                "score": round(score, 4),
+                "occurrences": sum(clause_matches[doc][0] for clause_matches in matches),
+                "hits": [hit for cue in first_cues for hit in sorted(hits[cue], key=lambda hit: hit["offset"])],
+            })
+        return results
+
+    def talk_positions(self, doc, clause):
+        """Posizioni d'inizio della clausola in un solo talk (per le frasi, intersecate come in clause_matches)."""
+        spans = []
+        for term in clause:
+            span = self.postings(term).get(doc)
+            if span is None:
+                return []
+            spans.append(span)
+        starts = None
+        for i, span in enumerate(spans):
+            shifted = {p - i for p in self.positions(span)}
+            starts = shifted if starts is None else starts & shifted
+        return sorted(starts)
+
+    def moments(self, doc, cues, hits=None, starts=None):
+        """
+        Cue del talk con istante di inizio (ms, None se il talk non ha gli istanti)
+        e testo: [{cue, start_ms, text, highlights}]. ``hits``: {cue: [hit]} come in search.
+        """
+        if starts is None:
+            starts = self.cue_starts_ms(doc)
+        return [{
+            "cue": cue,
+            "start_ms": starts[cue] if starts else None,
+            **snippet(self.cue_text(doc, cue), (hits or {}).get(cue, ())),
+        } for cue in cues if 0 <= cue < self.cue_count(doc)]
+
+    def find_moments(self, doc, query, limit=10):
+        """
+        Cue del talk in cui compare una delle clausole della query (parole o frasi
+        tra virgolette), nell'ordine del video: posizioni della parola -> cue con
+        una ricerca binaria sugli inizi delle cue, cue -> istante dalla colonna cue_times.
+        """
+        hits = {}
+        for clause in parse_query(query):
+            for cue, offset in self.locate(doc, self.talk_positions(doc, clause)):
+                hits.setdefault(cue, []).append({"cue": cue, "offset": offset, "length": len(clause)})
+        return self.moments(doc, sorted(hits)[:limit], hits)
+
+    def moment_at(self, doc, time_ms):
+        """Cue in corso all'istante ``time_ms`` del video (ricerca binaria), o None."""
+        starts = self.cue_starts_ms(doc)
+        if not starts:
+            return None
+        cue = cue_times.cue_at(starts, time_ms)
+        return self.moments(doc, [max(cue, 0)], starts=starts)[0]
+
+
+def snippet(cue_text, hits):
+    """Testo della cue con gli intervalli [inizio, fine) delle parole trovate, da evidenziare nel client."""
+    spans = token_spans(cue_text)
+    highlights = []
+    for hit in hits:
+        words = spans[hit["offset"]:hit["offset"] + hit["length"]]
+        if words:
+            highlights.append([words[0][1], words[-1][2]])
+    # Gli intervalli sono sul testo normalizzato, che quasi sempre ha la stessa
+    # lunghezza dell'originale: se non è così si restituisce il solo testo
+    if len(normalize(cue_text)) != len(cue_text):
+        highlights = []
+    return {"text": cue_text, "highlights": highlights}
+
+
+def attach_snippets(index, results, talks_collection=None):
+    """
+    Aggiunge gli snippet delle cue trovate, con l'istante di inizio per saltare al
+    passaggio nel video, letti dall'indice; titolo, url e speaker da MongoDB (solo
+    i talk restituiti, senza la trascrizione).
+    """
+    docs = {}
+    if talks_collection is not None and results:
+        projection = {"title": 1, "url": 1, "speakers": 1}
+        docs = {str(doc["_id"]): doc for doc in talks_collection.find({"_id": {"$in": ids.store_ids(r["id"] for r in results)}}, projection)}
+    for result in results:
+        doc = docs.get(result["id"]) or {}
+        by_cue = {}
+        for hit in result.pop("hits"):
+            by_cue.setdefault(hit["cue"], []).append(hit)
+        result.update({"title": doc.get("title"), "url": doc.get("url"), "speakers": doc.get("speakers")})
+        result["snippets"] = index.moments(index.index[result["id"]], list(by_cue), by_cue)
+    return results
+
+
+def load_index(path):
+    started_at = time.perf_counter()
+    index = TranscriptIndex(path)
+    metrics.record_init_phase("TranscriptIndexLoadDuration", (time.perf_counter() - started_at) * 1000)
+    print(f"Indice delle trascrizioni {index.version} caricato: {index.size} talk, {len(index.terms)} termini.")
+    return index
+
+
+_source = graph_snapshot.SnapshotSource("transcripts", TRANSCRIPT_INDEX_PATH, TRANSCRIPT_INDEX_S3_URI, load_index)
+
+
+def get_transcript_index():
+    """Indice corrente, oppure None se non configurato o non caricabile."""
+    return _source.get()
@@ -0,0 +1,376 @@
+"""
+Indice vettoriale dei contenuti dei talk (titolo, descrizione, trascrizione).
+
+Il job glue/contentVectors_V1.py calcola per ogni talk un vettore denso con un
+metodo solo CPU, senza modelli da scaricare:
+
+    termini (tedxgraph.text.candidate_terms) -> hashing con segno su HASH_FEATURES
+    colonne -> TF-IDF sublineare -> SVD troncata (LSA) -> normalizzazione L2
+
+I vettori sono quantizzati in int8 con una scala per vettore; anche la proiezione
+SVD (per trasformare un testo libero in vettore) è salvata in int8, riga per riga.
+Tutto finisce in un file nello stesso contenitore dello snapshot del grafo
+(tedxgraph.graph_snapshot), mappato in memoria dalle Lambda.
+
+Ricerca: forza bruta vettoriale (una moltiplicazione matrice-vettore) fino a
+BRUTE_FORCE_MAX_ITEMS vettori; oltre, ricerca su grafo di vicinato in stile
+HNSW a due livelli: un campione di "pivot" (livello alto, visitato a forza
+bruta) sceglie i punti d'ingresso della beam search sul grafo completo,
+costruito offline con i vicini esatti più gli archi inversi.
+"""
+
+import array
+import heapq
+import os
+import time
+import zlib
+
+from tedxgraph import graph_snapshot, metrics
+from tedxgraph.text import candidate_terms
+
+MAGIC = b"TEDXVECS"
+FORMAT_VERSION = 1
+HASH_FEATURES = 2 ** 15
+DIMENSIONS = 128
+GRAPH_DEGREE = 16
+# Un pivot ogni PIVOT_RATIO vettori (almeno MIN_PIVOTS): copre anche i cluster poco collegati
+PIVOT_RATIO = 64
+MIN_PIVOTS = 64
+ENTRY_POINTS = 8
+
+CONTENT_INDEX_PATH = os.environ.get("CONTENT_INDEX_PATH")
+CONTENT_INDEX_S3_URI = os.environ.get("CONTENT_INDEX_S3_URI")
+BRUTE_FORCE_MAX_ITEMS = int(os.environ.get("CONTENT_INDEX_BRUTE_FORCE_MAX_ITEMS", "20000"))
+GRAPH_SEARCH_EF = int(os.environ.get("CONTENT_INDEX_SEARCH_EF", "64"))
+
+
+# --- Feature hashing (condiviso tra job e Lambda) ---
+
+def hashed_term_counts(texts, n_features=HASH_FEATURES):
+    """
+    Conteggi con segno dei termini dei testi ``[(testo, peso)]`` hashati su
+    ``n_features`` colonne. crc32 è stabile tra processi (a differenza di hash()).
+    """
+    counts = {}
+    for text, weight in texts:
+        for term in candidate_terms(text or ""):
+            h = zlib.crc32(term.encode("utf-8"))
+            column = h % n_features
+            counts[column] = counts.get(column, 0) + (weight if h & 0x80000000 else -weight)
+    return {column: value for column, value in counts.items() if value}
+
+
+def quantize_rows(matrix):
+    """Quantizzazione int8 simmetrica per riga: restituisce (int8, scale float32)."""
+    import numpy as np
+
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+# --- Costruzione (job Glue) ---
+
+def build_index(talk_ids, titles, documents, version, dimensions=DIMENSIONS,
+                n_features=HASH_FEATURES, graph_degree=GRAPH_DEGREE):
+    """
+    ``documents``: per ogni talk una lista [(testo, peso)], es. titolo x3,
+    descrizione x2, trascrizione x1. Restituisce (header, arrays) per write_snapshot.
+    """
+    vectors, components, idf = lsa_vectors(documents, dimensions, n_features)
+    return index_arrays(talk_ids, titles, vectors, components, idf, version, graph_degree)
+
+
+def lsa_vectors(documents, dimensions=DIMENSIONS, n_features=HASH_FEATURES):
+    """Hashing TF-IDF + SVD troncata: restituisce (vettori n x k normalizzati, proiezione, idf)."""
+    import numpy as np
+    from scipy import sparse
+    from scipy.sparse.linalg import svds
+
+    rows, cols, values = [], [], []
+    for i, texts in enumerate(documents):
+        for column, count in hashed_term_counts(texts, n_features).items():
+            rows.append(i)
+            cols.append(column)
+            values.append(count)
+    n = len(documents)
+    counts = sparse.csr_matrix((np.array(values, dtype=np.float64), (rows, cols)), shape=(n, n_features))
+
+    # TF sublineare con segno e IDF liscio
+    tf = counts.copy()
+    tf.data = np.sign(tf.data) * (1.0 + np.log(np.abs(tf.data)))
+    doc_freq = np.bincount(tf.indices, minlength=n_features)
+    idf = (np.log((1.0 + n) / (1.0 + doc_freq)) + 1.0).astype(np.float32)
+    tfidf = _normalize_rows_sparse(tf @ sparse.diags(idf))
+
+    k = max(1, min(dimensions, min(tfidf.shape) - 1))
+    _, _, vt = svds(tfidf, k=k)
+    components = vt.T.astype(np.float32)                       # n_features x k
+    vectors = _normalize_rows(np.asarray(tfidf @ components))  # n x k
+    return vectors, components, idf
+
+
+def index_arrays(talk_ids, titles, vectors, components, idf, version, graph_degree=GRAPH_DEGREE):
+    """Quantizza vettori e proiezione, costruisce il grafo di ricerca e prepara (header, arrays)."""
+    import numpy as np
+
+    quantized_vectors, vector_scales = quantize_rows(vectors)
+    quantized_components, component_scales = quantize_rows(components)
+    graph_offsets, graph_neighbours = build_neighbour_graph(vectors, graph_degree)
+
+    arrays = {
+        "vectors": array.array("b", quantized_vectors.tobytes()),
+        "vector_scales": array.array("f", vector_scales.tobytes()),
+        "components": array.array("b", quantized_components.tobytes()),
+        "component_scales": array.array("f", component_scales.tobytes()),
+        "idf": array.array("f", np.asarray(idf, dtype=np.float32).tobytes()),
+        "graph_offsets": array.array("i", graph_offsets.astype(np.int32).tobytes()),
+        "graph_neighbours": array.array("i", graph_neighbours.astype(np.int32).tobytes()),
+        "pivots": array.array("i", _pivots(graph_offsets, graph_neighbours).tobytes()),
+    }
+    arrays["id_offsets"], arrays["id_data"] = graph_snapshot.text_column(talk_ids)
+    arrays["title_offsets"], arrays["title_data"] = graph_snapshot.text_column(titles)
+    header = {
+        "format": FORMAT_VERSION,
+        "version": version,
+        "talks": len(talk_ids),
+        "dimensions": vectors.shape[1],
+        "hash_features": components.shape[0],
+    }
+    return header, arrays
+
+
+def _normalize_rows(matrix):
+    import numpy as np
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+def _normalize_rows_sparse(matrix):
+    import numpy as np
+    from scipy import sparse
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms) @ matrix
+
+
+def build_neighbour_graph(vectors, degree, block_size=2048):
+    """
+    Grafo di vicinato per la ricerca approssimata: per ogni vettore i ``degree``
+    vicini esatti (prodotti a blocchi) più gli archi inversi, fino a 2*degree
+    archi per nodo tenendo i più simili. Restituisce (offsets, neighbours) CSR.
+    """
+    import numpy as np
+
+    n = len(vectors)
+    degree = min(degree, n - 1)
+    if degree <= 0:
+        return np.zeros(n + 1, dtype=np.int32), np.zeros(0, dtype=np.int32)
+    nearest = np.empty((n, degree), dtype=np.int64)
+    for start in range(0, n, block_size):
+        scores = vectors[start:start + block_size] @ vectors.T
+        np.fill_diagonal(scores[:, start:start + block_size], -np.inf)
+        top = np.argpartition(-scores, degree, axis=1)[:, :degree]
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+        nearest[start:start + block_size] = np.take_along_axis(top, order, axis=1)
+
+    links = [set(row) for row in nearest.tolist()]
+    for i, row in enumerate(nearest.tolist()):
+        for j in row:
+            links[j].add(i)
+    offsets = [0]
+    neighbours = []
+    for i, candidates in enumerate(links):
+        candidates = np.fromiter(candidates, dtype=np.int64)
+        if len(candidates) > 2 * degree:
+            candidates = candidates[np.argsort(-(vectors[candidates] @ vectors[i]))[:2 * degree]]
+        neighbours.extend(candidates.tolist())
+        offsets.append(len(neighbours))
+    return np.array(offsets), np.array(neighbours)
+
+
+def _pivots(offsets, neighbours, seed=42):
+    """
+    Livello alto del grafo: campione uniforme (seme fisso) di posizioni, più un
+    nodo per ogni componente connessa del grafo che ne resterebbe senza, così
+    che ogni vettore sia raggiungibile da almeno un punto d'ingresso.
+    """
+    import numpy as np
+    from scipy import sparse
+    from scipy.sparse.csgraph import connected_components
+
+    n = len(offsets) - 1
+    count = min(n, max(MIN_PIVOTS, n // PIVOT_RATIO))
+    pivots = np.random.default_rng(seed).choice(n, size=count, replace=False)
+    links = sparse.csr_matrix((np.ones(len(neighbours)), neighbours, offsets), shape=(n, n))
+    _, labels = connected_components(links, directed=True, connection="weak")
+    uncovered = np.setdiff1d(np.unique(labels), labels[pivots])
+    if len(uncovered):
+        _, first = np.unique(labels, return_index=True)
+        pivots = np.concatenate([pivots, first[uncovered]])
+    return np.sort(pivots).astype(np.int32)
+
+
+# --- Lettura (Lambda) ---
+
+class ContentIndex:
+    """Indice vettoriale mappato in memoria; le matrici sono viste NumPy sul file."""
+
+    def __init__(self, path):
+        import numpy as np
+
+        self._mmap, self.header, self.arrays = graph_snapshot.map_snapshot(path, magic=MAGIC, format_version=FORMAT_VERSION)
+        self.path = path
+        self.version = self.header.get("version")
+        self.size = self.header["talks"]
+        self.dimensions = self.header["dimensions"]
+        self.hash_features = self.header["hash_features"]
+        self.vectors = np.frombuffer(self.arrays["vectors"], dtype=np.int8).reshape(self.size, self.dimensions)
+        self.vector_scales = np.frombuffer(self.arrays["vector_scales"], dtype=np.float32)
+        self.components = np.frombuffer(self.arrays["components"], dtype=np.int8).reshape(self.hash_features, self.dimensions)
+        self.component_scales = np.frombuffer(self.arrays["component_scales"], dtype=np.float32)
+        self.idf = np.frombuffer(self.arrays["idf"], dtype=np.float32)
+        self.graph_offsets = np.frombuffer(self.arrays["graph_offsets"], dtype=np.int32)
+        self.graph_neighbours = np.frombuffer(self.arrays["graph_neighbours"], dtype=np.int32)
+        self.pivots = np.frombuffer(self.arrays["pivots"], dtype=np.int32)
+        self.ids = graph_snapshot.decode_column(self.arrays, "id")
+        self.titles = graph_snapshot.decode_column(self.arrays, "title")
+        self.index = {talk_id: i for i, talk_id in enumerate(self.ids)}
+        self._matrix = None
+        self._pivot_matrix = None
+
+    @property
+    def matrix(self):
+        """Vettori dequantizzati in float32 (creati alla prima ricerca a forza bruta)."""
+        if self._matrix is None:
+            import numpy as np
+
+            self._matrix = self.vectors.astype(np.float32) * self.vector_scales[:, None]
+        return self._matrix
+
+    def vector(self, i):
+        import numpy as np
+
+        return self.vectors[i].astype(np.float32) * self.vector_scales[i]
+
+    def embed_text(self, texts):
+        """Vettore di un testo libero ``[(testo, peso)]`` con la stessa pipeline del job."""
+        import numpy as np
+
+        counts = hashed_term_counts(texts, self.hash_features)
+        if not counts:
+            return None
+        columns = np.fromiter(counts.keys(), dtype=np.int64)
+        raw = np.fromiter(counts.values(), dtype=np.float32)
+        weights = np.sign(raw) * (1.0 + np.log(np.abs(raw))) * self.idf[columns]
+        weights /= np.linalg.norm(weights)
+        projection = (self.components[columns].astype(np.float32) * self.component_scales[columns][:, None]).T @ weights
+        norm = np.linalg.norm(projection)
+        return projection / norm if norm else None
+
+    # Ricerca
+
+    def search_exact(self, query, k=10, exclude=None):
+        import numpy as np
+
+        scores = self.matrix @ query
+        if exclude is not None:
+            scores[exclude] = -np.inf
+        k = min(k, self.size - (exclude is not None))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i])) for i in top]
+
+    def entry_points(self, query, count=ENTRY_POINTS):
+        """Pivot più vicini alla query (livello alto, a forza bruta)."""
+        import numpy as np
+
+        if self._pivot_matrix is None:
+            self._pivot_matrix = self.vectors[self.pivots].astype(np.float32) * self.vector_scales[self.pivots][:, None]
+        scores = self._pivot_matrix @ query
+        count = min(count, len(scores))
+        top = np.argpartition(-scores, count - 1)[:count]
+        return self.pivots[top].astype(np.int64), scores[top]
+
+    def search_graph(self, query, k=10, ef=GRAPH_SEARCH_EF, exclude=None):
+        """Beam search sul grafo di vicinato: ``ef`` candidati mantenuti durante la visita."""
+        import numpy as np
+
+        ef = max(ef, k)
+        entry, entry_scores = self.entry_points(query)
+        visited = set(entry.tolist())
+        candidates = [(-float(s), int(i)) for s, i in zip(entry_scores, entry)]
+        heapq.heapify(candidates)
+        best = [(float(s), int(i)) for s, i in zip(entry_scores, entry)]
+        heapq.heapify(best)
+        while len(best) > ef:
+            heapq.heappop(best)
+
+        while candidates:
+            negative_score, i = heapq.heappop(candidates)
+            if len(best) >= ef and -negative_score < best[0][0]:
+                break
+            neighbours = self.graph_neighbours[self.graph_offsets[i]:self.graph_offsets[i + 1]]
+            fresh = np.array([j for j in neighbours.tolist() if j not in visited], dtype=np.int64)
+            if not len(fresh):
+                continue
+            visited.update(fresh.tolist())
+            scores = (self.vectors[fresh].astype(np.float32) @ query) * self.vector_scales[fresh]
+            for score, j in zip(scores.tolist(), fresh.tolist()):
+                if len(best) < ef or score > best[0][0]:
+                    heapq.heappush(candidates, (-score, j))
+                    heapq.heappush(best, (score, j))
+                    if len(best) > ef:
+                        heapq.heappop(best)
+
+        results = sorted(((s, i) for s, i in best if i != exclude), reverse=True)[:k]
+        return [(i, s) for s, i in results]
+
+    def search(self, query, k=10, exclude=None):
+        if self.size <= BRUTE_FORCE_MAX_ITEMS:
+            return self.search_exact(query, k=k, exclude=exclude)
+        return self.search_graph(query, k=k, exclude=exclude)
+
+    def similar(self, talk_id, k=10):
+        """Talk più simili per contenuto: [{id, title, score}]; None se il talk non è indicizzato."""
+        i = self.index.get(str(talk_id))
+        if i is None:
+            return None
+        return [
+            {"id": self.ids[j], "title": self.titles[j] or None, "score": round(score, 4)}
+            for j, score in self.search(self.vector(i), k=k, exclude=i)
+        ]
+
+    def similarity(self, talk_id, other_ids):
+        """Similarità del coseno tra un talk e una lista di talk (None per quelli non indicizzati)."""
+        i = self.index.get(str(talk_id))
+        if i is None:
+            return {other: None for other in other_ids}
+        source = self.vector(i)
+        result = {}
+        for other in other_ids:
+            j = self.index.get(str(other))
+            result[other] = round(float(self.vector(j) @ source), 4) if j is not None else None
+        return result
+
+
+def load_index(path):
+    started_at = time.perf_counter()
+    index = ContentIndex(path)
+    metrics.record_init_phase("ContentIndexLoadDuration", (time.perf_counter() - started_at) * 1000)
+    print(f"Indice dei contenuti {index.version} caricato: {index.size} talk, {index.dimensions} dimensioni.")
+    return index
+
+
+_source = graph_snapshot.SnapshotSource("vectors", CONTENT_INDEX_PATH, CONTENT_INDEX_S3_URI, load_index)
+
+
+def get_content_index():
+    """Indice corrente, oppure None se non configurato o non caricabile."""
+    return _source.get()
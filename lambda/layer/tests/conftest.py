@@ -0,0 +1,19 @@
+"""
+Test del layer tedxgraph (e dei job Glue che lo usano), senza servizi esterni:
+
+    python -m pytest lambda/layer/tests -q
+
+Il pacchetto del layer, i job Glue e i moduli di benchmarks (tedxbench, server
+GraphQL stand-in) sono importati dai sorgenti del repository.
+"""
+
+import os
+import sys
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+for path in (os.path.join(REPO_ROOT, "lambda", "layer", "python"),
+             os.path.join(REPO_ROOT, "glue"),
+             os.path.join(REPO_ROOT, "benchmarks")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
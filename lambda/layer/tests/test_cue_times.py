@@ -0,0 +1,43 @@
+"""Test di tedxgraph.cue_times: codifica a delta degli istanti e ricerca della cue in corso."""
+
+import array
+
+from tedxgraph import cue_times
+
+
+def test_round_trip():
+    times = [0, 1500, 1500, 4200, 3_600_000]
+    encoded = cue_times.encode_times(times)
+    assert len(encoded) == 4 * len(times)
+    assert cue_times.decode_times(encoded) == times
+    assert cue_times.decode_times(cue_times.delta_encode(times)) == times
+    # Il formato è little-endian a prescindere dalla piattaforma
+    assert encoded[4:8] == (1500).to_bytes(4, "little")
+
+
+def test_missing_or_out_of_range_times():
+    assert cue_times.encode_times([]) is None
+    assert cue_times.encode_times(None) is None
+    assert cue_times.encode_times([0, None, 2000]) is None
+    assert cue_times.encode_times([0, cue_times.INT32_MAX + 1]) is None
+    assert cue_times.decode_times(None) == []
+    assert cue_times.decode_times(b"") == []
+
+
+def test_decode_accepts_delta_arrays():
+    assert cue_times.decode_times(array.array("i", [100, 50, 25])) == [100, 150, 175]
+
+
+def test_cue_at():
+    starts = [1000, 5000, 9000]
+    assert cue_times.cue_at(starts, 0) == -1
+    assert cue_times.cue_at(starts, 1000) == 0
+    assert cue_times.cue_at(starts, 4999) == 0
+    assert cue_times.cue_at(starts, 5000) == 1
+    assert cue_times.cue_at(starts, 60000) == 2
+
+
+def test_cue_line():
+    assert cue_times.cue_line("And I said,\nthis is amazing") == "And I said, this is amazing"
+    assert cue_times.cue_line("  Thank\r\n\t you  ") == "Thank you"
+    assert cue_times.cue_line(None) == ""
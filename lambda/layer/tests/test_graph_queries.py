@@ -0,0 +1,52 @@
+"""Test delle query Cypher di tedxgraph.graph_queries su una transazione che registra le query."""
+
+from tedxgraph import graph_queries
+from tedxgraph.talk_filters import TalkFilter
+
+
+class Result(list):
+    def single(self):
+        return self[0] if self else None
+
+
+class RecordingTx:
+    """Transazione finta: registra (query, parametri); i conteggi restituiscono ``counts`` in ordine."""
+
+    def __init__(self, counts=()):
+        self.queries = []
+        self.counts = list(counts)
+
+    def run(self, query, **params):
+        self.queries.append((query, params))
+        if "count(t)" in query:
+            return Result([{"n": self.counts.pop(0)}])
+        return Result()
+
+
+def listing_query(tx):
+    return tx.queries[-1][0]
+
+
+def test_find_talks_hints_the_most_selective_range():
+    tx = RecordingTx(counts=[900, 40])
+    graph_queries.find_talks(tx, TalkFilter.from_params({"published_after": "2015-01-01", "max_duration": 300}))
+    assert len(tx.queries) == 3
+    assert "USING INDEX t:Talk(graph, duration)" in listing_query(tx)
+
+
+def test_find_talks_single_range_uses_its_index_without_counting():
+    tx = RecordingTx()
+    graph_queries.find_talks(tx, TalkFilter.from_params({"published_after": "2015-01-01"}))
+    assert len(tx.queries) == 1
+    assert "USING INDEX t:Talk(graph, publishedAt)" in listing_query(tx)
+
+
+def test_find_talks_does_not_force_a_range_index_with_tags():
+    tx = RecordingTx()
+    graph_queries.find_talks(tx, TalkFilter.from_params(
+        {"published_after": "2015-01-01", "max_duration": 300}, tags=["climate"]))
+    assert len(tx.queries) == 1
+    query, params = tx.queries[0]
+    assert "USING INDEX" not in query
+    assert params["tags"] == ["climate"]
+    assert "t.publishedAt >= $published_min" in query and "t.duration <= $duration_max" in query
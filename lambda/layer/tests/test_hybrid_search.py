@@ -0,0 +1,115 @@
+"""Test di tedxgraph.hybrid_search: fusione RRF, filtri, ordinamento dei filtrati e budget dei retriever."""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tedxgraph import hybrid_search
+from tedxgraph.talk_filters import TalkFilter
+
+
+def test_rrf_sums_reciprocal_ranks():
+    rankings = {
+        "title": [("a", 1.0), ("b", 0.5)],
+        "vector": [("b", 0.9), ("c", 0.8), ("a", 0.1)],
+    }
+    results = hybrid_search.reciprocal_rank_fusion(rankings, k=60)
+    assert [entry["id"] for entry in results] == ["b", "a", "c"]
+    b, a, c = results
+    assert b["score"] == round(1 / 62 + 1 / 61, 6)
+    assert a["score"] == round(1 / 61 + 1 / 63, 6)
+    assert b["sources"] == {"title": {"rank": 2, "score": 0.5}, "vector": {"rank": 1, "score": 0.9}}
+    assert c["sources"] == {"vector": {"rank": 2, "score": 0.8}}
+
+
+def test_rrf_reranks_after_filter_and_limits():
+    rankings = {"title": [("x", 3.0), ("y", 2.0), ("z", 1.0)]}
+    results = hybrid_search.reciprocal_rank_fusion(rankings, allowed={"y", "z"}, limit=1)
+    # Il candidato scartato non penalizza quelli che seguono
+    assert results == [{"id": "y", "score": round(1 / 61, 6), "sources": {"title": {"rank": 1, "score": 2.0}}}]
+
+
+def test_rrf_counts_duplicates_once_and_normalizes_ids():
+    results = hybrid_search.reciprocal_rank_fusion({"transcript": [(7, 2.0), ("7", 1.0), (8, None)]})
+    assert [(entry["id"], entry["sources"]["transcript"]["rank"]) for entry in results] == [("7", 1), ("8", 2)]
+    assert results[1]["sources"]["transcript"]["score"] is None
+
+
+def test_sort_results_follows_filtered_order():
+    results = [{"id": "a"}, {"id": "b"}, {"id": "c"}]
+    assert [entry["id"] for entry in hybrid_search.sort_results(results, ["c", "a"])] == ["c", "a", "b"]
+
+
+def test_run_retrievers_reports_status():
+    def failing():
+        raise RuntimeError("boom")
+
+    def slow():
+        time.sleep(0.5)
+        return [("late", 1.0)]
+
+    retrievers = {"title": lambda: [("a", 1.0)], "transcript": lambda: None, "vector": failing, "slow": slow}
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results, report = hybrid_search.run_retrievers(executor, retrievers, {"slow": 50})
+    assert results == {"title": [("a", 1.0)]}
+    assert report["title"]["status"] == "ok" and report["title"]["candidates"] == 1
+    assert report["transcript"]["status"] == "unavailable"
+    assert report["vector"]["status"] == "error"
+    assert report["slow"] == {"status": "timeout", "ms": 50}
+
+
+def test_filtered_top_widens_until_enough_candidates_pass():
+    ranked = [(i, 1.0 / (i + 1)) for i in range(100)]
+    calls = []
+
+    def search(n):
+        calls.append(n)
+        return ranked[:n]
+
+    kept = hybrid_search.filtered_top(search, lambda i: i % 10 == 0, 5, len(ranked))
+    assert kept == [(0, 1.0), (10, 1 / 11), (20, 1 / 21), (30, 1 / 31), (40, 1 / 41)]
+    assert calls == [5, 20, 80]
+    # Candidati finiti prima di averne abbastanza
+    calls.clear()
+    assert hybrid_search.filtered_top(search, lambda i: i == 99, 3, len(ranked)) == [(99, 0.01)]
+    assert calls[-1] == 100
+
+
+class FakeSnapshot:
+    def __init__(self, allowed):
+        self.allowed = allowed
+
+    def filter_ids(self, talk_ids, talk_filter):
+        return [talk_id for talk_id in talk_ids if talk_id in self.allowed]
+
+    def matcher(self, talk_filter):
+        return lambda talk_id: str(talk_id) in self.allowed
+
+
+def test_filter_candidates_from_snapshot(monkeypatch):
+    monkeypatch.setattr(hybrid_search.graph_snapshot, "get_snapshot", lambda: FakeSnapshot({"b", "c"}))
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        allowed, report = hybrid_search.filter_candidates(executor, ["a", "b", "c", "b"], TalkFilter(["ai"]), 100)
+    assert allowed == ["b", "c"]
+    assert report["status"] == "ok"
+    assert hybrid_search.candidate_predicate(TalkFilter(["ai"]))("c")
+    assert hybrid_search.candidate_predicate(TalkFilter(sort="newest")) is None
+
+
+def test_filter_candidates_degrade_without_snapshot(monkeypatch):
+    monkeypatch.setattr(hybrid_search.graph_snapshot, "get_snapshot", lambda: None)
+    assert hybrid_search.candidate_predicate(TalkFilter(["ai"])) is None
+
+    def slow(*args):
+        time.sleep(0.5)
+        return ["a"]
+
+    def unavailable(*args):
+        raise ConnectionError("Neo4j not available")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        monkeypatch.setattr(hybrid_search.neo4j_runtime, "execute_read", slow)
+        assert hybrid_search.filter_candidates(executor, ["a", "b"], TalkFilter(["ai"]), 50) == \
+            (None, {"status": "timeout", "ms": 50})
+        monkeypatch.setattr(hybrid_search.neo4j_runtime, "execute_read", unavailable)
+        allowed, report = hybrid_search.filter_candidates(executor, ["a", "b"], TalkFilter(["ai"]), 50)
+        assert allowed is None and report["status"] == "error"
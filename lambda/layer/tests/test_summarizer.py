@@ -0,0 +1,51 @@
+"""Test di tedxgraph.summarizer: divisione in blocchi e budget del prompt finale del map-reduce."""
+
+from tedxgraph import summarizer
+
+
+def test_split_transcript_respects_cues_and_budget():
+    transcript = "\n".join(["one two three four five six seven"] * 10 + ["", "long " * 40])
+    chunks = summarizer.split_transcript(transcript, token_budget=20)
+    assert all(summarizer.estimate_tokens(chunk) <= 20 for chunk in chunks)
+    # Solo la cue più lunga del budget viene spezzata
+    assert "\n".join(chunks).count("one two three four five six seven") == 10
+
+
+def reduce_prompts(monkeypatch, partial_summaries, single_pass_tokens=100, chunk_tokens=10):
+    monkeypatch.setattr(summarizer, "SUMMARY_SINGLE_PASS_TOKENS", single_pass_tokens)
+    monkeypatch.setattr(summarizer, "SUMMARY_CHUNK_TOKENS", chunk_tokens)
+    prompts = []
+
+    def call_huggingface(prompt, max_new_tokens=350, wait_for_model=True):
+        prompts.append(prompt)
+        return "Final summary."
+
+    monkeypatch.setattr(summarizer, "call_huggingface", call_huggingface)
+    return summarizer.reduce_summaries("Title", partial_summaries), prompts
+
+
+def test_reduce_shortens_partials_that_cannot_be_grouped(monkeypatch):
+    # Ogni riassunto supera da solo il budget di un gruppo: nessun livello intermedio
+    partials = [f"Part {i}: " + "word " * 60 for i in range(4)]
+    result, prompts = reduce_prompts(monkeypatch, partials)
+    assert result == "Final summary."
+    [prompt] = prompts
+    numbered = prompt.split("Summaries of consecutive parts of the talk:")[1].split("Please provide")[0].strip()
+    assert summarizer.estimate_tokens(numbered) <= 100 + 2 * len(partials)
+    # Tutte le parti del talk restano nel prompt
+    assert all(f"Part {i}:" in numbered for i in range(4))
+
+
+def test_fit_partial_summaries():
+    partials = ["alpha " * 50, "short", "beta " * 50]
+    fitted = summarizer.fit_partial_summaries(partials, 90)
+    assert summarizer.estimate_tokens("\n".join(fitted)) <= 90
+    assert fitted[1] == "short"
+    assert fitted[0].startswith("alpha") and not fitted[0].endswith("alph")
+    assert summarizer.fit_partial_summaries(partials * 10, 90) is None
+
+
+def test_reduce_reports_an_error_instead_of_an_oversized_prompt(monkeypatch):
+    result, prompts = reduce_prompts(monkeypatch, ["word " * 60] * 50)
+    assert prompts == []
+    assert summarizer.summary_error_status(result) == 500
@@ -0,0 +1,91 @@
+"""Test di tedxgraph.summary_jobs: id dei job e presa in carico con lease (store in memoria)."""
+
+from datetime import timedelta
+
+from tedxgraph import summary_jobs
+
+
+def test_job_id_depends_on_talk_and_transcript():
+    job_id = summary_jobs.summary_job_id("101", "digest-a")
+    assert len(job_id) == 32
+    assert summary_jobs.summary_job_id("101", "digest-a") == job_id
+    assert summary_jobs.summary_job_id("101", "digest-b") != job_id
+    assert summary_jobs.summary_job_id("102", "digest-a") != job_id
+
+
+def test_create_is_idempotent():
+    store = summary_jobs.InMemoryJobStore()
+    assert store.create_if_absent("job", "101")
+    assert not store.create_if_absent("job", "101")
+    job = store.get("job")
+    assert job["status"] == summary_jobs.STATUS_QUEUED and job["attempts"] == 0
+    assert store.get("missing") is None
+
+
+def test_claim_takes_a_lease():
+    store = summary_jobs.InMemoryJobStore()
+    store.create_if_absent("job", "101")
+    job = store.claim("job")
+    assert job["status"] == summary_jobs.STATUS_RUNNING
+    assert job["attempts"] == 1
+    assert job["lease_until"] > job["updated_at"]
+    # Seconda consegna dello stesso messaggio mentre il lease è valido
+    assert store.claim("job") is None
+    assert store.claim("missing") is None
+
+
+def test_expired_lease_can_be_claimed_again():
+    store = summary_jobs.InMemoryJobStore()
+    store.create_if_absent("job", "101")
+    job = store.claim("job")
+    store.update("job", lease_until=job["updated_at"] - timedelta(seconds=1))
+    job = store.claim("job")
+    assert job is not None and job["attempts"] == 2
+
+
+def test_waiting_jobs_are_claimable_and_finished_jobs_are_not():
+    store = summary_jobs.InMemoryJobStore()
+    store.create_if_absent("job", "101")
+    store.claim("job")
+    store.update("job", status=summary_jobs.STATUS_WAITING_MODEL)
+    assert store.claim("job")["attempts"] == 2
+    store.update("job", status=summary_jobs.STATUS_DONE)
+    assert store.claim("job") is None
+
+
+def test_restart_failed():
+    store = summary_jobs.InMemoryJobStore()
+    store.create_if_absent("job", "101")
+    assert not store.restart_failed("job")
+    store.claim("job")
+    store.update("job", status=summary_jobs.STATUS_FAILED, error="boom")
+    assert store.restart_failed("job")
+    job = store.get("job")
+    assert (job["status"], job["attempts"], job["error"]) == (summary_jobs.STATUS_QUEUED, 0, None)
+
+
+class RecordingQueue:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, job_id, delay_seconds=0):
+        self.sent.append((job_id, delay_seconds))
+
+
+def test_model_not_ready_requeues_until_max_attempts(monkeypatch):
+    store, job_queue = summary_jobs.InMemoryJobStore(), RecordingQueue()
+    monkeypatch.setattr(summary_jobs, "_job_store", store)
+    monkeypatch.setattr(summary_jobs, "_job_queue", job_queue)
+    monkeypatch.setattr(summary_jobs.summarizer, "check_model_ready", lambda: (False, 20))
+    store.create_if_absent("job", "101")
+
+    statuses = [summary_jobs.process_job("job") for _ in range(summary_jobs.SUMMARY_JOB_MAX_ATTEMPTS)]
+    assert statuses == [summary_jobs.STATUS_WAITING_MODEL] * (summary_jobs.SUMMARY_JOB_MAX_ATTEMPTS - 1) + \
+        [summary_jobs.STATUS_FAILED]
+    assert job_queue.sent == [("job", 25)] * (summary_jobs.SUMMARY_JOB_MAX_ATTEMPTS - 1)
+    job = store.get("job")
+    assert job["status"] == summary_jobs.STATUS_FAILED
+    assert job["attempts"] == summary_jobs.SUMMARY_JOB_MAX_ATTEMPTS
+    assert job["error"]
+    # Un messaggio ancora in coda non riapre il job fallito
+    assert summary_jobs.process_job("job") is None
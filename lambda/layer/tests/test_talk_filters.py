@@ -0,0 +1,102 @@
+"""Test di tedxgraph.talk_filters: conversione dei parametri, range e planner."""
+
+from datetime import datetime, timezone
+
+import pytest
+
+from tedxgraph import graph_queries, talk_filters
+from tedxgraph.talk_filters import TalkFilter
+
+
+def test_parse_date_variants():
+    assert talk_filters.parse_date(None) is None
+    assert talk_filters.parse_date("") is None
+    assert talk_filters.parse_date("2020-01-31") == datetime(2020, 1, 31, tzinfo=timezone.utc)
+    assert talk_filters.parse_date("2020-01-31T10:30:00Z") == datetime(2020, 1, 31, 10, 30, tzinfo=timezone.utc)
+    # Con un fuso esplicito l'istante è conservato
+    assert talk_filters.parse_date("2020-01-31T12:00:00+02:00").timestamp() == \
+        datetime(2020, 1, 31, 10, 0, tzinfo=timezone.utc).timestamp()
+
+
+def test_date_only_upper_bound_includes_the_whole_day():
+    assert talk_filters.parse_date("2020-01-31", end_of_day=True) == \
+        datetime(2020, 1, 31, 23, 59, 59, 999999, tzinfo=timezone.utc)
+    # Con un orario esplicito l'estremo resta quello indicato
+    assert talk_filters.parse_date("2020-01-31T12:00:00Z", end_of_day=True) == \
+        datetime(2020, 1, 31, 12, tzinfo=timezone.utc)
+
+    talk_filter = TalkFilter.from_params({"published_after": "2020-01-01", "published_before": "2020-01-31"})
+    bounds = talk_filter.ranges()["published"]
+    for published, expected in [("2019-12-31T23:59:59Z", False), ("2020-01-01T00:00:00Z", True),
+                                ("2020-01-31T00:00:00Z", True), ("2020-01-31T18:30:00Z", True),
+                                ("2020-01-31T23:59:59Z", True), ("2020-02-01T00:00:00Z", False)]:
+        assert talk_filters.in_range(talk_filters.epoch_seconds(published), bounds) is expected, published
+
+    # Gli stessi estremi nei parametri della query Cypher
+    _, params = graph_queries._filter_conditions(talk_filter)
+    assert params["published_min"] == datetime(2020, 1, 1, tzinfo=timezone.utc)
+    assert params["published_max"] == datetime(2020, 1, 31, 23, 59, 59, 999999, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("value", ["31/01/2020", "yesterday", 20200131, ["2020-01-31"], {"date": "2020-01-31"}])
+def test_parse_date_rejects_invalid_values(value):
+    with pytest.raises(ValueError):
+        talk_filters.parse_date(value)
+
+
+def test_from_params():
+    talk_filter = TalkFilter.from_params({"published_after": "2019-01-01", "min_duration": "300",
+                                          "max_duration": 900, "sort": "newest"}, tags=["science"])
+    assert talk_filter.tags == ["science"]
+    assert talk_filter.published_after == datetime(2019, 1, 1, tzinfo=timezone.utc)
+    assert talk_filter.published_before is None
+    assert (talk_filter.min_duration, talk_filter.max_duration) == (300, 900)
+    assert talk_filter.sort == "newest"
+    assert TalkFilter.from_params({}).is_empty()
+
+
+@pytest.mark.parametrize("params, tags", [
+    ({"published_after": "not a date"}, None),
+    ({"published_before": 1577836800}, None),
+    ({"min_duration": "five"}, None),
+    ({"max_duration": talk_filters.MAX_DURATION_SECONDS + 1}, None),
+    ({"min_duration": -1}, None),
+    ({"sort": "random"}, None),
+    ({}, "science"),
+    ({}, ["science", 3]),
+])
+def test_from_params_rejects_invalid_params(params, tags):
+    with pytest.raises(ValueError):
+        TalkFilter.from_params(params, tags=tags)
+
+
+def test_ranges_and_in_range():
+    talk_filter = TalkFilter(published_after=datetime(2020, 1, 1, tzinfo=timezone.utc), max_duration=600)
+    ranges = talk_filter.ranges()
+    assert ranges == {"published": (1577836800, None), "duration": (None, 600)}
+    assert talk_filter.has_predicates() and not talk_filter.is_empty()
+    assert talk_filters.in_range(1577836800, ranges["published"])
+    assert not talk_filters.in_range(1577836799, ranges["published"])
+    assert talk_filters.in_range(600, ranges["duration"])
+    assert not talk_filters.in_range(601, ranges["duration"])
+    # 0 è il valore assente: non passa nessun filtro
+    assert not talk_filters.in_range(0, (None, 600))
+
+
+def test_value_conversions():
+    assert talk_filters.epoch_seconds("2020-01-01T00:00:00Z") == 1577836800
+    assert talk_filters.epoch_seconds(datetime(2020, 1, 1)) == 1577836800
+    assert talk_filters.epoch_seconds("garbage") == 0
+    assert talk_filters.epoch_seconds(None) == 0
+    assert talk_filters.iso_date(1577836800) == "2020-01-01T00:00:00Z"
+    assert talk_filters.iso_date(0) is None
+    assert [talk_filters.duration_seconds(value) for value in (754, "754", " 12 ", "1e3", True, None, -5)] == \
+        [754, 754, 12, 0, 0, 0, 0]
+
+
+def test_choose_driver():
+    assert talk_filters.choose_driver({}) is None
+    assert talk_filters.choose_driver({"tags": 40, "published": 900}) == "tags"
+    assert talk_filters.choose_driver({"tags": 900, "duration": 40}) == "duration"
+    # A parità vince un range
+    assert talk_filters.choose_driver({"tags": 50, "published": 50}) == "published"
@@ -0,0 +1,57 @@
+"""Test di tedxgraph.transcript_codec: round-trip zlib, dizionari e digest."""
+
+import pytest
+
+from tedxgraph import transcript_codec
+
+
+def sample_transcripts(count=transcript_codec.MIN_DICTIONARY_SAMPLES):
+    return [f"Thank you so much. This is talk number {i}.\nAnd I think that the future of ideas is here." for i in range(count)]
+
+
+def test_zlib_round_trip_without_dictionary():
+    text = "Hello, world.\nCiao, perché no?\n" * 50
+    transcript_z = transcript_codec.Compressor("zlib").compress(text)
+    assert transcript_z["format"] == transcript_codec.FORMAT_COMPRESSED
+    assert transcript_z["dict"] is None
+    assert transcript_z["size"] == len(text.encode("utf-8"))
+    assert transcript_z["sha256"] == transcript_codec.digest(text)
+    assert len(transcript_z["data"]) < transcript_z["size"]
+    assert transcript_codec.decompress(transcript_z) == text
+
+
+def test_zlib_round_trip_with_dictionary():
+    samples = sample_transcripts()
+    dictionary = transcript_codec.train_dictionary(samples, "zlib")
+    assert dictionary
+    compressor = transcript_codec.Compressor("zlib", dictionary)
+    assert compressor.dict_id == transcript_codec.dictionary_id("zlib", dictionary)
+    cache = transcript_codec.DictionaryCache({compressor.dict_id: dictionary}.get)
+    for text in samples[:3]:
+        doc = {"transcript_z": compressor.compress(text)}
+        assert transcript_codec.read_transcript(doc, cache) == text
+        assert transcript_codec.transcript_digest(doc) == transcript_codec.digest(text)
+
+
+def test_small_samples_give_no_dictionary():
+    assert transcript_codec.train_dictionary(sample_transcripts(3), "zlib") == b""
+    assert transcript_codec.dictionary_id("zlib", b"") is None
+
+
+def test_plain_documents():
+    doc = {"transcript": "Plain text"}
+    assert transcript_codec.has_transcript(doc)
+    assert transcript_codec.read_transcript(doc) == "Plain text"
+    assert transcript_codec.transcript_digest(doc) == transcript_codec.digest("Plain text")
+    assert transcript_codec.read_transcript({"transcript": ""}) is None
+    assert transcript_codec.transcript_digest({}) is None
+    assert not transcript_codec.has_transcript({"transcript": None})
+
+
+def test_invalid_codec_and_format():
+    with pytest.raises(ValueError):
+        transcript_codec.Compressor("lz4")
+    with pytest.raises(ValueError):
+        transcript_codec.decompress({"format": transcript_codec.FORMAT_PLAIN, "data": b""})
+    with pytest.raises(LookupError):
+        transcript_codec.DictionaryCache(lambda dict_id: None).get("zlib-missing")
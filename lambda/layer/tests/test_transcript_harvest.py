@@ -0,0 +1,128 @@
+"""
+Test di glue/transcript_harvest.py contro il server GraphQL stand-in
+(graphql_standin_server.py): cue e tempi, not_found, retry con backoff su 429 e 5xx.
+
+    python -m pytest lambda/layer/tests/test_transcript_harvest.py -q
+"""
+
+import pytest
+
+requests = pytest.importorskip("requests")
+
+import transcript_harvest  # noqa: E402
+from graphql_standin_server import start_server  # noqa: E402
+
+
+@pytest.fixture
+def standin():
+    server, catalog, url = start_server(scale=0.02)
+    yield catalog, url
+    server.shutdown()
+    server.server_close()
+
+
+def fetcher_for(url, sleeps, batch_size=transcript_harvest.INITIAL_BATCH_SIZE, cue_times=False):
+    # Le attese del backoff vengono registrate invece di essere eseguite
+    return transcript_harvest.BatchFetcher(requests.Session(), batch_size=batch_size, url=url,
+                                           cue_times=cue_times, sleep=sleeps.append)
+
+
+def transcribed_slugs(catalog, count):
+    slugs = [slug for slug, talk in catalog.talks.items() if catalog.generator.transcript(talk)]
+    return slugs[:count]
+
+
+def test_cues_and_times_match_the_server(standin):
+    catalog, url = standin
+    slugs = transcribed_slugs(catalog, 25)
+    sleeps = []
+    rows = transcript_harvest.harvest_rows(fetcher_for(url, sleeps, cue_times=True), slugs)
+
+    assert [row["slug"] for row in rows] == slugs
+    assert sleeps == []
+    for row in rows:
+        expected, error = catalog.translation(row["slug"], "en", cue_times=True)
+        assert error is None
+        assert row["status"] == transcript_harvest.STATUS_OK
+        assert row["http_status"] == 200
+        assert row["attempts"] == 1
+        assert row["paragraphs"] == expected
+        times = [cue["time"] for paragraph in row["paragraphs"] for cue in paragraph["cues"]]
+        assert times and all(isinstance(t, int) for t in times)
+        assert times == sorted(times)
+
+
+def test_cues_without_times_by_default(standin):
+    catalog, url = standin
+    rows = transcript_harvest.harvest_rows(fetcher_for(url, []), transcribed_slugs(catalog, 3))
+    for row in rows:
+        cues = [cue for paragraph in row["paragraphs"] for cue in paragraph["cues"]]
+        assert cues and all(set(cue) == {"text"} for cue in cues)
+
+
+def test_missing_transcripts_are_not_found(standin):
+    catalog, url = standin
+    untranscribed = next(slug for slug, talk in catalog.talks.items() if not catalog.generator.transcript(talk))
+    transcribed = transcribed_slugs(catalog, 1)[0]
+    # Le lingue diverse dall'inglese esistono solo per una parte dei talk
+    untranslated = next(slug for slug in transcribed_slugs(catalog, 200)
+                        if catalog.translation(slug, "it")[0] is None)
+    slugs = [untranscribed, "no_such_talk", transcribed, untranslated]
+    rows = {row["slug"]: row for row in transcript_harvest.harvest_rows(fetcher_for(url, []), slugs, ("en", "it"))}
+
+    assert rows[untranscribed]["status"] == transcript_harvest.STATUS_NOT_FOUND
+    assert rows[untranscribed]["error"] is None
+    assert rows[untranscribed]["paragraphs"] is None
+    # Slug sconosciuto: errore GraphQL sull'alias, ma non da ritentare
+    assert rows["no_such_talk"]["status"] == transcript_harvest.STATUS_NOT_FOUND
+    assert "Video not found" in rows["no_such_talk"]["error"]
+    assert rows["no_such_talk"]["attempts"] == 1
+    assert rows[transcribed]["status"] == transcript_harvest.STATUS_OK
+    assert rows[untranslated]["languages"]["it"]["status"] == transcript_harvest.STATUS_NOT_FOUND
+    assert not any(transcript_harvest.needs_retry(row) for row in rows.values())
+
+
+def test_throttled_batches_are_retried_after_retry_after(standin):
+    catalog, url = standin
+    slugs = transcribed_slugs(catalog, 8)
+    catalog.inject(429, 429)
+    sleeps = []
+    fetcher = fetcher_for(url, sleeps, batch_size=8)
+    rows = transcript_harvest.harvest_rows(fetcher, slugs)
+
+    assert all(row["status"] == transcript_harvest.STATUS_OK for row in rows)
+    assert [row["paragraphs"] for row in rows] == [catalog.translation(slug, "en")[0] for slug in slugs]
+    assert fetcher.stats["throttled"] == 2
+    # Retry-After: 1 del server prevale sul backoff esponenziale
+    assert sleeps == [1.0, 1.0]
+    assert catalog.injected == 2
+    assert max(row["attempts"] for row in rows) == 3
+
+
+def test_server_errors_use_exponential_backoff(standin):
+    catalog, url = standin
+    slugs = transcribed_slugs(catalog, 4)
+    catalog.inject(500, 502)
+    sleeps = []
+    fetcher = fetcher_for(url, sleeps, batch_size=4)
+    rows = transcript_harvest.harvest_rows(fetcher, slugs)
+
+    assert all(row["status"] == transcript_harvest.STATUS_OK for row in rows)
+    assert fetcher.stats["failed"] == 2
+    backoff = transcript_harvest.BACKOFF_SECONDS
+    assert sleeps == [backoff, backoff * 2]
+
+
+def test_retries_stop_after_max_attempts(standin):
+    catalog, url = standin
+    slug = transcribed_slugs(catalog, 1)[0]
+    catalog.inject(*[503] * transcript_harvest.MAX_ATTEMPTS)
+    sleeps = []
+    [row] = transcript_harvest.harvest_rows(fetcher_for(url, sleeps, batch_size=1), [slug])
+
+    assert row["status"] == transcript_harvest.STATUS_THROTTLED
+    assert row["http_status"] == 503
+    assert row["attempts"] == transcript_harvest.MAX_ATTEMPTS
+    assert row["paragraphs"] is None
+    assert transcript_harvest.needs_retry(row)
+    assert len(sleeps) == transcript_harvest.MAX_ATTEMPTS - 1
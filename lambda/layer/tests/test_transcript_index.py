@@ -0,0 +1,114 @@
+"""Test di tedxgraph.transcript_index: varint, costruzione, scrittura e lettura dell'indice."""
+
+import pytest
+
+import transcriptIndex_V1
+from tedxgraph import cue_times, graph_snapshot, transcript_index
+
+TRANSCRIPTS = [
+    "Thank you so much, Chris.\nIt's truly a great honor to be here.\nI have been blown away by this conference.",
+    None,
+    "Climate change is real.\nThe great honor of science is doubt.",
+]
+CUE_TIMES = [cue_times.encode_times([1000, 4000, 9000]), None, cue_times.encode_times([0, 2500])]
+
+
+@pytest.fixture
+def index(tmp_path):
+    header, arrays = transcript_index.build_index(["101", "102", "103"], TRANSCRIPTS, "v1", CUE_TIMES)
+    path = str(tmp_path / "transcripts.idx")
+    graph_snapshot.write_snapshot(path, header, arrays, magic=transcript_index.MAGIC)
+    return transcript_index.TranscriptIndex(path)
+
+
+def test_varint_round_trip():
+    values = [0, 1, 127, 128, 300, 2 ** 32, 2 ** 40 + 7]
+    data = transcript_index.encode_varints(values, bytearray())
+    assert transcript_index.decode_varints(data)[0] == values
+    positions = [3, 3, 10, 200, 100000]
+    assert transcript_index.decode_deltas(transcript_index.encode_deltas(positions, bytearray())) == positions
+
+
+def test_header(index):
+    assert index.version == "v1"
+    assert index.size == 3
+    assert index.header["cues"] == 5
+    assert index.header["timed_talks"] == 2
+    assert index.ids == ["101", "102", "103"]
+
+
+def test_search_words_and_phrases(index):
+    assert {result["id"] for result in index.search("honor")} == {"101", "103"}
+    [result] = index.search('"great honor to"')
+    assert result["id"] == "101"
+    assert result["hits"] == [{"cue": 1, "offset": 3, "length": 3}]
+    # Tutte le clausole devono comparire nello stesso talk
+    assert index.search("climate chris") == []
+    assert index.search("") == []
+
+
+def test_search_with_accept(index):
+    assert [result["id"] for result in index.search("honor", accept=lambda talk_id: talk_id == "103")] == ["103"]
+    # Il filtro non cambia i punteggi dei talk che restano
+    [unfiltered] = [result for result in index.search("honor") if result["id"] == "103"]
+    assert index.search("honor", accept=lambda talk_id: talk_id == "103")[0]["score"] == unfiltered["score"]
+
+
+def test_cue_text_and_moments(index):
+    doc = index.index["101"]
+    assert index.cue_count(doc) == 3
+    assert index.cue_text(doc, 2) == "I have been blown away by this conference."
+    assert index.cue_starts_ms(doc) == [1000, 4000, 9000]
+    [moment] = index.find_moments(doc, "conference")
+    assert moment["cue"] == 2 and moment["start_ms"] == 9000
+    assert moment["highlights"] == [[31, 41]]
+    assert index.moment_at(doc, 5000)["cue"] == 1
+    assert index.moment_at(doc, 0)["cue"] == 0
+
+
+def test_talks_without_times(index):
+    assert index.cue_starts_ms(index.index["102"]) is None
+    assert index.cue_count(index.index["102"]) == 0
+    assert index.moment_at(index.index["102"], 1000) is None
+
+
+def test_mismatched_times_are_ignored():
+    header, arrays = transcript_index.build_index(["1"], ["One.\nTwo."], "v", [cue_times.encode_times([0, 1, 2])])
+    assert header["cues"] == 2
+    assert header["timed_talks"] == 0
+    assert list(arrays["timed"]) == [0]
+
+
+def test_multi_line_cues_keep_their_times():
+    # Una cue di GraphQL che va a capo resta una sola riga della trascrizione
+    cues = ["And I said,\nthis is amazing", "  Thank \t you  "]
+    transcript = transcript_index.CUE_SEPARATOR.join(cue_times.cue_line(cue) for cue in cues)
+    header, arrays = transcript_index.build_index(["1"], [transcript], "v", [cue_times.encode_times([1000, 5000])])
+    assert header["cues"] == 2
+    assert header["timed_talks"] == 1
+    assert list(arrays["timed"]) == [1]
+    assert cue_times.decode_times(arrays["cue_times"]) == [1000, 5000]
+    assert transcript == "And I said, this is amazing\nThank you"
+
+
+class FakeCollection:
+    """find(...).sort(...) come pymongo, su una lista di documenti."""
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection):
+        return self
+
+    def sort(self, key, direction):
+        return sorted(self.docs, key=lambda doc: doc[key])
+
+
+def test_job_skips_talks_without_text():
+    docs = [{"_id": 3, "transcript": "Three."}, {"_id": 1, "transcript": ""},
+            {"_id": 2, "transcript": "Two.", "transcript_cue_times": cue_times.encode_times([0])},
+            {"_id": 4, "transcript_z": {}}]
+    talk_ids, transcripts, times = transcriptIndex_V1.load_transcripts(FakeCollection(docs))
+    assert talk_ids == ["2", "3"]
+    assert transcripts == ["Two.", "Three."]
+    assert times == [cue_times.encode_times([0]), None]
@@ -1,47 +1,115 @@
 import json
-import os
-from neo4j import GraphDatabase, basic_auth
+from concurrent.futures import ThreadPoolExecutor
 
-# Variabili d'ambiente (da configurare nella Lambda)
-NEO4J_URI = os.environ.get('NEO4J_URI')
-NEO4J_USER = os.environ.get('NEO4J_USER')
-NEO4J_PASSWORD = os.environ.get('NEO4J_PASSWORD')
+from tedxgraph import graph_snapshot, hybrid_search, mongo_runtime, neo4j_runtime, responses, transcript_index, vector_index
+from tedxgraph.talk_filters import TalkFilter
+from tedxgraph.graph_queries import parse_tags_param, search_nodes_by_title_cypher, search_talks_by_title
+from tedxgraph.metrics import instrument_handler
 
-driver = None
+# Driver, pool e sessioni sono gestiti dal layer condiviso (tedxgraph.neo4j_runtime),
+# configurato tramite le variabili d'ambiente NEO4J_* della Lambda.
+#
+# Con "mode": "transcript" la ricerca avviene nel testo delle trascrizioni tramite
+# l'indice posizionale (TRANSCRIPT_INDEX_S3_URI, vedi tedxgraph/transcript_index.py);
+# le frasi tra virgolette sono cercate esatte:
+#   POST {"search": "\"power of vulnerability\" shame", "mode": "transcript", "limit": 10}
+# Ogni risultato ha gli snippet delle cue trovate (numero di cue, intervalli da
+# evidenziare e start_ms, l'istante in cui la cue inizia nel video).
+#
+# Con "mode": "hybrid" titoli, trascrizioni e vettori dei contenuti sono interrogati
+# in parallelo e fusi con la Reciprocal Rank Fusion (tedxgraph/hybrid_search.py),
+# con filtri opzionali comuni a tutti i retriever (vedi tedxgraph/talk_filters.py):
+#   POST {"search": "climate change", "mode": "hybrid", "tags": "climate,energy",
+#         "published_after": "2015-01-01", "published_before": "2020-12-31",
+#         "min_duration": 300, "max_duration": 900, "limit": 10}
+# Con "sort" (pagerank, newest, oldest, shortest, longest) i risultati più rilevanti
+# vengono restituiti in quell'ordine invece che per punteggio.
+# Risposta: {"results": [{id, title, score, sources: {retriever: {rank, score}}}],
+#            "retrievers": {retriever: {status, ms, candidates}},
+#            "filter": {applied, status, ms}}   (solo con filtri o sort)
+# Senza snapshot del grafo i filtri sono verificati su Neo4j entro un budget: se la
+# verifica fallisce o scade i risultati arrivano non filtrati con "applied": false.
+MAX_TRANSCRIPT_RESULTS = 50
 
-def get_neo4j_driver():
-    global driver
-    if driver is None:
-        try:
-            driver = GraphDatabase.driver(NEO4J_URI, auth=basic_auth(NEO4J_USER, NEO4J_PASSWORD))
-            driver.verify_connectivity()
-            print("Successfully connected to Neo4j.")
-        except Exception as e:
-            print(f"Error connecting to Neo4j: {e}")
-            raise ConnectionError(f"Failed to connect to Neo4j: {e}") from e
-    return driver
-
-def search_nodes_by_title_cypher(tx, search_term_param):
-
-    query = (
-        "MATCH (n) "
-        "WHERE toLower(n.title) CONTAINS toLower($search_term) "
-        "RETURN n.id AS id, n.title AS title "
-        "ORDER BY n.title " # Opzionale: ordina i risultati, ma non per "affinità"
-        "LIMIT 5"
+# Executor a livello di modulo, riutilizzato tra le invocazioni (come in graph-api):
+# un retriever oltre il budget continua qui in background senza bloccare la risposta.
+_executor = ThreadPoolExecutor(max_workers=6, thread_name_prefix='search-agent')
+
+
+def search_transcripts(search_string, limit):
+    index = transcript_index.get_transcript_index()
+    if index is None:
+        raise ConnectionError('Transcript index not available')
+    results = index.search(search_string, limit=limit)
+    talks_collection = mongo_runtime.get_talks_collection() if results else None
+    return transcript_index.attach_snippets(index, results, talks_collection)
+
+
+def search_hybrid(search_string, limit, talk_filter=None):
+    filtered = talk_filter is not None and talk_filter.has_predicates()
+    # Con lo snapshot i filtri sono verificati dentro ogni retriever; senza, solo
+    # il retriever dei titoli (Cypher) li verifica e gli altri chiedono più candidati
+    accept = hybrid_search.candidate_predicate(talk_filter) if filtered else None
+    candidates = limit * hybrid_search.CANDIDATES_FACTOR
+    unchecked_candidates = limit * hybrid_search.FILTERED_CANDIDATES_FACTOR if filtered and accept is None else candidates
+    titles = {}
+
+    def title_retriever():
+        found = neo4j_runtime.execute_read(search_talks_by_title, search_string, candidates,
+                                           talk_filter if filtered else None)
+        titles.update((str(node['id']), node['title']) for node in found)
+        return [(node['id'], None) for node in found]
+
+    def transcript_retriever():
+        index = transcript_index.get_transcript_index()
+        if index is None:
+            return None
+        found = index.search(search_string, limit=unchecked_candidates, max_hits=0, accept=accept)
+        return [(result['id'], result['score']) for result in found]
+
+    def vector_retriever():
+        index = vector_index.get_content_index()
+        if index is None:
+            return None
+        query = index.embed_text([(search_string, 1)])
+        if query is None:
+            return []
+        if accept is None:
+            found = index.search(query, k=unchecked_candidates)
+        else:
+            found = hybrid_search.filtered_top(lambda k: index.search(query, k=k), lambda i: accept(index.ids[i]),
+                                               candidates, index.size)
+        titles.update((index.ids[i], index.titles[i]) for i, _ in found)
+        return [(index.ids[i], score) for i, score in found]
+
+    budgets = hybrid_search.retriever_budgets()
+    rankings, report = hybrid_search.run_retrievers(
+        _executor,
+        {'title': title_retriever, 'transcript': transcript_retriever, 'vector': vector_retriever},
+        budgets,
     )
+    allowed, filter_report = None, None
+    if talk_filter is not None and not talk_filter.is_empty():
+        allowed, filter_report = hybrid_search.filter_candidates(
+            _executor, [talk_id for ranking in rankings.values() for talk_id, _ in ranking], talk_filter,
+            budgets['filter'])
+    results = hybrid_search.reciprocal_rank_fusion(rankings, allowed=set(allowed) if allowed is not None else None,
+                                                   limit=limit)
+    if talk_filter is not None and talk_filter.sort and allowed is not None:
+        results = hybrid_search.sort_results(results, allowed)
 
-    result = tx.run(query, search_term=search_term_param)
-    
-    nodes_data = []
-    for record in result:
-        nodes_data.append({
-            "id": record["id"], # Assicurati che i tuoi nodi abbiano una proprietà 'id'
-                                # o usa id(n) se vuoi l'ID interno di Neo4j
-            "title": record["title"]
-        })
-    return nodes_data
+    snapshot = graph_snapshot.get_snapshot()
+    for result in results:
+        title = titles.get(result['id'])
+        if not title and snapshot is not None and snapshot.has(result['id']):
+            title = snapshot.text('title', snapshot.index[result['id']])
+        result['title'] = title
+    response = {'results': results, 'retrievers': report}
+    if filter_report is not None:
+        response['filter'] = {'applied': allowed is not None, **filter_report}
+    return response
 
+@instrument_handler('search-agent')
 def lambda_handler(event, context):
     print(f"Received event: {event}")
 
@@ -75,24 +143,35 @@ def lambda_handler(event, context):
                 'body': json.dumps({'error': 'Parameter "search" is missing in the request body'})
             }
 
-        print(f"Searching for nodes with title similar to: {search_string}")
+        try:
+            limit = min(max(int(body.get('limit', 10)), 1), MAX_TRANSCRIPT_RESULTS)
+        except (TypeError, ValueError):
+            limit = 10
 
-        db_driver = get_neo4j_driver()
+        if body.get('mode') == 'transcript':
+            print(f"Searching transcripts for: {search_string}")
+            found_nodes_list = search_transcripts(search_string, limit)
+        elif body.get('mode') == 'hybrid':
+            try:
+                talk_filter = TalkFilter.from_params(body, parse_tags_param(body.get('tags')))
+            except ValueError as ve:
+                return {
+                    'statusCode': 400,
+                    'headers': {
+                        'Content-Type': 'application/json',
+                        'Access-Control-Allow-Origin': '*'
+                    },
+                    'body': json.dumps({'error': str(ve)})
+                }
+            print(f"Hybrid search for: {search_string}")
+            found_nodes_list = search_hybrid(search_string, limit, talk_filter)
+        else:
+            print(f"Searching for nodes with title similar to: {search_string}")
+            found_nodes_list = neo4j_runtime.execute_read(search_nodes_by_title_cypher, search_string)
         
-        found_nodes_list = []
-        with db_driver.session() as session:
-            found_nodes_list = session.read_transaction(search_nodes_by_title_cypher, search_string)
-        
-        print(f"Found {len(found_nodes_list)} matching nodes.")
+        print(f"Found {len(found_nodes_list['results'] if isinstance(found_nodes_list, dict) else found_nodes_list)} matching nodes.")
 
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps(found_nodes_list)
-        }
+        return responses.json_response(event, 200, found_nodes_list, {'Access-Control-Allow-Origin': '*'})
 
     except ConnectionError as ce:
         print(f"Connection Error: {ce}")
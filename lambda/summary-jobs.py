@@ -0,0 +1,57 @@
+import json
+
+from tedxgraph import summary_jobs
+from tedxgraph.metrics import instrument_handler
+
+# API asincrona dei riassunti (alternativa non bloccante a openai-agent):
+#
+#   POST /summary-jobs {"id": "567505"}       -> 200 con il riassunto se già in cache,
+#                                                altrimenti 202 con {"job_id", "status", ...}
+#   GET  /summary-jobs?job_id=...&wait=20     -> stato del job (long polling fino a "wait" s),
+#                                                con i riassunti parziali dei blocchi già pronti
+#
+# I job vengono elaborati dalla Lambda summary-worker, collegata alla coda SQS.
+
+CORS_HEADERS = {'Access-Control-Allow-Origin': '*', 'Access-Control-Allow-Headers': 'Content-Type', 'Access-Control-Allow-Methods': 'GET,POST,OPTIONS'}
+
+
+def _response(status_code, body):
+    return {'statusCode': status_code, 'headers': {**CORS_HEADERS, 'Content-Type': 'application/json'}, 'body': json.dumps(body, ensure_ascii=False, default=str)}
+
+
+@instrument_handler('summary-jobs')
+def lambda_handler(event, context):
+    print(f"Evento ricevuto: {json.dumps(event, default=str)}")
+
+    if event.get('httpMethod') == 'OPTIONS':
+        return {'statusCode': 200, 'headers': CORS_HEADERS, 'body': ''}
+
+    params = dict(event.get('queryStringParameters') or {})
+    if event.get('body'):
+        try:
+            body = json.loads(event['body']) if isinstance(event['body'], str) else event['body']
+        except json.JSONDecodeError:
+            return _response(400, {'error': 'Corpo della richiesta JSON non valido'})
+        if isinstance(body, dict):
+            params.update(body)
+
+    try:
+        if params.get('job_id'):
+            try:
+                wait_seconds = float(params.get('wait', 0))
+            except (TypeError, ValueError):
+                return _response(400, {'error': "Parametro 'wait' non valido."})
+            status_code, body = summary_jobs.get_summary_job(params['job_id'], wait_seconds=wait_seconds)
+            return _response(status_code, body)
+
+        if not params.get('id'):
+            return _response(400, {'error': "Parametro 'id' o 'job_id' mancante nella richiesta."})
+
+        status_code, body = summary_jobs.submit_summary_job(params['id'])
+        return _response(status_code, body)
+
+    except Exception as e:
+        print(f"Errore imprevisto nel lambda_handler: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return _response(500, {'error': f'Errore interno del server: {str(e)}'})
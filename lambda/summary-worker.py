@@ -0,0 +1,24 @@
+import json
+
+from tedxgraph import summary_jobs
+from tedxgraph.metrics import instrument_handler
+
+# Worker dei job di riassunto: Lambda con event source mapping sulla coda SQS
+# (SUMMARY_QUEUE_URL), da configurare con ReportBatchItemFailures.
+# Ogni messaggio contiene {"job_id": "..."}; i messaggi falliti tornano in coda.
+
+
+@instrument_handler('summary-worker')
+def lambda_handler(event, context):
+    failures = []
+    for record in event.get('Records', []):
+        try:
+            job_id = json.loads(record['body'])['job_id']
+            final_status = summary_jobs.process_job(job_id)
+            print(f"Job {job_id}: {final_status or 'ignorato'}")
+        except Exception as e:
+            print(f"Errore durante l'elaborazione del messaggio {record.get('messageId')}: {e}")
+            import traceback
+            traceback.print_exc()
+            failures.append({'itemIdentifier': record.get('messageId')})
+    return {'batchItemFailures': failures}